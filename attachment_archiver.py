@@ -0,0 +1,154 @@
+"""
+Archivage des pièces jointes des tickets
+Les URLs du CDN Discord expirent : à la clôture d'un ticket, ses pièces jointes
+sont téléchargées et stockées sous leur empreinte SHA-256 (une capture collée
+dans plusieurs tickets du serveur n'est stockée qu'une fois), puis le transcript
+pointe vers ces copies.
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_URL_PREFIX = "/api/ticket-attachments"
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def attachment_url(guild_id: int, digest: str) -> str:
+    """URL (relative au dashboard) d'une pièce jointe archivée"""
+    return f"{ATTACHMENT_URL_PREFIX}/{guild_id}/{digest}"
+
+
+class AttachmentArchiver:
+    """Télécharge les pièces jointes d'un ticket vers le stockage des transcripts
+
+    Les téléchargements sont parallèles (limités par `concurrency`) et le volume
+    archivé par ticket est plafonné : au-delà, les pièces jointes gardent leur URL Discord.
+    """
+
+    def __init__(self, storage, max_ticket_bytes: Optional[int] = None, concurrency: Optional[int] = None):
+        self.storage = storage
+        self.enabled = os.getenv('TICKET_ATTACHMENT_ARCHIVE', '1').lower() not in ('0', 'false', 'no')
+        self.max_ticket_bytes = max_ticket_bytes if max_ticket_bytes is not None else int(
+            float(os.getenv('TICKET_ATTACHMENT_MAX_MB', '50')) * 1024 * 1024
+        )
+        self.concurrency = concurrency or int(os.getenv('TICKET_ATTACHMENT_CONCURRENCY', '4'))
+        self.timeout = float(os.getenv('TICKET_ATTACHMENT_TIMEOUT', '60'))
+
+    @staticmethod
+    def collect(messages: Iterable[Dict]) -> List[Dict]:
+        """Pièces jointes distinctes (par URL) d'un transcript, dans l'ordre des messages"""
+        seen = set()
+        attachments = []
+        for message in messages:
+            for attachment in message.get("attachments") or []:
+                url = attachment.get("url")
+                if url and url not in seen and not attachment.get("sha256"):
+                    seen.add(url)
+                    attachments.append(attachment)
+        return attachments
+
+    def plan(self, attachments: List[Dict]) -> List[Dict]:
+        """Retient les pièces jointes dans la limite de taille du ticket (taille annoncée par Discord)"""
+        budget = self.max_ticket_bytes
+        selected = []
+        for attachment in attachments:
+            size = attachment.get("size") or 0
+            if 0 < size <= budget:
+                selected.append(attachment)
+                budget -= size
+        return selected
+
+    async def archive_ticket(self, guild_id: int, messages: Iterable[Dict]) -> Dict[str, Dict]:
+        """Archive les pièces jointes d'un ticket, retourne {url d'origine: blob archivé}
+
+        Les erreurs sont journalisées sans interrompre la clôture du ticket.
+        """
+        if not self.enabled or not self.storage.is_ready():
+            return {}
+        try:
+            # Lecture des segments du transcript hors de la boucle d'événements
+            attachments = await asyncio.to_thread(self.collect, messages)
+            selected = self.plan(attachments)
+            if len(selected) < len(attachments):
+                logger.warning(
+                    f"{len(attachments) - len(selected)} pièce(s) jointe(s) non archivée(s) "
+                    f"(limite de {self.max_ticket_bytes / (1024 * 1024):g} Mo par ticket)"
+                )
+            if not selected:
+                return {}
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            locks: Dict[str, asyncio.Lock] = {}  # Une seule copie d'un contenu présent plusieurs fois dans le ticket
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                results = await asyncio.gather(*(
+                    self._archive_one(session, semaphore, locks, guild_id, attachment) for attachment in selected
+                ))
+            archived = dict(result for result in results if result)
+            logger.info(f"{len(archived)}/{len(selected)} pièce(s) jointe(s) archivée(s) pour le serveur {guild_id}")
+            return archived
+        except Exception as e:
+            logger.error(f"Erreur lors de l'archivage des pièces jointes: {e}")
+            return {}
+
+    async def _archive_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                           locks: Dict[str, asyncio.Lock], guild_id: int, attachment: Dict) -> Optional[Tuple[str, Dict]]:
+        url = attachment["url"]
+        limit = attachment.get("size") or 0
+        async with semaphore:
+            try:
+                with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+                    sha256 = hashlib.sha256()
+                    size = 0
+                    async with session.get(url) as response:
+                        if response.status != 200:
+                            logger.warning(f"Pièce jointe indisponible ({response.status}): {attachment.get('filename')}")
+                            return None
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > limit:
+                                # Plus grande qu'annoncé : la réservation dans la limite du ticket est dépassée
+                                logger.warning(f"Pièce jointe plus grande qu'annoncé, ignorée: {attachment.get('filename')}")
+                                return None
+                            sha256.update(chunk)
+                            spool.write(chunk)
+                        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+
+                    digest = sha256.hexdigest()
+                    # Même contenu déjà archivé (autre ticket du serveur) : rien à envoyer
+                    async with locks.setdefault(digest, asyncio.Lock()):
+                        if not await self.storage.has_blob(guild_id, digest):
+                            spool.seek(0)
+                            await self.storage.store_blob(guild_id, digest, spool, content_type)
+                return url, {"sha256": digest, "size": size, "content_type": content_type}
+            except Exception as e:
+                logger.error(f"Erreur lors de l'archivage de {attachment.get('filename')}: {e}")
+                return None
+
+    @staticmethod
+    def rewrite(messages: Iterable[Dict], guild_id: int, archived: Dict[str, Dict]) -> Iterator[Dict]:
+        """Fait pointer les pièces jointes archivées du transcript vers leur copie (URL d'origine conservée)"""
+        for message in messages:
+            attachments = message.get("attachments")
+            if attachments and any(attachment.get("url") in archived for attachment in attachments):
+                message = dict(message)
+                message["attachments"] = [
+                    dict(
+                        attachment,
+                        url=attachment_url(guild_id, archived[attachment["url"]]["sha256"]),
+                        source_url=attachment["url"],
+                        **archived[attachment["url"]]
+                    ) if attachment.get("url") in archived else attachment
+                    for attachment in attachments
+                ]
+            yield message
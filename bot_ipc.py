@@ -0,0 +1,209 @@
+"""
+API IPC locale du bot pour le dashboard
+Petit serveur HTTP (aiohttp, déjà présent avec discord.py) dans le processus du
+bot, en boucle locale ou sur un socket Unix, protégé par un secret partagé.
+Il expose le cache de la gateway au format de l'API REST Discord (serveur avec
+compteurs de présence, salons, rôles, membres, membre du bot) et reçoit des
+commandes du dashboard : déployer un menu de rôles, invalider une configuration.
+Le dashboard l'interroge en premier (bot_ipc_client.py) et revient à l'API REST
+Discord si le bot ne répond pas.
+
+Configuration :
+    BOT_IPC_SECRET   secret partagé avec le dashboard (serveur désactivé sans lui)
+    BOT_IPC_HOST     adresse d'écoute (127.0.0.1 par défaut)
+    BOT_IPC_PORT     port d'écoute (8765 par défaut)
+    BOT_IPC_SOCKET   chemin d'un socket Unix, utilisé à la place de HOST/PORT
+"""
+
+import os
+import hmac
+import logging
+from typing import Any, Dict, Optional
+
+import discord
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+MAX_MEMBERS = 1000
+
+
+def _asset_key(asset: Optional[discord.Asset]) -> Optional[str]:
+    return asset.key if asset else None
+
+
+def user_json(user: discord.abc.User) -> Dict[str, Any]:
+    return {
+        'id': str(user.id),
+        'username': user.name,
+        'global_name': getattr(user, 'global_name', None),
+        'discriminator': user.discriminator,
+        'avatar': _asset_key(user.avatar),
+        'bot': user.bot,
+    }
+
+
+def member_json(member: discord.Member) -> Dict[str, Any]:
+    return {
+        'user': user_json(member),
+        'nick': member.nick,
+        'roles': [str(role.id) for role in member.roles if not role.is_default()],
+        'joined_at': member.joined_at.isoformat() if member.joined_at else None,
+    }
+
+
+def channel_json(channel: discord.abc.GuildChannel) -> Dict[str, Any]:
+    return {
+        'id': str(channel.id),
+        'guild_id': str(channel.guild.id),
+        'type': channel.type.value,
+        'name': channel.name,
+        'position': channel.position,
+        'parent_id': str(channel.category_id) if channel.category_id else None,
+    }
+
+
+def role_json(role: discord.Role) -> Dict[str, Any]:
+    return {
+        'id': str(role.id),
+        'name': role.name,
+        'color': role.color.value,
+        'position': role.position,
+        'permissions': str(role.permissions.value),
+        'managed': role.managed,
+        'hoist': role.hoist,
+        'mentionable': role.mentionable,
+    }
+
+
+def guild_json(guild: discord.Guild) -> Dict[str, Any]:
+    online = sum(1 for member in guild.members if member.status is not discord.Status.offline)
+    return {
+        'id': str(guild.id),
+        'name': guild.name,
+        'icon': _asset_key(guild.icon),
+        'owner_id': str(guild.owner_id),
+        'member_count': guild.member_count,
+        'approximate_member_count': guild.member_count,
+        'approximate_presence_count': online,
+        'human_count': sum(1 for member in guild.members if not member.bot),
+    }
+
+
+class BotIPCServer:
+    """Serveur IPC du bot, démarré dans setup_hook et arrêté avec le bot"""
+
+    def __init__(self, bot, secret: Optional[str] = None, host: Optional[str] = None,
+                 port: Optional[int] = None, socket_path: Optional[str] = None):
+        self.bot = bot
+        self.secret = secret or os.getenv('BOT_IPC_SECRET')
+        self.host = host or os.getenv('BOT_IPC_HOST', '127.0.0.1')
+        self.port = port or int(os.getenv('BOT_IPC_PORT', str(DEFAULT_PORT)))
+        self.socket_path = socket_path or os.getenv('BOT_IPC_SOCKET')
+        self.runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._authenticate])
+        app.add_routes([
+            web.get('/health', self.health),
+            web.get('/users/@me', self.bot_user),
+            web.get('/guilds/{guild_id}', self.guild),
+            web.get('/guilds/{guild_id}/channels', self.channels),
+            web.get('/guilds/{guild_id}/roles', self.roles),
+            web.get('/guilds/{guild_id}/members', self.members),
+            web.get('/guilds/{guild_id}/members/@me', self.bot_member),
+            web.post('/role-menus/{menu_id}/deploy', self.deploy_role_menu),
+            web.post('/config/invalidate', self.invalidate_config),
+        ])
+        return app
+
+    async def start(self) -> None:
+        if not self.secret:
+            logger.info("API IPC désactivée (BOT_IPC_SECRET non défini)")
+            return
+        self.runner = web.AppRunner(self.build_app(), access_log=None)
+        await self.runner.setup()
+        if self.socket_path:
+            site = web.UnixSite(self.runner, self.socket_path)
+        else:
+            site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logger.info(f"API IPC du bot à l'écoute sur {self.socket_path or f'{self.host}:{self.port}'}")
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @web.middleware
+    async def _authenticate(self, request: web.Request, handler):
+        expected = f"Bearer {self.secret}"
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+            return web.json_response({'message': '401: Unauthorized'}, status=401)
+        if request.path != '/health' and not self.bot.is_ready():
+            return web.json_response({'message': 'Bot not ready'}, status=503)
+        return await handler(request)
+
+    def _guild(self, request: web.Request) -> discord.Guild:
+        try:
+            guild = self.bot.get_guild(int(request.match_info['guild_id']))
+        except ValueError:
+            guild = None
+        if guild is None:
+            raise web.HTTPNotFound(text='{"message": "Unknown Guild"}', content_type='application/json')
+        return guild
+
+    # Lecture du cache de la gateway
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'ready': self.bot.is_ready(),
+            'guilds': len(self.bot.guilds),
+            'latency': round(self.bot.latency, 3) if self.bot.is_ready() else None,
+        })
+
+    async def bot_user(self, request: web.Request) -> web.Response:
+        return web.json_response(user_json(self.bot.user))
+
+    async def guild(self, request: web.Request) -> web.Response:
+        return web.json_response(guild_json(self._guild(request)))
+
+    async def channels(self, request: web.Request) -> web.Response:
+        return web.json_response([channel_json(channel) for channel in self._guild(request).channels])
+
+    async def roles(self, request: web.Request) -> web.Response:
+        return web.json_response([role_json(role) for role in self._guild(request).roles])
+
+    async def members(self, request: web.Request) -> web.Response:
+        """Membres du serveur ; `query` filtre par nom via l'index des membres du bot"""
+        guild = self._guild(request)
+        limit = max(1, min(int(request.query.get('limit', 100)), MAX_MEMBERS))
+        members = self.bot.member_index.search(guild, request.query.get('query', ''), limit,
+                                               include_bots=request.query.get('include_bots') == 'true')
+        return web.json_response([member_json(member) for member in members])
+
+    async def bot_member(self, request: web.Request) -> web.Response:
+        guild = self._guild(request)
+        return web.json_response({**member_json(guild.me), 'permissions': str(guild.me.guild_permissions.value)})
+
+    # Commandes du dashboard
+
+    async def deploy_role_menu(self, request: web.Request) -> web.Response:
+        """Crée ou met à jour le message d'un menu de rôles"""
+        cog = self.bot.get_cog('RoleMenus')
+        if cog is None:
+            return web.json_response({'message': 'Role menus not loaded'}, status=503)
+        deployed = await cog.force_create_menu_message(int(request.match_info['menu_id']))
+        return web.json_response({'deployed': deployed})
+
+    async def invalidate_config(self, request: web.Request) -> web.Response:
+        """Invalide la configuration en mémoire d'un serveur (une portée, ou toutes)"""
+        body = await request.json()
+        guild_id = int(body['guild_id']) if body.get('guild_id') else None
+        if guild_id is not None and body.get('scope'):
+            # Même traitement qu'une nouvelle version : les abonnés de la portée sont prévenus
+            self.bot.interactions.config.changed(guild_id, body['scope'])
+        else:
+            self.bot.interactions.config.invalidate(guild_id, body.get('scope'))
+        return web.json_response({'invalidated': True})
@@ -0,0 +1,82 @@
+"""
+Client du dashboard pour l'API IPC du bot (voir bot_ipc.py)
+Les lectures et commandes passent d'abord par le bot ; toute indisponibilité
+(bot arrêté, délai dépassé, erreur) renvoie None et l'appelant se rabat sur
+l'API REST Discord ou sur la base. Après un échec de connexion, le bot n'est
+plus interrogé pendant `retry_after` secondes pour ne pas ralentir chaque requête.
+
+Configuration :
+    BOT_IPC_SECRET   secret partagé avec le bot (client désactivé sans lui)
+    BOT_IPC_URL      adresse du bot (http://127.0.0.1:8765 par défaut)
+    BOT_IPC_SOCKET   chemin d'un socket Unix, utilisé à la place de l'adresse
+"""
+
+import os
+import time
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class BotIPCClient:
+    """Accès au bot en processus local ; None quand le bot ne peut pas répondre"""
+
+    def __init__(self, url: Optional[str] = None, secret: Optional[str] = None,
+                 socket_path: Optional[str] = None, timeout: float = 2.0, retry_after: float = 30.0):
+        self.secret = secret or os.getenv('BOT_IPC_SECRET')
+        self.url = url or os.getenv('BOT_IPC_URL', 'http://127.0.0.1:8765')
+        self.socket_path = socket_path or os.getenv('BOT_IPC_SOCKET')
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.down_until = 0.0
+        self.http: Optional[httpx.AsyncClient] = None
+        self.stats = {'hits': 0, 'fallbacks': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret) and time.monotonic() >= self.down_until
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.http is None:
+            transport = httpx.AsyncHTTPTransport(uds=self.socket_path) if self.socket_path else None
+            self.http = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 0.5)),
+                headers={'Authorization': f'Bearer {self.secret}'},
+                transport=transport
+            )
+        return self.http
+
+    async def request(self, method: str, path: str, **kwargs) -> Optional[Any]:
+        """Réponse JSON du bot, ou None (bot indisponible, serveur inconnu, commande refusée)"""
+        if not self.enabled:
+            return None
+        try:
+            response = await self._client().request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.down_until = time.monotonic() + self.retry_after
+            self.stats['fallbacks'] += 1
+            logger.warning(f"API IPC du bot indisponible ({type(e).__name__}), repli pendant {self.retry_after:.0f}s")
+            return None
+        if response.status_code != 200:
+            if response.status_code in (401, 503):
+                # Secret refusé ou bot pas encore connecté à la gateway
+                self.down_until = time.monotonic() + self.retry_after
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats['hits'] += 1
+        return response.json()
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        return await self.request('GET', path, params=params)
+
+    async def command(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        return await self.request('POST', path, json=payload or {})
+
+    async def aclose(self) -> None:
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
@@ -0,0 +1,281 @@
+"""
+Actions de modération groupées
+Une action (timeout, kick, ban) appliquée à une liste de membres passe par un
+petit pool de workers : chaque appel attend un jeton du bucket de la route
+(serveur, action) et du bucket global du processus, maintenu sous la limite
+globale de Discord, et un 429 bloque le bucket concerné puis remet la cible en
+file. L'historique de tout le lot est écrit en une insertion groupée à la fin.
+La progression de chaque lot est observable pendant son exécution (embed du
+bot, flux du dashboard). Partagé par le bot et le dashboard.
+"""
+
+import os
+import re
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from log_queue import RateLimitBucket
+from moderation_stats import record_actions
+from moderation_scheduler import cancel_expirations, enqueue_expirations
+
+logger = logging.getLogger(__name__)
+
+BULK_ACTIONS = ('timeout', 'kick', 'ban')
+MAX_BULK_TARGETS = 500
+MAX_ATTEMPTS = 3  # Tentatives par cible en cas de 429
+JOB_RETENTION_SECONDS = 900  # Durée de conservation d'un lot terminé (consultation de son résultat)
+
+_USER_ID_PATTERN = re.compile(r'<@!?(\d{15,20})>|\b(\d{15,20})\b')
+
+PerformAction = Callable[[int], Awaitable[Any]]
+
+
+class RateLimited(Exception):
+    """Réponse 429 de Discord pour une cible (elle sera retentée après retry_after secondes)"""
+
+    def __init__(self, retry_after: float, is_global: bool = False):
+        super().__init__(f"Rate limited for {retry_after:.2f}s")
+        self.retry_after = retry_after
+        self.is_global = is_global
+
+
+def parse_user_ids(text: str) -> List[int]:
+    """IDs des mentions et identifiants numériques d'un texte, sans doublons, dans l'ordre"""
+    seen = {}
+    for mention, raw in _USER_ID_PATTERN.findall(text or ''):
+        seen.setdefault(int(mention or raw), None)
+    return list(seen)
+
+
+class BulkJob:
+    """Un lot d'actions et sa progression"""
+
+    def __init__(self, guild_id: int, moderator_id: int, action_type: str, targets: List[int],
+                 reason: Optional[str] = None, duration_minutes: Optional[int] = None):
+        if action_type not in BULK_ACTIONS:
+            raise ValueError(f"Action groupée non prise en charge: {action_type}")
+        if action_type == 'timeout' and not duration_minutes:
+            raise ValueError("Durée requise pour un timeout")
+        self.id = uuid.uuid4().hex
+        self.guild_id = guild_id
+        self.moderator_id = moderator_id
+        self.action_type = action_type
+        self.targets = list(dict.fromkeys(targets))[:MAX_BULK_TARGETS]
+        self.reason = reason
+        self.duration_minutes = duration_minutes if action_type == 'timeout' else None
+        self.status = 'pending'
+        self.succeeded: List[int] = []
+        self.failed: Dict[int, str] = {}
+        self.rate_limited = 0
+        self.history_written = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self.changed = asyncio.Condition()
+
+    @property
+    def done(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+    @property
+    def finished(self) -> bool:
+        return self.status == 'done'
+
+    async def touch(self) -> None:
+        """Signale une évolution aux observateurs"""
+        async with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 2)
+        return {
+            'job_id': self.id,
+            'guild_id': str(self.guild_id),
+            'action': self.action_type,
+            'status': self.status,
+            'total': len(self.targets),
+            'done': self.done,
+            'succeeded': len(self.succeeded),
+            'failed': [{'user_id': str(user_id), 'error': error} for user_id, error in self.failed.items()],
+            'rate_limited': self.rate_limited,
+            'history_written': self.history_written,
+            'elapsed_seconds': elapsed
+        }
+
+    async def progress(self, interval: float = 0.0) -> AsyncIterator[Dict[str, Any]]:
+        """Instantanés successifs jusqu'à la fin du lot, au plus un par `interval` secondes"""
+        seen = -1
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.version != seen)
+                seen = self.version
+            snapshot = self.snapshot()
+            yield snapshot
+            if snapshot['status'] == 'done':
+                return
+            if interval:
+                await asyncio.sleep(interval)
+
+
+class BulkActionExecutor:
+    """Exécute les lots avec un pool de workers borné par les buckets de rate limit
+
+    Un bucket par (serveur, action) limite le débit d'une route ; le bucket global
+    est partagé par tous les lots du processus.
+    """
+
+    def __init__(self, db, concurrency: Optional[int] = None, route_rate: Optional[float] = None,
+                 global_rate: Optional[float] = None):
+        self.db = db
+        self.concurrency = concurrency or int(os.getenv('BULK_MODERATION_CONCURRENCY', '5'))
+        self.route_rate = route_rate or float(os.getenv('BULK_MODERATION_ROUTE_RATE', '10'))
+        self.global_bucket = RateLimitBucket(
+            capacity=int(global_rate or float(os.getenv('BULK_MODERATION_GLOBAL_RATE', '40'))), per=1.0
+        )
+        self.buckets: Dict[Tuple[int, str], RateLimitBucket] = {}
+        self.jobs: Dict[str, BulkJob] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def bucket(self, guild_id: int, action_type: str) -> RateLimitBucket:
+        key = (guild_id, action_type)
+        if key not in self.buckets:
+            self.buckets[key] = RateLimitBucket(capacity=max(1, int(self.route_rate)), per=1.0)
+        return self.buckets[key]
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        self._prune()
+        return self.jobs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, job: BulkJob, perform: PerformAction,
+               on_done: Optional[Callable[[BulkJob], Awaitable[None]]] = None) -> asyncio.Task:
+        """Lance le lot en tâche de fond (suivi via get(job.id)), puis `on_done` une fois terminé"""
+        self._prune()
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run_and_finish(job, perform, on_done))
+        self.tasks[job.id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job.id, None))
+        return task
+
+    async def _run_and_finish(self, job: BulkJob, perform: PerformAction,
+                              on_done: Optional[Callable[[BulkJob], Awaitable[None]]]) -> BulkJob:
+        try:
+            await self.run(job, perform)
+        finally:
+            if on_done:
+                try:
+                    await on_done(job)
+                except Exception as e:
+                    logger.error(f"Erreur après le lot {job.id}: {e}")
+        return job
+
+    async def run(self, job: BulkJob, perform: PerformAction) -> BulkJob:
+        """Applique l'action à toutes les cibles puis écrit l'historique du lot"""
+        self.jobs.setdefault(job.id, job)
+        job.status = 'running'
+        job.started_at = time.monotonic()
+        await job.touch()
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_id in job.targets:
+            queue.put_nowait((user_id, 1))
+        route = self.bucket(job.guild_id, job.action_type)
+
+        workers = [
+            asyncio.create_task(self._worker(job, perform, queue, route))
+            for _ in range(min(self.concurrency, len(job.targets)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # Même interrompu, le lot enregistre les actions déjà appliquées
+            for worker in workers:
+                worker.cancel()
+            try:
+                await self.write_history(job)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture de l'historique du lot {job.id}: {e}")
+            job.status = 'done'
+            job.finished_at = time.monotonic()
+            await job.touch()
+
+        logger.info(
+            f"Lot {job.action_type} {job.id} terminé sur le serveur {job.guild_id}: "
+            f"{len(job.succeeded)} réussie(s), {len(job.failed)} échec(s), {job.rate_limited} 429"
+        )
+        return job
+
+    async def _acquire(self, route: RateLimitBucket) -> None:
+        while True:
+            delay = max(route.delay(), self.global_bucket.delay())
+            if delay <= 0:
+                route.consume()
+                self.global_bucket.consume()
+                return
+            await asyncio.sleep(delay)
+
+    async def _worker(self, job: BulkJob, perform: PerformAction, queue: asyncio.Queue,
+                      route: RateLimitBucket) -> None:
+        while True:
+            try:
+                user_id, attempt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._acquire(route)
+            try:
+                await perform(user_id)
+                job.succeeded.append(user_id)
+            except RateLimited as e:
+                job.rate_limited += 1
+                (self.global_bucket if e.is_global else route).block(e.retry_after)
+                if attempt < MAX_ATTEMPTS:
+                    queue.put_nowait((user_id, attempt + 1))
+                    continue
+                job.failed[user_id] = "rate limited"
+            except Exception as e:
+                job.failed[user_id] = str(e)[:200] or type(e).__name__
+            await job.touch()
+
+    async def write_history(self, job: BulkJob) -> None:
+        """Historique et compteurs de statistiques des actions réussies, en une fois"""
+        if not job.succeeded:
+            return
+        expires_at = None
+        if job.duration_minutes:
+            expires_at = datetime.now() + timedelta(minutes=job.duration_minutes)
+        await self.db.execute_many(
+            """INSERT INTO moderation_history
+               (guild_id, user_id, moderator_id, action_type, reason, duration_minutes, expires_at, is_active)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+            [
+                (job.guild_id, user_id, job.moderator_id, job.action_type, job.reason,
+                 job.duration_minutes, expires_at, True)
+                for user_id in job.succeeded
+            ]
+        )
+        await record_actions(self.db, job.guild_id, job.moderator_id, job.action_type, job.succeeded)
+        # Expirations antérieures de ces membres remplacées par celles du lot
+        await cancel_expirations(self.db, job.guild_id, job.action_type, job.succeeded)
+        if expires_at:
+            await enqueue_expirations(self.db, job.guild_id, job.action_type,
+                                      [(user_id, expires_at) for user_id in job.succeeded])
+        job.history_written = True
+
+    async def close(self) -> None:
+        """Annule les lots encore en cours (arrêt du processus)"""
+        for task in list(self.tasks.values()):
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
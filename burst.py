@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# flush_callback(guild_id, kind, items, count, duration)
+FlushCallback = Callable[[int, str, List[str], int, float], Awaitable[None]]
+
+
+class Burst:
+    """Pending events of an active burst for one (guild, kind)"""
+
+    __slots__ = ('items', 'count', 'total', 'started', 'task')
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.count = 0  # Events since the last summary
+        self.total = 0  # Events over the whole burst
+        self.started = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+
+class BurstCoalescer:
+    """Detects event floods per guild and folds them into periodic summaries.
+
+    Events are delivered normally until more than ``threshold`` of the same kind
+    arrive within ``window`` seconds. From then on ``observe`` returns True and
+    the caller skips its per-event work; the coalescer emits one summary per
+    window through ``flush_callback`` until a window passes with no events.
+    """
+
+    def __init__(self, flush_callback: FlushCallback, window: Optional[float] = None,
+                 threshold: Optional[int] = None, max_items: int = 50):
+        self.flush_callback = flush_callback
+        self.window = window if window is not None else float(os.getenv('BURST_WINDOW', '10'))
+        self.threshold = threshold if threshold is not None else int(os.getenv('BURST_THRESHOLD', '5'))
+        self.max_items = max_items
+        self.recent: Dict[Tuple[int, str], Deque[float]] = {}
+        self.bursts: Dict[Tuple[int, str], Burst] = {}
+        self.stats = {
+            'bursts_detected': 0,
+            'events_coalesced': 0,
+            'summaries_sent': 0,
+            'largest_burst': 0
+        }
+
+    def is_active(self, guild_id: int, kind: str) -> bool:
+        return (guild_id, kind) in self.bursts
+
+    def observe(self, guild_id: int, kind: str, item: str) -> bool:
+        """Record an event; returns True if it was absorbed into a burst summary"""
+        key = (guild_id, kind)
+        burst = self.bursts.get(key)
+        if burst:
+            self._absorb(burst, item)
+            return True
+
+        now = time.monotonic()
+        recent = self.recent.get(key)
+        if recent is None:
+            recent = deque()
+            self.recent[key] = recent
+        recent.append(now)
+        while recent and now - recent[0] > self.window:
+            recent.popleft()
+        while len(recent) > self.threshold + 1:
+            recent.popleft()
+
+        if len(recent) <= self.threshold:
+            return False
+
+        # Threshold crossed: start a burst and take over delivery
+        del self.recent[key]
+        burst = Burst()
+        self.bursts[key] = burst
+        self.stats['bursts_detected'] += 1
+        self._absorb(burst, item)
+        burst.task = asyncio.create_task(self._run(key, burst))
+        return True
+
+    def _absorb(self, burst: Burst, item: str) -> None:
+        burst.count += 1
+        burst.total += 1
+        if len(burst.items) < self.max_items:
+            burst.items.append(item)
+        self.stats['events_coalesced'] += 1
+
+    async def _run(self, key: Tuple[int, str], burst: Burst) -> None:
+        """Emit one summary per window until the burst dies down"""
+        try:
+            while True:
+                await asyncio.sleep(self.window)
+                if not burst.count:
+                    break
+                await self._flush(key, burst)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.stats['largest_burst'] = max(self.stats['largest_burst'], burst.total)
+            if self.bursts.get(key) is burst:
+                del self.bursts[key]
+
+    async def _flush(self, key: Tuple[int, str], burst: Burst) -> None:
+        items, count = burst.items, burst.count
+        burst.items, burst.count = [], 0
+        try:
+            await self.flush_callback(key[0], key[1], items, count, self.window)
+            self.stats['summaries_sent'] += 1
+        except Exception as e:
+            logger.error(f"Error sending burst summary for guild {key[0]} ({key[1]}): {e}")
+
+    async def close(self) -> None:
+        """Flush every pending summary and stop all burst tasks"""
+        for key, burst in list(self.bursts.items()):
+            if burst.task:
+                burst.task.cancel()
+            if burst.count:
+                await self._flush(key, burst)
+        self.bursts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'active_bursts': [
+                {'guild_id': guild_id, 'kind': kind, 'events': burst.total,
+                 'seconds': round(time.monotonic() - burst.started, 1)}
+                for (guild_id, kind), burst in self.bursts.items()
+            ]
+        }
+
+
+def format_burst_lines(items: List[str], count: int, more_text: Callable[[int], str],
+                       limit: int = 3900) -> str:
+    """Join burst items into an embed description, noting how many were left out"""
+    lines = []
+    length = 0
+    for item in items:
+        if length + len(item) + 1 > limit:
+            break
+        lines.append(item)
+        length += len(item) + 1
+    if count > len(lines):
+        lines.append(more_text(count - len(lines)))
+    return "\n".join(lines)
@@ -1,304 +1,584 @@
 """
 Système de stockage cloud pour les logs de tickets
-Utilise Google Drive API pour stocker les logs compressés
+Les logs compressés sont stockés sur Google Drive ou sur le disque local
+(TRANSCRIPT_STORAGE=drive|local)
 """
 
 import os
 import json
 import zipfile
 import io
+import re
+import uuid
+import shutil
 import asyncio
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import tempfile
+import threading
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Any, Set, Tuple
 import aiohttp
 import aiofiles
+from transcript_buffer import TranscriptBuffer
+from transcript_index import TranscriptIndex
+from attachment_archiver import AttachmentArchiver, SHA256_PATTERN
 
 logger = logging.getLogger(__name__)
 
-class GoogleDriveStorage:
-    """Gestionnaire de stockage Google Drive pour les logs de tickets"""
-    
-    def __init__(self, credentials_file: str = "credentials.json", token_file: str = "token.json"):
-        self.credentials_file = credentials_file
-        self.token_file = token_file
-        self.scopes = ['https://www.googleapis.com/auth/drive.file']
-        self.folder_id = None
-        self._service = None
-        
-        # Support des variables d'environnement pour Railway et BisectHosting
-        # Priorité : Fichiers locaux > Variables d'environnement
-        has_local_files = os.path.exists(credentials_file) or os.path.exists(token_file)
-        self.use_env_vars = (
-            not has_local_files and (  # Seulement si pas de fichiers locaux
-                os.getenv('RAILWAY_ENVIRONMENT') is not None or  # Railway
-                os.getenv('BISECT_HOSTING') is not None or        # BisectHosting
-                os.getenv('GOOGLE_CLIENT_ID') is not None         # Variables présentes
+LOGS_FOLDER_NAME = 'MaybeBot Ticket Logs'
+ATTACHMENTS_FOLDER_NAME = 'MaybeBot Ticket Attachments'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+LOCAL_FILE_ID_PATTERN = re.compile(r'^(\d+)-([0-9a-f]{32})$')  # <guild_id>-<uuid hex>
+
+# Format paginé des archives : messages en segments JSONL indexés par transcript.json
+TRANSCRIPT_FORMAT = 2
+TRANSCRIPT_HEADER_FILE = "transcript.json"
+TRANSCRIPT_EVENTS_FILE = "events.jsonl"
+TRANSCRIPT_CHUNK_MESSAGES = int(os.getenv('TRANSCRIPT_CHUNK_MESSAGES', '50'))
+FINALIZE_RETRY_SECONDS = float(os.getenv('TRANSCRIPT_FINALIZE_RETRY_SECONDS', '600'))  # Reprise des archivages en échec
+TRANSCRIPT_RETENTION_DAYS = int(os.getenv('TRANSCRIPT_RETENTION_DAYS', '0'))  # 0 : archives conservées sans limite
+CLEANUP_INTERVAL_SECONDS = 24 * 3600
+AUTHOR_FIELDS = ("author_name", "author_username", "author_discriminator", "author_avatar_url")
+
+# Pool de threads partagé par toutes les instances : googleapiclient est bloquant
+_drive_executor: Optional[ThreadPoolExecutor] = None
+_drive_executor_lock = threading.Lock()
+
+
+def _get_drive_executor() -> ThreadPoolExecutor:
+    global _drive_executor
+    with _drive_executor_lock:
+        if _drive_executor is None:
+            _drive_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('GOOGLE_DRIVE_MAX_WORKERS', '4')),
+                thread_name_prefix='drive'
             )
+        return _drive_executor
+
+
+class TranscriptCache:
+    """Cache LRU (transcripts décompressés ou archives brutes), borné en nombre d'entrées et en taille"""
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, file_id: str) -> Optional[Any]:
+        entry = self._entries.get(file_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(file_id)
+        value = entry[0]
+        # Copie des transcripts : les appelants y ajoutent des clés
+        return dict(value) if isinstance(value, dict) else value
+    
+    def put(self, file_id: str, value: Any, size: int) -> None:
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        self.discard(file_id)
+        self._entries[file_id] = (value, size)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+    
+    def discard(self, file_id: str) -> None:
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+def _compact_message(entry: Dict, authors: Dict[str, Dict]) -> Dict:
+    """Retire d'un message les champs d'auteur identiques à ceux de la table des auteurs"""
+    author_id = entry.get("author_id")
+    if author_id is None:
+        return entry
+    known = authors.get(author_id)
+    if known is None:
+        authors[author_id] = {k: entry[k] for k in AUTHOR_FIELDS if k in entry}
+        return {k: v for k, v in entry.items() if k not in AUTHOR_FIELDS}
+    # Champs conservés s'ils ont changé en cours de ticket (pseudo, avatar...)
+    return {k: v for k, v in entry.items() if k not in known or v != known[k]}
+
+
+def _expand_message(entry: Dict, authors: Dict[str, Dict]) -> Dict:
+    known = authors.get(entry.get("author_id"))
+    if not known:
+        return entry
+    message = dict(known)
+    message.update(entry)
+    return message
+
+
+class PagedTranscriptMessages:
+    """Messages d'une archive paginée, lus segment par segment
+    
+    len() donne le nombre total de messages ; l'indexation et les tranches ne
+    portent que sur les segments déjà chargés (load() avant d'afficher une page).
+    """
+    
+    def __init__(self, storage: 'TranscriptStorage', file_id: str, total: int, chunk_size: int,
+                 chunks: Optional[Dict[int, List[Dict]]] = None):
+        self.storage = storage
+        self.file_id = file_id
+        self.total = total
+        self.chunk_size = chunk_size
+        self._chunks: Dict[int, List[Dict]] = chunks or {}
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def _chunk_range(self, start: int, stop: int) -> range:
+        start, stop = max(start, 0), min(stop, self.total)
+        if start >= stop:
+            return range(0)
+        return range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1)
+    
+    def is_loaded(self, start: int, stop: int) -> bool:
+        return all(index in self._chunks for index in self._chunk_range(start, stop))
+    
+    async def load(self, start: int, stop: int) -> None:
+        """Charge les segments couvrant les messages [start, stop)"""
+        for index in self._chunk_range(start, stop):
+            if index not in self._chunks:
+                self._chunks[index] = await self.storage.read_message_chunk(self.file_id, index)
+    
+    def _message(self, position: int) -> Dict:
+        chunk = self._chunks.get(position // self.chunk_size)
+        if chunk is None:
+            raise LookupError(f"Segment de messages non chargé (message {position})")
+        return chunk[position % self.chunk_size]
+    
+    def __getitem__(self, key):
+        positions = range(self.total)[key]
+        if isinstance(positions, range):
+            return [self._message(position) for position in positions]
+        return self._message(positions)
+    
+    def __iter__(self):
+        for position in range(self.total):
+            yield self._message(position)
+
+
+class TranscriptStorage:
+    """Stockage des archives de tickets (classe de base des backends)
+    
+    Un backend fournit les primitives initialize, is_ready, store_archive,
+    read_archive, delete_archive et list_ticket_archives ; la construction des
+    archives, leur lecture (avec cache LRU) et le nettoyage sont communs.
+    
+    Les archives contiennent metadata.json, transcript.json (en-tête du ticket,
+    table des auteurs et index des segments), des segments messages/NNNNNN.jsonl
+    et events.jsonl ; les anciennes archives (logs.json unique) restent lisibles.
+    """
+    
+    backend_name = "base"
+    
+    def __init__(self):
+        self.cache = TranscriptCache(
+            int(os.getenv('TRANSCRIPT_CACHE_ENTRIES', '32')),
+            int(float(os.getenv('TRANSCRIPT_CACHE_MB', '64')) * 1024 * 1024)
         )
+        # Archives compressées récemment lues : changer de page ne retélécharge rien
+        self.archives = TranscriptCache(
+            int(os.getenv('TRANSCRIPT_ARCHIVE_CACHE_ENTRIES', '64')),
+            int(float(os.getenv('TRANSCRIPT_ARCHIVE_CACHE_MB', '32')) * 1024 * 1024)
+        )
+    
+    async def initialize(self) -> bool:
+        raise NotImplementedError
+    
+    async def close(self):
+        pass
+    
+    def is_ready(self) -> bool:
+        raise NotImplementedError
+    
+    async def list_ticket_archives(self, guild_id: Optional[int] = None) -> List[Dict]:
+        """Liste les archives de tickets (id, name, createdTime, size), les plus récentes d'abord"""
+        raise NotImplementedError
+    
+    async def store_archive(self, guild_id: int, filename: str, archive,
+                            created_time: Optional[str] = None) -> Optional[Dict]:
+        """Enregistre une archive zip déjà construite (retourne id, name, size, createdTime)"""
+        raise NotImplementedError
+    
+    async def read_archive(self, file_id: str) -> bytes:
+        """Retourne le contenu brut d'une archive"""
+        raise NotImplementedError
+    
+    async def delete_archive(self, file_id: str) -> None:
+        raise NotImplementedError
+    
+    async def has_blob(self, guild_id: int, digest: str) -> bool:
+        """Indique si une pièce jointe (adressée par son SHA-256) est déjà archivée pour ce serveur"""
+        raise NotImplementedError
+    
+    async def store_blob(self, guild_id: int, digest: str, fileobj, content_type: str) -> None:
+        raise NotImplementedError
+    
+    async def read_blob(self, guild_id: int, digest: str) -> Optional[Tuple[bytes, str]]:
+        """Contenu et type MIME d'une pièce jointe archivée (None si absente)"""
+        raise NotImplementedError
+    
+    async def list_blobs(self, guild_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        """Pièces jointes archivées : liste de (guild_id, sha256)"""
+        raise NotImplementedError
+    
+    @staticmethod
+    def archive_filename(guild_id: int, ticket_id: int) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"ticket_{guild_id}_{ticket_id}_{timestamp}.zip"
+    
+    @staticmethod
+    def _build_metadata(guild_id: int, ticket_id: int, logs_data: Dict, message_count: int,
+                        event_count: int, first_message: Optional[Dict]) -> Dict:
+        """Construit le fichier metadata.json d'une archive de ticket"""
+        metadata = {
+            "guild_id": guild_id,
+            "ticket_id": ticket_id,
+            "upload_date": datetime.now().isoformat(),
+            "message_count": message_count,
+            "event_count": event_count,
+            "created_at": logs_data.get("created_at"),
+            "status": logs_data.get("status", "closed"),
+            "closed_at": logs_data.get("closed_at")
+        }
         
-    async def initialize(self):
-        """Initialise la connexion Google Drive"""
-        try:
-            from google.oauth2.credentials import Credentials
-            from google_auth_oauthlib.flow import InstalledAppFlow
-            from google.auth.transport.requests import Request
-            from googleapiclient.discovery import build
-            import pickle
-            
-            creds = None
-            
-            if self.use_env_vars:
-                # Mode Railway - utiliser les variables d'environnement
-                creds = await self._load_credentials_from_env()
-            else:
-                # Mode local - utiliser les fichiers
-                # Charger les tokens existants
-                if os.path.exists(self.token_file):
-                    with open(self.token_file, 'rb') as token:
-                        creds = pickle.load(token)
-                
-                # Si pas de credentials valides, demander l'autorisation
-                if not creds or not creds.valid:
-                    if creds and creds.expired and creds.refresh_token:
-                        creds.refresh(Request())
-                    else:
-                        if not os.path.exists(self.credentials_file):
-                            logger.error(f"Fichier credentials.json manquant: {self.credentials_file}")
-                            return False
-                        
-                        flow = InstalledAppFlow.from_client_secrets_file(
-                            self.credentials_file, self.scopes)
-                        creds = flow.run_local_server(port=0)
-                    
-                    # Sauvegarder les credentials
-                    with open(self.token_file, 'wb') as token:
-                        pickle.dump(creds, token)
-            
-            if not creds:
-                logger.error("Impossible d'obtenir les credentials")
-                return False
-            
-            self._service = build('drive', 'v3', credentials=creds)
-            
-            # Créer ou récupérer le dossier de logs
-            await self._ensure_logs_folder()
-            
-            logger.info("Google Drive initialisé avec succès")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de l'initialisation Google Drive: {e}")
-            return False
+        # Ajouter les informations utilisateur si disponibles
+        # Essayer d'abord d'utiliser les données du ticket depuis la base de données
+        ticket_user_id = logs_data.get("ticket_user_id")
+        if ticket_user_id:
+            # Utiliser les données du ticket depuis la base de données
+            metadata.update({
+                "user_id": ticket_user_id,
+                "username": logs_data.get("ticket_username", "Unknown"),
+                "discriminator": logs_data.get("ticket_discriminator", "0000"),
+                "display_name": logs_data.get("ticket_display_name", "Unknown"),
+                "avatar_url": logs_data.get("ticket_avatar_url")
+            })
+        elif first_message:
+            # Fallback sur le premier message
+            metadata.update({
+                "user_id": first_message.get("author_id"),
+                "username": first_message.get("author_username"),
+                "discriminator": first_message.get("author_discriminator"),
+                "display_name": first_message.get("author_name"),
+                "avatar_url": first_message.get("author_avatar_url")
+            })
+        return metadata
     
-    async def _load_credentials_from_env(self):
-        """Charge les credentials depuis les variables d'environnement (Railway)"""
+    async def upload_ticket_logs(self, guild_id: int, ticket_id: int, logs_data: Dict) -> Optional[str]:
+        """Archive les logs d'un ticket déjà chargés en mémoire"""
         try:
-            from google.oauth2.credentials import Credentials
-            
-            # Récupérer les variables d'environnement
-            client_id = os.getenv('GOOGLE_CLIENT_ID')
-            client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
-            refresh_token = os.getenv('GOOGLE_REFRESH_TOKEN')
-            
-            if not all([client_id, client_secret, refresh_token]):
-                logger.error("Variables d'environnement Google manquantes")
+            if not self.is_ready():
+                logger.error("Stockage des transcripts non initialisé")
                 return None
             
-            # Créer les credentials
-            creds = Credentials(
-                token=None,
-                refresh_token=refresh_token,
-                token_uri='https://oauth2.googleapis.com/token',
-                client_id=client_id,
-                client_secret=client_secret,
-                scopes=self.scopes
+            # Compresser les données
+            messages = logs_data.get("messages", [])
+            events = logs_data.get("events", [])
+            header = {k: v for k, v in logs_data.items() if k not in ("messages", "events")}
+            header["first_message"] = messages[0] if messages else None
+            zip_buffer = io.BytesIO()
+            await asyncio.to_thread(
+                self.write_streamed_archive, zip_buffer, guild_id, ticket_id, header,
+                messages, events
             )
             
-            # Rafraîchir le token
-            from google.auth.transport.requests import Request
-            creds.refresh(Request())
-            
-            return creds
+            file = await self.store_archive(guild_id, self.archive_filename(guild_id, ticket_id), zip_buffer)
+            return file.get('id') if file else None
             
         except Exception as e:
-            logger.error(f"Erreur lors du chargement des credentials depuis l'environnement: {e}")
+            logger.error(f"Erreur lors de l'upload: {e}")
             return None
     
-    async def _ensure_logs_folder(self):
-        """Crée le dossier de logs s'il n'existe pas"""
-        try:
-            # Chercher le dossier existant
-            results = self._service.files().list(
-                q="name='MaybeBot Ticket Logs' and mimeType='application/vnd.google-apps.folder'",
-                fields="files(id, name)"
-            ).execute()
+    @classmethod
+    def write_streamed_archive(cls, archive, guild_id: int, ticket_id: int, header: Dict,
+                               messages: Iterable[Dict], events: Iterable[Dict],
+                               chunk_size: Optional[int] = None) -> Dict:
+        """Écrit une archive de ticket paginée en streamant messages et événements
+        
+        Les messages sont écrits en JSONL compact par segments de chunk_size
+        messages, sans les champs d'auteur répétés (table des auteurs de
+        transcript.json, écrit en dernier avec l'index des segments).
+        Retourne les métadonnées écrites dans metadata.json.
+        """
+        chunk_size = chunk_size or TRANSCRIPT_CHUNK_MESSAGES
+        authors: Dict[str, Dict] = {}
+        chunks: List[Dict] = []
+        
+        def compact(entry: Dict) -> str:
+            return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            lines: List[str] = []
+            message_count = 0
+            for entry in itertools.chain(messages, [None]):
+                if entry is not None:
+                    lines.append(compact(_compact_message(entry, authors)))
+                    message_count += 1
+                if lines and (entry is None or len(lines) >= chunk_size):
+                    name = f"messages/{len(chunks):06d}.jsonl"
+                    zip_file.writestr(name, "\n".join(lines) + "\n")
+                    chunks.append({"name": name, "start": message_count - len(lines), "count": len(lines)})
+                    lines = []
             
-            items = results.get('files', [])
+            event_count = 0
+            with zip_file.open(TRANSCRIPT_EVENTS_FILE, 'w') as raw:
+                out = io.TextIOWrapper(raw, encoding='utf-8')
+                for entry in events:
+                    out.write(compact(entry) + "\n")
+                    event_count += 1
+                out.flush()
+                out.detach()
             
-            if items:
-                self.folder_id = items[0]['id']
-                logger.info(f"Dossier de logs trouvé: {self.folder_id}")
-            else:
-                # Créer le dossier
-                file_metadata = {
-                    'name': 'MaybeBot Ticket Logs',
-                    'mimeType': 'application/vnd.google-apps.folder'
-                }
-                
-                folder = self._service.files().create(
-                    body=file_metadata,
-                    fields='id'
-                ).execute()
-                
-                self.folder_id = folder.get('id')
-                logger.info(f"Dossier de logs créé: {self.folder_id}")
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de la création du dossier: {e}")
+            transcript_header = {k: v for k, v in header.items() if k not in ("first_message", "participants")}
+            transcript_header.update({
+                "format": TRANSCRIPT_FORMAT,
+                "message_count": message_count,
+                "event_count": event_count,
+                "chunk_size": chunk_size,
+                "chunks": chunks,
+                "authors": authors
+            })
+            zip_file.writestr(TRANSCRIPT_HEADER_FILE, compact(transcript_header))
+            
+            metadata = cls._build_metadata(
+                guild_id, ticket_id, header, message_count, event_count, header.get("first_message")
+            )
+            zip_file.writestr("metadata.json", json.dumps(metadata, ensure_ascii=False, indent=2))
+        return metadata
     
-    async def upload_ticket_logs(self, guild_id: int, ticket_id: int, logs_data: Dict) -> Optional[str]:
-        """Upload les logs d'un ticket vers Google Drive"""
+    async def upload_ticket_transcript(self, guild_id: int, ticket_id: int, buffer: TranscriptBuffer,
+                                       ticket_key: str, attachments: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """Upload un transcript tamponné sur disque sans le charger entièrement en mémoire
+        
+        `attachments` ({url d'origine: blob}, voir AttachmentArchiver) remplace
+        les URLs Discord des pièces jointes archivées.
+        Retourne le fichier créé (id, name, size, createdTime) et ses métadonnées.
+        """
         try:
-            if not self._service or not self.folder_id:
-                logger.error("Google Drive non initialisé")
+            if not self.is_ready():
+                logger.error("Stockage des transcripts non initialisé")
                 return None
             
-            # Créer le nom du fichier
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ticket_{guild_id}_{ticket_id}_{timestamp}.zip"
-            
-            # Compresser les données
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # Ajouter les logs JSON
-                zip_file.writestr("logs.json", json.dumps(logs_data, ensure_ascii=False, indent=2))
-                
-                # Ajouter un fichier de métadonnées
-                metadata = {
-                    "guild_id": guild_id,
-                    "ticket_id": ticket_id,
-                    "upload_date": datetime.now().isoformat(),
-                    "message_count": len(logs_data.get("messages", [])),
-                    "event_count": len(logs_data.get("events", [])),
-                    "created_at": logs_data.get("created_at"),
-                    "status": logs_data.get("status", "closed"),
-                    "closed_at": logs_data.get("closed_at")
-                }
-                
-                # Ajouter les informations utilisateur si disponibles
-                # Essayer d'abord d'utiliser les données du ticket depuis la base de données
-                ticket_user_id = logs_data.get("ticket_user_id")
-                if ticket_user_id:
-                    # Utiliser les données du ticket depuis la base de données
-                    metadata.update({
-                        "user_id": ticket_user_id,
-                        "username": logs_data.get("ticket_username", "Unknown"),
-                        "discriminator": logs_data.get("ticket_discriminator", "0000"),
-                        "display_name": logs_data.get("ticket_display_name", "Unknown"),
-                        "avatar_url": logs_data.get("ticket_avatar_url")
-                    })
-                elif logs_data.get("messages"):
-                    # Fallback sur le premier message
-                    first_message = logs_data["messages"][0]
-                    metadata.update({
-                        "user_id": first_message.get("author_id"),
-                        "username": first_message.get("author_username"),
-                        "discriminator": first_message.get("author_discriminator"),
-                        "display_name": first_message.get("author_name"),
-                        "avatar_url": first_message.get("author_avatar_url")
-                    })
-                zip_file.writestr("metadata.json", json.dumps(metadata, ensure_ascii=False, indent=2))
-            
-            zip_buffer.seek(0)
-            
-            # Upload vers Google Drive
-            from googleapiclient.http import MediaIoBaseUpload
-            
-            file_metadata = {
-                'name': filename,
-                'parents': [self.folder_id]
-            }
-            
-            media = MediaIoBaseUpload(
-                zip_buffer,
-                mimetype='application/zip',
-                resumable=True
-            )
-            
-            file = self._service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
+            await buffer.flush(ticket_key)
+            messages = buffer.iter_messages(ticket_key)
+            if attachments:
+                messages = AttachmentArchiver.rewrite(messages, guild_id, attachments)
             
-            file_id = file.get('id')
-            logger.info(f"Logs uploadés avec succès: {filename} (ID: {file_id})")
-            
-            return file_id
+            # Archive construite dans un fichier temporaire (en mémoire tant qu'elle reste petite)
+            with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as archive:
+                metadata = await asyncio.to_thread(
+                    self.write_streamed_archive, archive, guild_id, ticket_id,
+                    buffer.get_header(ticket_key), messages,
+                    buffer.iter_events(ticket_key)
+                )
+                size = archive.tell()
+                file = await self.store_archive(guild_id, self.archive_filename(guild_id, ticket_id), archive)
+                if not file:
+                    return None
+                file.setdefault('size', size)
+                file['metadata'] = metadata
+                return file
             
         except Exception as e:
             logger.error(f"Erreur lors de l'upload: {e}")
             return None
     
-    async def download_ticket_logs(self, file_id: str) -> Optional[Dict]:
-        """Télécharge et décompresse les logs d'un ticket"""
-        try:
-            if not self._service:
-                logger.error("Google Drive non initialisé")
-                return None
+    @staticmethod
+    def _read_chunk(zip_file: zipfile.ZipFile, header: Dict, index: int) -> List[Dict]:
+        authors = header.get("authors") or {}
+        raw = zip_file.read(header["chunks"][index]["name"]).decode('utf-8')
+        return [_expand_message(json.loads(line), authors) for line in raw.splitlines() if line]
+    
+    @staticmethod
+    def _read_logs_header(zip_file: zipfile.ZipFile, header: Dict) -> Dict:
+        """En-tête du ticket, événements et métadonnées d'une archive paginée (sans les messages)"""
+        logs_data = {k: v for k, v in header.items() if k not in (
+            "format", "message_count", "event_count", "chunk_size", "chunks", "authors"
+        )}
+        raw = zip_file.read(TRANSCRIPT_EVENTS_FILE).decode('utf-8')
+        logs_data['events'] = [json.loads(line) for line in raw.splitlines() if line]
+        logs_data['metadata'] = json.loads(zip_file.read("metadata.json").decode('utf-8'))
+        return logs_data
+    
+    @classmethod
+    def parse_archive(cls, content: bytes) -> Tuple[Dict, int]:
+        """Décompresse une archive de ticket (appel bloquant), retourne les logs et leur taille décompressée"""
+        zip_buffer = io.BytesIO(content)
+        with zipfile.ZipFile(zip_buffer, 'r') as zip_file:
+            size = sum(info.file_size for info in zip_file.infolist())
+            if TRANSCRIPT_HEADER_FILE in zip_file.namelist():
+                header = json.loads(zip_file.read(TRANSCRIPT_HEADER_FILE).decode('utf-8'))
+                logs_data = cls._read_logs_header(zip_file, header)
+                logs_data['messages'] = [
+                    message for index in range(len(header.get("chunks", [])))
+                    for message in cls._read_chunk(zip_file, header, index)
+                ]
+                return logs_data, size
             
-            # Télécharger le fichier
-            request = self._service.files().get_media(fileId=file_id)
-            file_content = request.execute()
+            # Ancien format : un seul logs.json
+            logs_json = zip_file.read("logs.json")
+            logs_data = json.loads(logs_json.decode('utf-8'))
             
-            # Décompresser
-            zip_buffer = io.BytesIO(file_content)
-            with zipfile.ZipFile(zip_buffer, 'r') as zip_file:
-                # Lire les logs
-                logs_json = zip_file.read("logs.json")
-                logs_data = json.loads(logs_json.decode('utf-8'))
-                
-                # Lire les métadonnées
-                metadata_json = zip_file.read("metadata.json")
-                metadata = json.loads(metadata_json.decode('utf-8'))
-                
-                logs_data['metadata'] = metadata
+            # Lire les métadonnées
+            metadata_json = zip_file.read("metadata.json")
+            metadata = json.loads(metadata_json.decode('utf-8'))
+            
+            logs_data['metadata'] = metadata
+        
+        return logs_data, size
+    
+    @classmethod
+    def parse_archive_summary(cls, content: bytes,
+                              tail: int = 10) -> Optional[Tuple[Dict, Dict, Dict[int, List[Dict]]]]:
+        """Lit une archive paginée sans ses messages, sauf les segments des `tail` derniers (appel bloquant)
+        
+        Retourne (logs sans messages, en-tête transcript.json, {index: messages}),
+        ou None pour une archive à l'ancien format.
+        """
+        with zipfile.ZipFile(io.BytesIO(content), 'r') as zip_file:
+            if TRANSCRIPT_HEADER_FILE not in zip_file.namelist():
+                return None
+            header = json.loads(zip_file.read(TRANSCRIPT_HEADER_FILE).decode('utf-8'))
+            logs_data = cls._read_logs_header(zip_file, header)
+            chunks = {}
+            total, chunk_size = header.get("message_count", 0), header.get("chunk_size") or TRANSCRIPT_CHUNK_MESSAGES
+            if total:
+                for index in range(max(total - tail, 0) // chunk_size, (total - 1) // chunk_size + 1):
+                    chunks[index] = cls._read_chunk(zip_file, header, index)
+        return logs_data, header, chunks
+    
+    @classmethod
+    def parse_archive_chunk(cls, content: bytes, index: int) -> List[Dict]:
+        """Décompresse un seul segment de messages d'une archive paginée (appel bloquant)"""
+        with zipfile.ZipFile(io.BytesIO(content), 'r') as zip_file:
+            header = json.loads(zip_file.read(TRANSCRIPT_HEADER_FILE).decode('utf-8'))
+            return cls._read_chunk(zip_file, header, index)
+    
+    async def _fetch_archive(self, file_id: str) -> Optional[bytes]:
+        """Contenu compressé d'une archive (cache des archives récentes, puis backend)"""
+        content = self.archives.get(file_id)
+        if content is not None:
+            return content
+        try:
+            if not self.is_ready():
+                logger.error("Stockage des transcripts non initialisé")
+                return None
             
-            return logs_data
+            content = await self.read_archive(file_id)
+            self.archives.put(file_id, content, len(content))
+            return content
             
+        except asyncio.TimeoutError:
+            logger.error(f"Délai dépassé lors du téléchargement de {file_id}")
+            return None
         except Exception as e:
-            if "404" in str(e) or "notFound" in str(e):
-                logger.warning(f"Fichier non trouvé sur Google Drive: {file_id}")
+            if isinstance(e, FileNotFoundError) or "404" in str(e) or "notFound" in str(e):
+                logger.warning(f"Archive de ticket introuvable ({self.backend_name}): {file_id}")
             else:
                 logger.error(f"Erreur lors du téléchargement: {e}")
             return None
     
+    async def download_ticket_logs(self, file_id: str) -> Optional[Dict]:
+        """Télécharge et décompresse les logs d'un ticket (servis depuis le cache si lus récemment)"""
+        cached = self.cache.get(file_id)
+        if cached is not None:
+            return cached
+        content = await self._fetch_archive(file_id)
+        if content is None:
+            return None
+        try:
+            # Décompression hors de la boucle d'événements
+            logs_data, size = await asyncio.to_thread(self.parse_archive, content)
+            self.cache.put(file_id, logs_data, size)
+            return dict(logs_data)
+        except Exception as e:
+            logger.error(f"Archive de ticket illisible {file_id}: {e}")
+            return None
+    
+    async def read_transcript_summary(self, file_id: str) -> Optional[Dict]:
+        """Logs d'un ticket sans décompresser tous ses messages
+        
+        Pour une archive paginée, 'messages' est un PagedTranscriptMessages dont
+        seul le dernier segment est chargé ; les anciennes archives sont lues en entier.
+        """
+        cached = self.cache.get(file_id)
+        if cached is not None:
+            return cached
+        content = await self._fetch_archive(file_id)
+        if content is None:
+            return None
+        try:
+            summary = await asyncio.to_thread(self.parse_archive_summary, content)
+        except Exception as e:
+            logger.error(f"Archive de ticket illisible {file_id}: {e}")
+            return None
+        if summary is None:
+            return await self.download_ticket_logs(file_id)
+        logs_data, header, chunks = summary
+        logs_data['messages'] = PagedTranscriptMessages(
+            self, file_id, header.get("message_count", 0), header.get("chunk_size") or TRANSCRIPT_CHUNK_MESSAGES, chunks
+        )
+        return logs_data
+    
+    async def read_message_chunk(self, file_id: str, index: int) -> List[Dict]:
+        """Messages d'un segment d'une archive paginée (seul ce segment est décompressé)"""
+        content = await self._fetch_archive(file_id)
+        if content is None:
+            raise FileNotFoundError(f"Archive de ticket introuvable: {file_id}")
+        return await asyncio.to_thread(self.parse_archive_chunk, content, index)
+    
+    async def read_message_page(self, file_id: str, page: int, per_page: int = 10) -> Optional[Dict]:
+        """Page `page` (à partir de 0) des messages d'un ticket"""
+        summary = await self.read_transcript_summary(file_id)
+        if summary is None:
+            return None
+        messages = summary['messages']
+        start = max(page, 0) * per_page
+        if isinstance(messages, PagedTranscriptMessages):
+            await messages.load(start, start + per_page)
+        total = len(messages)
+        return {
+            "file_id": file_id,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page,
+            "messages": list(messages[start:start + per_page])
+        }
+    
+    async def _download_all(self, files: List[Dict]) -> List[Optional[Dict]]:
+        """Télécharge plusieurs archives en parallèle (bornées par la limite de concurrence)"""
+        return await asyncio.gather(*(self.download_ticket_logs(file['id']) for file in files))
+    
     async def list_user_ticket_logs(self, guild_id: int, user_id: int) -> List[Dict]:
         """Liste tous les logs de tickets d'un utilisateur"""
         try:
-            if not self._service or not self.folder_id:
+            if not self.is_ready():
                 return []
             
             print(f"🔍 Searching tickets for user {user_id} in guild {guild_id}")
             
-            # Chercher les fichiers de logs pour ce serveur
-            query = f"'{self.folder_id}' in parents and name contains 'ticket_{guild_id}_' and mimeType='application/zip'"
-            
-            results = self._service.files().list(
-                q=query,
-                fields="files(id, name, createdTime, size)",
-                orderBy="createdTime desc"
-            ).execute()
-            
-            files = results.get('files', [])
+            # Chercher les archives de logs pour ce serveur
+            files = await self.list_ticket_archives(guild_id)
             print(f"📁 Found {len(files)} ticket files for guild {guild_id}")
             user_logs = []
             
-            for file in files:
+            for file, logs_data in zip(files, await self._download_all(files)):
                 try:
-                    # Télécharger et analyser les métadonnées
-                    logs_data = await self.download_ticket_logs(file['id'])
+                    # Analyser les métadonnées
                     if logs_data and logs_data.get('metadata'):
                         metadata = logs_data['metadata']
                         
@@ -361,29 +641,20 @@ class GoogleDriveStorage:
         except Exception as e:
             logger.error(f"Erreur lors de la liste des logs: {e}")
             return []
-
+    
     async def list_all_ticket_logs(self, guild_id: int) -> List[Dict]:
         """Liste tous les logs de tickets d'un serveur"""
         try:
-            if not self._service or not self.folder_id:
+            if not self.is_ready():
                 return []
             
-            # Chercher les fichiers de logs pour ce serveur
-            query = f"'{self.folder_id}' in parents and name contains 'ticket_{guild_id}_' and mimeType='application/zip'"
-            
-            results = self._service.files().list(
-                q=query,
-                fields="files(id, name, createdTime, size)",
-                orderBy="createdTime desc"
-            ).execute()
-            
-            files = results.get('files', [])
+            # Chercher les archives de logs pour ce serveur
+            files = await self.list_ticket_archives(guild_id)
             all_logs = []
             
-            for file in files:
+            for file, logs_data in zip(files, await self._download_all(files)):
                 try:
-                    # Télécharger et analyser les métadonnées
-                    logs_data = await self.download_ticket_logs(file['id'])
+                    # Analyser les métadonnées
                     if logs_data:
                         # Extraire les informations utilisateur des métadonnées ou du premier message
                         messages = logs_data.get('messages', [])
@@ -453,76 +724,647 @@ class GoogleDriveStorage:
             logger.error(f"Erreur lors de la récupération des logs du serveur: {e}")
             return []
     
-    async def cleanup_old_logs(self, days: int = 30):
-        """Nettoie les anciens logs (plus de X jours)"""
+    async def cleanup_old_logs(self, days: int = 30) -> List[str]:
+        """Nettoie les anciens logs (plus de X jours), retourne les IDs des fichiers supprimés"""
+        deleted = []
         try:
-            if not self._service or not self.folder_id:
-                return
+            if not self.is_ready():
+                return deleted
             
-            cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-            cutoff_iso = datetime.fromtimestamp(cutoff_date).isoformat()
+            # Dates des archives en UTC (format RFC 3339), comparées sur leurs 19 premiers caractères
+            cutoff_iso = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
             
             # Chercher les anciens fichiers
-            query = f"'{self.folder_id}' in parents and createdTime < '{cutoff_iso}' and mimeType='application/zip'"
-            
-            results = self._service.files().list(
-                q=query,
-                fields="files(id, name, createdTime)"
-            ).execute()
-            
-            files = results.get('files', [])
+            files = [
+                file for file in await self.list_ticket_archives()
+                if (file.get('createdTime') or '')[:19] < cutoff_iso
+            ]
             
             for file in files:
                 try:
-                    self._service.files().delete(fileId=file['id']).execute()
+                    await self.delete_archive(file['id'])
+                    self.cache.discard(file['id'])
+                    self.archives.discard(file['id'])
+                    deleted.append(file['id'])
                     logger.info(f"Ancien log supprimé: {file['name']}")
                 except Exception as e:
                     logger.error(f"Erreur lors de la suppression de {file['name']}: {e}")
             
-            logger.info(f"Nettoyage terminé: {len(files)} fichiers supprimés")
+            logger.info(f"Nettoyage terminé: {len(deleted)} fichiers supprimés")
             
         except Exception as e:
             logger.error(f"Erreur lors du nettoyage: {e}")
+        return deleted
+
+
+class GoogleDriveStorage(TranscriptStorage):
+    """Gestionnaire de stockage Google Drive pour les logs de tickets"""
+    
+    backend_name = "drive"
+    
+    def __init__(self, credentials_file: str = "credentials.json", token_file: str = "token.json"):
+        super().__init__()
+        self.credentials_file = credentials_file
+        self.token_file = token_file
+        self.scopes = ['https://www.googleapis.com/auth/drive.file']
+        self.folder_id = None
+        self.attachments_folder_id = None
+        self._attachments_folder_lock = asyncio.Lock()
+        self._blob_files: Dict[str, Dict] = {}  # Pièces jointes déjà trouvées : nom -> id, mimeType
+        self._service = None
+        self._creds = None
+        self._local = threading.local()  # Un client HTTP par thread (httplib2 n'est pas thread-safe)
+        
+        # Limites des appels Drive : requêtes simultanées, délai par appel et nouvelles tentatives
+        self.max_concurrency = int(os.getenv('GOOGLE_DRIVE_MAX_CONCURRENCY', '4'))
+        self.timeout = float(os.getenv('GOOGLE_DRIVE_TIMEOUT', '60'))
+        self.upload_timeout = float(os.getenv('GOOGLE_DRIVE_UPLOAD_TIMEOUT', '300'))
+        self.num_retries = int(os.getenv('GOOGLE_DRIVE_RETRIES', '2'))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Faux Drive local (voir fake_drive.py) pour travailler hors ligne
+        self.fake_dir = os.getenv('GOOGLE_DRIVE_FAKE_DIR')
+        
+        # Support des variables d'environnement pour Railway et BisectHosting
+        # Priorité : Fichiers locaux > Variables d'environnement
+        has_local_files = os.path.exists(credentials_file) or os.path.exists(token_file)
+        self.use_env_vars = (
+            not has_local_files and (  # Seulement si pas de fichiers locaux
+                os.getenv('RAILWAY_ENVIRONMENT') is not None or  # Railway
+                os.getenv('BISECT_HOSTING') is not None or        # BisectHosting
+                os.getenv('GOOGLE_CLIENT_ID') is not None         # Variables présentes
+            )
+        )
+        
+    async def initialize(self):
+        """Initialise la connexion Google Drive"""
+        try:
+            if self.fake_dir:
+                from fake_drive import FakeDriveService
+                self._service = FakeDriveService(self.fake_dir)
+                await self._ensure_logs_folder()
+                logger.info(f"Faux Google Drive local utilisé: {self.fake_dir}")
+                return True
+            
+            if self.use_env_vars:
+                # Mode Railway - utiliser les variables d'environnement
+                creds = await self._load_credentials_from_env()
+            else:
+                # Mode local - utiliser les fichiers (l'autorisation interactive n'a pas de délai)
+                creds = await self._run(self._load_credentials_from_files, timeout=None)
+            
+            if not creds:
+                logger.error("Impossible d'obtenir les credentials")
+                return False
+            
+            from googleapiclient.discovery import build
+            self._creds = creds
+            self._service = await self._run(
+                functools.partial(build, 'drive', 'v3', credentials=creds, cache_discovery=False)
+            )
+            
+            # Créer ou récupérer le dossier de logs
+            await self._ensure_logs_folder()
+            
+            logger.info("Google Drive initialisé avec succès")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation Google Drive: {e}")
+            return False
+    
+    def _load_credentials_from_files(self):
+        """Charge ou obtient les credentials depuis les fichiers locaux (appel bloquant)"""
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        import pickle
+        
+        creds = None
+        
+        # Charger les tokens existants
+        if os.path.exists(self.token_file):
+            with open(self.token_file, 'rb') as token:
+                creds = pickle.load(token)
+        
+        # Si pas de credentials valides, demander l'autorisation
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(self.credentials_file):
+                    logger.error(f"Fichier credentials.json manquant: {self.credentials_file}")
+                    return None
+                
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_file, self.scopes)
+                creds = flow.run_local_server(port=0)
+            
+            # Sauvegarder les credentials
+            with open(self.token_file, 'wb') as token:
+                pickle.dump(creds, token)
+        
+        return creds
+    
+    async def _load_credentials_from_env(self):
+        """Charge les credentials depuis les variables d'environnement (Railway)"""
+        try:
+            from google.oauth2.credentials import Credentials
+            
+            # Récupérer les variables d'environnement
+            client_id = os.getenv('GOOGLE_CLIENT_ID')
+            client_secret = os.getenv('GOOGLE_CLIENT_SECRET')
+            refresh_token = os.getenv('GOOGLE_REFRESH_TOKEN')
+            
+            if not all([client_id, client_secret, refresh_token]):
+                logger.error("Variables d'environnement Google manquantes")
+                return None
+            
+            # Créer les credentials
+            creds = Credentials(
+                token=None,
+                refresh_token=refresh_token,
+                token_uri='https://oauth2.googleapis.com/token',
+                client_id=client_id,
+                client_secret=client_secret,
+                scopes=self.scopes
+            )
+            
+            # Rafraîchir le token
+            from google.auth.transport.requests import Request
+            await self._run(creds.refresh, Request())
+            
+            return creds
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des credentials depuis l'environnement: {e}")
+            return None
+    
+    async def _run(self, func: Callable, *args, timeout: Optional[float] = -1):
+        """Exécute un appel bloquant dans le pool de threads Drive, avec limite de concurrence et délai"""
+        if timeout == -1:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            future = loop.run_in_executor(_get_drive_executor(), functools.partial(func, *args))
+            return await asyncio.wait_for(future, timeout=timeout)
+    
+    def _http(self):
+        """Client HTTP authentifié propre au thread courant (réutilise ses connexions)"""
+        if self._creds is None:
+            return None  # Faux Drive : pas de transport HTTP
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            http = AuthorizedHttp(self._creds, http=httplib2.Http(timeout=self.timeout))
+            self._local.http = http
+        return http
+    
+    def _execute_sync(self, request):
+        return request.execute(http=self._http(), num_retries=self.num_retries)
+    
+    async def _execute(self, request):
+        """Exécute une requête googleapiclient hors de la boucle d'événements"""
+        return await self._run(self._execute_sync, request)
+    
+    async def _list_files(self, query: str, fields: str, order_by: Optional[str] = None) -> List[Dict]:
+        """Liste tous les fichiers correspondant à une requête, en suivant la pagination"""
+        files = []
+        page_token = None
+        while True:
+            params = {
+                'q': query,
+                'fields': f"nextPageToken, {fields}",
+                'pageSize': 1000,
+                'pageToken': page_token
+            }
+            if order_by:
+                params['orderBy'] = order_by
+            results = await self._execute(self._service.files().list(**params))
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+    
+    async def close(self):
+        """Libère les clients HTTP (le pool de threads est partagé entre les instances)"""
+        self._local = threading.local()
+        self._service = None
+    
+    async def _find_or_create_folder(self, name: str) -> str:
+        """Retourne l'ID d'un dossier Drive, créé s'il n'existe pas"""
+        # Chercher le dossier existant
+        items = await self._list_files(
+            f"name='{name}' and mimeType='{FOLDER_MIME_TYPE}'",
+            "files(id, name)"
+        )
+        
+        if items:
+            logger.info(f"Dossier {name} trouvé: {items[0]['id']}")
+            return items[0]['id']
+        
+        # Créer le dossier
+        file_metadata = {
+            'name': name,
+            'mimeType': FOLDER_MIME_TYPE
+        }
+        
+        folder = await self._execute(self._service.files().create(
+            body=file_metadata,
+            fields='id'
+        ))
+        
+        logger.info(f"Dossier {name} créé: {folder.get('id')}")
+        return folder.get('id')
+    
+    async def _ensure_logs_folder(self):
+        """Crée le dossier de logs s'il n'existe pas"""
+        try:
+            self.folder_id = await self._find_or_create_folder(LOGS_FOLDER_NAME)
+        except Exception as e:
+            logger.error(f"Erreur lors de la création du dossier: {e}")
+    
+    def is_ready(self) -> bool:
+        return bool(self._service and self.folder_id)
+    
+    async def list_ticket_archives(self, guild_id: Optional[int] = None) -> List[Dict]:
+        """Liste les archives de tickets (id, nom, date, taille) sans les télécharger"""
+        if not self.is_ready():
+            return []
+        
+        query = f"'{self.folder_id}' in parents and mimeType='application/zip'"
+        if guild_id is not None:
+            query += f" and name contains 'ticket_{guild_id}_'"
+        return await self._list_files(
+            query, "files(id, name, createdTime, size)", order_by="createdTime desc"
+        )
+    
+    async def store_archive(self, guild_id: int, filename: str, archive,
+                            created_time: Optional[str] = None) -> Optional[Dict]:
+        """Upload une archive zip déjà construite vers Google Drive (retourne id, nom, taille, date)"""
+        from googleapiclient.http import MediaIoBaseUpload
+        
+        file_metadata = {
+            'name': filename,
+            'parents': [self.folder_id]
+        }
+        if created_time:
+            file_metadata['createdTime'] = created_time  # Conservée lors d'une migration
+        
+        archive.seek(0)
+        media = MediaIoBaseUpload(
+            archive,
+            mimetype='application/zip',
+            resumable=True
+        )
+        
+        request = self._service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, name, size, createdTime'
+        )
+        file = await self._run(self._execute_sync, request, timeout=self.upload_timeout)
+        
+        logger.info(f"Logs uploadés avec succès: {filename} (ID: {file.get('id')})")
+        
+        return file
+    
+    async def read_archive(self, file_id: str) -> bytes:
+        return await self._execute(self._service.files().get_media(fileId=file_id))
+    
+    async def delete_archive(self, file_id: str) -> None:
+        await self._execute(self._service.files().delete(fileId=file_id))
+    
+    async def _attachments_folder(self) -> str:
+        async with self._attachments_folder_lock:
+            if not self.attachments_folder_id:
+                self.attachments_folder_id = await self._find_or_create_folder(ATTACHMENTS_FOLDER_NAME)
+            return self.attachments_folder_id
+    
+    async def _find_blob(self, guild_id: int, digest: str) -> Optional[Dict]:
+        if not SHA256_PATTERN.match(digest):
+            return None
+        name = f"{guild_id}_{digest}"
+        file = self._blob_files.get(name)
+        if file is None:
+            folder_id = await self._attachments_folder()
+            items = await self._list_files(f"'{folder_id}' in parents and name='{name}'", "files(id, mimeType)")
+            if items:
+                file = self._blob_files[name] = items[0]
+        return file
+    
+    async def has_blob(self, guild_id: int, digest: str) -> bool:
+        return await self._find_blob(guild_id, digest) is not None
+    
+    async def store_blob(self, guild_id: int, digest: str, fileobj, content_type: str) -> None:
+        from googleapiclient.http import MediaIoBaseUpload
+        
+        name = f"{guild_id}_{digest}"
+        request = self._service.files().create(
+            body={'name': name, 'parents': [await self._attachments_folder()]},
+            media_body=MediaIoBaseUpload(fileobj, mimetype=content_type, resumable=True),
+            fields='id, mimeType'
+        )
+        self._blob_files[name] = await self._run(self._execute_sync, request, timeout=self.upload_timeout)
+    
+    async def read_blob(self, guild_id: int, digest: str) -> Optional[Tuple[bytes, str]]:
+        file = await self._find_blob(guild_id, digest)
+        if file is None:
+            return None
+        content = await self._execute(self._service.files().get_media(fileId=file['id']))
+        return content, file.get('mimeType') or 'application/octet-stream'
+    
+    async def list_blobs(self, guild_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        query = f"'{await self._attachments_folder()}' in parents"
+        if guild_id is not None:
+            query += f" and name contains '{guild_id}_'"
+        blobs = []
+        for file in await self._list_files(query, "files(id, name, mimeType)"):
+            blob_guild, _, digest = file['name'].partition('_')
+            if blob_guild.isdigit() and SHA256_PATTERN.match(digest) and guild_id in (None, int(blob_guild)):
+                self._blob_files[file['name']] = file
+                blobs.append((int(blob_guild), digest))
+        return blobs
+
+
+class LocalTranscriptStorage(TranscriptStorage):
+    """Stockage des archives de tickets sur le disque local
+    
+    Arborescence partitionnée <dossier>/<guild_id>/<xx>/<file_id>.zip, chaque
+    archive étant accompagnée d'un fichier <file_id>.json (nom, date, taille).
+    Les écritures passent par un fichier temporaire renommé atomiquement.
+    Les pièces jointes sont dans <dossier>/attachments/<guild_id>/<xx>/<sha256>.
+    """
+    
+    backend_name = "local"
+    
+    def __init__(self, base_dir: Optional[str] = None):
+        super().__init__()
+        self.base_dir = base_dir or os.getenv('TRANSCRIPT_STORAGE_DIR', 'transcript_archives')
+        self._ready = False
+    
+    async def initialize(self) -> bool:
+        try:
+            await asyncio.to_thread(os.makedirs, self.base_dir, exist_ok=True)
+            self._ready = True
+            logger.info(f"Stockage local des transcripts: {os.path.abspath(self.base_dir)}")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation du stockage local: {e}")
+            return False
+    
+    def is_ready(self) -> bool:
+        return self._ready
+    
+    def _archive_path(self, file_id: str) -> str:
+        """Chemin de l'archive d'un identifiant (validé : pas de traversée de dossier)"""
+        match = LOCAL_FILE_ID_PATTERN.match(file_id or '')
+        if not match:
+            raise FileNotFoundError(f"Identifiant d'archive invalide: {file_id}")
+        guild_id, token = match.groups()
+        return os.path.join(self.base_dir, guild_id, token[:2], f"{file_id}.zip")
+    
+    @staticmethod
+    def _write_atomic(path: str, write: Callable) -> int:
+        """Écrit un fichier via un fichier temporaire du même dossier, fsync puis renommage"""
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return size
+    
+    def _store_sync(self, guild_id: int, filename: str, archive, created_time: Optional[str]) -> Dict:
+        file_id = f"{guild_id}-{uuid.uuid4().hex}"
+        path = self._archive_path(file_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        archive.seek(0)
+        size = self._write_atomic(path, lambda f: shutil.copyfileobj(archive, f))
+        # Métadonnées écrites après l'archive : une archive listée est toujours complète
+        file = {
+            'id': file_id,
+            'name': filename,
+            'createdTime': created_time or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'size': str(size)
+        }
+        self._write_atomic(path[:-4] + '.json', lambda f: f.write(json.dumps(file).encode('utf-8')))
+        return file
+    
+    async def store_archive(self, guild_id: int, filename: str, archive,
+                            created_time: Optional[str] = None) -> Optional[Dict]:
+        file = await asyncio.to_thread(self._store_sync, guild_id, filename, archive, created_time)
+        logger.info(f"Logs archivés localement: {filename} (ID: {file['id']})")
+        return dict(file)
+    
+    def _list_sync(self, guild_id: Optional[int]) -> List[Dict]:
+        if guild_id is not None:
+            guild_dirs = [os.path.join(self.base_dir, str(guild_id))]
+        else:
+            guild_dirs = [entry.path for entry in os.scandir(self.base_dir) if entry.is_dir() and entry.name.isdigit()]
+        
+        files = []
+        for guild_dir in guild_dirs:
+            if not os.path.isdir(guild_dir):
+                continue
+            for shard in os.scandir(guild_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.startswith('.') or not entry.name.endswith('.json'):
+                        continue
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            files.append(json.load(f))
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Métadonnées d'archive illisibles {entry.path}: {e}")
+        files.sort(key=lambda f: f.get('createdTime') or '', reverse=True)
+        return files
+    
+    async def list_ticket_archives(self, guild_id: Optional[int] = None) -> List[Dict]:
+        if not self.is_ready():
+            return []
+        return await asyncio.to_thread(self._list_sync, guild_id)
+    
+    def _read_sync(self, file_id: str) -> bytes:
+        with open(self._archive_path(file_id), 'rb') as f:
+            return f.read()
+    
+    async def read_archive(self, file_id: str) -> bytes:
+        return await asyncio.to_thread(self._read_sync, file_id)
+    
+    def _delete_sync(self, file_id: str) -> None:
+        path = self._archive_path(file_id)
+        # Métadonnées supprimées en premier : l'archive disparaît aussitôt des listes
+        for target in (path[:-4] + '.json', path):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+    
+    async def delete_archive(self, file_id: str) -> None:
+        await asyncio.to_thread(self._delete_sync, file_id)
+    
+    def _blob_path(self, guild_id: int, digest: str) -> str:
+        if not SHA256_PATTERN.match(digest):
+            raise FileNotFoundError(f"Empreinte de pièce jointe invalide: {digest}")
+        return os.path.join(self.base_dir, 'attachments', str(int(guild_id)), digest[:2], digest)
+    
+    async def has_blob(self, guild_id: int, digest: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._blob_path(guild_id, digest) + '.json')
+    
+    def _store_blob_sync(self, guild_id: int, digest: str, fileobj, content_type: str) -> None:
+        path = self._blob_path(guild_id, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = self._write_atomic(path, lambda f: shutil.copyfileobj(fileobj, f))
+        info = {'content_type': content_type, 'size': size}
+        self._write_atomic(path + '.json', lambda f: f.write(json.dumps(info).encode('utf-8')))
+    
+    async def store_blob(self, guild_id: int, digest: str, fileobj, content_type: str) -> None:
+        await asyncio.to_thread(self._store_blob_sync, guild_id, digest, fileobj, content_type)
+    
+    def _read_blob_sync(self, guild_id: int, digest: str) -> Optional[Tuple[bytes, str]]:
+        path = self._blob_path(guild_id, digest)
+        try:
+            with open(path + '.json', 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            with open(path, 'rb') as f:
+                return f.read(), info.get('content_type') or 'application/octet-stream'
+        except FileNotFoundError:
+            return None
+    
+    async def read_blob(self, guild_id: int, digest: str) -> Optional[Tuple[bytes, str]]:
+        if not SHA256_PATTERN.match(digest or ''):
+            return None
+        return await asyncio.to_thread(self._read_blob_sync, guild_id, digest)
+    
+    def _list_blobs_sync(self, guild_id: Optional[int]) -> List[Tuple[int, str]]:
+        root = os.path.join(self.base_dir, 'attachments')
+        if not os.path.isdir(root):
+            return []
+        guild_names = [str(guild_id)] if guild_id is not None else os.listdir(root)
+        blobs = []
+        for guild_name in guild_names:
+            guild_dir = os.path.join(root, guild_name)
+            if not guild_name.isdigit() or not os.path.isdir(guild_dir):
+                continue
+            for shard in os.scandir(guild_dir):
+                if shard.is_dir():
+                    blobs.extend(
+                        (int(guild_name), entry.name[:-5]) for entry in os.scandir(shard.path)
+                        if entry.name.endswith('.json') and SHA256_PATTERN.match(entry.name[:-5])
+                    )
+        return blobs
+    
+    async def list_blobs(self, guild_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        return await asyncio.to_thread(self._list_blobs_sync, guild_id)
+
+
+TRANSCRIPT_STORAGE_BACKENDS = {
+    'drive': GoogleDriveStorage,
+    'local': LocalTranscriptStorage,
+}
+
+
+def create_transcript_storage(backend: Optional[str] = None) -> TranscriptStorage:
+    """Crée le stockage des transcripts choisi par TRANSCRIPT_STORAGE ('drive' par défaut, ou 'local')
+    
+    'local:<dossier>' sélectionne le stockage local dans un dossier précis.
+    """
+    backend = (backend or os.getenv('TRANSCRIPT_STORAGE', 'drive')).strip()
+    name, _, option = backend.partition(':')
+    storage_class = TRANSCRIPT_STORAGE_BACKENDS.get(name.lower())
+    if storage_class is None:
+        raise ValueError(f"Stockage de transcripts inconnu: {backend}")
+    if storage_class is LocalTranscriptStorage:
+        return LocalTranscriptStorage(option or None)
+    return storage_class()
+
 
 class CloudTicketLogger:
     """Gestionnaire de logs de tickets avec stockage cloud"""
     
-    def __init__(self, bot, cloud_storage: GoogleDriveStorage):
+    def __init__(self, bot, cloud_storage: TranscriptStorage):
         self.bot = bot
         self.cloud_storage = cloud_storage
-        self.ticket_cache = {}  # Cache temporaire des messages par ticket
-        self.max_cache_size = 1000  # Limite du cache
+        self.transcripts = TranscriptBuffer()  # Transcripts des tickets ouverts, tamponnés sur disque
+        recovered = self.transcripts.recover()
+        if recovered:
+            logger.info(f"{recovered} transcript(s) de tickets ouverts récupéré(s) depuis le disque")
+        self.active_channels: Set[int] = set()  # Index mémoire des canaux de tickets actifs
+        self.active_channels_loaded = False
+        self.index = TranscriptIndex(bot.db)  # Index SQL des transcripts archivés
+        self.attachments = AttachmentArchiver(cloud_storage)  # Copies des pièces jointes (URLs Discord éphémères)
+        self.retry_task: Optional[asyncio.Task] = None
+        self.cleanup_task: Optional[asyncio.Task] = None
+        self.finalizing: Set[str] = set()  # Archivages en cours (bouton de fermeture ou reprise)
     
     async def initialize(self):
         """Initialise le système de logs cloud"""
         return await self.cloud_storage.initialize()
     
+    async def load_active_channels(self) -> bool:
+        """Charge l'index des canaux de tickets actifs depuis la base de données"""
+        try:
+            rows = await self.bot.db.query(
+                "SELECT channel_id FROM active_tickets",
+                fetchall=True
+            )
+            self.active_channels = {int(row['channel_id']) for row in (rows or [])}
+            self.active_channels_loaded = True
+            logger.info(f"Index des tickets actifs chargé: {len(self.active_channels)} canaux")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des tickets actifs: {e}")
+            return False
+    
+    def register_ticket_channel(self, channel_id: int):
+        """Ajoute un canal à l'index des tickets actifs"""
+        self.active_channels.add(int(channel_id))
+    
+    def unregister_ticket_channel(self, channel_id: int):
+        """Retire un canal de l'index des tickets actifs"""
+        self.active_channels.discard(int(channel_id))
+    
+    async def is_ticket_channel(self, guild_id: int, channel_id: int) -> bool:
+        """Vérifie si un canal est un ticket actif (lookup mémoire, DB en secours)"""
+        if self.active_channels_loaded or await self.load_active_channels():
+            return channel_id in self.active_channels
+        
+        ticket_data = await self.bot.db.query(
+            "SELECT id FROM active_tickets WHERE channel_id = %s AND guild_id = %s",
+            (str(channel_id), str(guild_id)),
+            fetchone=True
+        )
+        return bool(ticket_data)
+    
     async def log_message(self, message):
         """Enregistre un message dans le cache temporaire"""
         if not message.guild or not message.channel:
             return
         
         # Vérifier si c'est un canal de ticket
-        ticket_data = await self.bot.db.query(
-            "SELECT * FROM active_tickets WHERE channel_id = %s AND guild_id = %s",
-            (str(message.channel.id), str(message.guild.id)),
-            fetchone=True
-        )
-        
-        if not ticket_data:
+        if not await self.is_ticket_channel(message.guild.id, message.channel.id):
             return
         
         ticket_key = f"{message.guild.id}_{message.channel.id}"
         
-        # Initialiser le cache pour ce ticket
-        if ticket_key not in self.ticket_cache:
-            self.ticket_cache[ticket_key] = {
-                "ticket_id": str(message.channel.id),
-                "guild_id": str(message.guild.id),
-                "created_at": message.channel.created_at.isoformat(),
-                "messages": [],
-                "events": []
-            }
+        # Initialiser le transcript pour ce ticket
+        self.transcripts.ensure(ticket_key, {
+            "ticket_id": str(message.channel.id),
+            "guild_id": str(message.guild.id),
+            "created_at": message.channel.created_at.isoformat()
+        })
         
         # Ajouter le message au cache
         message_entry = {
@@ -557,27 +1399,18 @@ class CloudTicketLogger:
             ]
         }
         
-        self.ticket_cache[ticket_key]["messages"].append(message_entry)
-        
-        # Limiter la taille du cache
-        if len(self.ticket_cache) > self.max_cache_size:
-            oldest_keys = list(self.ticket_cache.keys())[:100]
-            for key in oldest_keys:
-                del self.ticket_cache[key]
+        await self.transcripts.append_message(ticket_key, message_entry)
     
     async def log_ticket_event(self, guild_id: int, channel_id: int, event_type: str, 
                               user_id: int, user_name: str, details: str = ""):
         """Enregistre un événement de ticket dans le cache"""
         ticket_key = f"{guild_id}_{channel_id}"
         
-        if ticket_key not in self.ticket_cache:
-            self.ticket_cache[ticket_key] = {
-                "ticket_id": str(channel_id),
-                "guild_id": str(guild_id),
-                "created_at": datetime.now().isoformat(),
-                "messages": [],
-                "events": []
-            }
+        self.transcripts.ensure(ticket_key, {
+            "ticket_id": str(channel_id),
+            "guild_id": str(guild_id),
+            "created_at": datetime.now().isoformat()
+        })
         
         event_entry = {
             "type": event_type,
@@ -587,41 +1420,169 @@ class CloudTicketLogger:
             "details": details
         }
         
-        self.ticket_cache[ticket_key]["events"].append(event_entry)
+        await self.transcripts.append_event(ticket_key, event_entry)
+    
+    def set_ticket_info(self, guild_id: int, channel_id: int, **fields) -> bool:
+        """Ajoute des informations (utilisateur du ticket...) au transcript d'un ticket ouvert"""
+        return self.transcripts.update_header(f"{guild_id}_{channel_id}", **fields)
+    
+    def start(self):
+        """Démarre l'écriture périodique des transcripts tamponnés et la reprise des archivages en échec"""
+        self.transcripts.start_flusher()
+        if self.retry_task is None:
+            self.retry_task = asyncio.create_task(self._retry_loop())
+        if self.cleanup_task is None and TRANSCRIPT_RETENTION_DAYS > 0:
+            self.cleanup_task = asyncio.create_task(self._cleanup_loop(TRANSCRIPT_RETENTION_DAYS))
+    
+    async def close(self):
+        """Écrit sur disque les lignes de transcript encore en attente"""
+        for task in (self.retry_task, self.cleanup_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.retry_task = self.cleanup_task = None
+        await self.transcripts.stop_flusher()
+        await self.transcripts.flush_all()
+    
+    def is_finalize_pending(self, guild_id: int, channel_id: int) -> bool:
+        """Transcript fermé dont l'archivage a échoué, conservé sur disque pour être repris"""
+        header = self.transcripts.get_header(f"{guild_id}_{channel_id}")
+        return bool(header and header.get("finalize_requested_at"))
+    
+    async def retry_pending_finalizations(self) -> int:
+        """Relance l'archivage des tickets fermés dont l'upload a échoué (y compris avant un redémarrage)"""
+        archived = 0
+        for ticket_key in self.transcripts.keys():
+            header = self.transcripts.get_header(ticket_key)
+            if not header or not header.get("finalize_requested_at"):
+                continue
+            if await self.finalize_ticket_logs(int(header["guild_id"]), int(header["ticket_id"])):
+                archived += 1
+        if archived:
+            logger.info(f"{archived} transcript(s) de tickets fermés archivé(s) après reprise")
+        return archived
+    
+    async def _retry_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.retry_pending_finalizations()
+            except Exception as e:
+                logger.error(f"Erreur lors de la reprise des archivages de transcripts: {e}")
+            await asyncio.sleep(FINALIZE_RETRY_SECONDS)
+    
+    async def cleanup_old_transcripts(self, days: int) -> int:
+        """Supprime les archives de plus de `days` jours du stockage puis de l'index"""
+        deleted = await self.cloud_storage.cleanup_old_logs(days)
+        if deleted:
+            try:
+                await self.index.remove(deleted)
+            except Exception as e:
+                logger.error(f"Erreur lors du retrait de {len(deleted)} archive(s) de l'index: {e}")
+        return len(deleted)
+    
+    async def _cleanup_loop(self, days: int):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.cleanup_old_transcripts(days)
+            except Exception as e:
+                logger.error(f"Erreur lors du nettoyage des anciens transcripts: {e}")
+            await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
     
     async def finalize_ticket_logs(self, guild_id: int, channel_id: int) -> Optional[str]:
         """Finalise les logs d'un ticket et les upload vers le cloud"""
         ticket_key = f"{guild_id}_{channel_id}"
         
-        if ticket_key not in self.ticket_cache:
+        if ticket_key not in self.transcripts:
             logger.warning(f"Aucun log trouvé pour le ticket {channel_id}")
             return None
+        if ticket_key in self.finalizing:
+            return None
         
+        # Marqueur persistant dans l'en-tête : un échec est repris par retry_pending_finalizations
+        if not self.transcripts.get_header(ticket_key).get("finalize_requested_at"):
+            self.transcripts.update_header(ticket_key, finalize_requested_at=datetime.now().isoformat())
+        
+        self.finalizing.add(ticket_key)
         try:
-            # Récupérer les logs du cache
-            logs_data = self.ticket_cache[ticket_key]
-            
-            # Ajouter les informations utilisateur depuis la base de données
-            # (Cette partie sera implémentée dans le cog Ticket)
-            
-            # Upload vers Google Drive
-            file_id = await self.cloud_storage.upload_ticket_logs(
-                guild_id, channel_id, logs_data
-            )
+            # Archive déjà envoyée lors d'une tentative précédente : seule l'indexation reste à faire
+            archive = self.transcripts.get_header(ticket_key).get("archive")
+            if not archive:
+                # Pièces jointes copiées avant l'archivage du transcript, qui pointe ensuite vers elles
+                await self.transcripts.flush(ticket_key)
+                attachments = await self.attachments.archive_ticket(guild_id, self.transcripts.iter_messages(ticket_key))
+                
+                # Archivage (Google Drive ou disque local) en streamant les segments du transcript
+                archive = await self.cloud_storage.upload_ticket_transcript(
+                    guild_id, channel_id, self.transcripts, ticket_key, attachments
+                )
+                
+                if not archive:
+                    # Segments locaux conservés sur disque en cas d'échec
+                    logger.warning(f"Transcript du ticket {channel_id} conservé localement après l'échec de l'upload (nouvelle tentative prévue)")
+                    return None
+                self.transcripts.update_header(ticket_key, archive=json.loads(json.dumps(archive, default=str)))
             
-            # Supprimer du cache
-            del self.ticket_cache[ticket_key]
+            if not await self.index_transcript(ticket_key, archive):
+                # Sans ligne d'index l'archive resterait invisible : segments et marqueur conservés pour la reprise
+                logger.warning(f"Transcript du ticket {channel_id} archivé mais non indexé (nouvelle tentative prévue)")
+                return archive['id']
             
-            return file_id
+            # Supprimer les segments locaux une fois archivés et indexés
+            self.transcripts.discard(ticket_key)
+            return archive['id']
             
         except Exception as e:
             logger.error(f"Erreur lors de la finalisation des logs: {e}")
             return None
+        finally:
+            self.finalizing.discard(ticket_key)
+    
+    async def index_transcript(self, ticket_key: str, archive: Dict) -> bool:
+        """Ajoute un transcript tout juste archivé à l'index SQL et à l'index plein texte"""
+        header = self.transcripts.get_header(ticket_key) or {}
+        first_message = header.get("first_message") or {}
+        tail = self.transcripts.tail(ticket_key)
+        row = TranscriptIndex.build_row(
+            archive, archive.get('metadata', {}), header.get("participants", {}),
+            first_message.get("timestamp"), tail[-1].get("timestamp") if tail else None
+        )
+        if not await self.index.record(row):
+            return False
+        try:
+            # Contenu relu depuis les segments locaux, avant leur suppression
+            await self.index.index_messages(
+                archive['id'], row['guild_id'], row['ticket_id'], self.transcripts.iter_messages(ticket_key)
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation plein texte du ticket {row['ticket_id']}: {e}")
+        return True
+    
+    async def backfill_index(self) -> int:
+        """Indexe une seule fois les archives antérieures à l'index des transcripts"""
+        try:
+            return await self.index.backfill(self.cloud_storage)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation des transcripts existants: {e}")
+            return 0
     
     async def get_user_ticket_logs(self, guild_id: int, user_id: int) -> List[Dict]:
-        """Récupère tous les logs de tickets d'un utilisateur depuis le cloud"""
+        """Récupère les tickets d'un utilisateur (index SQL, sans messages ; stockage tant que l'index est incomplet)"""
+        if await self.index.is_backfilled():
+            try:
+                return await self.index.list_user(guild_id, user_id)
+            except Exception as e:
+                logger.error(f"Erreur lors de la lecture de l'index des transcripts: {e}")
         return await self.cloud_storage.list_user_ticket_logs(guild_id, user_id)
     
     async def get_ticket_logs(self, file_id: str) -> Optional[Dict]:
         """Récupère les logs d'un ticket spécifique depuis le cloud"""
         return await self.cloud_storage.download_ticket_logs(file_id)
+    
+    async def get_ticket_summary(self, file_id: str) -> Optional[Dict]:
+        """Récupère un ticket pour l'affichage paginé (messages chargés page par page)"""
+        return await self.cloud_storage.read_transcript_summary(file_id)
@@ -176,7 +176,7 @@ class DisboardConfig(commands.Cog):
             
             # Get bump statistics
             bump_stats = await self.bot.db.query(
-                "SELECT COUNT(*) as total_bumps, MAX(bump_time) as last_bump FROM disboard_bumps WHERE guild_id = %s",
+                "SELECT COALESCE(SUM(bumps), 0) as total_bumps, MAX(last_bump_at) as last_bump FROM disboard_bump_counters WHERE guild_id = %s",
                 (guild_id,),
                 fetchone=True
             )
@@ -4,11 +4,12 @@ Automatically detects bumps and sends reminders for server promotion
 """
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta, timezone
 import asyncio
+import heapq
 import re
 from i18n import _
 from .command_logger import log_command_usage
@@ -25,10 +26,19 @@ class DisboardReminder(commands.Cog):
         self.bot = bot
         self.disboard_id = 302050872383242240  # Disboard bot ID
         self.reminder_interval = 2  # Hours between bumps
-        self.check_reminders.start()
+        self.reminder_retry = timedelta(minutes=5)  # Delay before retrying a failed reminder
+        self.state: Optional[Dict[int, Dict[str, Any]]] = None  # guild_id -> disboard_state row
+        self.deadlines: List[tuple] = []  # Min-heap of (reminder due time, guild_id)
+        self.wakeup = asyncio.Event()
+        self.reminder_task = None
+        self.stats_cache_ttl = 60  # Seconds a computed leaderboard / stats result is reused
+    
+    async def cog_load(self):
+        self.reminder_task = asyncio.create_task(self._reminder_loop())
         
     def cog_unload(self):
-        self.check_reminders.cancel()
+        if self.reminder_task:
+            self.reminder_task.cancel()
     
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -76,13 +86,37 @@ class DisboardReminder(commands.Cog):
                 (guild.id, bumper.id, bumper.display_name, channel.id, current_time, current_time, current_time)
             )
             
+            # Latest bump state, which moves this guild's reminder deadline
+            await self.bot.db.execute(
+                """INSERT INTO disboard_state (guild_id, channel_id, last_bump_at, last_bumper_id)
+                   VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE channel_id = VALUES(channel_id), last_bump_at = VALUES(last_bump_at),
+                                           last_bumper_id = VALUES(last_bumper_id)""",
+                (guild.id, channel.id, current_time, bumper.id)
+            )
+            if self.state is not None:
+                state = self.state.setdefault(guild.id, {'last_reminder_at': None})
+                state.update(channel_id=channel.id, last_bump_at=current_time)
+                self._schedule(guild.id)
+            
+            # Daily counter feeding the leaderboards and statistics
+            await self.bot.db.execute(
+                """INSERT INTO disboard_bump_counters
+                   (guild_id, bumper_id, bump_day, bumper_name, bumps, first_bump_at, last_bump_at)
+                   VALUES (%s, %s, %s, %s, 1, %s, %s)
+                   ON DUPLICATE KEY UPDATE bumps = bumps + 1, bumper_name = VALUES(bumper_name),
+                                           last_bump_at = VALUES(last_bump_at)""",
+                (guild.id, bumper.id, current_time.date(), bumper.display_name, current_time, current_time)
+            )
+            self._invalidate_bump_stats(guild.id)
+            
             # Get total bumps for this user in this guild
             total_bumps = await self.bot.db.query(
-                "SELECT COUNT(*) as count FROM disboard_bumps WHERE guild_id = %s AND bumper_id = %s",
+                "SELECT COALESCE(SUM(bumps), 0) as count FROM disboard_bump_counters WHERE guild_id = %s AND bumper_id = %s",
                 (guild.id, bumper.id),
                 fetchone=True
             )
-            bump_count = total_bumps['count']
+            bump_count = int(total_bumps['count'])
             
             # Send simple thank you message
             await channel.send(_("disboard.thank_you.message", guild_id=guild.id, bumper=bumper.display_name, server=guild.name))
@@ -278,93 +312,76 @@ class DisboardReminder(commands.Cog):
         except Exception as e:
             logger.error(f"Error sending bump role offer message: {e}")
 
-    @tasks.loop(minutes=1)
-    async def check_reminders(self):
-        """Check and send bump reminders every minute"""
-        try:
-            current_time = datetime.now()
-            reminder_threshold = current_time - timedelta(hours=self.reminder_interval)
-            
-            # Get all servers with bump data for logging
-            all_servers = await self.bot.db.query(
-                """SELECT DISTINCT guild_id, 
-                          (SELECT channel_id FROM disboard_bumps WHERE guild_id = db.guild_id ORDER BY bump_time DESC LIMIT 1) as channel_id,
-                          (SELECT bump_time FROM disboard_bumps WHERE guild_id = db.guild_id ORDER BY bump_time DESC LIMIT 1) as last_bump
-                   FROM disboard_bumps db
-                   WHERE (SELECT bump_time FROM disboard_bumps WHERE guild_id = db.guild_id ORDER BY bump_time DESC LIMIT 1) IS NOT NULL""",
-                fetchall=True
-            )
-            
-            for server_data in all_servers:
-                guild_id = server_data['guild_id']
-                channel_id = server_data['channel_id']
-                last_bump = server_data['last_bump']
-                
-                # Skip if any required data is missing or None
-                if not guild_id or not channel_id or not last_bump:
-                    logger.debug(f"Skipping server {guild_id}: missing data (channel_id={channel_id}, last_bump={last_bump})")
-                    continue
-                
-                # Get guild name for logging
-                guild = self.bot.get_guild(guild_id)
-                guild_name = guild.name if guild else f"Guild {guild_id}"
-                
-                # Calculate time since last bump
-                time_since_bump = current_time - last_bump
-                minutes_since_bump = int(time_since_bump.total_seconds() / 60)
-                
-                # Check if reminder is needed
-                needs_reminder = last_bump < reminder_threshold
-                
-                # Check if reminder was already sent for this bump
-                last_reminder = await self.bot.db.query(
-                    "SELECT reminder_time FROM disboard_reminders WHERE guild_id = %s ORDER BY reminder_time DESC LIMIT 1",
-                    (guild_id,),
-                    fetchone=True
-                )
-                
-                reminder_already_sent = False
-                if last_reminder and last_reminder['reminder_time'] > last_bump:
-                    # A reminder was sent after the last bump, so no more reminders until next bump
-                    reminder_already_sent = True
-                
-                # Calculate next reminder time
-                if reminder_already_sent:
-                    # No more reminders until next bump
-                    minutes_until_next_reminder = 0
-                else:
-                    # Next reminder will be exactly 2h after last bump
-                    next_reminder_time = last_bump + timedelta(hours=2)
-                    minutes_until_next_reminder = int((next_reminder_time - current_time).total_seconds() / 60)
-                    if minutes_until_next_reminder <= 0:
-                        minutes_until_next_reminder = 0
-                
-                # Log status
-                if needs_reminder and not reminder_already_sent:
-                    logger.info(f"⏰ Last bump for \"{guild_name}\" {minutes_since_bump} minutes ago. REMINDER SENT!")
-                else:
-                    if reminder_already_sent:
-                        logger.info(f"⏰ Last bump for \"{guild_name}\" {minutes_since_bump} minutes ago. Reminder already sent, waiting for next bump.")
-                    else:
-                        logger.info(f"⏰ Last bump for \"{guild_name}\" {minutes_since_bump} minutes ago. Next reminder in {minutes_until_next_reminder} minutes.")
+    async def load_state(self):
+        """Load the per-guild bump state and schedule every pending reminder"""
+        rows = await self.bot.db.query(
+            "SELECT guild_id, channel_id, last_bump_at, last_reminder_at FROM disboard_state",
+            fetchall=True
+        ) or []
+        self.state = {row['guild_id']: row for row in rows}
+        self.deadlines = []
+        for guild_id in self.state:
+            self._schedule(guild_id)
+        logger.info(f"⏰ Bump reminders loaded: {len(self.deadlines)} pending out of {len(self.state)} server(s)")
+
+    def _reminder_due(self, state: Dict[str, Any]) -> Optional[datetime]:
+        """When the reminder for the latest bump is due, or None if it was already sent"""
+        if state['last_reminder_at'] and state['last_reminder_at'] > state['last_bump_at']:
+            return None
+        return state['last_bump_at'] + timedelta(hours=self.reminder_interval)
+
+    def _schedule(self, guild_id: int, due: Optional[datetime] = None):
+        due = due or self._reminder_due(self.state[guild_id])
+        if due is None:
+            return
+        heapq.heappush(self.deadlines, (due, guild_id))
+        if self.deadlines[0] == (due, guild_id):
+            self.wakeup.set()  # New earliest deadline: recompute the sleep
+
+    async def _reminder_loop(self):
+        """Sleep until the next reminder deadline, send what is due, repeat"""
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                if self.state is None:
+                    await self.load_state()
                 
-                # Send reminder if needed and not already sent
-                if needs_reminder and not reminder_already_sent:
-                    await self._send_bump_reminder(guild_id, channel_id, last_bump)
+                now = datetime.now()
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    due, guild_id = heapq.heappop(self.deadlines)
+                    state = self.state.get(guild_id)
+                    expected = self._reminder_due(state) if state else None
+                    # Stale entry: a newer bump moved the deadline, or the reminder was already sent
+                    if expected is None or due < expected:
+                        continue
+                    if not await self._send_bump_reminder(guild_id, state['channel_id'], state['last_bump_at']):
+                        self._schedule(guild_id, now + self.reminder_retry)
                 
-        except Exception as e:
-            logger.error(f"Error checking bump reminders: {e}")
+                timeout = (self.deadlines[0][0] - datetime.now()).total_seconds() if self.deadlines else None
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in bump reminder loop: {e}")
+                await asyncio.sleep(60)
 
-    async def _send_bump_reminder(self, guild_id: int, channel_id: int, last_bump: datetime):
-        """Send bump reminder to specified channel"""
+    async def _send_bump_reminder(self, guild_id: int, channel_id: int, last_bump: datetime) -> bool:
+        """Send bump reminder to specified channel
+        
+        Returns False when sending failed and should be retried.
+        """
         try:
             guild = self.bot.get_guild(guild_id)
             if not guild:
-                return
+                return True
                 
             channel = guild.get_channel(channel_id)
             if not channel:
-                return
+                return True
             
             # Get server configuration for bump role
             config = await self.bot.db.query(
@@ -386,16 +403,95 @@ class DisboardReminder(commands.Cog):
             else:
                 await channel.send(reminder_message)
             
+            # Mark as sent before the database writes, so a database error doesn't resend it
+            reminder_time = datetime.now()
+            if self.state is not None and guild_id in self.state:
+                self.state[guild_id]['last_reminder_at'] = reminder_time
+            
             # Log reminder in database
             await self.bot.db.query(
                 "INSERT INTO disboard_reminders (guild_id, channel_id, reminder_time) VALUES (%s, %s, %s)",
-                (guild_id, channel_id, datetime.now())
+                (guild_id, channel_id, reminder_time)
+            )
+            await self.bot.db.execute(
+                "UPDATE disboard_state SET last_reminder_at = %s WHERE guild_id = %s",
+                (reminder_time, guild_id)
             )
             
             logger.info(f"Bump reminder sent to {guild.name} (ID: {guild_id})")
+            return True
             
         except Exception as e:
             logger.error(f"Error sending bump reminder: {e}")
+            return False
+
+    def _invalidate_bump_stats(self, guild_id: int):
+        """Drop the cached leaderboards and statistics of a guild after a new bump"""
+        for key in ("week", "month", "all", "stats"):
+            self.bot.cache.general.delete(f"disboard_{key}_{guild_id}")
+
+    async def get_leaderboard(self, guild_id: int, period: str) -> Dict[str, Any]:
+        """Bumpers ranked over the period, summed from the daily counters (cached briefly)"""
+        cache_key = f"disboard_{period}_{guild_id}"
+        cached = self.bot.cache.general.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Day granularity: the week/month window starts at midnight of its first day
+        if period == "week":
+            day_filter = "AND bump_day >= DATE(NOW() - INTERVAL 1 WEEK)"
+        elif period == "month":
+            day_filter = "AND bump_day >= DATE(NOW() - INTERVAL 1 MONTH)"
+        else:
+            day_filter = ""
+        
+        rows = await self.bot.db.query(
+            f"""SELECT bumper_id, MAX(bumper_name) as bumper_name, SUM(bumps) as bump_count,
+                       MAX(last_bump_at) as last_bump
+                FROM disboard_bump_counters
+                WHERE guild_id = %s {day_filter}
+                GROUP BY bumper_id
+                ORDER BY bump_count DESC, last_bump DESC""",
+            (guild_id,),
+            fetchall=True
+        ) or []
+        for row in rows:
+            row['bump_count'] = int(row['bump_count'])
+        
+        leaderboard = {'top': rows[:10], 'total': sum(row['bump_count'] for row in rows)}
+        self.bot.cache.general.set(cache_key, leaderboard, ttl=self.stats_cache_ttl)
+        return leaderboard
+
+    async def get_bump_stats(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Overall bump statistics of a guild, from the daily counters (cached briefly)"""
+        cache_key = f"disboard_stats_{guild_id}"
+        cached = self.bot.cache.general.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        stats = await self.bot.db.query(
+            """SELECT
+                   COALESCE(SUM(bumps), 0) as total_bumps,
+                   COUNT(DISTINCT bumper_id) as unique_bumpers,
+                   MAX(last_bump_at) as last_bump,
+                   MIN(first_bump_at) as first_bump
+               FROM disboard_bump_counters
+               WHERE guild_id = %s""",
+            (guild_id,),
+            fetchone=True
+        )
+        if not stats:
+            return None
+        stats['total_bumps'] = int(stats['total_bumps'])
+        
+        # Mean of the intervals between consecutive bumps = span / number of intervals
+        stats['avg_hours_between'] = None
+        if stats['total_bumps'] > 1:
+            span = stats['last_bump'] - stats['first_bump']
+            stats['avg_hours_between'] = span.total_seconds() / 3600 / (stats['total_bumps'] - 1)
+        
+        self.bot.cache.general.set(cache_key, stats, ttl=self.stats_cache_ttl)
+        return stats
 
     @app_commands.command(name="bumptop", description="Display server bump leaderboard")
     @app_commands.describe(
@@ -410,29 +506,16 @@ class DisboardReminder(commands.Cog):
             if period not in ["week", "month", "all"]:
                 period = "all"
             
-            # Build query based on period
             if period == "week":
-                time_filter = "AND bump_time >= DATE_SUB(NOW(), INTERVAL 1 WEEK)"
                 period_name = _("disboard.leaderboard.this_week", interaction.user.id, guild_id)
             elif period == "month":
-                time_filter = "AND bump_time >= DATE_SUB(NOW(), INTERVAL 1 MONTH)"
                 period_name = _("disboard.leaderboard.this_month", interaction.user.id, guild_id)
             else:
-                time_filter = ""
                 period_name = _("disboard.leaderboard.all_time", interaction.user.id, guild_id)
             
             # Get top bumpers
-            top_bumpers = await self.bot.db.query(
-                f"""SELECT bumper_id, bumper_name, COUNT(*) as bump_count, 
-                           MAX(bump_time) as last_bump
-                    FROM disboard_bumps 
-                    WHERE guild_id = %s {time_filter}
-                    GROUP BY bumper_id, bumper_name
-                    ORDER BY bump_count DESC, last_bump DESC
-                    LIMIT 10""",
-                (guild_id,),
-                fetchall=True
-            )
+            leaderboard = await self.get_leaderboard(guild_id, period)
+            top_bumpers = leaderboard['top']
             
             if not top_bumpers:
                 embed = discord.Embed(
@@ -455,21 +538,15 @@ class DisboardReminder(commands.Cog):
             # Add top bumpers
             for i, bumper in enumerate(top_bumpers, 1):
                 medal = GOLD_MEDAL if i == 1 else SILVER_MEDAL if i == 2 else BRONZE_MEDAL if i == 3 else f"**{i}.**"
+                member = interaction.guild.get_member(bumper['bumper_id'])
                 
                 embed.add_field(
-                    name=f"{medal} {bumper['bumper_name']}",
+                    name=f"{medal} {member.display_name if member else bumper['bumper_name']}",
                     value=f"**{bumper['bump_count']}** {_('disboard.leaderboard.bumps', interaction.user.id, guild_id)}\n{CLOCK} {_('disboard.leaderboard.last_bump', interaction.user.id, guild_id)}: <t:{int(bumper['last_bump'].timestamp())}:R>",
                     inline=False
                 )
             
-            # Add server stats
-            total_bumps = await self.bot.db.query(
-                f"SELECT COUNT(*) as total FROM disboard_bumps WHERE guild_id = %s {time_filter}",
-                (guild_id,),
-                fetchone=True
-            )
-            
-            embed.set_footer(text=_("disboard.leaderboard.footer", interaction.user.id, guild_id, total=total_bumps['total'], period=period_name))
+            embed.set_footer(text=_("disboard.leaderboard.footer", interaction.user.id, guild_id, total=leaderboard['total'], period=period_name))
             
             await interaction.response.send_message(embed=embed)
             
@@ -488,43 +565,7 @@ class DisboardReminder(commands.Cog):
             guild_id = interaction.guild.id
             
             # Get overall stats
-            stats = await self.bot.db.query(
-                """SELECT 
-                       COUNT(*) as total_bumps,
-                       COUNT(DISTINCT bumper_id) as unique_bumpers,
-                       MAX(bump_time) as last_bump,
-                       MIN(bump_time) as first_bump
-                   FROM disboard_bumps 
-                   WHERE guild_id = %s""",
-                (guild_id,),
-                fetchone=True
-            )
-            
-            # Calculate average time between bumps (simplified approach)
-            if stats and stats['total_bumps'] > 1:
-                # Get all bumps ordered by time to calculate intervals
-                all_bumps = await self.bot.db.query(
-                    "SELECT bump_time FROM disboard_bumps WHERE guild_id = %s ORDER BY bump_time",
-                    (guild_id,),
-                    fetchall=True
-                )
-                
-                if len(all_bumps) > 1:
-                    total_hours = 0
-                    intervals = 0
-                    for i in range(len(all_bumps) - 1):
-                        time_diff = all_bumps[i+1]['bump_time'] - all_bumps[i]['bump_time']
-                        total_hours += time_diff.total_seconds() / 3600
-                        intervals += 1
-                    
-                    if intervals > 0:
-                        stats['avg_hours_between'] = total_hours / intervals
-                    else:
-                        stats['avg_hours_between'] = None
-                else:
-                    stats['avg_hours_between'] = None
-            else:
-                stats['avg_hours_between'] = None
+            stats = await self.get_bump_stats(guild_id)
             
             if not stats or not stats['total_bumps']:
                 embed = discord.Embed(
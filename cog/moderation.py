@@ -1,11 +1,14 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from typing import Optional, Union
 import asyncio
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from i18n import _
 from .command_logger import log_command_usage
+from moderation_history import fetch_history_page
+from moderation_stats import read_action_totals, read_stats, reconcile, record_action
+from bulk_moderation import MAX_BULK_TARGETS, BulkActionExecutor, BulkJob, RateLimited, parse_user_ids
 # Validation module removed during cleanup
 import logging
 from custom_emojis import (
@@ -15,10 +18,23 @@ from custom_emojis import (
 
 logger = logging.getLogger(__name__)
 
+STATS_BACKFILL_MARKER = "backfill_moderation_daily_stats"
+STATS_RECONCILE_DAYS = 35  # Fenêtre de 30 jours des statistiques, plus une marge
+
+def parse_member_reference(text: str) -> Optional[int]:
+    """ID d'une mention (<@id>, <@!id>) ou d'un ID numérique, None pour un nom"""
+    text = text.strip()
+    if text.startswith('<@') and text.endswith('>') and text[2:-1].lstrip('!').isdigit():
+        return int(text[2:-1].lstrip('!'))
+    if text.isdigit():
+        return int(text)
+    return None
+
 class MemberSelectView(discord.ui.View):
     """View pour sélectionner un membre avec un menu déroulant"""
     
-    def __init__(self, action_type: str, bot, interaction: discord.Interaction):
+    def __init__(self, action_type: str, bot, interaction: discord.Interaction,
+                 members: Optional[list] = None):
         super().__init__(timeout=300)
         self.action_type = action_type
         self.bot = bot
@@ -27,19 +43,16 @@ class MemberSelectView(discord.ui.View):
         self.guild_id = interaction.guild.id
         
         # Créer les options du menu déroulant
-        self.create_member_options()
+        self.create_member_options(members)
     
-    def create_member_options(self):
-        """Crée les options du menu déroulant avec les membres"""
-        # Récupérer tous les membres du serveur
-        members = self.original_interaction.guild.members
+    def create_member_options(self, members: Optional[list] = None):
+        """Crée les options du menu déroulant avec les membres (résultats d'une recherche, ou les premiers par pseudo)"""
+        if members is None:
+            # Premiers membres humains par pseudo, lus dans l'index plutôt qu'en triant guild.members
+            members = self.bot.member_index.search(self.original_interaction.guild, "", limit=24)
         
-        # Filtrer les bots et trier par nom
-        human_members = [m for m in members if not m.bot]
-        human_members.sort(key=lambda x: x.display_name.lower())
-        
-        # Limiter à 25 membres (limite Discord)
-        members_to_show = human_members[:25]
+        # 24 membres + l'option de recherche (limite Discord de 25 options)
+        members_to_show = members[:24]
         
         # Créer les options
         options = []
@@ -180,35 +193,34 @@ class MemberSearchModal(discord.ui.Modal):
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
-            # Extraire l'ID du membre
             member_text = self.member_input.value.strip()
-            member_id = None
-            
-            # Si c'est une mention
-            if member_text.startswith('<@') and member_text.endswith('>'):
-                member_id = int(member_text[2:-1].replace('!', ''))
-            # Si c'est un ID numérique
-            elif member_text.isdigit():
-                member_id = int(member_text)
+            member_id = parse_member_reference(member_text)
+            
+            if member_id is not None:
+                member = interaction.guild.get_member(member_id)
+                matches = [member] if member else []
             else:
+                # Recherche par pseudo / nom d'utilisateur dans l'index des membres
+                matches = self.bot.member_index.search(interaction.guild, member_text, limit=24)
+            
+            if not matches:
                 await interaction.response.send_message(
-                    f"{ERROR} {_('moderation.member_select.invalid_format', self.user_id, self.guild_id)}",
+                    f"{ERROR} {_('moderation.member_select.member_not_found', self.user_id, self.guild_id)}",
                     ephemeral=True
                 )
                 return
             
-            # Récupérer le membre
-            member = interaction.guild.get_member(member_id)
-            if not member:
+            view = MemberSelectView(self.action_type, self.bot, interaction, members=matches)
+            if len(matches) == 1:
+                # Rediriger vers l'action appropriée
+                await view.execute_action(interaction, matches[0])
+            else:
                 await interaction.response.send_message(
-                    f"{ERROR} {_('moderation.member_select.member_not_found', self.user_id, self.guild_id)}",
+                    _('moderation.member_select.search_results', self.user_id, self.guild_id,
+                      count=len(matches), query=member_text),
+                    view=view,
                     ephemeral=True
                 )
-                return
-            
-            # Rediriger vers l'action appropriée
-            view = MemberSelectView(self.action_type, self.bot, interaction)
-            await view.execute_action(interaction, member)
                 
         except Exception as e:
             logger.error(f"Error in member search: {e}")
@@ -972,33 +984,17 @@ class ModerationView(discord.ui.View):
             )
     
     async def get_moderation_stats(self):
-        """Récupère les statistiques de modération depuis la base de données"""
+        """Récupère les statistiques de modération depuis les compteurs journaliers"""
         try:
-            # Statistiques des avertissements
-            warnings_stats = await self.bot.db.query(
-                """SELECT 
-                    COUNT(*) as total_warnings,
-                    COUNT(CASE WHEN timestamp >= DATE_SUB(NOW(), INTERVAL 1 MONTH) THEN 1 END) as warnings_this_month,
-                    COUNT(CASE WHEN timestamp >= DATE_SUB(NOW(), INTERVAL 1 WEEK) THEN 1 END) as warnings_this_week
-                   FROM warnings WHERE guild_id = %s""",
-                (self.guild_id,),
-                fetchone=True
-            )
-            
-            # Statistiques des timeouts
-            timeouts_stats = await self.bot.db.query(
-                "SELECT COUNT(*) as total_timeouts FROM timeouts WHERE guild_id = %s",
-                (self.guild_id,),
-                fetchone=True
-            )
+            totals = await read_action_totals(self.bot.db, self.guild_id)
             
             return {
-                'total_warnings': warnings_stats['total_warnings'] if warnings_stats else 0,
-                'warnings_this_month': warnings_stats['warnings_this_month'] if warnings_stats else 0,
-                'warnings_this_week': warnings_stats['warnings_this_week'] if warnings_stats else 0,
-                'total_timeouts': timeouts_stats['total_timeouts'] if timeouts_stats else 0,
-                'total_kicks': 0,  # À implémenter si nécessaire
-                'total_bans': 0    # À implémenter si nécessaire
+                'total_warnings': totals['warn']['total'],
+                'warnings_this_month': totals['warn']['this_month'],
+                'warnings_this_week': totals['warn']['this_week'],
+                'total_timeouts': totals['timeout']['total'],
+                'total_kicks': totals['kick']['total'],
+                'total_bans': totals['ban']['total']
             }
             
         except Exception as e:
@@ -1505,6 +1501,14 @@ class Moderation(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        self.bulk = BulkActionExecutor(bot.db)
+    
+    async def cog_load(self):
+        self.reconcile_stats.start()
+    
+    async def cog_unload(self):
+        self.reconcile_stats.cancel()
+        await self.bulk.close()
     
     async def log_moderation_action(self, guild_id: int, user_id: int, moderator_id: int, 
                                    action_type: str, reason: str = None, duration_minutes: int = None,
@@ -1512,8 +1516,7 @@ class Moderation(commands.Cog):
                                    evidence_urls: list = None):
         """Enregistre une action de modération dans la base de données"""
         try:
-            from db import get_database
-            db = await get_database()
+            db = self.bot.db
             
             # Convertir evidence_urls en JSON si fourni
             evidence_json = None
@@ -1542,92 +1545,92 @@ class Moderation(commands.Cog):
             
         except Exception as e:
             logger.error(f"Failed to log moderation action: {e}")
+            return
+        
+        try:
+            # Une expiration antérieure ne doit pas lever un nouveau ban (permanent) ni un timeout renouvelé
+            await self.bot.moderation_jobs.cancel(guild_id, user_id, action_type)
+        except Exception as e:
+            logger.error(f"Failed to cancel pending moderation expirations: {e}")
+        
+        if expires_at:
+            try:
+                # Fin du timeout / levée du ban temporaire à l'échéance
+                await self.bot.moderation_jobs.schedule(guild_id, user_id, action_type, expires_at)
+            except Exception as e:
+                logger.error(f"Failed to schedule moderation expiration: {e}")
+        
+        try:
+            # Compteurs des écrans de statistiques (corrigés par reconcile_stats en cas d'échec)
+            await record_action(db, guild_id, user_id, moderator_id, action_type)
+        except Exception as e:
+            logger.warning(f"Failed to update moderation stats counters: {e}")
     
-    async def get_moderation_history(self, guild_id: int, user_id: int = None, 
-                                   action_type: str = None, limit: int = 50, offset: int = 0):
-        """Récupère l'historique de modération avec filtres optionnels"""
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        """Débannissement (manuel ou par le bot) : l'expiration du ban temporaire n'a plus lieu d'être"""
         try:
-            from db import get_database
-            db = await get_database()
-            
-            # Construire la requête avec filtres
-            where_conditions = ["guild_id = %s"]
-            params = [guild_id]
-            
-            if user_id:
-                where_conditions.append("user_id = %s")
-                params.append(user_id)
-            
-            if action_type:
-                where_conditions.append("action_type = %s")
-                params.append(action_type)
-            
-            where_clause = " AND ".join(where_conditions)
-            
-            query = f"""
-                SELECT mh.*, 
-                       u.username as user_name, u.discriminator as user_discriminator,
-                       m.username as moderator_name, m.discriminator as moderator_discriminator
-                FROM moderation_history mh
-                LEFT JOIN user_cache u ON mh.user_id = u.user_id
-                LEFT JOIN user_cache m ON mh.moderator_id = m.user_id
-                WHERE {where_clause}
-                ORDER BY mh.timestamp DESC
-                LIMIT %s OFFSET %s
-            """
-            params.extend([limit, offset])
-            
-            results = await db.fetch(query, params)
-            return results
-            
+            await self.bot.moderation_jobs.cancel(guild.id, user.id, 'unban')
+        except Exception as e:
+            logger.error(f"Failed to cancel ban expiration after unban: {e}")
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Timeout levé avant son échéance"""
+        if before.timed_out_until and not after.timed_out_until:
+            try:
+                await self.bot.moderation_jobs.cancel(after.guild.id, after.id, 'unmute')
+            except Exception as e:
+                logger.error(f"Failed to cancel timeout expiration after unmute: {e}")
+    
+    async def get_moderation_history(self, guild_id: int, user_id: int = None,
+                                   action_type: str = None, limit: int = 50, cursor: str = None):
+        """Récupère une page de l'historique de modération avec filtres optionnels
+
+        Retourne (entrées, curseur de la page suivante ou None).
+        """
+        try:
+            return await fetch_history_page(
+                self.bot.db, guild_id, user_id=user_id, action_type=action_type, limit=limit, cursor=cursor
+            )
         except Exception as e:
             logger.error(f"Failed to get moderation history: {e}")
-            return []
+            return [], None
     
     async def get_moderation_stats(self, guild_id: int):
-        """Récupère les statistiques de modération pour un serveur"""
+        """Récupère les statistiques de modération des 30 derniers jours (compteurs précalculés)"""
         try:
-            from db import get_database
-            db = await get_database()
-            
-            # Statistiques générales
-            stats_query = """
-                SELECT 
-                    action_type,
-                    COUNT(*) as count,
-                    COUNT(DISTINCT user_id) as unique_users,
-                    COUNT(DISTINCT moderator_id) as unique_moderators
-                FROM moderation_history 
-                WHERE guild_id = %s AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-                GROUP BY action_type
-            """
-            stats = await db.fetch(stats_query, (guild_id,))
-            
-            # Top modérateurs
-            moderators_query = """
-                SELECT 
-                    moderator_id,
-                    COUNT(*) as action_count,
-                    m.username as moderator_name,
-                    m.discriminator as moderator_discriminator
-                FROM moderation_history mh
-                LEFT JOIN user_cache m ON mh.moderator_id = m.user_id
-                WHERE guild_id = %s AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-                GROUP BY moderator_id
-                ORDER BY action_count DESC
-                LIMIT 10
-            """
-            moderators = await db.fetch(moderators_query, (guild_id,))
-            
-            return {
-                'stats': stats,
-                'top_moderators': moderators
-            }
-            
+            return await read_stats(self.bot.db, guild_id)
         except Exception as e:
             logger.error(f"Failed to get moderation stats: {e}")
             return {'stats': [], 'top_moderators': []}
-        
+    
+    @tasks.loop(hours=6)
+    async def reconcile_stats(self):
+        """Recalcule les compteurs de statistiques depuis moderation_history
+
+        Premier passage : tout l'historique. Ensuite : les jours écoulés de la
+        fenêtre affichée (le jour en cours n'est alimenté que par log_moderation_action).
+        """
+        try:
+            db = self.bot.db
+            marker = await db.query(
+                "SELECT id FROM migrations WHERE filename = %s", (STATS_BACKFILL_MARKER,), fetchone=True
+            )
+            if marker:
+                today = date.today()
+                written = await reconcile(db, since=today - timedelta(days=STATS_RECONCILE_DAYS), until=today)
+            else:
+                written = await reconcile(db)
+                await db.execute("INSERT IGNORE INTO migrations (filename) VALUES (%s)", (STATS_BACKFILL_MARKER,))
+            logger.info(f"Moderation stats reconciled ({written} counter row(s) written)")
+        except Exception as e:
+            logger.error(f"Failed to reconcile moderation stats: {e}")
+    
+    @reconcile_stats.before_loop
+    async def before_reconcile_stats(self):
+        await self.bot.wait_until_ready()
+    
     @app_commands.command(name="moderation", description="Menu de modération complet")
     @log_command_usage
     async def moderation(self, interaction: discord.Interaction):
@@ -1673,9 +1676,9 @@ class Moderation(commands.Cog):
     
     @app_commands.command(name="moderation_history", description="Affiche l'historique des actions de modération")
     @app_commands.describe(
-        user="Utilisateur à filtrer (optionnel)",
+        user="Utilisateur à filtrer : pseudo, mention ou ID (optionnel)",
         action="Type d'action à filtrer (optionnel)",
-        limit="Nombre d'entrées à afficher (défaut: 10, max: 50)"
+        limit="Nombre d'entrées par page (défaut: 10, max: 10)"
     )
     @app_commands.choices(action=[
         app_commands.Choice(name="Warn", value="warn"),
@@ -1687,7 +1690,7 @@ class Moderation(commands.Cog):
     ])
     @log_command_usage
     async def moderation_history(self, interaction: discord.Interaction, 
-                               user: discord.Member = None, 
+                               user: Optional[str] = None, 
                                action: str = None, 
                                limit: int = 10):
         """Affiche l'historique des actions de modération avec filtres"""
@@ -1702,13 +1705,27 @@ class Moderation(commands.Cog):
             )
             return
         
-        # Limiter le nombre d'entrées
-        limit = min(max(limit, 1), 50)
+        # Une page tient dans un embed (10 champs d'historique au plus)
+        limit = min(max(limit, 1), 10)
+        
+        # L'autocomplétion fournit l'ID ; un texte libre désigne le meilleur résultat de l'index
+        target_id = None
+        if user:
+            target_id = parse_member_reference(user)
+            if target_id is None:
+                matches = self.bot.member_index.search(interaction.guild, user, limit=1, include_bots=True)
+                if not matches:
+                    await interaction.response.send_message(
+                        f"{ERROR} {_('moderation.member_select.member_not_found', user_id, guild_id)}",
+                        ephemeral=True
+                    )
+                    return
+                target_id = matches[0].id
         
-        # Récupérer l'historique
-        history = await self.get_moderation_history(
+        # Récupérer la première page
+        history, next_cursor = await self.get_moderation_history(
             guild_id=guild_id,
-            user_id=user.id if user else None,
+            user_id=target_id,
             action_type=action,
             limit=limit
         )
@@ -1722,6 +1739,29 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
+        embed = await self.build_history_embed(interaction, history, target_id, action, limit, page=0)
+        view = ModerationHistoryView(self, interaction, target_id, action, limit, next_cursor)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    
+    @moderation_history.autocomplete('user')
+    async def moderation_history_user_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggestions de membres (préfixe puis recherche approchée) ; la valeur est l'ID"""
+        members = self.bot.member_index.search(interaction.guild, current, limit=25, include_bots=True)
+        return [
+            app_commands.Choice(
+                name=(member.display_name if member.display_name == member.name
+                      else f"{member.display_name} ({member.name})")[:100],
+                value=str(member.id)
+            )
+            for member in members
+        ]
+    
+    async def build_history_embed(self, interaction: discord.Interaction, history: list,
+                                  target_id: Optional[int], action: Optional[str], limit: int, page: int):
+        """Embed d'une page de l'historique de modération"""
+        user_id = interaction.user.id
+        guild_id = interaction.guild.id
+        
         # Créer l'embed avec l'historique
         embed = discord.Embed(
             title=f"{CHART_BAR} {_('moderation.history.title', user_id, guild_id)}",
@@ -1732,8 +1772,8 @@ class Moderation(commands.Cog):
         
         # Ajouter les filtres appliqués
         filters = []
-        if user:
-            filters.append(f"**{_('moderation.history.filter_user', user_id, guild_id)}:** {user.display_name}")
+        if target_id:
+            filters.append(f"**{_('moderation.history.filter_user', user_id, guild_id)}:** <@{target_id}>")
         if action:
             action_names = {
                 'warn': _('moderation.actions.warn', user_id, guild_id),
@@ -1753,10 +1793,10 @@ class Moderation(commands.Cog):
             )
         
         # Ajouter les entrées d'historique
-        for i, entry in enumerate(history[:10]):  # Limiter à 10 pour éviter la limite Discord
-            # Formater les noms d'utilisateur
-            user_name = f"{entry['user_name']}#{entry['user_discriminator']}" if entry['user_name'] else f"<@{entry['user_id']}>"
-            moderator_name = f"{entry['moderator_name']}#{entry['moderator_discriminator']}" if entry['moderator_name'] else f"<@{entry['moderator_id']}>"
+        for i, entry in enumerate(history, start=page * limit):
+            # Mentions : Discord affiche le nom à jour de chaque utilisateur
+            user_name = f"<@{entry['user_id']}>"
+            moderator_name = f"<@{entry['moderator_id']}>"
             
             # Emoji pour le type d'action
             action_emojis = {
@@ -1797,8 +1837,8 @@ class Moderation(commands.Cog):
                 inline=False
             )
         
-        # Ajouter les statistiques si pas de filtres spécifiques
-        if not user and not action:
+        # Ajouter les statistiques si pas de filtres spécifiques (première page seulement)
+        if not target_id and not action and page == 0:
             stats = await self.get_moderation_stats(guild_id)
             if stats['stats']:
                 stats_text = ""
@@ -1812,8 +1852,247 @@ class Moderation(commands.Cog):
                 )
         
         embed.set_footer(text=_('moderation.history.footer', user_id, guild_id, limit=limit))
+        return embed
+    
+    @app_commands.command(name="moderation_bulk", description="Applique une action de modération à plusieurs membres")
+    @app_commands.describe(
+        action="Action à appliquer",
+        members="Mentions ou IDs des membres (séparés par des espaces)",
+        joined_within="Cibler aussi les membres arrivés depuis N minutes",
+        duration="Durée du timeout en minutes",
+        reason="Raison de l'action"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Timeout", value="timeout"),
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Ban", value="ban")
+    ])
+    @log_command_usage
+    async def moderation_bulk(self, interaction: discord.Interaction, action: str,
+                              members: Optional[str] = None,
+                              joined_within: Optional[app_commands.Range[int, 1, 10080]] = None,
+                              duration: Optional[app_commands.Range[int, 1, 40320]] = None,
+                              reason: Optional[str] = None):
+        """Action groupée (raids) : cibles par mentions/IDs et/ou date d'arrivée, après confirmation"""
+        user_id = interaction.user.id
+        guild_id = interaction.guild.id
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        required_permission = {
+            'timeout': ('moderate_members', 'moderation.permissions.no_moderate_permission'),
+            'kick': ('kick_members', 'moderation.permissions.no_kick_permission'),
+            'ban': ('ban_members', 'moderation.permissions.no_ban_permission')
+        }[action]
+        if not getattr(interaction.user.guild_permissions, required_permission[0]):
+            await interaction.response.send_message(
+                f"{ERROR} {_(required_permission[1], user_id, guild_id)}",
+                ephemeral=True
+            )
+            return
+        
+        if action == 'timeout' and not duration:
+            await interaction.response.send_message(_('moderation.bulk.duration_required', user_id, guild_id), ephemeral=True)
+            return
+        
+        targets, skipped = self.resolve_bulk_targets(interaction, action, members, joined_within)
+        if not targets:
+            await interaction.response.send_message(_('moderation.bulk.no_targets', user_id, guild_id), ephemeral=True)
+            return
+        
+        job = BulkJob(guild_id, user_id, action, targets, reason=reason, duration_minutes=duration)
+        action_name = _(f'moderation.actions.{action}', user_id, guild_id)
+        notes = []
+        if skipped:
+            notes.append(_('moderation.bulk.skipped', user_id, guild_id, count=skipped))
+        if len(targets) > MAX_BULK_TARGETS:
+            notes.append(_('moderation.bulk.truncated', user_id, guild_id, max=MAX_BULK_TARGETS))
+        
+        embed = discord.Embed(
+            title=f"{WARNING} {_('moderation.bulk.confirm_title', user_id, guild_id, action=action_name)}",
+            description="\n".join(
+                [_('moderation.bulk.confirm_description', user_id, guild_id, count=len(job.targets))] + notes
+            ),
+            color=discord.Color.orange(),
+            timestamp=datetime.now()
+        )
+        view = BulkActionConfirmView(self, interaction, job)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    
+    def resolve_bulk_targets(self, interaction: discord.Interaction, action: str, members: Optional[str],
+                             joined_within: Optional[int]):
+        """IDs ciblés et nombre de membres écartés (modérateur, bot, propriétaire, hiérarchie des rôles)"""
+        guild = interaction.guild
+        moderator = interaction.user
+        ids = parse_user_ids(members)
+        if joined_within:
+            cutoff = discord.utils.utcnow() - timedelta(minutes=joined_within)
+            ids.extend(m.id for m in guild.members if not m.bot and m.joined_at and m.joined_at >= cutoff)
+        
+        targets, skipped = [], 0
+        for target_id in dict.fromkeys(ids):
+            member = guild.get_member(target_id)
+            if member is None:
+                # Un ban peut viser un compte qui a déjà quitté le serveur
+                if action == 'ban' and target_id not in (moderator.id, guild.owner_id, guild.me.id):
+                    targets.append(target_id)
+                else:
+                    skipped += 1
+                continue
+            if (member.id in (moderator.id, guild.owner_id, guild.me.id)
+                    or member.top_role >= guild.me.top_role
+                    or (moderator.id != guild.owner_id and member.top_role >= moderator.top_role)):
+                skipped += 1
+                continue
+            targets.append(member.id)
+        return targets, skipped
+    
+    def bulk_performer(self, guild: discord.Guild, job: BulkJob):
+        """Appel Discord d'une cible du lot"""
+        async def perform(target_id: int):
+            try:
+                if job.action_type == 'ban':
+                    await guild.ban(discord.Object(id=target_id), reason=job.reason, delete_message_seconds=0)
+                    return
+                member = guild.get_member(target_id)
+                if member is None:
+                    raise LookupError("member left the server")
+                if job.action_type == 'timeout':
+                    await member.timeout(timedelta(minutes=job.duration_minutes), reason=job.reason)
+                else:
+                    await member.kick(reason=job.reason)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    raise RateLimited(float(e.response.headers.get('Retry-After', 1)))
+                raise
+        return perform
+    
+    def build_bulk_embed(self, interaction: discord.Interaction, snapshot: dict) -> discord.Embed:
+        """Embed de progression (puis de résultat) d'un lot"""
+        user_id = interaction.user.id
+        guild_id = interaction.guild.id
+        action_name = _(f"moderation.actions.{snapshot['action']}", user_id, guild_id)
+        finished = snapshot['status'] == 'done'
+        total = snapshot['total'] or 1
+        filled = round(10 * snapshot['done'] / total)
+        
+        embed = discord.Embed(
+            title=(f"{SUCCESS} {_('moderation.bulk.done_title', user_id, guild_id, action=action_name)}" if finished
+                   else f"{CLOCK} {_('moderation.bulk.progress_title', user_id, guild_id, action=action_name)}"),
+            description=f"`{'█' * filled}{'░' * (10 - filled)}` "
+                        + _('moderation.bulk.progress', user_id, guild_id, done=snapshot['done'],
+                            total=snapshot['total'], succeeded=snapshot['succeeded'],
+                            failed=len(snapshot['failed'])),
+            color=discord.Color.green() if finished else discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        if finished and snapshot['failed']:
+            lines = [f"<@{entry['user_id']}> — {entry['error'][:80]}" for entry in snapshot['failed'][:10]]
+            if len(snapshot['failed']) > 10:
+                lines.append(f"… +{len(snapshot['failed']) - 10}")
+            embed.add_field(name=_('moderation.bulk.failures', user_id, guild_id), value="\n".join(lines), inline=False)
+        return embed
+
+
+class ModerationHistoryView(discord.ui.View):
+    """Navigation dans l'historique de modération par curseur (pages précédentes gardées en mémoire)"""
+    
+    def __init__(self, cog: 'Moderation', interaction: discord.Interaction, target_id: Optional[int],
+                 action: Optional[str], limit: int, next_cursor: Optional[str]):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.interaction = interaction
+        self.target_id = target_id
+        self.action = action
+        self.limit = limit
+        self.cursors = [None]  # Curseur de début de chaque page déjà vue
+        self.next_cursor = next_cursor
+        self.update_buttons()
+    
+    @property
+    def page(self) -> int:
+        return len(self.cursors) - 1
+    
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.next_cursor is None
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.interaction.user.id
+    
+    async def show_page(self, interaction: discord.Interaction):
+        history, self.next_cursor = await self.cog.get_moderation_history(
+            guild_id=interaction.guild.id,
+            user_id=self.target_id,
+            action_type=self.action,
+            limit=self.limit,
+            cursor=self.cursors[-1]
+        )
+        self.update_buttons()
+        embed = await self.cog.build_history_embed(self.interaction, history, self.target_id, self.action, self.limit, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="Précédent", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page > 0:
+            self.cursors.pop()
+        await self.show_page(interaction)
+    
+    @discord.ui.button(label="Suivant", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor:
+            self.cursors.append(self.next_cursor)
+        await self.show_page(interaction)
+    
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.interaction.edit_original_response(view=self)
+        except Exception:
+            pass
+
+
+class BulkActionConfirmView(discord.ui.View):
+    """Confirmation d'une action groupée, puis suivi de sa progression dans le même message"""
+    
+    def __init__(self, cog: 'Moderation', interaction: discord.Interaction, job: BulkJob):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.interaction = interaction
+        self.job = job
+        self.confirm.label = _('moderation.bulk.confirm_button', interaction.user.id, interaction.guild.id)
+        self.cancel.label = _('moderation.bulk.cancel_button', interaction.user.id, interaction.guild.id)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.interaction.user.id
+    
+    @discord.ui.button(style=discord.ButtonStyle.danger, emoji="⚠️")
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.stop()
+        job = self.job
+        await interaction.response.edit_message(embed=self.cog.build_bulk_embed(interaction, job.snapshot()), view=None)
+        # Expirations des timeouts écrites par le lot : les charger dans le planificateur dès la fin
+        self.cog.bulk.submit(job, self.cog.bulk_performer(interaction.guild, job),
+                             on_done=lambda job: self.cog.bot.moderation_jobs.sync())
+        # Modifications du message espacées : elles partagent le rate limit du webhook d'interaction
+        async for snapshot in job.progress(interval=2.0):
+            try:
+                await interaction.edit_original_response(embed=self.cog.build_bulk_embed(interaction, snapshot))
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to update bulk action progress: {e}")
+    
+    @discord.ui.button(style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.stop()
+        await interaction.response.edit_message(
+            content=_('moderation.bulk.cancelled', interaction.user.id, interaction.guild.id), embed=None, view=None
+        )
+    
+    async def on_timeout(self):
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except Exception:
+            pass
+
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
\ No newline at end of file
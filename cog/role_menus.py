@@ -1,17 +1,40 @@
 import discord
 from .command_logger import log_command_usage
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
+import asyncio
+import hashlib
+import json
 import logging
 from typing import List, Dict, Optional
 from i18n import _
 
 logger = logging.getLogger(__name__)
 
+# Menus and their options in one query; LEFT JOIN keeps menus that have no option yet
+MENUS_QUERY = """
+    SELECT m.id, m.guild_id, m.channel_id, m.message_id, m.title, m.description, m.color,
+           m.placeholder, m.max_values, m.min_values,
+           o.role_id, o.label, o.description AS option_description, o.emoji, o.position
+    FROM role_menus m
+    LEFT JOIN role_menu_options o ON o.menu_id = m.id
+    {where}
+    ORDER BY m.id, o.position, o.id
+"""
+MENU_COLUMNS = ('id', 'guild_id', 'channel_id', 'message_id', 'title', 'description', 'color',
+                'placeholder', 'max_values', 'min_values')
+
+
+def menu_content_hash(menu: Dict) -> str:
+    """Fingerprint of what a menu's Discord message shows (message ID excluded)"""
+    content = {key: value for key, value in menu.items() if key != 'message_id'}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
 class RoleMenuDropdown(discord.ui.Select):
     def __init__(self, bot, menu_data: Dict, options_data: List[Dict]):
         self.bot = bot
         self.menu_data = menu_data
+        self.options_data = options_data
         self.guild_id = menu_data['guild_id']
         
         # Convert database options to Discord select options
@@ -55,73 +78,47 @@ class RoleMenuDropdown(discord.ui.Select):
                 await interaction.response.send_message(_('role_menus.error.bot_not_found', interaction.user.id, guild.id), ephemeral=True)
                 return
             
-            # Get all roles from this menu for removal logic
-            menu_options = await self.bot.db.query(
-                "SELECT role_id FROM role_menu_options WHERE menu_id = %s",
-                params=(self.menu_data['id'],),
-                fetchall=True
-            )
+            # Current menu definition from the cog's registry (the view's own copy if the cog is gone)
+            cog = self.bot.get_cog('RoleMenus')
+            menu = cog.menus.get(self.menu_data['id']) if cog else None
+            menu_options = menu['options'] if menu else self.options_data
             
             if not menu_options:
                 logger.error(f"❌ No options found for menu {self.menu_data['id']}")
                 await interaction.response.send_message(_('role_menus.error.menu_config', interaction.user.id, guild.id), ephemeral=True)
                 return
                 
-            menu_role_ids = [option['role_id'] for option in menu_options]
-            logger.info(f"📋 Menu role IDs: {menu_role_ids}")
+            menu_role_ids = {option['role_id'] for option in menu_options}
             
-            # Check if this is a single-selection menu (max_values = 1)
-            is_single_selection = self.menu_data.get('max_values', 1) == 1
-            
-            # Role removal logic depends on selection mode
-            roles_to_remove = []
-            
-            if is_single_selection:
-                # Single selection: remove all other roles from this menu that aren't selected
-                for role in member.roles:
-                    if role.id in menu_role_ids and role.id not in selected_role_ids:
-                        if role < bot_member.top_role:  # Check if bot can manage this role
-                            roles_to_remove.append(role)
-            else:
-                # Multiple selection: For true multi-select behavior, we should only remove roles
-                # that the user explicitly deselected. However, Discord dropdowns show current selection,
-                # so any role from this menu not in the current selection should be removed.
-                for role in member.roles:
-                    if role.id in menu_role_ids and role.id not in selected_role_ids:
-                        if role < bot_member.top_role:
-                            roles_to_remove.append(role)
+            # Single and multiple selection alike: Discord dropdowns show the current selection,
+            # so any role from this menu that is not selected anymore is removed
+            roles_to_remove = [
+                role for role in member.roles
+                if role.id in menu_role_ids and role.id not in selected_role_ids and role < bot_member.top_role
+            ]
             
             # Add newly selected roles
             roles_to_add = []
             for role_id in selected_role_ids:
                 role = guild.get_role(role_id)
-                if role and role not in member.roles and role < bot_member.top_role:
+                if role and role.id in menu_role_ids and role not in member.roles and role < bot_member.top_role:
                     roles_to_add.append(role)
             
-            # Apply role changes
+            # Apply all role changes in a single member edit
             changes_made = []
             
-            if roles_to_remove:
-                try:
-                    await member.remove_roles(*roles_to_remove, reason="Role menu selection")
-                    for role in roles_to_remove:
-                        changes_made.append(f"➖ Removed {role.name}")
-                except discord.Forbidden:
-                    await interaction.response.send_message(_('role_menus.error.no_permission_remove', interaction.user.id, guild.id), ephemeral=True)
-                    return
-                except Exception as e:
-                    logger.error(f"Error removing roles: {e}")
-            
-            if roles_to_add:
+            if roles_to_remove or roles_to_add:
+                new_roles = [role for role in member.roles[1:] if role not in roles_to_remove] + roles_to_add
                 try:
-                    await member.add_roles(*roles_to_add, reason="Role menu selection")
-                    for role in roles_to_add:
-                        changes_made.append(f"➕ Added {role.name}")
+                    await member.edit(roles=new_roles, reason="Role menu selection")
+                    changes_made.extend(f"➖ Removed {role.name}" for role in roles_to_remove)
+                    changes_made.extend(f"➕ Added {role.name}" for role in roles_to_add)
                 except discord.Forbidden:
-                    await interaction.response.send_message(_('role_menus.error.no_permission_add', interaction.user.id, guild.id), ephemeral=True)
+                    error_key = 'role_menus.error.no_permission_add' if roles_to_add else 'role_menus.error.no_permission_remove'
+                    await interaction.response.send_message(_(error_key, interaction.user.id, guild.id), ephemeral=True)
                     return
                 except Exception as e:
-                    logger.error(f"Error adding roles: {e}")
+                    logger.error(f"Error updating roles: {e}")
             
             # Send response
             if changes_made:
@@ -149,49 +146,45 @@ class RoleMenuView(discord.ui.View):
             self.add_item(dropdown)
 
 class RoleMenus(commands.Cog):
+    """Role menus deployed from the dashboard
+
+    Menus and options live in an in-memory registry (menu id -> menu with its options),
+    loaded with a single JOIN. The dashboard asks for a deploy through the bot's IPC API
+    and bumps the 'role_menus' config version on every change; the version watcher then
+    reloads the guild's menus and deploys or updates whatever differs. Each deploy records
+    a hash of the menu's content, so edits made while the bot was offline are deployed at
+    the next startup.
+    """
+
     def __init__(self, bot):
         self.bot = bot
+        self.menus: Dict[int, Dict] = {}
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.deploy_task: Optional[asyncio.Task] = None
         
     async def cog_load(self):
-        """Load persistent views for existing role menus"""
+        """Load the registry and persistent views for existing role menus"""
+        self.bot.interactions.config.subscribe('role_menus', self.on_menus_changed)
         try:
             # Wait for database to be connected
             if not self.bot.db.pool:
                 logger.info("Waiting for database connection before loading role menu views...")
                 await self.bot.db.connect()
             
-            # Get all active role menus
-            menus = await self.bot.db.query(
-                "SELECT * FROM role_menus WHERE message_id IS NOT NULL",
-                params=None,
-                fetchall=True
-            )
-            
-            if not menus:
-                logger.info("No existing role menus found with message IDs")
-                return
-            
-            logger.info(f"Found {len(menus)} role menus with message IDs, loading persistent views...")
+            self.menus = await self.load_menus()
             
-            for menu in menus:
-                # Get menu options
-                options = await self.bot.db.query(
-                    "SELECT * FROM role_menu_options WHERE menu_id = %s ORDER BY position",
-                    params=(menu['id'],),
-                    fetchall=True
-                )
-                
-                if options:
-                    view = RoleMenuView(self.bot, menu, options)
-                    self.bot.add_view(view, message_id=menu['message_id'])
-                    logger.info(f"✅ Loaded persistent view for role menu {menu['id']} ({menu['title']})")
-                else:
+            loaded = 0
+            for menu in self.menus.values():
+                if menu['message_id'] and menu['options']:
+                    self.bot.add_view(RoleMenuView(self.bot, menu, menu['options']), message_id=menu['message_id'])
+                    loaded += 1
+                elif menu['message_id']:
                     logger.warning(f"⚠️  Role menu {menu['id']} has no options, skipping persistent view")
                     
-            logger.info(f"✅ Loaded {len(menus)} persistent role menu views")
+            logger.info(f"✅ Loaded {len(self.menus)} role menus ({loaded} persistent views)")
             
-            # Start the background task to check for new role menus
-            self.check_new_role_menus.start()
+            # Menus created or edited while the bot was offline are deployed once connected
+            self.deploy_task = asyncio.create_task(self.deploy_pending_menus())
             
         except Exception as e:
             logger.error(f"Error loading role menu views: {e}")
@@ -199,63 +192,85 @@ class RoleMenus(commands.Cog):
             logger.error(f"Traceback: {traceback.format_exc()}")
             
     async def cog_unload(self):
-        """Stop background tasks when cog is unloaded"""
-        self.check_new_role_menus.cancel()
+        """Stop listening for dashboard changes when the cog is unloaded"""
+        self.bot.interactions.config.unsubscribe('role_menus', self.on_menus_changed)
+        if self.deploy_task:
+            self.deploy_task.cancel()
     
-    @tasks.loop(seconds=30)  # Check every 30 seconds
-    async def check_new_role_menus(self):
-        """Check for role menus that need Discord messages created"""
-        try:
-            # Find role menus without message IDs
-            menus = await self.bot.db.query(
-                "SELECT * FROM role_menus WHERE message_id IS NULL",
-                params=None,
-                fetchall=True
-            )
-            
-            if not menus:
-                return
-                
-            logger.info(f"Found {len(menus)} role menus without Discord messages")
-            
-            for menu in menus:
-                try:
-                    # Get menu options
-                    options = await self.bot.db.query(
-                        "SELECT * FROM role_menu_options WHERE menu_id = %s ORDER BY position",
-                        params=(menu['id'],),
-                        fetchall=True
-                    )
-                    
-                    if not options:
-                        logger.warning(f"Role menu {menu['id']} has no options, skipping")
-                        continue
-                    
-                    # Create the Discord message
-                    message = await self.create_or_update_menu_message(menu, options)
-                    
-                    if message:
-                        logger.info(f"✅ Created Discord message for role menu {menu['id']}")
-                        
-                        # Add persistent view
-                        view = RoleMenuView(self.bot, menu, options)
-                        self.bot.add_view(view, message_id=message.id)
-                    else:
-                        logger.error(f"❌ Failed to create Discord message for role menu {menu['id']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing role menu {menu['id']}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Error in check_new_role_menus task: {e}")
+    async def load_menus(self, where: str = "", params=None) -> Dict[int, Dict]:
+        """Menus (with their 'options' list) matching an optional WHERE clause, in one query"""
+        rows = await self.bot.db.query(MENUS_QUERY.format(where=where), params=params, fetchall=True)
+        menus: Dict[int, Dict] = {}
+        for row in rows or []:
+            menu = menus.get(row['id'])
+            if menu is None:
+                menu = menus[row['id']] = {column: row[column] for column in MENU_COLUMNS}
+                menu['options'] = []
+            if row['role_id'] is not None:
+                menu['options'].append({
+                    'role_id': row['role_id'],
+                    'label': row['label'],
+                    'description': row['option_description'],
+                    'emoji': row['emoji'],
+                    'position': row['position']
+                })
+        return menus
     
-    @check_new_role_menus.before_loop
-    async def before_check_new_role_menus(self):
-        """Wait for bot to be ready before starting the task"""
+    async def deploy_pending_menus(self):
+        """Create missing messages and update those whose menu changed since it was last deployed"""
         await self.bot.wait_until_ready()
-
-    # sync_role_menus command removed - automatic sync is now handled by background task
+        rows = await self.bot.db.query("SELECT menu_id, content_hash FROM role_menu_deployments", fetchall=True)
+        deployed = {row['menu_id']: row['content_hash'] for row in rows or []}
+        for menu_id in [menu_id for menu_id, menu in self.menus.items()
+                        if not menu['message_id'] or deployed.get(menu_id) != menu_content_hash(menu)]:
+            await self.sync_menu(menu_id)
+    
+    async def on_menus_changed(self, guild_id: int):
+        """A guild's role menus changed on the dashboard: apply the differences"""
+        await self.bot.wait_until_ready()
+        menus = await self.load_menus("WHERE m.guild_id = %s", (guild_id,))
+        
+        for menu_id in [menu_id for menu_id, menu in self.menus.items()
+                        if menu['guild_id'] == guild_id and menu_id not in menus]:
+            # Deleted (the dashboard removes the Discord message itself)
+            self.menus.pop(menu_id, None)
+        
+        for menu_id, menu in menus.items():
+            if self.menus.get(menu_id) != menu or not menu['message_id']:
+                await self.sync_menu(menu_id)
     
+    async def sync_menu(self, menu_id: int) -> bool:
+        """Reload one menu and create or update its Discord message"""
+        lock = self.locks.setdefault(menu_id, asyncio.Lock())
+        async with lock:
+            # Read inside the lock: a deploy that just finished has stored its message ID
+            menu = (await self.load_menus("WHERE m.id = %s", (menu_id,))).get(menu_id)
+            if not menu:
+                logger.error(f"Role menu {menu_id} not found")
+                self.menus.pop(menu_id, None)
+                return False
+            
+            self.menus[menu_id] = menu
+            if not menu['options']:
+                logger.warning(f"Role menu {menu_id} has no options, skipping")
+                return False
+            
+            # Sending or editing the message with the view registers it as persistent
+            message = await self.create_or_update_menu_message(menu, menu['options'])
+            if not message:
+                logger.error(f"❌ Failed to create Discord message for role menu {menu_id}")
+                return False
+            
+            menu['message_id'] = message.id
+            # Remembered so that edits made while the bot is offline are applied at the next startup
+            await self.bot.db.execute(
+                """INSERT INTO role_menu_deployments (menu_id, content_hash) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash)""",
+                (menu_id, menu_content_hash(menu))
+            )
+            logger.info(f"✅ Deployed Discord message for role menu {menu_id}")
+            return True
+
     async def create_or_update_menu_message(self, menu_data: Dict, options_data: List[Dict]) -> Optional[discord.Message]:
         """Create or update a role menu message"""
         try:
@@ -330,40 +345,9 @@ class RoleMenus(commands.Cog):
             return None
 
     async def force_create_menu_message(self, menu_id: int) -> bool:
-        """Force create a Discord message for a specific role menu"""
+        """Force create or update the Discord message of a role menu (dashboard IPC command)"""
         try:
-            # Get menu data
-            menu = await self.bot.db.query(
-                "SELECT * FROM role_menus WHERE id = %s",
-                params=(menu_id,),
-                fetchone=True
-            )
-            
-            if not menu:
-                logger.error(f"Role menu {menu_id} not found")
-                return False
-            
-            # Get menu options
-            options = await self.bot.db.query(
-                "SELECT * FROM role_menu_options WHERE menu_id = %s ORDER BY position",
-                params=(menu_id,),
-                fetchall=True
-            )
-            
-            if not options:
-                logger.error(f"Role menu {menu_id} has no options")
-                return False
-            
-            # Create the message
-            message = await self.create_or_update_menu_message(menu, options)
-            
-            if message:
-                logger.info(f"✅ Forced creation of Discord message for role menu {menu_id}")
-                return True
-            else:
-                logger.error(f"❌ Failed to force create Discord message for role menu {menu_id}")
-                return False
-                
+            return await self.sync_menu(menu_id)
         except Exception as e:
             logger.error(f"Error in force_create_menu_message: {e}")
             return False
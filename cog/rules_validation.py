@@ -24,41 +24,50 @@ class RulesValidation(commands.Cog):
         except Exception:
             return fallback
 
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        if interaction.type != discord.InteractionType.component:
-            return
+    async def cog_load(self):
+        self.bot.interactions.config.register("rules", self.load_config)
+        self.bot.interactions.register("rules_accept", self.handle_accept)
+
+    async def cog_unload(self):
+        self.bot.interactions.unregister("rules_accept")
+        self.bot.interactions.config.unregister("rules")
+
+    async def load_config(self, guild_id: int):
+        return await self.bot.db.query(
+            "SELECT * FROM rules_validation_config WHERE guild_id = %s",
+            (guild_id,),
+            fetchone=True
+        )
 
-        custom_id = interaction.data.get("custom_id", "") if interaction.data else ""
-        if not custom_id.startswith("rules_accept_"):
-            return
+    async def toggle_acceptance(self, guild_id: int, user_id: int) -> bool:
+        """Flip a member's acceptance in a single statement, returns True if the rules are now accepted.
+
+        LAST_INSERT_ID(expr) reports the outcome without a prior SELECT:
+        0 = first acceptance (inserted), 2 = accepted again, 1 = withdrawn.
+        """
+        outcome = await self.bot.db.execute_and_get_id(
+            """INSERT INTO rules_acceptances (guild_id, user_id, accepted_at, accepted)
+               VALUES (%s, %s, %s, 1)
+               ON DUPLICATE KEY UPDATE
+                   accepted_at = IF(accepted = 0, VALUES(accepted_at), accepted_at),
+                   accepted = LAST_INSERT_ID(2 - accepted) - 1""",
+            (guild_id, user_id, datetime.utcnow())
+        )
+        return outcome != 1
 
+    async def handle_accept(self, interaction: discord.Interaction, key: str):
         guild = interaction.guild
         member = interaction.user
         if not guild or not isinstance(member, discord.Member):
             return
 
         try:
-            config = await self.bot.db.query(
-                "SELECT * FROM rules_validation_config WHERE guild_id = %s",
-                (str(guild.id),),
-                fetchone=True
-            )
+            config = await self.bot.interactions.config.get(guild.id, "rules")
             if not config:
                 await interaction.response.send_message("Configuration du règlement introuvable.", ephemeral=True)
                 return
 
-            acceptance = await self.bot.db.query(
-                "SELECT accepted_at FROM rules_acceptances WHERE guild_id = %s AND user_id = %s",
-                (str(guild.id), str(member.id)),
-                fetchone=True
-            )
-            if acceptance:
-                await self.bot.db.query(
-                    "DELETE FROM rules_acceptances WHERE guild_id = %s AND user_id = %s",
-                    (str(guild.id), str(member.id))
-                )
-
+            if not await self.toggle_acceptance(guild.id, member.id):
                 removed_role_name = None
                 grant_role_id = config.get("grant_role_id")
                 if grant_role_id:
@@ -77,11 +86,6 @@ class RulesValidation(commands.Cog):
                 await interaction.response.send_message(ack, ephemeral=True)
                 return
 
-            await self.bot.db.query(
-                "INSERT INTO rules_acceptances (guild_id, user_id, accepted_at) VALUES (%s, %s, %s)",
-                (str(guild.id), str(member.id), datetime.utcnow())
-            )
-
             granted_role_name = None
             grant_role_id = config.get("grant_role_id")
             if grant_role_id:
@@ -1,8 +1,11 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from datetime import datetime, timezone
 import logging
 from i18n import _
+from message_cache import MessageCache, CachedMessage
+from log_queue import LogDeliveryQueue
+from burst import BurstCoalescer, format_burst_lines
 from .command_logger import log_command_usage
 
 logger = logging.getLogger(__name__)
@@ -12,7 +15,26 @@ class ServerLogsCog(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.message_cache = {}  # Cache for message content before deletion
+        self.message_cache = MessageCache.from_env()  # Per-guild cache for message content before deletion
+        self.log_queue = LogDeliveryQueue(bot)  # Batched, rate-limit-aware delivery to log channels
+        self.bursts = BurstCoalescer(self.send_burst_summary)  # Join/leave/voice flood summaries
+        self.cleanup_message_cache.start()
+    
+    async def cog_unload(self):
+        self.cleanup_message_cache.cancel()
+        await self.bursts.close()
+        await self.log_queue.close()
+        await self.message_cache.close()
+    
+    @tasks.loop(hours=1)
+    async def cleanup_message_cache(self):
+        """Purge expired entries from the disk tier of the message cache"""
+        try:
+            expired = await self.message_cache.cleanup_expired()
+            if expired:
+                logger.debug(f"Message cache cleanup: {expired} expired entries removed")
+        except Exception as e:
+            logger.error(f"Error cleaning message cache: {e}")
         
     async def get_log_config(self, guild_id: int):
         """Get server logging configuration for a guild"""
@@ -70,16 +92,58 @@ class ServerLogsCog(commands.Cog):
         if not channel:
             return
         
-        try:
-            await channel.send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"No permission to send logs to channel {channel.id} in guild {guild_id}")
-        except Exception as e:
-            logger.error(f"Error sending log message: {e}")
+        # Queued and packed with other pending logs for this channel
+        self.log_queue.enqueue(channel, embed)
+    
+    async def send_burst_summary(self, guild_id: int, kind: str, items: list, count: int, duration: float):
+        """Send one summary embed for a coalesced flood of join, leave or voice events"""
+        config = await self.get_log_config(guild_id)
+        
+        if not config:
+            return
+        
+        seconds = int(duration)
+        if kind == 'join':
+            if not config['log_member_join']:
+                return
+            title = f"👥 {_('server_logs.burst.members_joined', 0, guild_id, count=count, seconds=seconds)}"
+            color = discord.Color.green()
+        elif kind == 'leave':
+            if not config['log_member_leave']:
+                return
+            title = f"👥 {_('server_logs.burst.members_left', 0, guild_id, count=count, seconds=seconds)}"
+            color = discord.Color.red()
+        else:
+            if not config['log_voice_join'] and not config['log_voice_leave']:
+                return
+            title = f"🔄 {_('server_logs.burst.voice_moves', 0, guild_id, count=count, seconds=seconds)}"
+            color = discord.Color.purple()
+        
+        embed = discord.Embed(
+            title=title,
+            description=format_burst_lines(
+                items, count, lambda more: _('server_logs.burst.and_more', 0, guild_id, count=more)
+            ),
+            color=color,
+            timestamp=datetime.now(timezone.utc)
+        )
+        
+        guild = self.bot.get_guild(guild_id)
+        if guild:
+            embed.add_field(
+                name=_("config_system.server_logs.embed_fields.total_members", 0, guild_id),
+                value=f"{guild.member_count}",
+                inline=True
+            )
+        
+        await self.send_log(guild_id, embed)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Log when a member joins the server"""
+        if self.bursts.observe(member.guild.id, 'join', f"{member.mention} ({member.name})"):
+            return  # Part of a join flood, reported in the burst summary
+        
         config = await self.get_log_config(member.guild.id)
         
         if not config or not config['log_member_join']:
@@ -121,6 +185,9 @@ class ServerLogsCog(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Log when a member leaves the server"""
+        if self.bursts.observe(member.guild.id, 'leave', f"**{member.display_name}** ({member.name})"):
+            return  # Part of a leave flood, reported in the burst summary
+        
         config = await self.get_log_config(member.guild.id)
         
         if not config or not config['log_member_leave']:
@@ -159,6 +226,12 @@ class ServerLogsCog(commands.Cog):
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """Log voice channel joins, leaves, and voice state changes"""
+        if before.channel != after.channel:
+            source = before.channel.mention if before.channel else "∅"
+            target = after.channel.mention if after.channel else "∅"
+            if self.bursts.observe(member.guild.id, 'voice', f"{member.mention}: {source} → {target}"):
+                return  # Part of a voice flood, reported in the burst summary
+        
         config = await self.get_log_config(member.guild.id)
         
         if not config:
@@ -341,115 +414,123 @@ class ServerLogsCog(commands.Cog):
         if message.author.bot or not message.guild:
             return
             
-        # Store message content for potential deletion logging
-        self.message_cache[message.id] = {
-            'content': message.content,
-            'author': message.author,
-            'channel': message.channel,
-            'created_at': message.created_at,
-            'attachments': [att.url for att in message.attachments],
-            'embeds': len(message.embeds)
-        }
-        
-        # Keep cache size manageable (store last 1000 messages)
-        if len(self.message_cache) > 1000:
-            # Remove oldest entries
-            oldest_keys = list(self.message_cache.keys())[:100]
-            for key in oldest_keys:
-                del self.message_cache[key]
+        # Store a compact snapshot for potential deletion logging
+        self.message_cache.add(CachedMessage.from_message(message))
     
-    @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        """Log when a message is deleted"""
-        if message.author.bot or not message.guild:
-            return
-            
-        config = await self.get_log_config(message.guild.id)
-        
-        if not config or not config['log_message_delete']:
-            return
-        
-        # Get cached message content
-        cached_msg = self.message_cache.get(message.id)
-        
+    def build_message_delete_embed(self, guild_id: int, message_id: int, author_id: int, author_name: str,
+                                   channel_mention: str, channel_name: str, content: str,
+                                   attachment_count: int, avatar_url: str = None):
+        """Build the deletion log embed from plain message data"""
         embed = discord.Embed(
-            title=f"🗑️ {_('config_system.server_logs.log_events.message_deleted', 0, message.guild.id)}",
+            title=f"🗑️ {_('config_system.server_logs.log_events.message_deleted', 0, guild_id)}",
             color=discord.Color.red(),
             timestamp=datetime.now(timezone.utc)
         )
         
         embed.add_field(
-            name=_('server_logs.author', 0, message.guild.id),
-            value=f"{message.author.mention}\n({message.author.name})",
+            name=_('server_logs.author', 0, guild_id),
+            value=f"<@{author_id}>\n({author_name})",
             inline=True
         )
         
         embed.add_field(
-            name=_("config_system.server_logs.embed_fields.channel", 0, message.guild.id),
-            value=f"{message.channel.mention}\n({message.channel.name})",
+            name=_("config_system.server_logs.embed_fields.channel", 0, guild_id),
+            value=f"{channel_mention}\n({channel_name})",
             inline=True
         )
         
         embed.add_field(
-            name=_("config_system.server_logs.embed_fields.message_id", 0, message.guild.id),
-            value=f"{message.id}",
+            name=_("config_system.server_logs.embed_fields.message_id", 0, guild_id),
+            value=f"{message_id}",
             inline=True
         )
         
         # Show message content if available
-        if cached_msg and cached_msg['content']:
-            content = cached_msg['content']
+        if content:
             if len(content) > 1024:
                 content = content[:1021] + "..."
             embed.add_field(
-                name=_("config_system.server_logs.embed_fields.content", 0, message.guild.id),
-                value=f"```{content}```",
-                inline=False
-            )
-        elif message.content:
-            content = message.content
-            if len(content) > 1024:
-                content = content[:1021] + "..."
-            embed.add_field(
-                name=_("config_system.server_logs.embed_fields.content", 0, message.guild.id),
+                name=_("config_system.server_logs.embed_fields.content", 0, guild_id),
                 value=f"```{content}```",
                 inline=False
             )
         else:
             embed.add_field(
-                name=_("config_system.server_logs.embed_fields.content", 0, message.guild.id),
-                value=_("config_system.server_logs.embed_fields.no_content", 0, message.guild.id),
+                name=_("config_system.server_logs.embed_fields.content", 0, guild_id),
+                value=_("config_system.server_logs.embed_fields.no_content", 0, guild_id),
                 inline=False
             )
         
         # Show attachments if any
-        if cached_msg and cached_msg['attachments']:
-            embed.add_field(
-                name=_("config_system.server_logs.embed_fields.attachments", 0, message.guild.id),
-                value=_("config_system.server_logs.embed_fields.attachment_count", 0, message.guild.id).format(count=len(cached_msg['attachments'])),
-                inline=True
-            )
-        elif message.attachments:
+        if attachment_count:
             embed.add_field(
-                name=_("config_system.server_logs.embed_fields.attachments", 0, message.guild.id),
-                value=_("config_system.server_logs.embed_fields.attachment_count", 0, message.guild.id).format(count=len(message.attachments)),
+                name=_("config_system.server_logs.embed_fields.attachments", 0, guild_id),
+                value=_("config_system.server_logs.embed_fields.attachment_count", 0, guild_id).format(count=attachment_count),
                 inline=True
             )
         
-        embed.set_thumbnail(url=message.author.display_avatar.url)
-        embed.set_footer(text=f"Author ID: {message.author.id}")
+        if avatar_url:
+            embed.set_thumbnail(url=avatar_url)
+        embed.set_footer(text=f"Author ID: {author_id}")
+        return embed
+    
+    @commands.Cog.listener()
+    async def on_message_delete(self, message):
+        """Log when a message is deleted"""
+        if message.author.bot or not message.guild:
+            return
+        
+        # Always drop the cached copy, even when logging is disabled
+        cached_msg = await self.message_cache.pop(message.guild.id, message.id)
+            
+        config = await self.get_log_config(message.guild.id)
+        
+        if not config or not config['log_message_delete']:
+            return
+        
+        content = cached_msg.content if cached_msg and cached_msg.content else message.content
+        attachment_count = len(cached_msg.attachments) if cached_msg and cached_msg.attachments else len(message.attachments)
+        
+        embed = self.build_message_delete_embed(
+            message.guild.id, message.id, message.author.id, message.author.name,
+            message.channel.mention, message.channel.name, content, attachment_count,
+            message.author.display_avatar.url
+        )
         
         await self.send_log(message.guild.id, embed)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Log deletions of messages that discord.py no longer has in its own cache"""
+        if payload.cached_message is not None or not payload.guild_id:
+            return  # Handled by on_message_delete
+        
+        cached_msg = await self.message_cache.pop(payload.guild_id, payload.message_id)
+        if not cached_msg:
+            return
+        
+        config = await self.get_log_config(payload.guild_id)
+        
+        if not config or not config['log_message_delete']:
+            return
         
-        # Clean up cache
-        if message.id in self.message_cache:
-            del self.message_cache[message.id]
+        channel = self.bot.get_channel(payload.channel_id)
+        channel_name = channel.name if channel else str(payload.channel_id)
+        
+        embed = self.build_message_delete_embed(
+            payload.guild_id, payload.message_id, cached_msg.author_id, cached_msg.author_name,
+            f"<#{payload.channel_id}>", channel_name, cached_msg.content, len(cached_msg.attachments)
+        )
+        
+        await self.send_log(payload.guild_id, embed)
     
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
         """Log when a message is edited"""
         if before.author.bot or not before.guild or before.content == after.content:
             return
+        
+        self.message_cache.update_content(before.guild.id, before.id, after.content)
             
         config = await self.get_log_config(before.guild.id)
         
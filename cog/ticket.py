@@ -8,7 +8,7 @@ import json
 import os
 import logging
 from datetime import datetime
-from cloud_storage import CloudTicketLogger, GoogleDriveStorage
+from cloud_storage import CloudTicketLogger, PagedTranscriptMessages, create_transcript_storage
 from custom_emojis import TICKET, TICKET_CREATE, TICKET_CLOSE, TICKET_DELETE, SUCCESS, ERROR, WARNING, CLOCK, TRASH, CHECK, CROSS
 
 logger = logging.getLogger(__name__)
@@ -18,10 +18,39 @@ class Ticket(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        # Initialiser le stockage cloud
-        self.cloud_storage = GoogleDriveStorage()
+        # Initialiser le stockage des transcripts (Google Drive ou disque local, voir TRANSCRIPT_STORAGE)
+        self.cloud_storage = create_transcript_storage()
         self.ticket_logger = CloudTicketLogger(bot, self.cloud_storage)
         self.cloud_enabled = False  # Sera défini à True si l'initialisation réussit
+        self.index_task = None
+    
+    async def cog_load(self):
+        # Boutons des panels déployés depuis le dashboard
+        self.bot.interactions.config.register('tickets', self.load_panel_config)
+        self.bot.interactions.register('ticket_button', self.handle_panel_button)
+        # Charger l'index des canaux de tickets actifs (rechargé à la demande en cas d'échec)
+        await self.ticket_logger.load_active_channels()
+        # Lignes de transcript en attente écrites toutes les quelques secondes, même sans nouveau message
+        self.ticket_logger.start()
+    
+    async def cog_unload(self):
+        self.bot.interactions.unregister('ticket_button')
+        self.bot.interactions.config.unregister('tickets')
+        if self.index_task:
+            self.index_task.cancel()
+        # Écrire les transcripts en attente pour qu'ils survivent au redémarrage
+        await self.ticket_logger.close()
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Indexation unique des archives existantes (reprise au prochain démarrage si interrompue)
+        if self.cloud_enabled and self.index_task is None:
+            self.index_task = asyncio.create_task(self.ticket_logger.backfill_index())
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Retirer de l'index les tickets dont le canal a été supprimé manuellement"""
+        self.ticket_logger.unregister_ticket_channel(channel.id)
     
     async def log_ticket_event(self, guild: discord.Guild, event_type: str, ticket_channel: discord.TextChannel, 
                                user: discord.Member, details: str = ""):
@@ -90,62 +119,51 @@ class Ticket(commands.Cog):
         except Exception as e:
             logger.error(f"Erreur lors du log d'événement de ticket: {e}")
 
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        """Handle button interactions from dashboard-created ticket panels"""
-        if interaction.type != discord.InteractionType.component:
-            return
-            
-        if not interaction.data.get('custom_id', '').startswith('ticket_button_'):
+    async def load_panel_config(self, guild_id: int) -> dict:
+        """Panels et boutons de tickets d'un serveur, chargés en une fois pour le routeur d'interactions"""
+        panels = await self.bot.db.query(
+            "SELECT * FROM ticket_panels WHERE guild_id = %s",
+            (str(guild_id),),
+            fetchall=True
+        )
+        buttons = await self.bot.db.query("""
+            SELECT tb.id, tb.panel_id, tb.button_label, tb.button_emoji, tb.button_style,
+                   tb.category_id, tb.ticket_name_format, tb.ping_roles, tb.initial_message,
+                   tb.button_order
+            FROM ticket_buttons tb
+            JOIN ticket_panels tp ON tb.panel_id = tp.id
+            WHERE tp.guild_id = %s
+        """, (str(guild_id),), fetchall=True)
+        return {
+            'panels': {panel['id']: panel for panel in panels or []},
+            'buttons': {button['id']: button for button in buttons or []}
+        }
+
+    async def handle_panel_button(self, interaction: discord.Interaction, button_id: str):
+        """Handle button interactions from dashboard-created ticket panels (custom_id ticket_button_<id>)"""
+        if not interaction.guild or not button_id.isdigit():
             return
-            
-        # Extract button ID from custom_id
-        button_id = interaction.data['custom_id'].replace('ticket_button_', '')
         
         try:
-            # Get button configuration from database
-            button_data = await self.bot.db.query("""
-                SELECT tb.id, tb.panel_id, tb.button_label, tb.button_emoji, tb.button_style, 
-                       tb.category_id, tb.ticket_name_format, tb.ping_roles, tb.initial_message, 
-                       tb.button_order, tp.panel_name, tp.guild_id 
-                FROM ticket_buttons tb 
-                JOIN ticket_panels tp ON tb.panel_id = tp.id 
-                WHERE tb.id = %s
-            """, (button_id,), fetchone=True)
+            config = await self.bot.interactions.config.get(interaction.guild.id, 'tickets')
+            button_data = config['buttons'].get(int(button_id))
             
             if not button_data:
                 await interaction.response.send_message(_('ticket_system.button_config_not_found', interaction.user.id, interaction.guild.id), ephemeral=True)
                 return
             
-            # Debug logging
-            print(f"DEBUG: Retrieved button data: {button_data}")
-            
-            # Extract values from dictionary result
-            btn_id = button_data['id']
             panel_id = button_data['panel_id']
-            button_label = button_data['button_label']
-            button_emoji = button_data['button_emoji']
-            button_style = button_data['button_style']
             category_id = button_data['category_id']
-            ticket_name_format = button_data['ticket_name_format']
             ping_roles_json = button_data['ping_roles']
-            initial_message = button_data['initial_message']
-            button_order = button_data['button_order']
-            panel_name = button_data['panel_name']
-            guild_id = button_data['guild_id']
-            
-            # Debug logging
-            print(f"DEBUG: Category ID: {category_id} (type: {type(category_id)})")
             
             # Validate category_id - handle both integer and string types
             try:
                 category_id = int(category_id) if category_id is not None else None
                 if not category_id or category_id <= 0:
-                    print(f"DEBUG: Category ID validation failed - value: {category_id}")
                     await interaction.response.send_message(_('ticket_system.invalid_category_config', interaction.user.id, interaction.guild.id), ephemeral=True)
                     return
             except (ValueError, TypeError):
-                print(f"DEBUG: Category ID conversion failed - original value: {category_id}")
+                logger.warning(f"Catégorie invalide pour le bouton de ticket {button_id}: {category_id}")
                 await interaction.response.send_message(_('ticket_system.invalid_category_config', interaction.user.id, interaction.guild.id), ephemeral=True)
                 return
             
@@ -160,15 +178,17 @@ class Ticket(commands.Cog):
             
             # Create ticket
             await self.create_dashboard_ticket(
-                interaction, category_id, ticket_name_format, 
-                initial_message, ping_roles, button_label, btn_id, panel_id
+                interaction, category_id, button_data['ticket_name_format'],
+                button_data['initial_message'], ping_roles, button_data['button_label'], button_data['id'], panel_id,
+                panel_data=config['panels'].get(panel_id)
             )
             
         except Exception as e:
             print(f"Error handling ticket button interaction: {e}")
-            await interaction.response.send_message(_('ticket_system.creation_error', interaction.user.id, interaction.guild.id), ephemeral=True)
+            if not interaction.response.is_done():
+                await interaction.response.send_message(_('ticket_system.creation_error', interaction.user.id, interaction.guild.id), ephemeral=True)
 
-    async def create_dashboard_ticket(self, interaction, category_id, name_format, initial_message, ping_roles, button_label, button_id, panel_id=None):
+    async def create_dashboard_ticket(self, interaction, category_id, name_format, initial_message, ping_roles, button_label, button_id, panel_id=None, panel_data=None):
         """Create a ticket from dashboard button click"""
         guild = interaction.guild
         user = interaction.user
@@ -229,9 +249,8 @@ class Ticket(commands.Cog):
             
             mention_content = " ".join(mentions) if mentions else ""
             
-            # Fetch panel data to check if this is a verification ticket
-            panel_data = None
-            if panel_id:
+            # Fetch panel data to check if this is a verification ticket (unless served by the router's config table)
+            if panel_data is None and panel_id:
                 panel_data = await self.bot.db.query(
                     "SELECT * FROM ticket_panels WHERE id = %s AND guild_id = %s",
                     (panel_id, str(guild.id)),
@@ -248,6 +267,7 @@ class Ticket(commands.Cog):
                 INSERT INTO active_tickets (guild_id, channel_id, user_id, button_id, panel_id, created_at)
                 VALUES (%s, %s, %s, %s, %s, NOW())
             """, (str(guild.id), str(channel.id), str(user.id), button_id, panel_id))
+            self.ticket_logger.register_ticket_channel(channel.id)
             
             # Enregistrer l'événement de création
             await self.log_ticket_event(guild, "created", channel, user, f"Ticket créé via {button_label}")
@@ -288,7 +308,7 @@ class Ticket(commands.Cog):
         await interaction.response.defer(ephemeral=True)
         
         try:
-            # Récupérer les logs de l'utilisateur depuis Google Drive
+            # Récupérer les logs de l'utilisateur depuis le stockage des transcripts
             user_logs = await self.ticket_logger.get_user_ticket_logs(guild_id, user.id)
             
             if not user_logs:
@@ -429,6 +449,7 @@ class Ticket(commands.Cog):
                 INSERT INTO active_tickets (guild_id, channel_id, user_id, button_id, panel_id, created_at)
                 VALUES (%s, %s, %s, %s, %s, NOW())
             """, (str(guild_id), str(channel.id), str(user.id), None, None))
+            self.ticket_logger.register_ticket_channel(channel.id)
             
             # Enregistrer l'événement de création
             await self.ticket_logger.log_ticket_event(
@@ -770,6 +791,9 @@ class TicketConfirmDeleteButton(discord.ui.Button):
                 _('ticket_system.no_permission_delete', user_id, guild_id), ephemeral=True)
             return
         
+        # L'archivage du transcript dépasse souvent les 3 secondes accordées par Discord
+        await interaction.response.defer(ephemeral=True)
+        
         channel = interaction.channel
         
         # Enregistrer l'événement de suppression
@@ -790,47 +814,47 @@ class TicketConfirmDeleteButton(discord.ui.Button):
         # Ajouter les informations utilisateur aux logs si disponibles
         if ticket_data:
             ticket_cog = interaction.client.get_cog('Ticket')
-            ticket_key = f"{guild_id}_{channel.id}"
             
-            if ticket_key in ticket_cog.ticket_logger.ticket_cache:
-                logs_data = ticket_cog.ticket_logger.ticket_cache[ticket_key]
-                
-                # Ajouter les informations utilisateur depuis la base de données
-                logs_data["ticket_user_id"] = ticket_data.get("user_id")
-                
-                # Essayer de récupérer les informations utilisateur depuis Discord
-                try:
-                    user = interaction.guild.get_member(int(ticket_data["user_id"]))
-                    if user:
-                        logs_data["ticket_username"] = user.name
-                        logs_data["ticket_discriminator"] = user.discriminator
-                        logs_data["ticket_display_name"] = user.display_name
-                        logs_data["ticket_avatar_url"] = str(user.display_avatar.url) if user.display_avatar else None
-                except Exception as e:
-                    logger.warning(f"Impossible de récupérer les informations utilisateur: {e}")
-        
-        # Finaliser et uploader les logs vers Google Drive
+            # Ajouter les informations utilisateur depuis la base de données
+            user_info = {"ticket_user_id": ticket_data.get("user_id")}
+            
+            # Essayer de récupérer les informations utilisateur depuis Discord
+            try:
+                user = interaction.guild.get_member(int(ticket_data["user_id"]))
+                if user:
+                    user_info["ticket_username"] = user.name
+                    user_info["ticket_discriminator"] = user.discriminator
+                    user_info["ticket_display_name"] = user.display_name
+                    user_info["ticket_avatar_url"] = str(user.display_avatar.url) if user.display_avatar else None
+            except Exception as e:
+                logger.warning(f"Impossible de récupérer les informations utilisateur: {e}")
+            
+            ticket_cog.ticket_logger.set_ticket_info(guild_id, channel.id, **user_info)
+        
+        # Finaliser et uploader les logs vers le stockage des transcripts
         ticket_cog = interaction.client.get_cog('Ticket')
         file_id = await ticket_cog.ticket_logger.finalize_ticket_logs(guild_id, channel.id)
         
         if file_id:
-            logger.info(f"Logs du ticket {channel.id} uploadés vers Google Drive: {file_id}")
+            logger.info(f"Logs du ticket {channel.id} archivés: {file_id}")
+        elif ticket_cog.ticket_logger.is_finalize_pending(guild_id, channel.id):
+            logger.warning(f"Échec de l'upload des logs pour le ticket {channel.id}, nouvelle tentative en arrière-plan")
         else:
-            logger.warning(f"Échec de l'upload des logs pour le ticket {channel.id}")
+            # Aucun transcript exploitable : le salon reste la seule copie de la conversation
+            logger.warning(f"Transcript du ticket {channel.id} introuvable, salon conservé")
+            await interaction.followup.send(
+                "❌ Le transcript de ce ticket n'a pas pu être archivé : le salon est conservé.", ephemeral=True)
+            return
         
         # Supprimer le ticket de la base de données
         await interaction.client.db.execute(
             "DELETE FROM active_tickets WHERE channel_id = %s AND guild_id = %s",
             (str(channel.id), str(guild_id))
         )
+        ticket_cog.ticket_logger.unregister_ticket_channel(channel.id)
         
-        try:
-            await interaction.response.send_message(
-                _('ticket_system.ticket_deleted_permanently', user_id, guild_id), ephemeral=True)
-        except discord.NotFound:
-            # L'interaction a expiré, utiliser followup
-            await interaction.followup.send(
-                _('ticket_system.ticket_deleted_permanently', user_id, guild_id), ephemeral=True)
+        await interaction.followup.send(
+            _('ticket_system.ticket_deleted_permanently', user_id, guild_id), ephemeral=True)
         
         # Supprimer le canal
         await asyncio.sleep(2)
@@ -881,6 +905,9 @@ class TicketCloseAndVerifyButton(discord.ui.Button):
             await interaction.response.send_message("❌ Le membre du ticket est introuvable.", ephemeral=True)
             return
         
+        # Rôles, message de vérification et archivage dépassent souvent les 3 secondes accordées par Discord
+        await interaction.response.defer(ephemeral=True)
+        
         try:
             # Retirer les rôles spécifiés
             roles_to_remove = self.panel_data.get('roles_to_remove', [])
@@ -959,17 +986,26 @@ class TicketCloseAndVerifyButton(discord.ui.Button):
                     f"Membre {ticket_member.display_name} vérifié et ticket fermé par {interaction.user.display_name}"
                 )
             
+            # Finaliser et uploader les logs (reprise en arrière-plan si l'upload échoue)
+            ticket_cog = interaction.client.get_cog('Ticket')
+            file_id = await ticket_cog.ticket_logger.finalize_ticket_logs(guild_id, channel.id)
+            if not file_id and not ticket_cog.ticket_logger.is_finalize_pending(guild_id, channel.id):
+                # Aucun transcript exploitable : le salon reste la seule copie de la conversation
+                logger.warning(f"Transcript du ticket {channel.id} introuvable, salon conservé")
+                await interaction.followup.send(
+                    f"✅ Membre {ticket_member.mention} vérifié, mais le transcript n'a pas pu être archivé : le salon est conservé.",
+                    ephemeral=True
+                )
+                return
+            
             # Supprimer le ticket de la base de données
             await interaction.client.db.execute(
                 "DELETE FROM active_tickets WHERE channel_id = %s AND guild_id = %s",
                 (str(channel.id), str(guild_id))
             )
+            ticket_cog.ticket_logger.unregister_ticket_channel(channel.id)
             
-            # Finaliser et uploader les logs
-            ticket_cog = interaction.client.get_cog('Ticket')
-            file_id = await ticket_cog.ticket_logger.finalize_ticket_logs(guild_id, channel.id)
-            
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"✅ Membre {ticket_member.mention} vérifié avec succès ! Le ticket sera supprimé dans 5 secondes.", 
                 ephemeral=True
             )
@@ -980,7 +1016,7 @@ class TicketCloseAndVerifyButton(discord.ui.Button):
             
         except Exception as e:
             logger.error(f"Erreur lors de la vérification du membre: {e}")
-            await interaction.response.send_message(f"❌ Erreur lors de la vérification: {str(e)}", ephemeral=True)
+            await interaction.followup.send(f"❌ Erreur lors de la vérification: {str(e)}", ephemeral=True)
 
 class TicketReopenButton(discord.ui.Button):
     """Bouton pour rouvrir le ticket"""
@@ -1048,6 +1084,30 @@ class TicketReopenButton(discord.ui.Button):
                 f"Ticket rouvert par {interaction.user.display_name}"
             )
 
+async def load_ticket_transcript(interaction: discord.Interaction, ticket_data: dict) -> dict:
+    """Télécharge à la demande les événements et derniers messages d'un ticket issu de l'index"""
+    if 'messages' in ticket_data or not ticket_data.get('file_id'):
+        return ticket_data
+    
+    ticket_cog = interaction.client.get_cog('Ticket')
+    logs = await ticket_cog.ticket_logger.get_ticket_summary(ticket_data['file_id']) if ticket_cog else None
+    # Conservés dans le dict partagé par la vue : la navigation ne retélécharge pas
+    # (archives paginées : les autres pages de messages sont lues à l'affichage)
+    ticket_data['messages'] = (logs or {}).get('messages', [])
+    ticket_data['events'] = (logs or {}).get('events', [])
+    return ticket_data
+
+def message_page_loaded(messages, page: int, per_page: int = 10) -> bool:
+    """Indique si une page de messages peut être affichée sans relire l'archive"""
+    if isinstance(messages, PagedTranscriptMessages):
+        return messages.is_loaded(page * per_page, (page + 1) * per_page)
+    return True
+
+async def load_message_page(messages, page: int, per_page: int = 10):
+    """Charge depuis l'archive le segment contenant une page de messages"""
+    if isinstance(messages, PagedTranscriptMessages):
+        await messages.load(page * per_page, (page + 1) * per_page)
+
 class TicketLogsDropdown(discord.ui.Select):
     """Dropdown pour sélectionner un ticket dans les logs"""
     
@@ -1099,13 +1159,21 @@ class TicketLogsDropdown(discord.ui.Select):
             ticket_index = int(self.values[0])
             selected_ticket = self.tickets[ticket_index]
             
+            # Transcript pas encore chargé : différer pendant le téléchargement
+            if 'messages' not in selected_ticket:
+                await interaction.response.defer(ephemeral=True)
+                await load_ticket_transcript(interaction, selected_ticket)
+            
             # Créer la vue pour afficher les détails du ticket
             view = TicketDetailsView(selected_ticket, self.tickets, ticket_index)
             
             # Créer l'embed avec les détails du ticket
             embed = await self.create_ticket_details_embed(selected_ticket)
             
-            await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
             
         except Exception as e:
             logger.error(f"Erreur lors de la sélection du ticket: {e}")
@@ -1211,6 +1279,9 @@ class TicketPreviousButton(discord.ui.Button):
         try:
             if self.current_index > 0:
                 previous_ticket = self.all_tickets[self.current_index - 1]
+                if 'messages' not in previous_ticket:
+                    await interaction.response.defer()
+                    await load_ticket_transcript(interaction, previous_ticket)
                 
                 # Créer l'embed pour le ticket précédent
                 embed = await self.create_ticket_details_embed(previous_ticket)
@@ -1218,7 +1289,10 @@ class TicketPreviousButton(discord.ui.Button):
                 # Créer la nouvelle vue
                 view = TicketDetailsView(previous_ticket, self.all_tickets, self.current_index - 1)
                 
-                await interaction.response.edit_message(embed=embed, view=view)
+                if interaction.response.is_done():
+                    await interaction.edit_original_response(embed=embed, view=view)
+                else:
+                    await interaction.response.edit_message(embed=embed, view=view)
             else:
                 await interaction.response.send_message("❌ Aucun ticket précédent.", ephemeral=True)
         except Exception as e:
@@ -1303,6 +1377,9 @@ class TicketNextButton(discord.ui.Button):
         try:
             if self.current_index < len(self.all_tickets) - 1:
                 next_ticket = self.all_tickets[self.current_index + 1]
+                if 'messages' not in next_ticket:
+                    await interaction.response.defer()
+                    await load_ticket_transcript(interaction, next_ticket)
                 
                 # Créer l'embed pour le ticket suivant
                 embed = await self.create_ticket_details_embed(next_ticket)
@@ -1310,7 +1387,10 @@ class TicketNextButton(discord.ui.Button):
                 # Créer la nouvelle vue
                 view = TicketDetailsView(next_ticket, self.all_tickets, self.current_index + 1)
                 
-                await interaction.response.edit_message(embed=embed, view=view)
+                if interaction.response.is_done():
+                    await interaction.edit_original_response(embed=embed, view=view)
+                else:
+                    await interaction.response.edit_message(embed=embed, view=view)
             else:
                 await interaction.response.send_message("❌ Aucun ticket suivant.", ephemeral=True)
         except Exception as e:
@@ -1397,13 +1477,21 @@ class TicketMessagesButton(discord.ui.Button):
                 await interaction.response.send_message("❌ Aucun message trouvé dans ce ticket.", ephemeral=True)
                 return
             
+            # Première page pas encore lue dans l'archive : différer pendant la lecture
+            if not message_page_loaded(messages, 0):
+                await interaction.response.defer(ephemeral=True)
+                await load_message_page(messages, 0)
+            
             # Créer l'embed avec les premiers messages
             embed = await self.create_messages_embed(messages, 0)
             
             # Créer la vue avec pagination si nécessaire
             view = TicketMessagesView(messages, self.ticket_data, 0)
             
-            await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
             
         except Exception as e:
             logger.error(f"Erreur lors de l'affichage des messages: {e}")
@@ -1493,10 +1581,16 @@ class TicketMessagesPreviousButton(discord.ui.Button):
         try:
             if self.page > 0:
                 new_page = self.page - 1
+                if not message_page_loaded(self.messages, new_page):
+                    await interaction.response.defer()
+                    await load_message_page(self.messages, new_page)
                 view = TicketMessagesView(self.messages, self.ticket_data, new_page)
                 embed = await self.create_messages_embed(self.messages, new_page)
                 
-                await interaction.response.edit_message(embed=embed, view=view)
+                if interaction.response.is_done():
+                    await interaction.edit_original_response(embed=embed, view=view)
+                else:
+                    await interaction.response.edit_message(embed=embed, view=view)
             else:
                 await interaction.response.send_message("❌ Vous êtes déjà à la première page.", ephemeral=True)
         except Exception as e:
@@ -1566,10 +1660,16 @@ class TicketMessagesNextButton(discord.ui.Button):
             
             if self.page < total_pages - 1:
                 new_page = self.page + 1
+                if not message_page_loaded(self.messages, new_page):
+                    await interaction.response.defer()
+                    await load_message_page(self.messages, new_page)
                 view = TicketMessagesView(self.messages, self.ticket_data, new_page)
                 embed = await self.create_messages_embed(self.messages, new_page)
                 
-                await interaction.response.edit_message(embed=embed, view=view)
+                if interaction.response.is_done():
+                    await interaction.edit_original_response(embed=embed, view=view)
+                else:
+                    await interaction.response.edit_message(embed=embed, view=view)
             else:
                 await interaction.response.send_message("❌ Vous êtes déjà à la dernière page.", ephemeral=True)
         except Exception as e:
@@ -1771,7 +1871,7 @@ async def setup(bot):
     # Initialiser le stockage cloud (optionnel)
     try:
         if await ticket_cog.cloud_storage.initialize():
-            logger.info("✅ Stockage cloud Google Drive initialisé avec succès")
+            logger.info(f"✅ Stockage des transcripts ({ticket_cog.cloud_storage.backend_name}) initialisé avec succès")
             ticket_cog.cloud_enabled = True
         else:
             logger.warning("⚠️ Échec de l'initialisation du stockage cloud - Mode local activé")
@@ -2,12 +2,18 @@ import discord
 from discord.ext import commands
 from discord import app_commands, Embed
 from i18n import _
+from burst import BurstCoalescer, format_burst_lines
 from .command_logger import log_command_usage
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        self.bursts = BurstCoalescer(self.send_burst_welcome)  # Coalesces join floods into one message
+        self.burst_configs = {}  # guild_id -> welcome config reused while a join burst is active
+
+    async def cog_unload(self):
+        await self.bursts.close()
 
     async def get_welcome_config(self, guild_id):
         """Get welcome configuration for a guild"""
@@ -91,13 +97,61 @@ class Welcome(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member):
         guild_id = member.guild.id
-        config = await self.get_welcome_config(guild_id)
+        coalesced = self.bursts.observe(guild_id, 'join', member.mention)
+        
+        # During a join flood, reuse the config instead of querying it for every member
+        config = self.burst_configs.get(guild_id) if coalesced else None
+        if config is None:
+            config = await self.get_welcome_config(guild_id)
+            if coalesced:
+                self.burst_configs[guild_id] = config
+            else:
+                self.burst_configs.pop(guild_id, None)
         
         # Handle auto-role assignment first
         await self.handle_auto_roles(member, config)
         
-        # Then handle welcome message
-        await self.send_welcome_message(member, config)
+        # Then handle welcome message (coalesced members get the burst summary)
+        if not coalesced:
+            await self.send_welcome_message(member, config)
+
+    async def send_burst_welcome(self, guild_id, kind, mentions, count, duration):
+        """Send a single welcome message for a flood of new members"""
+        config = self.burst_configs.get(guild_id)
+        if config is None:
+            config = await self.get_welcome_config(guild_id)
+        
+        channel_id = config.get("welcome_channel")
+        guild = self.bot.get_guild(guild_id)
+        if not channel_id or not guild:
+            return
+        
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return
+        
+        description = _("welcome_system.burst_welcome_message", 0, guild_id,
+                        count=count, serverName=guild.name, memberCount=guild.member_count)
+        mention_lines = format_burst_lines(
+            mentions, count, lambda more: _("welcome_system.burst_and_more", 0, guild_id, count=more),
+            limit=3500
+        )
+        
+        embed_color = config.get("embed_color")
+        try:
+            color = int(embed_color.lstrip('#'), 16) if embed_color else 0xFFD700
+        except Exception:
+            color = 0xFFD700
+        embed = Embed(
+            title=_("welcome_system.burst_welcome_title", 0, guild_id),
+            description=f"{description}\n\n{mention_lines}",
+            color=color
+        )
+        
+        try:
+            await channel.send(embed=embed)
+        except Exception as e:
+            pass  # Silently handle send errors
 
     async def handle_auto_roles(self, member, config):
         """Handle automatic role assignment for new members"""
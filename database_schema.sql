@@ -81,7 +81,8 @@ CREATE TABLE IF NOT EXISTS xp_data (
     INDEX idx_user_id (user_id),
     INDEX idx_guild_id (guild_id),
     INDEX idx_xp (xp),
-    INDEX idx_level (level)
+    INDEX idx_level (level),
+    INDEX idx_guild_xp_level (guild_id, xp, level, user_id)
 );
 
 -- XP System configuration table
@@ -194,7 +195,15 @@ CREATE TABLE IF NOT EXISTS xp_history (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_guild_user (guild_id, user_id),
     INDEX idx_timestamp (timestamp),
-    INDEX idx_source (source)
+    INDEX idx_source (source),
+    INDEX idx_guild_time (guild_id, timestamp)
+);
+
+-- Guilds the bot is in, published by the bot for the dashboard's access checks
+CREATE TABLE IF NOT EXISTS bot_guilds (
+    guild_id BIGINT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- ============================================================================
@@ -230,6 +239,29 @@ CREATE TABLE IF NOT EXISTS disboard_reminders (
     INDEX idx_guild_reminder_time (guild_id, reminder_time)
 );
 
+-- Bump counters per guild, bumper and day (leaderboards and bump statistics)
+CREATE TABLE IF NOT EXISTS disboard_bump_counters (
+    guild_id BIGINT NOT NULL,
+    bumper_id BIGINT NOT NULL,
+    bump_day DATE NOT NULL,
+    bumper_name VARCHAR(255) NOT NULL,
+    bumps INT NOT NULL DEFAULT 0,
+    first_bump_at DATETIME NOT NULL,
+    last_bump_at DATETIME NOT NULL,
+    PRIMARY KEY (guild_id, bumper_id, bump_day),
+    INDEX idx_guild_day (guild_id, bump_day)
+);
+
+-- Latest bump state per guild (drives the reminder deadlines)
+CREATE TABLE IF NOT EXISTS disboard_state (
+    guild_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    last_bump_at DATETIME NOT NULL,
+    last_bumper_id BIGINT NULL,
+    last_reminder_at DATETIME NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
 -- Table for server-specific Disboard configuration
 CREATE TABLE IF NOT EXISTS disboard_config (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -220,6 +220,32 @@ class Database:
         
         return None
     
+    async def execute_many(self, query, params_list):
+        """Execute the same statement for many parameter sets (multi-row INSERT when possible)"""
+        if not params_list:
+            return 0
+        if not self.pool:
+            await self.connect()
+
+        for attempt in range(self.max_retries):
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        await cur.executemany(query, params_list)
+                        logger.debug(f"{cur.rowcount} row(s) affected")
+                        return cur.rowcount
+            except aiomysql.Error as e:
+                print(f"❌ Database error (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    raise
+            except Exception as e:
+                print(f"❌ Unexpected error: {e}")
+                raise
+
+        return None
+
     async def execute_and_get_id(self, query, params=None):
         """Execute INSERT query and return the auto-increment ID"""
         if not self.pool:
@@ -415,6 +441,14 @@ class Database:
             )
             """,
             """
+            CREATE TABLE IF NOT EXISTS role_menu_deployments (
+                menu_id INT PRIMARY KEY,
+                content_hash CHAR(64) NOT NULL,
+                deployed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (menu_id) REFERENCES role_menus(id) ON DELETE CASCADE
+            )
+            """,
+            """
             CREATE TABLE IF NOT EXISTS user_languages (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 user_id BIGINT NOT NULL UNIQUE,
@@ -643,15 +677,22 @@ class Database:
                 guild_id BIGINT NOT NULL,
                 user_id BIGINT NOT NULL,
                 moderator_id BIGINT NOT NULL,
-                action_type ENUM('warn', 'ban', 'kick', 'timeout', 'unban') NOT NULL,
+                action_type ENUM('warn', 'timeout', 'kick', 'ban', 'unban', 'unmute') NOT NULL,
                 reason TEXT,
-                duration INT DEFAULT NULL,
+                duration_minutes INT NULL,
+                evidence_urls TEXT NULL,
+                channel_id BIGINT NULL,
+                message_id BIGINT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NULL,
+                is_active BOOLEAN DEFAULT TRUE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_guild_id (guild_id),
-                INDEX idx_user_id (user_id),
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_guild_timestamp (guild_id, timestamp, id),
+                INDEX idx_guild_user_timestamp (guild_id, user_id, timestamp, id),
+                INDEX idx_guild_action_timestamp (guild_id, action_type, timestamp, id),
                 INDEX idx_moderator_id (moderator_id),
-                INDEX idx_action_type (action_type),
-                INDEX idx_created_at (created_at)
+                INDEX idx_expires_at (expires_at)
             )
             """,
             """
@@ -725,12 +766,14 @@ class Database:
                     with open(migration_file, 'r', encoding='utf-8') as f:
                         sql = f.read()
                     
+                    # Drop comment-only lines so a header comment doesn't swallow the statement that follows it
+                    sql = '\n'.join(line for line in sql.splitlines() if not line.strip().startswith('--'))
+                    
                     # Split by semicolons and execute each statement
                     statements = [s.strip() for s in sql.split(';') if s.strip()]
                     
                     for statement in statements:
-                        if statement and not statement.startswith('--'):
-                            await self.execute(statement)
+                        await self.execute(statement)
                     
                     # Mark migration as executed
                     await self.execute(
@@ -0,0 +1,281 @@
+"""
+Client REST Discord partagé du dashboard
+Un seul httpx.AsyncClient longue durée (connexions keep-alive, HTTP/2 si le
+paquet h2 est installé) sert tous les appels à l'API Discord. Chaque requête
+passe par le bucket de sa route et de son paramètre majeur (salon, serveur,
+webhook) : les en-têtes X-RateLimit-* tiennent à jour les requêtes restantes et
+la fin de la fenêtre, les requêtes suivantes attendent leur tour au lieu de
+recevoir un 429, et un 429 reçu malgré tout est retenté après le délai indiqué.
+Une limite globale par jeton suspend toutes les requêtes de ce jeton.
+
+Faux Discord local (voir fake_discord.py) pour développer et tester hors ligne.
+Activation : DISCORD_API_FAKE_FILE=/chemin/vers/donnees.json
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from log_queue import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DISCORD_API_BASE = 'https://discord.com/api/v10'
+MAX_RETRIES = 3
+GLOBAL_RATE = 50  # Requêtes par seconde et par jeton (limite globale de Discord)
+MAX_TRACKED_BUCKETS = 2048
+
+_API_PREFIX = re.compile(r'^/api(?:/v\d+)?')
+_MAJOR_PARAMETER = re.compile(r'^/(channels|guilds|webhooks)/(\d+)')
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def route_key(method: str, url: str) -> Tuple[str, str]:
+    """Route et paramètre majeur d'une requête
+
+    GET /api/v10/guilds/123/members/456 -> ('GET /guilds/{id}/members/{id}', '123')
+    """
+    path = _API_PREFIX.sub('', httpx.URL(url).path)
+    major = _MAJOR_PARAMETER.match(path)
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path)}", major.group(2) if major else ''
+
+
+def retry_after(response: httpx.Response) -> Tuple[float, bool]:
+    """Délai d'attente et portée (globale ou non) d'une réponse 429"""
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    delay = body.get('retry_after') or response.headers.get('Retry-After') or 1.0
+    is_global = bool(body.get('global')) or response.headers.get('X-RateLimit-Global') == 'true'
+    return float(delay), is_global
+
+
+class RouteBucket:
+    """Fenêtre de rate limit d'un bucket Discord, d'après les en-têtes de ses réponses"""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None  # Inconnu tant qu'aucune réponse n'est arrivée
+        self.reset_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Réserve une requête dans la fenêtre courante ; renvoie le temps attendu
+
+        Le verrou est tenu pendant l'attente : les requêtes en file partent dans l'ordre.
+        """
+        async with self.lock:
+            waited = 0.0
+            now = time.monotonic()
+            if self.remaining is not None and self.remaining <= 0 and now < self.reset_at:
+                waited = self.reset_at - now
+                await asyncio.sleep(waited)
+            if time.monotonic() >= self.reset_at:
+                self.remaining = self.limit  # Nouvelle fenêtre
+            if self.remaining is not None:
+                self.remaining -= 1
+            return waited
+
+    def update(self, headers: httpx.Headers) -> None:
+        if 'X-RateLimit-Remaining' not in headers or 'X-RateLimit-Reset-After' not in headers:
+            return
+        remaining = int(headers['X-RateLimit-Remaining'])
+        reset_at = time.monotonic() + float(headers['X-RateLimit-Reset-After'])
+        if 'X-RateLimit-Limit' in headers:
+            self.limit = int(headers['X-RateLimit-Limit'])
+        if self.remaining is None or reset_at > self.reset_at + 0.5:
+            self.remaining = remaining  # Première réponse de cette fenêtre
+        else:
+            # Réponses arrivées dans le désordre : garder le décompte le plus bas
+            self.remaining = min(self.remaining, remaining)
+        self.reset_at = reset_at
+
+    def block(self, delay: float) -> None:
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + delay)
+
+    def idle(self, now: float) -> bool:
+        return now >= self.reset_at and not self.lock.locked()
+
+
+class _Methods:
+    """Raccourcis get/post/put/patch/delete au-dessus de request()"""
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        raise NotImplementedError
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('PUT', url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('PATCH', url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('DELETE', url, **kwargs)
+
+
+class DiscordSession(_Methods):
+    """Vue du client partagé avec un délai par défaut ; quitter la session ne ferme rien"""
+
+    def __init__(self, client: 'DiscordRESTClient', timeout: Optional[float]):
+        self.client = client
+        self.timeout = timeout
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+        return await self.client.request(method, url, **kwargs)
+
+
+class DiscordRESTClient(_Methods):
+    """Client HTTP unique du processus, avec suivi des buckets de rate limit Discord
+
+    Accepte les URL complètes (https://discord.com/api/...) comme les chemins
+    relatifs à DISCORD_API_BASE. Les buckets sont propres à chaque jeton
+    (en-tête Authorization) : les limites des jetons OAuth des utilisateurs
+    sont indépendantes de celles du bot.
+    """
+
+    def __init__(self, base_url: str = DISCORD_API_BASE, timeout: float = 10.0,
+                 max_connections: Optional[int] = None, max_retries: int = MAX_RETRIES,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        max_connections = max_connections or int(os.getenv('DISCORD_HTTP_MAX_CONNECTIONS', '20'))
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            http2=HTTP2_AVAILABLE and transport is None,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections, keepalive_expiry=60),
+            transport=transport
+        )
+        self.max_retries = max_retries
+        self.buckets: Dict[Tuple[str, str, str], RouteBucket] = {}
+        self.bucket_hashes: Dict[str, str] = {}  # Route -> X-RateLimit-Bucket
+        self.global_buckets: Dict[str, RateLimitBucket] = {}
+        self.stats: Dict[str, Any] = {'requests': 0, 'rate_limited': 0, 'retries': 0, 'waited_seconds': 0.0}
+
+    def session(self, timeout: Optional[float] = None):
+        """Contexte `async with` utilisable à la place d'un httpx.AsyncClient éphémère"""
+        return _session(self, timeout)
+
+    def _bucket(self, auth: str, route: str, major: str) -> RouteBucket:
+        key = (auth, self.bucket_hashes.get(route, route), major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= MAX_TRACKED_BUCKETS:
+                self._prune()
+            bucket = self.buckets[key] = RouteBucket()
+        return bucket
+
+    def _global_bucket(self, auth: str) -> RateLimitBucket:
+        bucket = self.global_buckets.get(auth)
+        if bucket is None:
+            if len(self.global_buckets) >= MAX_TRACKED_BUCKETS:
+                for key in [key for key, b in self.global_buckets.items() if b.delay() == 0]:
+                    del self.global_buckets[key]
+            bucket = self.global_buckets[auth] = RateLimitBucket(capacity=GLOBAL_RATE, per=1.0)
+        return bucket
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, bucket in self.buckets.items() if bucket.idle(now)]:
+            del self.buckets[key]
+
+    def _learn_bucket(self, auth: str, route: str, major: str, bucket: RouteBucket,
+                      response: httpx.Response) -> RouteBucket:
+        """Rattache la route au bucket partagé annoncé par Discord (X-RateLimit-Bucket)"""
+        bucket_hash = response.headers.get('X-RateLimit-Bucket')
+        if bucket_hash and self.bucket_hashes.get(route) != bucket_hash:
+            self.bucket_hashes[route] = bucket_hash
+            bucket = self.buckets.setdefault((auth, bucket_hash, major), bucket)
+        bucket.update(response.headers)
+        return bucket
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Requête HTTP ; après `max_retries` 429 consécutifs, le dernier 429 est renvoyé"""
+        headers = kwargs.get('headers') or {}
+        auth = headers.get('Authorization', '')
+        route, major = route_key(method, url)
+        attempt = 0
+        while True:
+            global_bucket = self._global_bucket(auth)
+            delay = global_bucket.delay()
+            while delay > 0:
+                self.stats['waited_seconds'] += delay
+                await asyncio.sleep(delay)
+                delay = global_bucket.delay()
+            global_bucket.consume()
+
+            bucket = self._bucket(auth, route, major)
+            self.stats['waited_seconds'] += await bucket.acquire()
+            self.stats['requests'] += 1
+            response = await self.http.request(method, url, **kwargs)
+            bucket = self._learn_bucket(auth, route, major, bucket, response)
+
+            if response.status_code != 429:
+                return response
+            self.stats['rate_limited'] += 1
+            delay, is_global = retry_after(response)
+            if is_global:
+                global_bucket.block(delay)
+            else:
+                bucket.block(delay)
+            if attempt >= self.max_retries:
+                logger.warning(f"429 persistant sur {route} après {attempt} nouvelle(s) tentative(s)")
+                return response
+            attempt += 1
+            self.stats['retries'] += 1
+            logger.info(f"429 sur {route} ({'global' if is_global else 'route'}), nouvelle tentative dans {delay:.2f}s")
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+@asynccontextmanager
+async def _session(client: DiscordRESTClient, timeout: Optional[float]) -> AsyncIterator[DiscordSession]:
+    yield DiscordSession(client, timeout)
+
+
+_client: Optional[DiscordRESTClient] = None
+
+
+def get_client() -> DiscordRESTClient:
+    """Client partagé du processus, créé au premier appel"""
+    global _client
+    if _client is None:
+        transport = None
+        fake_file = os.getenv('DISCORD_API_FAKE_FILE')
+        if fake_file:
+            from fake_discord import FakeDiscordAPI
+            transport = FakeDiscordAPI.from_file(fake_file)
+            logger.info(f"Faux Discord local utilisé: {fake_file}")
+        _client = DiscordRESTClient(transport=transport)
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
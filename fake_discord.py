@@ -0,0 +1,213 @@
+"""
+Faux service API Discord local
+Transport httpx qui reproduit le sous-ensemble de l'API REST Discord utilisé
+par le dashboard (utilisateur courant et ses serveurs, serveurs, salons, rôles,
+membres, messages, sanctions, OAuth) à partir d'un fichier JSON, avec des
+en-têtes X-RateLimit-* et des 429 réalistes, pour développer et tester hors
+ligne le client REST partagé (discord_rest.py).
+
+Activation : DISCORD_API_FAKE_FILE=/chemin/vers/donnees.json
+
+Format des données :
+    {"bot": {"id": "1", "username": "Maybee"},
+     "users": {"<jeton OAuth>": {"id": "2", "username": "admin", "guilds": ["10"]}},
+     "guilds": [{"id": "10", "name": "Serveur", "channels": [...], "roles": [...], "members": [...]}]}
+"""
+
+import re
+import json
+import time
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from discord_rest import route_key
+
+_API_PREFIX = re.compile(r'^/api(?:/v\d+)?')
+
+
+class FakeDiscordAPI(httpx.AsyncBaseTransport):
+    """Faux Discord en mémoire branché comme transport d'un httpx.AsyncClient
+
+    Chaque bucket (route, paramètre majeur, jeton) accepte `rate_limit` requêtes
+    par fenêtre de `reset_after` secondes ; au-delà, 429 avec retry_after.
+    `force_429(n)` fait échouer les n prochaines requêtes (global=True pour un
+    429 global). Les requêtes reçues sont conservées dans `requests`.
+    `shared_buckets` associe des routes ('GET /guilds/{id}/roles') à un même
+    bucket, annoncé dans X-RateLimit-Bucket comme le fait Discord.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, rate_limit: int = 5,
+                 reset_after: float = 1.0, latency: float = 0.0,
+                 shared_buckets: Optional[Dict[str, str]] = None):
+        data = data or {}
+        self.bot = data.get('bot', {'id': '1', 'username': 'Maybee', 'bot': True})
+        self.users: Dict[str, Dict[str, Any]] = data.get('users', {})
+        self.guilds: Dict[str, Dict[str, Any]] = {
+            str(guild['id']): {
+                'channels': [], 'roles': [], 'members': [], 'bans': {}, **guild
+            } for guild in data.get('guilds', [])
+        }
+        self.messages: Dict[str, List[Dict[str, Any]]] = {}
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.latency = latency
+        self.shared_buckets = shared_buckets or {}
+        self.windows: Dict[Tuple[str, str, str], Tuple[float, int]] = {}
+        self.forced: List[bool] = []
+        self.requests: List[Tuple[str, str]] = []
+        self.ids = itertools.count(900000000000000000)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'FakeDiscordAPI':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def force_429(self, count: int = 1, is_global: bool = False) -> None:
+        self.forced.extend([is_global] * count)
+
+    def count(self, method: str, path: str) -> int:
+        """Nombre de requêtes reçues pour une méthode et un chemin (sans préfixe /api/vN)"""
+        return sum(1 for m, p in self.requests if m == method and p == path)
+
+    # Transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        method = request.method
+        path = _API_PREFIX.sub('', request.url.path)
+        self.requests.append((method, path))
+        auth = request.headers.get('Authorization', '')
+
+        if self.forced:
+            is_global = self.forced.pop(0)
+            return self._json(429, {'message': 'You are being rate limited.', 'retry_after': self.reset_after,
+                                    'global': is_global},
+                              {'X-RateLimit-Global': 'true'} if is_global else {})
+
+        route, major = route_key(method, path)
+        route = self.shared_buckets.get(route, route)
+        key = (auth, route, major)
+        now = time.monotonic()
+        reset_at, used = self.windows.get(key, (0.0, 0))
+        if now >= reset_at:
+            reset_at, used = now + self.reset_after, 0
+        if used >= self.rate_limit:
+            return self._json(429, {'message': 'You are being rate limited.', 'retry_after': round(reset_at - now, 3),
+                                    'global': False}, self._limit_headers(route, 0, reset_at - now))
+        self.windows[key] = (reset_at, used + 1)
+        headers = self._limit_headers(route, self.rate_limit - used - 1, reset_at - now)
+
+        if not auth and path != '/oauth2/token':
+            return self._json(401, {'message': '401: Unauthorized', 'code': 0}, headers)
+        try:
+            status, body = self.dispatch(method, path, request, auth)
+        except (KeyError, StopIteration):
+            status, body = 404, {'message': 'Unknown resource', 'code': 10003}
+        return self._json(status, body, headers)
+
+    def _limit_headers(self, route: str, remaining: int, reset_after: float) -> Dict[str, str]:
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(max(remaining, 0)),
+            'X-RateLimit-Reset-After': f"{max(reset_after, 0):.3f}",
+            'X-RateLimit-Bucket': format(abs(hash(route)), 'x'),
+        }
+
+    @staticmethod
+    def _json(status: int, body: Any, headers: Dict[str, str]) -> httpx.Response:
+        if status == 204:
+            return httpx.Response(204, headers=headers)
+        return httpx.Response(status, json=body, headers=headers)
+
+    # Routes
+
+    def _user(self, auth: str) -> Dict[str, Any]:
+        if auth.startswith('Bot '):
+            return self.bot
+        return self.users[auth.split(' ', 1)[-1]]
+
+    def _guild_summary(self, guild: Dict[str, Any], auth: str) -> Dict[str, Any]:
+        return {'id': guild['id'], 'name': guild['name'], 'icon': guild.get('icon'),
+                'owner': False, 'permissions': '8' if not auth.startswith('Bot ') else '0'}
+
+    def dispatch(self, method: str, path: str, request: httpx.Request, auth: str) -> Tuple[int, Any]:
+        parts = path.strip('/').split('/')
+        body = json.loads(request.content) if request.content and request.headers.get(
+            'Content-Type', '').startswith('application/json') else {}
+
+        if parts == ['oauth2', 'token']:
+            return 200, {'access_token': next(iter(self.users), 'token'), 'token_type': 'Bearer',
+                         'expires_in': 604800, 'scope': 'identify guilds'}
+        if parts[0] == 'users':
+            if parts == ['users', '@me']:
+                return 200, {key: value for key, value in self._user(auth).items() if key != 'guilds'}
+            if parts == ['users', '@me', 'guilds']:
+                if auth.startswith('Bot '):
+                    guilds = list(self.guilds.values())
+                else:
+                    guilds = [self.guilds[guild_id] for guild_id in self._user(auth).get('guilds', [])]
+                limit = int(request.url.params.get('limit', 200))
+                after = int(request.url.params.get('after', 0))
+                guilds = sorted((g for g in guilds if int(g['id']) > after), key=lambda g: int(g['id']))
+                return 200, [self._guild_summary(guild, auth) for guild in guilds[:limit]]
+            if parts == ['users', '@me', 'channels']:
+                return 200, {'id': str(next(self.ids)), 'type': 1, 'recipients': [{'id': body.get('recipient_id')}]}
+            user = next((u for u in self.users.values() if u['id'] == parts[1]), None)
+            if user is None:
+                user = next(m['user'] for g in self.guilds.values() for m in g['members'] if m['user']['id'] == parts[1])
+            return 200, {key: value for key, value in user.items() if key != 'guilds'}
+
+        if parts[0] == 'channels':
+            channel_id = parts[1]
+            if method == 'POST' and parts[2:] == ['messages']:
+                message = {'id': str(next(self.ids)), 'channel_id': channel_id, **body}
+                self.messages.setdefault(channel_id, []).append(message)
+                return 200, message
+            if method == 'DELETE' and parts[2] == 'messages':
+                messages = self.messages.get(channel_id, [])
+                self.messages[channel_id] = [m for m in messages if m['id'] != parts[3]]
+                return 204, None
+            raise KeyError(path)
+
+        if parts[0] == 'guilds':
+            guild = self.guilds[parts[1]]
+            rest = parts[2:]
+            if not rest:
+                summary = {key: value for key, value in guild.items() if key not in ('channels', 'members', 'bans')}
+                return 200, {**summary, 'approximate_member_count': len(guild['members'])}
+            if rest == ['channels']:
+                if method == 'POST':
+                    channel = {'id': str(next(self.ids)), 'guild_id': guild['id'], **body}
+                    guild['channels'].append(channel)
+                    return 201, channel
+                return 200, guild['channels']
+            if rest == ['roles']:
+                if method == 'POST':
+                    role = {'id': str(next(self.ids)), 'position': len(guild['roles']), **body}
+                    guild['roles'].append(role)
+                    return 200, role
+                return 200, guild['roles']
+            if rest == ['members']:
+                limit = int(request.url.params.get('limit', 1))
+                after = int(request.url.params.get('after', 0))
+                members = sorted(guild['members'], key=lambda m: int(m['user']['id']))
+                return 200, [m for m in members if int(m['user']['id']) > after][:limit]
+            if rest[0] == 'members':
+                member = next(m for m in guild['members'] if m['user']['id'] == rest[1])
+                if method == 'GET':
+                    return 200, member
+                if method == 'PATCH':
+                    member.update(body)
+                    return 200, member
+                if method == 'DELETE':
+                    guild['members'].remove(member)
+                    return 204, None
+            if rest[0] == 'bans' and method == 'PUT':
+                guild['bans'][rest[1]] = body
+                guild['members'] = [m for m in guild['members'] if m['user']['id'] != rest[1]]
+                return 204, None
+        raise KeyError(path)
@@ -0,0 +1,164 @@
+"""
+Faux service Google Drive local
+Reproduit le sous-ensemble de l'API Drive v3 utilisé par GoogleDriveStorage
+(files().list/create/get_media/delete) en stockant les fichiers sur disque,
+pour développer et tester le stockage des tickets hors ligne.
+
+Activation : GOOGLE_DRIVE_FAKE_DIR=/chemin/vers/dossier
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+_CLAUSE_PATTERNS = [
+    (re.compile(r"^'([^']+)' in parents$"), lambda f, v: v in f.get('parents', [])),
+    (re.compile(r"^name contains '([^']*)'$"), lambda f, v: v in f['name']),
+    (re.compile(r"^name\s*=\s*'([^']*)'$"), lambda f, v: f['name'] == v),
+    (re.compile(r"^mimeType\s*=\s*'([^']*)'$"), lambda f, v: f['mimeType'] == v),
+    (re.compile(r"^createdTime\s*<\s*'([^']*)'$"), lambda f, v: f['createdTime'] < v),
+    (re.compile(r"^createdTime\s*>\s*'([^']*)'$"), lambda f, v: f['createdTime'] > v),
+]
+
+
+class FakeDriveError(Exception):
+    """Erreur renvoyée par le faux service (message au format HttpError de Drive)"""
+
+
+class FakeRequest:
+    """Équivalent d'un HttpRequest googleapiclient : exécuté via execute()"""
+
+    def __init__(self, func: Callable[[], Any], latency: float = 0.0):
+        self.func = func
+        self.latency = latency
+
+    def execute(self, http=None, num_retries: int = 0):
+        if self.latency:
+            time.sleep(self.latency)  # Simule un appel réseau bloquant
+        return self.func()
+
+
+class FakeFiles:
+    def __init__(self, service: 'FakeDriveService'):
+        self.service = service
+
+    def list(self, q: str = "", fields: str = "", orderBy: str = "", pageSize: int = 100,
+             pageToken: Optional[str] = None, **kwargs) -> FakeRequest:
+        return self.service.request(lambda: self.service.list_files(q, orderBy, pageSize, pageToken))
+
+    def create(self, body: Dict, media_body=None, fields: str = "", **kwargs) -> FakeRequest:
+        return self.service.request(lambda: self.service.create_file(body, media_body))
+
+    def get_media(self, fileId: str, **kwargs) -> FakeRequest:
+        return self.service.request(lambda: self.service.read_file(fileId))
+
+    def delete(self, fileId: str, **kwargs) -> FakeRequest:
+        return self.service.request(lambda: self.service.delete_file(fileId))
+
+
+class FakeDriveService:
+    """Faux service Drive v3 persistant dans un dossier local"""
+
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = root
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(root, 'index.json')
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        self.files_index: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.files_index = json.load(f)
+
+    def files(self) -> FakeFiles:
+        return FakeFiles(self)
+
+    def request(self, func: Callable[[], Any]) -> FakeRequest:
+        return FakeRequest(func, self.latency)
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files_index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, file_id: str) -> str:
+        return os.path.join(self.root, 'blobs', file_id)
+
+    def list_files(self, q: str, order_by: str, page_size: int, page_token: Optional[str]) -> Dict:
+        clauses = [c.strip() for c in q.split(' and ')] if q else []
+        matchers = []
+        for clause in clauses:
+            for pattern, predicate in _CLAUSE_PATTERNS:
+                match = pattern.match(clause)
+                if match:
+                    matchers.append((predicate, match.group(1)))
+                    break
+            else:
+                raise FakeDriveError(f"Invalid Value: unsupported query clause {clause!r}")
+
+        with self.lock:
+            files = [dict(f) for f in self.files_index.values()
+                     if all(predicate(f, value) for predicate, value in matchers)]
+
+        if order_by.startswith('createdTime'):
+            files.sort(key=lambda f: f['createdTime'], reverse=order_by.endswith('desc'))
+
+        start = int(page_token or 0)
+        page = files[start:start + page_size]
+        result: Dict[str, Any] = {'files': page}
+        if start + page_size < len(files):
+            result['nextPageToken'] = str(start + page_size)
+        return result
+
+    def create_file(self, body: Dict, media_body=None) -> Dict:
+        file_id = uuid.uuid4().hex
+        data = b''
+        if media_body is not None:
+            stream = media_body.stream() if hasattr(media_body, 'stream') else media_body
+            stream.seek(0)
+            data = stream.read()
+        with open(self._blob_path(file_id), 'wb') as f:
+            f.write(data)
+
+        entry = {
+            'id': file_id,
+            'name': body.get('name', file_id),
+            'mimeType': body.get('mimeType') or (
+                media_body.mimetype() if hasattr(media_body, 'mimetype') else 'application/octet-stream'
+            ),
+            'parents': body.get('parents', []),
+            'createdTime': body.get('createdTime') or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'size': str(len(data))
+        }
+        with self.lock:
+            self.files_index[file_id] = entry
+            self._save_index()
+        return dict(entry)
+
+    def read_file(self, file_id: str) -> bytes:
+        if file_id not in self.files_index:
+            raise FakeDriveError(f"<HttpError 404 \"File not found: {file_id}.\" notFound>")
+        with open(self._blob_path(file_id), 'rb') as f:
+            return f.read()
+
+    def delete_file(self, file_id: str) -> str:
+        with self.lock:
+            if self.files_index.pop(file_id, None) is None:
+                raise FakeDriveError(f"<HttpError 404 \"File not found: {file_id}.\" notFound>")
+            self._save_index()
+        try:
+            os.remove(self._blob_path(file_id))
+        except FileNotFoundError:
+            pass
+        return ''
+
+    def list_names(self) -> List[str]:
+        return sorted(f['name'] for f in self.files_index.values())
@@ -0,0 +1,268 @@
+"""
+Serveurs du bot et serveurs des utilisateurs pour le contrôle d'accès du dashboard
+Le bot publie la liste de ses serveurs dans la table `bot_guilds` (synchronisation
+complète à la connexion, puis ajout / retrait à chaque arrivée ou départ). Le
+dashboard garde cet ensemble en mémoire et le relit en tâche de fond ; sans
+table publiée, il le reconstruit depuis l'API Discord (pagination complète).
+Les serveurs de chaque utilisateur (avec ses permissions) sont conservés,
+jusqu'à l'expiration de sa session, dans un cache LRU borné : vérifier un accès
+ou une permission devient une recherche en mémoire, sans appel Discord dans la
+plupart des cas.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+KICK_MEMBERS = 0x2
+BAN_MEMBERS = 0x4
+ADMINISTRATOR = 0x8
+MODERATE_MEMBERS = 1 << 40
+GUILDS_PAGE_SIZE = 200
+
+
+class BotGuildPublisher:
+    """Côté bot : tient la table bot_guilds à jour"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def attach(self, bot) -> None:
+        """Branche les écouteurs de connexion et d'arrivée / départ de serveur sur le bot"""
+        self.bot = bot
+        bot.add_listener(self.on_ready, 'on_ready')
+        bot.add_listener(self.on_guild_join, 'on_guild_join')
+        bot.add_listener(self.on_guild_remove, 'on_guild_remove')
+
+    async def sync(self, guilds: Iterable[discord.Guild]) -> None:
+        rows = [(guild.id, guild.name[:100]) for guild in guilds]
+        if rows:
+            await self.db.execute_many(
+                """INSERT INTO bot_guilds (guild_id, name) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE name = VALUES(name)""",
+                rows
+            )
+            await self.db.execute(
+                f"DELETE FROM bot_guilds WHERE guild_id NOT IN ({', '.join(['%s'] * len(rows))})",
+                [guild_id for guild_id, _ in rows]
+            )
+        else:
+            await self.db.execute("DELETE FROM bot_guilds")
+        logger.info(f"Serveurs du bot publiés ({len(rows)})")
+
+    async def on_ready(self):
+        try:
+            await self.sync(self.bot.guilds)
+        except Exception as e:
+            logger.error(f"Erreur lors de la publication des serveurs du bot: {e}")
+
+    async def on_guild_join(self, guild: discord.Guild):
+        try:
+            await self.db.execute(
+                """INSERT INTO bot_guilds (guild_id, name) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE name = VALUES(name)""",
+                (guild.id, guild.name[:100])
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ajout du serveur {guild.id} à bot_guilds: {e}")
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        try:
+            await self.db.execute("DELETE FROM bot_guilds WHERE guild_id = %s", (guild.id,))
+        except Exception as e:
+            logger.error(f"Erreur lors du retrait du serveur {guild.id} de bot_guilds: {e}")
+
+
+class BotGuildSet:
+    """Côté dashboard : ensemble des serveurs du bot, relu périodiquement
+
+    Sources, dans l'ordre : table bot_guilds (publiée par le bot), API Discord
+    avec le jeton du bot, puis, seulement si l'ensemble est encore vide, les
+    serveurs présents dans xp_data. En cas d'échec, l'ensemble précédent est conservé.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], bot_token: Optional[str],
+                 get_db: Callable[[], Any], refresh_interval: Optional[float] = None):
+        self.get_client = get_client
+        self.bot_token = bot_token
+        self.get_db = get_db
+        self.refresh_interval = refresh_interval or float(os.getenv('BOT_GUILDS_REFRESH_SECONDS', '60'))
+        self.miss_refresh_interval = 15.0  # Relecture anticipée au plus tous les 15 s sur un serveur inconnu
+        self.guilds: Set[str] = set()
+        self.source: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.guilds)
+
+    async def start(self) -> None:
+        if not self.task:
+            await self.refresh()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'actualisation des serveurs du bot: {e}")
+
+    async def refresh(self) -> Set[str]:
+        """Relit l'ensemble (les appels simultanés partagent la même relecture)"""
+        started = time.monotonic()
+        async with self.lock:
+            if self.refreshed_at >= started:
+                return self.guilds  # Relu pendant l'attente du verrou
+            for source, load in (('database', self._from_table), ('discord', self._from_discord)):
+                try:
+                    guilds = await load()
+                except Exception as e:
+                    logger.warning(f"Serveurs du bot indisponibles depuis {source}: {e}")
+                    continue
+                if guilds:
+                    self.guilds, self.source = guilds, source
+                    break
+            else:
+                if not self.guilds:
+                    try:
+                        self.guilds, self.source = await self._from_xp_data(), 'xp_data'
+                    except Exception as e:
+                        logger.error(f"Aucune source pour les serveurs du bot: {e}")
+            self.refreshed_at = time.monotonic()
+            return self.guilds
+
+    async def _from_table(self) -> Set[str]:
+        db = self.get_db()
+        if db is None:
+            return set()
+        rows = await db.query("SELECT guild_id FROM bot_guilds", fetchall=True)
+        return {str(row['guild_id']) for row in rows or []}
+
+    async def _from_discord(self) -> Set[str]:
+        if not self.bot_token:
+            return set()
+        guilds: Set[str] = set()
+        after = '0'
+        while True:
+            response = await self.get_client().get(
+                '/users/@me/guilds',
+                params={'limit': GUILDS_PAGE_SIZE, 'after': after},
+                headers={'Authorization': f'Bot {self.bot_token}'}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            page = response.json()
+            guilds.update(str(guild['id']) for guild in page)
+            if len(page) < GUILDS_PAGE_SIZE:
+                return guilds
+            after = page[-1]['id']
+
+    async def _from_xp_data(self) -> Set[str]:
+        db = self.get_db()
+        rows = await db.query("SELECT DISTINCT guild_id FROM xp_data", fetchall=True) if db else []
+        return {str(row['guild_id']) for row in rows or []}
+
+    async def contains(self, guild_id: str) -> bool:
+        """Le bot est-il sur ce serveur ? Un serveur inconnu déclenche une relecture anticipée"""
+        guild_id = str(guild_id)
+        if guild_id in self.guilds:
+            return True
+        if time.monotonic() - self.refreshed_at >= self.miss_refresh_interval:
+            await self.refresh()
+        return guild_id in self.guilds
+
+    async def snapshot(self) -> Set[str]:
+        if not self.refreshed_at:
+            await self.refresh()
+        return set(self.guilds)
+
+
+class UserGuildCache:
+    """Serveurs de chaque utilisateur (/users/@me/guilds), par jeton OAuth, jusqu'à son expiration
+
+    LRU borné ; les jetons sont conservés sous forme de hachage. Les demandes
+    simultanées pour un même jeton partagent un seul appel Discord.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, default_ttl: float = 300.0):
+        self.max_size = max_size or int(os.getenv('USER_GUILDS_CACHE_SIZE', '1024'))
+        self.default_ttl = default_ttl
+        self.entries: 'OrderedDict[str, Tuple[float, List[Dict]]]' = OrderedDict()
+        self.pending: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(access_token: str) -> str:
+        return hashlib.sha256(access_token.encode()).hexdigest()
+
+    def get(self, access_token: str) -> Optional[List[Dict]]:
+        key = self._key(access_token)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, access_token: str, guilds: List[Dict], expires_at: Optional[float] = None) -> None:
+        key = self._key(access_token)
+        self.entries[key] = (expires_at or time.time() + self.default_ttl, guilds)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, access_token: str) -> None:
+        self.entries.pop(self._key(access_token), None)
+
+    async def get_or_fetch(self, access_token: str, fetch: Callable[[str], Awaitable[List[Dict]]],
+                           expires_at: Optional[float] = None) -> List[Dict]:
+        """Liste en cache, ou `fetch(access_token)` mis en cache jusqu'à `expires_at` (epoch)"""
+        guilds = self.get(access_token)
+        if guilds is not None:
+            return guilds
+        key = self._key(access_token)
+        task = self.pending.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch(access_token))
+            self.pending[key] = task
+            task.add_done_callback(lambda done: self.pending.pop(key, None))
+        guilds = await asyncio.shield(task)
+        self.put(access_token, guilds, expires_at)
+        return guilds
+
+
+def admin_guilds(guilds: Iterable[Dict]) -> List[Dict]:
+    """Serveurs où la permission Administrateur est accordée"""
+    return [guild for guild in guilds if int(guild.get('permissions', 0)) & ADMINISTRATOR]
+
+
+def guild_permissions(guilds: Iterable[Dict], guild_id: str) -> int:
+    """Champ de bits des permissions de l'utilisateur sur un serveur (0 s'il n'en est pas membre)"""
+    guild = next((guild for guild in guilds if guild['id'] == str(guild_id)), None)
+    return int(guild.get('permissions', 0)) if guild else 0
+
+
+def has_permission(permissions: int, flag: int) -> bool:
+    """Permission accordée directement ou par Administrateur"""
+    return bool(permissions & (ADMINISTRATOR | flag))
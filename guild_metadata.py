@@ -0,0 +1,152 @@
+"""
+Cache des métadonnées de serveur du dashboard
+Salons, rôles et informations des serveurs lus via l'API REST Discord sont
+conservés quelques dizaines de secondes par serveur et partagés par tous les
+endpoints : l'ouverture du dashboard (données groupées, salons, catégories,
+rôles, infos du bot) et les changements d'onglet ne refont pas les mêmes
+appels. Les lectures simultanées d'une même ressource attendent un seul appel
+Discord, et les mutations faites par le dashboard invalident les entrées
+concernées.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation par type de ressource (secondes)
+DEFAULT_TTLS = {
+    'channels': 60.0,
+    'roles': 60.0,
+    'guild': 120.0,
+    'bot_member': 300.0,
+    'bot_user': 3600.0,
+}
+MAX_ENTRIES = 4096
+
+_PATHS = {
+    'channels': '/guilds/{guild_id}/channels',
+    'roles': '/guilds/{guild_id}/roles',
+    'guild': '/guilds/{guild_id}?with_counts=true',
+    'bot_member': '/guilds/{guild_id}/members/{bot_id}',
+    'bot_user': '/users/@me',
+}
+
+# Mêmes ressources servies par l'API IPC du bot (bot_ipc.py)
+_IPC_PATHS = {
+    'channels': '/guilds/{guild_id}/channels',
+    'roles': '/guilds/{guild_id}/roles',
+    'guild': '/guilds/{guild_id}',
+    'bot_member': '/guilds/{guild_id}/members/@me',
+    'bot_user': '/users/@me',
+}
+
+
+class DiscordAPIError(Exception):
+    """Réponse non 200 de Discord pour une ressource (jamais mise en cache)"""
+
+    def __init__(self, status_code: int, text: str = ''):
+        super().__init__(f"Discord API error {status_code}: {text[:200]}")
+        self.status_code = status_code
+        self.text = text
+
+
+class GuildMetadataCache:
+    """Ressources Discord par (serveur, type), avec durée de vie et coalescence des requêtes
+
+    `get_client` renvoie le client REST partagé (discord_rest.get_client) ;
+    `ipc`, si fourni (bot_ipc_client.BotIPCClient), est interrogé en premier.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], bot_token: Optional[str],
+                 ttls: Optional[Dict[str, float]] = None, ipc=None):
+        self.get_client = get_client
+        self.bot_token = bot_token
+        self.ipc = ipc
+        scale = float(os.getenv('GUILD_METADATA_TTL_SCALE', '1'))
+        self.ttls = {kind: ttl * scale for kind, ttl in (ttls or DEFAULT_TTLS).items()}
+        self.entries: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self.pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.invalidations: Dict[Tuple[str, str], int] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    async def get(self, guild_id: str, kind: str) -> Any:
+        """Ressource du serveur (JSON Discord) ; DiscordAPIError si Discord la refuse"""
+        key = (str(guild_id), kind)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats['hits'] += 1
+            return entry[1]
+
+        task = self.pending.get(key)
+        if task is None:
+            self.stats['misses'] += 1
+            # Tâche indépendante : l'annulation d'un demandeur n'interrompt pas les autres
+            task = asyncio.create_task(self._load(key))
+            self.pending[key] = task
+            task.add_done_callback(lambda done: self._loaded(key, done))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Tuple[str, str]) -> Any:
+        generation = self.invalidations.get(key, 0)
+        value = await self._fetch(*key)
+        # Invalidée pendant l'appel : la réponse est servie mais pas conservée
+        if self.invalidations.get(key, 0) == generation:
+            self._store(key, value)
+        return value
+
+    def _loaded(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        if self.pending.get(key) is task:
+            del self.pending[key]
+        if not task.cancelled():
+            task.exception()  # Erreur marquée comme lue même si tous les demandeurs sont partis
+
+    async def _fetch(self, guild_id: str, kind: str) -> Any:
+        if self.ipc is not None:
+            # Cache de la gateway du bot d'abord, API REST si le bot ne répond pas
+            value = await self.ipc.get(_IPC_PATHS[kind].format(guild_id=guild_id))
+            if value is not None:
+                return value
+        if not self.bot_token:
+            raise DiscordAPIError(500, "Bot token not configured")
+        bot_id = ''
+        if kind == 'bot_member':
+            bot_id = (await self.get('', 'bot_user'))['id']
+        path = _PATHS[kind].format(guild_id=guild_id, bot_id=bot_id)
+        response = await self.get_client().get(path, headers={"Authorization": f"Bot {self.bot_token}"})
+        if response.status_code != 200:
+            raise DiscordAPIError(response.status_code, response.text)
+        return response.json()
+
+    def _store(self, key: Tuple[str, str], value: Any) -> None:
+        now = time.monotonic()
+        if len(self.entries) >= MAX_ENTRIES:
+            for stale in [k for k, (expires_at, _) in self.entries.items() if expires_at <= now]:
+                del self.entries[stale]
+            if len(self.entries) >= MAX_ENTRIES:
+                self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (now + self.ttls.get(key[1], 60.0), value)
+
+    def invalidate(self, guild_id: str, *kinds: str) -> None:
+        """Oublie les ressources d'un serveur (toutes si aucun type n'est précisé)"""
+        guild_id = str(guild_id)
+        for kind in kinds or tuple(self.ttls):
+            key = (guild_id, kind)
+            self.entries.pop(key, None)
+            if self.pending.pop(key, None) is not None:
+                # Appel en cours : les demandes suivantes en lancent un nouveau
+                self.invalidations[key] = self.invalidations.get(key, 0) + 1
+
+    async def channels(self, guild_id: str):
+        return await self.get(guild_id, 'channels')
+
+    async def roles(self, guild_id: str):
+        return await self.get(guild_id, 'roles')
+
+    async def guild(self, guild_id: str):
+        return await self.get(guild_id, 'guild')
@@ -0,0 +1,121 @@
+"""
+Statistiques de serveur du dashboard (/api/guild/{id}/stats et /bulk)
+Une seule requête agrégée par serveur : membres avec XP, XP total, niveau
+moyen, activité des 7 derniers jours, top 5 et nombre de membres humains lu
+dans member_count_history (enregistré par le bot toutes les 5 minutes), sans
+appel à l'API Discord. Le résultat est servi depuis un cache
+stale-while-revalidate : frais pendant quelques secondes, puis encore servi
+tel quel pendant qu'une actualisation unique tourne en tâche de fond.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOP_USERS = 5
+ACTIVITY_DAYS = 7
+MAX_ENTRIES = 4096
+
+STATS_QUERY = f"""
+SELECT
+    COUNT(*) AS xp_members,
+    COALESCE(SUM(x.xp), 0) AS total_xp,
+    COALESCE(AVG(x.level), 0) AS average_level,
+    (SELECT COUNT(*) FROM xp_history h
+     WHERE h.guild_id = %(guild_id)s AND h.timestamp >= NOW() - INTERVAL {ACTIVITY_DAYS} DAY) AS recent_activity,
+    (SELECT m.human_count FROM member_count_history m
+     WHERE m.guild_id = %(guild_id)s ORDER BY m.recorded_at DESC LIMIT 1) AS human_count,
+    (SELECT GROUP_CONCAT(CONCAT_WS(':', t.user_id, t.xp, t.level) ORDER BY t.xp DESC, t.user_id SEPARATOR ',')
+     FROM (SELECT user_id, xp, level FROM xp_data WHERE guild_id = %(guild_id)s
+           ORDER BY xp DESC LIMIT {TOP_USERS}) t) AS top_users
+FROM xp_data x
+WHERE x.guild_id = %(guild_id)s
+"""
+
+
+def _top_users(packed: Optional[str]) -> List[Dict[str, Any]]:
+    """'id:xp:level,...' -> [{'user_id': 'id', 'xp': xp, 'level': level}] (identifiants en chaîne pour JavaScript)"""
+    users = []
+    for item in (packed or '').split(','):
+        if item:
+            user_id, xp, level = item.split(':')
+            users.append({'user_id': user_id, 'xp': int(xp), 'level': int(level)})
+    return users
+
+
+async def load_guild_stats(db, guild_id: str) -> Dict[str, Any]:
+    """Statistiques d'un serveur en une requête"""
+    row = await db.query(STATS_QUERY, {'guild_id': int(guild_id)}, fetchone=True) or {}
+    xp_members = int(row.get('xp_members') or 0)
+    human_count = row.get('human_count')
+    return {
+        # Sans relevé du bot (serveur jamais vu par stats_tracker), repli sur les membres avec XP
+        'total_members': int(human_count) if human_count is not None else xp_members,
+        'total_xp': int(row.get('total_xp') or 0),
+        'average_level': round(float(row.get('average_level') or 0), 1),
+        'recent_activity': int(row.get('recent_activity') or 0),
+        'top_users': _top_users(row.get('top_users')),
+    }
+
+
+class GuildStatsCache:
+    """Cache stale-while-revalidate des statistiques par serveur
+
+    Une entrée est fraîche pendant `fresh_for` secondes ; ensuite, et jusqu'à
+    `max_stale` secondes, elle est renvoyée immédiatement et une seule
+    actualisation est lancée en tâche de fond. Au-delà (ou sans entrée), la
+    requête attend le chargement, partagé entre les demandes simultanées.
+    """
+
+    def __init__(self, load: Callable[[str], Awaitable[Dict[str, Any]]],
+                 fresh_for: Optional[float] = None, max_stale: float = 600.0):
+        self.load = load
+        self.fresh_for = fresh_for if fresh_for is not None else float(os.getenv('GUILD_STATS_TTL_SECONDS', '30'))
+        self.max_stale = max_stale
+        self.entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0}
+
+    async def get(self, guild_id: str) -> Dict[str, Any]:
+        guild_id = str(guild_id)
+        entry = self.entries.get(guild_id)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.fresh_for:
+                self.stats['hits'] += 1
+                return entry[1]
+            if age < self.fresh_for + self.max_stale:
+                self.stats['stale'] += 1
+                self._refresh(guild_id)
+                return entry[1]
+        self.stats['misses'] += 1
+        return await asyncio.shield(self._refresh(guild_id))
+
+    def _refresh(self, guild_id: str) -> asyncio.Task:
+        task = self.pending.get(guild_id)
+        if task is None:
+            task = asyncio.create_task(self._load(guild_id))
+            self.pending[guild_id] = task
+            task.add_done_callback(lambda done: self._loaded(guild_id, done))
+        return task
+
+    async def _load(self, guild_id: str) -> Dict[str, Any]:
+        value = await self.load(guild_id)
+        if len(self.entries) >= MAX_ENTRIES and guild_id not in self.entries:
+            self.entries.pop(min(self.entries, key=lambda key: self.entries[key][0]))
+        self.entries[guild_id] = (time.monotonic(), value)
+        return value
+
+    def _loaded(self, guild_id: str, task: asyncio.Task) -> None:
+        if self.pending.get(guild_id) is task:
+            del self.pending[guild_id]
+        if not task.cancelled() and task.exception() is not None:
+            # Une actualisation en échec laisse l'entrée précédente en place
+            logger.warning(f"Statistiques du serveur {guild_id} non actualisées: {task.exception()}")
+
+    def invalidate(self, guild_id: str) -> None:
+        self.entries.pop(str(guild_id), None)
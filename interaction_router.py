@@ -0,0 +1,202 @@
+"""
+Routage centralisé des interactions de composants persistants
+Les boutons déployés depuis le dashboard (panels de tickets, validation du
+règlement) portent un custom_id `<préfixe>_<clé>` : il est analysé une seule fois
+ici puis transmis au sous-système qui a enregistré le préfixe. Les configurations
+de ces composants sont servies depuis une table en mémoire par serveur, invalidée
+quand le dashboard modifie ou redéploie un panel (table `config_versions`).
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+InteractionHandler = Callable[[discord.Interaction, str], Awaitable[None]]
+ConfigLoader = Callable[[int], Awaitable[Any]]
+ChangeListener = Callable[[int], Awaitable[None]]
+
+
+def parse_custom_id(custom_id: str) -> Tuple[str, str]:
+    """Sépare un custom_id en (préfixe, clé) : "ticket_button_12" -> ("ticket_button", "12")"""
+    prefix, _, key = custom_id.rpartition('_')
+    return prefix, key
+
+
+class ComponentConfigTable:
+    """Table en mémoire des configurations de composants, par (serveur, portée)
+
+    Chaque portée ("tickets", "rules", ...) a son chargeur, qui lit en une fois
+    toute la configuration du serveur. Les chargements concurrents d'une même
+    entrée sont fusionnés : une vague de clics ne coûte qu'une requête. Le
+    dashboard incrémente la version de la portée à chaque modification ; une tâche
+    de fond surveille ces versions et invalide les entrées concernées. Le TTL ne
+    sert que de filet de sécurité. Les sous-systèmes qui doivent agir sur une
+    modification (pas seulement relire) s'abonnent à la portée avec subscribe().
+    """
+
+    def __init__(self, db, ttl: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.db = db
+        self.ttl = ttl if ttl is not None else int(os.getenv('COMPONENT_CONFIG_TTL', '900'))
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv('COMPONENT_CONFIG_POLL_SECONDS', '5')
+        )
+        self.loaders: Dict[str, ConfigLoader] = {}
+        self.entries: Dict[Tuple[int, str], Tuple[float, Any]] = {}
+        self.pending: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.versions: Dict[Tuple[int, str], int] = {}
+        self.listeners: Dict[str, List[ChangeListener]] = {}
+        self.last_seen = None
+        self.watch_task = None
+
+    def register(self, scope: str, loader: ConfigLoader) -> None:
+        self.loaders[scope] = loader
+
+    def unregister(self, scope: str) -> None:
+        self.loaders.pop(scope, None)
+        self.invalidate(scope=scope)
+
+    def subscribe(self, scope: str, listener: ChangeListener) -> None:
+        """`listener(guild_id)` est appelé à chaque modification de la portée par le dashboard"""
+        self.listeners.setdefault(scope, []).append(listener)
+
+    def unsubscribe(self, scope: str, listener: ChangeListener) -> None:
+        if listener in self.listeners.get(scope, []):
+            self.listeners[scope].remove(listener)
+
+    async def get(self, guild_id: int, scope: str) -> Any:
+        """Configuration d'une portée pour un serveur (chargée à la première demande)"""
+        key = (guild_id, scope)
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[key] = future
+            try:
+                value = await self.loaders[scope](guild_id)
+                # Une invalidation pendant le chargement rend la valeur lue potentiellement périmée
+                if self.pending.get(key) is future:
+                    self.entries[key] = (time.monotonic() + self.ttl, value)
+                future.set_result(value)
+            except Exception as e:
+                future.set_exception(e)
+                # Exception déjà transmise à l'appelant : éviter l'avertissement si personne d'autre n'attend
+                future.exception()
+                raise
+            finally:
+                if self.pending.get(key) is future:
+                    del self.pending[key]
+            return value
+        return await asyncio.shield(future)
+
+    def invalidate(self, guild_id: Optional[int] = None, scope: Optional[str] = None) -> None:
+        """Oublie les entrées d'un serveur et/ou d'une portée (tout si aucun filtre)"""
+        for key in [k for k in list(self.entries) + list(self.pending)
+                    if (guild_id is None or k[0] == guild_id) and (scope is None or k[1] == scope)]:
+            self.entries.pop(key, None)
+            self.pending.pop(key, None)
+
+    def changed(self, guild_id: int, scope: str) -> None:
+        """Modification signalée (nouvelle version ou IPC) : invalide l'entrée et prévient les abonnés"""
+        self.invalidate(guild_id, scope)
+        for listener in list(self.listeners.get(scope, [])):
+            asyncio.create_task(self._notify(listener, guild_id, scope))
+
+    @staticmethod
+    async def _notify(listener: ChangeListener, guild_id: int, scope: str) -> None:
+        try:
+            await listener(guild_id)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de la modification {scope} du serveur {guild_id}: {e}")
+
+    async def start_watch(self) -> None:
+        if not self.watch_task:
+            self.watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop_watch(self) -> None:
+        if self.watch_task:
+            self.watch_task.cancel()
+            try:
+                await self.watch_task
+            except asyncio.CancelledError:
+                pass
+            self.watch_task = None
+
+    async def poll_versions(self) -> int:
+        """Invalide les entrées dont la version a changé depuis le dernier passage"""
+        if self.last_seen is None:
+            rows = await self.db.query(
+                "SELECT guild_id, scope, version, updated_at FROM config_versions", fetchall=True
+            )
+        else:
+            # >= : deux modifications dans la même milliseconde restent détectées grâce au numéro de version
+            rows = await self.db.query(
+                "SELECT guild_id, scope, version, updated_at FROM config_versions WHERE updated_at >= %s",
+                (self.last_seen,),
+                fetchall=True
+            )
+        first_pass = self.last_seen is None
+        changed = 0
+        for row in rows or []:
+            key = (int(row['guild_id']), row['scope'])
+            if self.versions.get(key) != row['version']:
+                self.versions[key] = row['version']
+                if not first_pass:
+                    self.changed(*key)
+                    changed += 1
+            if self.last_seen is None or row['updated_at'] > self.last_seen:
+                self.last_seen = row['updated_at']
+        if first_pass and self.last_seen is None:
+            # Table encore vide : tout ce qui sera écrit ensuite est une modification
+            self.last_seen = (await self.db.query("SELECT NOW(3) AS now", fetchone=True))['now']
+        return changed
+
+    async def _watch_loop(self):
+        while True:
+            try:
+                changed = await self.poll_versions()
+                if changed:
+                    logger.debug(f"{changed} configuration(s) de composants invalidée(s)")
+                await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                # Versions illisibles : se rabattre sur le TTL plutôt que de servir des données figées
+                logger.error(f"Erreur lors du suivi des versions de configuration: {e}")
+                self.invalidate()
+                await asyncio.sleep(max(self.poll_interval, 30))
+
+
+class InteractionRouter:
+    """Unique écouteur on_interaction des composants persistants, routé par préfixe de custom_id"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers: Dict[str, InteractionHandler] = {}
+        self.config = ComponentConfigTable(bot.db)
+
+    def register(self, prefix: str, handler: InteractionHandler) -> None:
+        self.handlers[prefix] = handler
+
+    def unregister(self, prefix: str) -> None:
+        self.handlers.pop(prefix, None)
+
+    async def dispatch(self, interaction: discord.Interaction):
+        if interaction.type != discord.InteractionType.component or not interaction.data:
+            return
+        prefix, key = parse_custom_id(interaction.data.get('custom_id', ''))
+        handler = self.handlers.get(prefix)
+        if handler is None:
+            return  # Composant géré par une View (ou inconnu)
+        try:
+            await handler(interaction, key)
+        except Exception as e:
+            logger.error(f"Erreur non gérée pour l'interaction {prefix}: {e}")
@@ -0,0 +1,280 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Retry policy for Discord 5xx responses
+SERVER_ERROR_BACKOFF = 2.0
+MAX_SERVER_ERROR_BACKOFF = 60.0
+MAX_SERVER_ERROR_RETRIES = 5
+
+
+class RateLimitBucket:
+    """Token bucket mirroring Discord's per-channel message rate limit"""
+
+    def __init__(self, capacity: int = 5, per: float = 5.0):
+        self.capacity = capacity
+        self.per = per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.hits = 0  # Number of 429 responses received
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.per)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds to wait before the next send is allowed"""
+        self._refill()
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.capacity
+
+    def consume(self) -> None:
+        self._refill()
+        self.tokens = max(0.0, self.tokens - 1)
+
+    def block(self, retry_after: float) -> None:
+        self.hits += 1
+        self.backoff(retry_after)
+
+    def backoff(self, seconds: float) -> None:
+        """Hold off sending without counting a 429"""
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class ChannelLogQueue:
+    """Outbound embed queue for a single log channel"""
+
+    def __init__(self, channel_id: int, max_size: int):
+        self.channel_id = channel_id
+        self.embeds: Deque[discord.Embed] = deque()
+        self.max_size = max_size
+        self.bucket = RateLimitBucket()
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+        self.first_enqueued = 0.0
+        self.sent_messages = 0
+        self.sent_embeds = 0
+        self.dropped = 0
+        self.server_errors = 0  # Consecutive 5xx responses for the head batch
+        self.isolate = 0  # Embeds to send one per message after a rejected batch
+
+    def push(self, embed: discord.Embed) -> None:
+        if not self.embeds:
+            self.first_enqueued = time.monotonic()
+        if len(self.embeds) >= self.max_size:
+            # Drop the oldest entry so the freshest events still get through
+            self.embeds.popleft()
+            self.dropped += 1
+        self.embeds.append(embed)
+        if len(self.embeds) >= MAX_EMBEDS_PER_MESSAGE:
+            self.wakeup.set()
+
+    def take_batch(self) -> list:
+        """Pop as many embeds as fit into one message"""
+        batch = []
+        total = 0
+        # Resend a rejected batch embed by embed so only the bad one is lost
+        limit = 1 if self.isolate else MAX_EMBEDS_PER_MESSAGE
+        while self.embeds and len(batch) < limit:
+            size = len(self.embeds[0])
+            if batch and total + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(self.embeds.popleft())
+            total += size
+        if self.embeds:
+            self.first_enqueued = time.monotonic()
+        return batch
+
+    def settle(self, batch: list) -> None:
+        """Mark a batch as delivered or dropped"""
+        self.server_errors = 0
+        self.isolate = max(0, self.isolate - len(batch))
+
+
+class LogDeliveryQueue:
+    """Batches log embeds per channel and sends them without tripping rate limits.
+
+    Embeds are packed up to 10 per message and flushed either when a full
+    message is ready or after a short latency window. Each channel tracks its
+    own rate-limit bucket so a flood in one guild never stalls event handlers.
+    """
+
+    def __init__(self, bot, flush_interval: float = 1.5, max_queue_size: int = 500):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.queues: Dict[int, ChannelLogQueue] = {}
+        self.closing = False
+        self.stats = {
+            'enqueued': 0,
+            'sent_messages': 0,
+            'sent_embeds': 0,
+            'dropped': 0,
+            'rate_limited': 0,
+            'errors': 0
+        }
+
+    def enqueue(self, channel, embed: discord.Embed) -> bool:
+        """Queue an embed for a channel; returns False if the queue is shutting down"""
+        if self.closing:
+            return False
+
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = ChannelLogQueue(channel.id, self.max_queue_size)
+            self.queues[channel.id] = queue
+
+        dropped = queue.dropped
+        queue.push(embed)
+        self.stats['enqueued'] += 1
+        self.stats['dropped'] += queue.dropped - dropped
+
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._run(queue))
+        return True
+
+    async def _run(self, queue: ChannelLogQueue) -> None:
+        """Drain a channel queue until it is empty"""
+        while queue.embeds:
+            # Wait for the latency window unless a full message is already ready
+            if not self.closing and not queue.isolate and len(queue.embeds) < MAX_EMBEDS_PER_MESSAGE:
+                remaining = self.flush_interval - (time.monotonic() - queue.first_enqueued)
+                if remaining > 0:
+                    queue.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(queue.wakeup.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+            delay = queue.bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            batch = queue.take_batch()
+            if batch:
+                await self._send(queue, batch)
+
+    async def _send(self, queue: ChannelLogQueue, batch: list) -> None:
+        channel = self.bot.get_channel(queue.channel_id)
+        if channel is None:
+            queue.embeds.clear()
+            queue.isolate = 0
+            return
+
+        queue.bucket.consume()
+        try:
+            await channel.send(embeds=batch)
+            queue.settle(batch)
+            queue.sent_messages += 1
+            queue.sent_embeds += len(batch)
+            self.stats['sent_messages'] += 1
+            self.stats['sent_embeds'] += len(batch)
+        except discord.Forbidden:
+            logger.warning(f"No permission to send logs to channel {queue.channel_id}")
+            queue.dropped += len(batch) + len(queue.embeds)
+            self.stats['dropped'] += len(batch) + len(queue.embeds)
+            queue.embeds.clear()
+            queue.isolate = 0
+        except discord.RateLimited as e:
+            self._requeue_rate_limited(queue, batch, e.retry_after)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self._requeue_rate_limited(queue, batch, getattr(e, 'retry_after', None) or 5.0)
+            elif e.status >= 500:
+                self._requeue_server_error(queue, batch, e)
+            elif len(batch) > 1:
+                # One embed made Discord reject the message; isolate it
+                logger.warning(
+                    f"Log batch rejected in channel {queue.channel_id} ({e.status}), "
+                    f"resending {len(batch)} embed(s) individually"
+                )
+                queue.embeds.extendleft(reversed(batch))
+                queue.isolate = len(batch)
+            else:
+                logger.error(f"Log embed rejected in channel {queue.channel_id}: {e}")
+                self._drop(queue, batch)
+        except Exception as e:
+            logger.error(f"Error sending log batch to channel {queue.channel_id}: {e}")
+            self._drop(queue, batch)
+
+    def _drop(self, queue: ChannelLogQueue, batch: list) -> None:
+        queue.settle(batch)
+        self.stats['errors'] += 1
+        queue.dropped += len(batch)
+        self.stats['dropped'] += len(batch)
+
+    def _requeue_rate_limited(self, queue: ChannelLogQueue, batch: list, retry_after: float) -> None:
+        queue.bucket.block(retry_after)
+        self.stats['rate_limited'] += 1
+        # Put the batch back at the front so ordering is preserved
+        queue.embeds.extendleft(reversed(batch))
+
+    def _requeue_server_error(self, queue: ChannelLogQueue, batch: list, error: discord.HTTPException) -> None:
+        queue.server_errors += 1
+        if queue.server_errors > MAX_SERVER_ERROR_RETRIES:
+            logger.error(
+                f"Giving up on log batch for channel {queue.channel_id} after "
+                f"{MAX_SERVER_ERROR_RETRIES} retries: {error}"
+            )
+            self._drop(queue, batch)
+            return
+        delay = min(MAX_SERVER_ERROR_BACKOFF, SERVER_ERROR_BACKOFF * 2 ** (queue.server_errors - 1))
+        logger.warning(f"Discord returned {error.status} for channel {queue.channel_id}, retrying in {delay:.0f}s")
+        queue.bucket.backoff(delay)
+        queue.embeds.extendleft(reversed(batch))
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting embeds and flush everything still queued"""
+        self.closing = True
+        workers = []
+        for queue in self.queues.values():
+            queue.wakeup.set()
+            if queue.embeds and (queue.worker is None or queue.worker.done()):
+                queue.worker = asyncio.create_task(self._run(queue))
+            if queue.worker and not queue.worker.done():
+                workers.append(queue.worker)
+
+        if not workers:
+            return
+        done, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            lost = sum(len(q.embeds) for q in self.queues.values())
+            self.stats['dropped'] += lost
+            logger.warning(f"Log queue shutdown timed out, {lost} log embed(s) dropped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, drop counts and rate-limit state per channel"""
+        return {
+            **self.stats,
+            'queue_depth': sum(len(q.embeds) for q in self.queues.values()),
+            'channels': {
+                channel_id: {
+                    'depth': len(q.embeds),
+                    'sent_messages': q.sent_messages,
+                    'sent_embeds': q.sent_embeds,
+                    'dropped': q.dropped,
+                    'rate_limit_hits': q.bucket.hits,
+                    'tokens': round(q.bucket.tokens, 2)
+                }
+                for channel_id, q in self.queues.items()
+            }
+        }
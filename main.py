@@ -7,6 +7,11 @@ import logging
 from datetime import datetime
 from db import Database
 from cache import BotCache
+from interaction_router import InteractionRouter
+from member_index import MemberIndexRegistry
+from moderation_scheduler import ModerationJobScheduler
+from guild_access import BotGuildPublisher
+from bot_ipc import BotIPCServer
 from cog.ticket import TicketPanelView, TicketCloseView
 from dotenv import load_dotenv
 from i18n import i18n, _
@@ -200,6 +205,24 @@ class MyBot(commands.Bot):
         self.cache = BotCache(self.db)
         self.i18n = i18n
         
+        # Single dispatcher for persistent dashboard components (ticket panels, rules)
+        self.interactions = InteractionRouter(self)
+        self.add_listener(self.interactions.dispatch, 'on_interaction')
+        
+        # Member name index for moderation pickers and autocomplete
+        self.member_index = MemberIndexRegistry()
+        self.member_index.attach(self)
+        
+        # Expirations of timeouts and temporary bans (moderation_jobs table + in-memory heap)
+        self.moderation_jobs = ModerationJobScheduler(self)
+        
+        # Publish the bot's guild list (bot_guilds table) for the dashboard's access checks
+        self.guild_publisher = BotGuildPublisher(self.db)
+        self.guild_publisher.attach(self)
+        
+        # Local IPC API for the dashboard (gateway cache reads, role menu deploys, config invalidation)
+        self.ipc = BotIPCServer(self)
+        
         # Legacy attributes for backward compatibility
         self.role_reactions = {}
 
@@ -212,6 +235,10 @@ class MyBot(commands.Bot):
         await self.cache.stop_cleanup_task()
         logger.info("Cache cleanup stopped")
         
+        await self.interactions.config.stop_watch()
+        await self.moderation_jobs.stop()
+        await self.ipc.stop()
+        
         # Close database
         await self.db.close()
         logger.info("Database connection closed")
@@ -228,6 +255,18 @@ class MyBot(commands.Bot):
             await self.db.init_tables()
             logger.info("Database tables initialized")
             
+            # Watch dashboard config versions to invalidate cached panel/rules configs
+            await self.interactions.config.start_watch()
+            
+            # Load pending moderation expirations and sleep until the next one
+            await self.moderation_jobs.start()
+            
+            # Dashboard IPC is optional: the dashboard falls back to Discord REST without it
+            try:
+                await self.ipc.start()
+            except OSError as e:
+                logger.error(f"Bot IPC API could not start: {e}")
+            
             # Load language preferences from database
             await self.i18n.load_language_preferences(self.db)
             logger.info("Language preferences loaded from database")
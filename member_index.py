@@ -0,0 +1,253 @@
+"""
+Index des noms de membres par serveur
+Recherche par préfixe (tableaux triés parcourus par dichotomie) et recherche
+approchée (trigrammes) sur le pseudo, le nom d'utilisateur et le nom global,
+sans parcourir guild.members à chaque frappe. Sert aux sélecteurs de membres
+de la modération et à l'autocomplétion des commandes ; tenu à jour par les
+événements de membres.
+"""
+
+import bisect
+import logging
+import unicodedata
+from typing import Dict, Iterator, List, Set, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Trigrammes partagés par plus de cette proportion de membres : aucun pouvoir discriminant
+_COMMON_TRIGRAM_RATIO = 0.2
+
+
+def normalize_name(name: str) -> str:
+    """Forme insensible à la casse et aux accents d'un pseudo ou nom d'utilisateur"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MemberEntry:
+    """Noms indexés d'un membre (conservés pour retirer les clés exactes lors d'une mise à jour)"""
+
+    __slots__ = ('member_id', 'display_key', 'name_keys', 'bot')
+
+    def __init__(self, member: discord.Member):
+        self.member_id = member.id
+        self.bot = member.bot
+        self.display_key = normalize_name(member.display_name)
+        # Nom d'utilisateur et nom global, s'ils diffèrent du pseudo
+        self.name_keys = tuple(sorted({
+            key for key in (normalize_name(member.name), normalize_name(member.global_name or ''))
+            if key and key != self.display_key
+        }))
+
+    def keys(self) -> Iterator[str]:
+        yield self.display_key
+        yield from self.name_keys
+
+    def same_names(self, other: 'MemberEntry') -> bool:
+        return self.display_key == other.display_key and self.name_keys == other.name_keys
+
+
+class MemberNameIndex:
+    """Index des noms des membres d'un serveur
+
+    Les recherches par préfixe se font par dichotomie dans deux tableaux triés
+    (pseudos, autres noms) : O(log n + résultats). La recherche approchée ne
+    visite que les membres partageant des trigrammes avec la requête. Une mise à
+    jour coûte une dichotomie et une insertion par nom.
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild_id = guild.id
+        self.entries: Dict[int, MemberEntry] = {}
+        self.by_display: List[Tuple[str, int]] = []
+        self.by_name: List[Tuple[str, int]] = []
+        self.trigrams: Dict[str, Set[int]] = {}
+        self.complete = guild.chunked
+        self.build(guild.members)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def build(self, members) -> None:
+        self.entries = {member.id: MemberEntry(member) for member in members}
+        self.by_display = sorted((entry.display_key, entry.member_id) for entry in self.entries.values())
+        self.by_name = sorted(
+            (key, entry.member_id) for entry in self.entries.values() for key in entry.name_keys
+        )
+        self.trigrams = {}
+        for entry in self.entries.values():
+            self._add_trigrams(entry)
+
+    def _add_trigrams(self, entry: MemberEntry) -> None:
+        for key in entry.keys():
+            for gram in trigrams(key):
+                self.trigrams.setdefault(gram, set()).add(entry.member_id)
+
+    def _remove_trigrams(self, entry: MemberEntry) -> None:
+        for key in entry.keys():
+            for gram in trigrams(key):
+                postings = self.trigrams.get(gram)
+                if postings is not None:
+                    postings.discard(entry.member_id)
+                    if not postings:
+                        del self.trigrams[gram]
+
+    @staticmethod
+    def _insort(keys: List[Tuple[str, int]], item: Tuple[str, int]) -> None:
+        bisect.insort(keys, item)
+
+    @staticmethod
+    def _remove(keys: List[Tuple[str, int]], item: Tuple[str, int]) -> None:
+        position = bisect.bisect_left(keys, item)
+        if position < len(keys) and keys[position] == item:
+            del keys[position]
+
+    def add(self, member: discord.Member) -> None:
+        entry = MemberEntry(member)
+        previous = self.entries.get(member.id)
+        if previous is not None:
+            if previous.same_names(entry):
+                return
+            self.remove(member.id)
+        self.entries[member.id] = entry
+        self._insort(self.by_display, (entry.display_key, entry.member_id))
+        for key in entry.name_keys:
+            self._insort(self.by_name, (key, entry.member_id))
+        self._add_trigrams(entry)
+
+    def remove(self, member_id: int) -> None:
+        entry = self.entries.pop(member_id, None)
+        if entry is None:
+            return
+        self._remove(self.by_display, (entry.display_key, member_id))
+        for key in entry.name_keys:
+            self._remove(self.by_name, (key, member_id))
+        self._remove_trigrams(entry)
+
+    def first(self, limit: int = 25, include_bots: bool = False) -> List[int]:
+        """Membres dans l'ordre des pseudos (liste par défaut des sélecteurs)"""
+        result = []
+        for _, member_id in self.by_display:
+            if include_bots or not self.entries[member_id].bot:
+                result.append(member_id)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def prefix(self, query: str, limit: int = 25, include_bots: bool = False) -> List[int]:
+        """Membres dont le pseudo, le nom d'utilisateur ou le nom global commence par la requête"""
+        query = normalize_name(query)
+        result: List[int] = []
+        seen: Set[int] = set()
+        for keys in (self.by_display, self.by_name):
+            position = bisect.bisect_left(keys, (query, 0))
+            while position < len(keys) and len(result) < limit:
+                key, member_id = keys[position]
+                if not key.startswith(query):
+                    break
+                if member_id not in seen and (include_bots or not self.entries[member_id].bot):
+                    seen.add(member_id)
+                    result.append(member_id)
+                position += 1
+        return result
+
+    def fuzzy(self, query: str, limit: int = 25, include_bots: bool = False) -> List[int]:
+        """Membres classés par trigrammes communs (sous-chaînes, petites fautes de frappe)"""
+        query = normalize_name(query)
+        grams = trigrams(query)
+        postings = sorted((self.trigrams.get(gram, ()) for gram in grams), key=len)
+        # Ignorer les trigrammes quasi universels, en gardant au moins le plus sélectif non vide
+        ceiling = max(len(self.entries) * _COMMON_TRIGRAM_RATIO, 1)
+        selective = [p for p in postings if p and len(p) <= ceiling] or [p for p in postings if p][:1]
+
+        scores: Dict[int, int] = {}
+        for members in selective:
+            for member_id in members:
+                scores[member_id] = scores.get(member_id, 0) + 1
+        threshold = max(1, (len(selective) + 1) // 2)
+        ranked = sorted(
+            (member_id for member_id, score in scores.items() if score >= threshold),
+            key=lambda member_id: (-scores[member_id], self.entries[member_id].display_key)
+        )
+        return [
+            member_id for member_id in ranked if include_bots or not self.entries[member_id].bot
+        ][:limit]
+
+    def search(self, query: str, limit: int = 25, include_bots: bool = False) -> List[int]:
+        """Correspondances par préfixe d'abord, complétées par la recherche approchée"""
+        if not normalize_name(query):
+            return self.first(limit, include_bots)
+        result = self.prefix(query, limit, include_bots)
+        if len(result) < limit:
+            seen = set(result)
+            for member_id in self.fuzzy(query, limit, include_bots):
+                if member_id not in seen:
+                    result.append(member_id)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+class MemberIndexRegistry:
+    """Index par serveur, construits à la première utilisation puis tenus à jour par les événements"""
+
+    def __init__(self):
+        self.indexes: Dict[int, MemberNameIndex] = {}
+
+    def attach(self, bot) -> None:
+        """Branche les écouteurs d'événements de membres sur le bot"""
+        bot.add_listener(self.on_member_join, 'on_member_join')
+        bot.add_listener(self.on_member_remove, 'on_member_remove')
+        bot.add_listener(self.on_member_update, 'on_member_update')
+        bot.add_listener(self.on_user_update, 'on_user_update')
+        bot.add_listener(self.on_guild_remove, 'on_guild_remove')
+
+    def get(self, guild: discord.Guild) -> MemberNameIndex:
+        index = self.indexes.get(guild.id)
+        # Un index construit avant la réception complète des membres est reconstruit ensuite
+        if index is None or (not index.complete and guild.chunked):
+            index = MemberNameIndex(guild)
+            self.indexes[guild.id] = index
+            logger.debug(f"Index des membres construit pour le serveur {guild.id} ({len(index)} membres)")
+        return index
+
+    def search(self, guild: discord.Guild, query: str, limit: int = 25,
+               include_bots: bool = False) -> List[discord.Member]:
+        """Membres correspondant à la requête (les premiers membres si elle est vide)"""
+        index = self.get(guild)
+        members = (guild.get_member(member_id) for member_id in index.search(query, limit, include_bots))
+        return [member for member in members if member is not None]
+
+    async def on_member_join(self, member: discord.Member):
+        index = self.indexes.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    async def on_member_remove(self, member: discord.Member):
+        index = self.indexes.get(member.guild.id)
+        if index is not None:
+            index.remove(member.id)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name:
+            await self.on_member_join(after)
+
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        """Changement de nom d'utilisateur / nom global : mise à jour dans chaque serveur indexé"""
+        if before.name == after.name and before.global_name == after.global_name:
+            return
+        for guild in after.mutual_guilds:
+            index = self.indexes.get(guild.id)
+            member = guild.get_member(after.id)
+            if index is not None and member is not None:
+                index.add(member)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.indexes.pop(guild.id, None)
@@ -0,0 +1,364 @@
+import os
+import asyncio
+import sqlite3
+import sys
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough fixed cost of a CachedMessage (slots object + OrderedDict node + key)
+_ENTRY_OVERHEAD = 160
+
+
+class CachedMessage:
+    """Compact snapshot of a guild message, holding IDs and content only"""
+
+    __slots__ = (
+        'message_id', 'guild_id', 'channel_id', 'author_id', 'author_name',
+        'content', 'created_at', 'attachments', 'embeds', 'size'
+    )
+
+    def __init__(self, message_id: int, guild_id: int, channel_id: int, author_id: int,
+                 author_name: str, content: str, created_at: float,
+                 attachments: Iterable[str] = (), embeds: int = 0):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.content = content or ''
+        self.created_at = created_at
+        self.attachments = tuple(attachments)
+        self.embeds = embeds
+        self.size = self._estimate_size()
+
+    @classmethod
+    def from_message(cls, message) -> 'CachedMessage':
+        """Build a snapshot from a discord.Message without keeping object references"""
+        return cls(
+            message_id=message.id,
+            guild_id=message.guild.id,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            author_name=str(message.author.name),
+            content=message.content,
+            created_at=message.created_at.timestamp(),
+            attachments=[att.url for att in message.attachments],
+            embeds=len(message.embeds)
+        )
+
+    def _estimate_size(self) -> int:
+        size = _ENTRY_OVERHEAD + sys.getsizeof(self.content) + sys.getsizeof(self.author_name)
+        for url in self.attachments:
+            size += sys.getsizeof(url)
+        return size
+
+
+class GuildMessageCache:
+    """Per-guild LRU of cached messages bounded by entry count and memory budget"""
+
+    def __init__(self, capacity: int, memory_budget: int):
+        self.capacity = capacity
+        self.memory_budget = memory_budget
+        self.entries: 'OrderedDict[int, CachedMessage]' = OrderedDict()
+        self.memory = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, entry: CachedMessage) -> List[CachedMessage]:
+        """Insert or refresh an entry, returning the entries evicted to make room"""
+        previous = self.entries.pop(entry.message_id, None)
+        if previous:
+            self.memory -= previous.size
+        self.entries[entry.message_id] = entry
+        self.memory += entry.size
+
+        evicted = []
+        while self.entries and (len(self.entries) > self.capacity or self.memory > self.memory_budget):
+            _, oldest = self.entries.popitem(last=False)
+            self.memory -= oldest.size
+            evicted.append(oldest)
+        return evicted
+
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        return self.entries.get(message_id)
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self.entries.pop(message_id, None)
+        if entry:
+            self.memory -= entry.size
+        return entry
+
+
+class DiskMessageStore:
+    """SQLite-backed overflow tier for messages evicted from memory
+
+    All SQLite work (connect, writes, lookups, cleanup) runs on a dedicated
+    single-thread executor so it never blocks the event loop. The one worker
+    owns the connection and runs jobs in submission order, so a lookup always
+    sees batches spilled before it.
+    """
+
+    def __init__(self, path: str, ttl: int, flush_size: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.flush_size = flush_size
+        self.pending: Dict[int, CachedMessage] = {}
+        self.conn: Optional[sqlite3.Connection] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='message-cache')
+        self.executor.submit(self._open)
+
+    def _open(self) -> None:
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    message_id INTEGER PRIMARY KEY,
+                    guild_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    author_id INTEGER NOT NULL,
+                    author_name TEXT,
+                    content TEXT,
+                    created_at REAL NOT NULL,
+                    attachments TEXT,
+                    embeds INTEGER DEFAULT 0,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stored_at ON messages (stored_at)")
+            conn.commit()
+            self.conn = conn
+        except sqlite3.Error as e:
+            logger.error(f"Disk message cache disabled: {e}")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def spill(self, entries: List[CachedMessage]) -> None:
+        """Queue evicted entries, writing them out in batches"""
+        for entry in entries:
+            self.pending[entry.message_id] = entry
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand the queued entries to the SQLite thread (does not wait for the write)"""
+        if not self.pending:
+            return
+        now = time.time()
+        rows = [
+            (e.message_id, e.guild_id, e.channel_id, e.author_id, e.author_name, e.content,
+             e.created_at, '\n'.join(e.attachments), e.embeds, now)
+            for e in self.pending.values()
+        ]
+        self.pending.clear()
+        self.executor.submit(self._write, rows)
+
+    def _write(self, rows: List[tuple]) -> None:
+        if self.conn is None:
+            return
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error spilling messages to disk cache: {e}")
+
+    async def pop(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self.pending.pop(message_id, None)
+        if entry:
+            return entry
+        row = await self._run(self._take, message_id)
+        if not row or time.time() - row[9] > self.ttl:
+            return None
+        return CachedMessage(
+            message_id=row[0], guild_id=row[1], channel_id=row[2], author_id=row[3],
+            author_name=row[4], content=row[5], created_at=row[6],
+            attachments=row[7].split('\n') if row[7] else (), embeds=row[8]
+        )
+
+    def _take(self, message_id: int) -> Optional[tuple]:
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT message_id, guild_id, channel_id, author_id, author_name, content, "
+                "created_at, attachments, embeds, stored_at FROM messages WHERE message_id = ?",
+                (message_id,)
+            ).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM messages WHERE message_id = ?", (message_id,))
+                self.conn.commit()
+            return row
+        except sqlite3.Error as e:
+            logger.error(f"Error reading message from disk cache: {e}")
+            return None
+
+    async def cleanup_expired(self) -> int:
+        return await self._run(self._delete_expired)
+
+    def _delete_expired(self) -> int:
+        if self.conn is None:
+            return 0
+        try:
+            cursor = self.conn.execute(
+                "DELETE FROM messages WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            self.conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Error cleaning disk message cache: {e}")
+            return 0
+
+    async def close(self) -> None:
+        self.flush()
+        await self._run(self._close)
+        self.executor.shutdown(wait=False)
+
+    def _close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class MessageCache:
+    """Bounded message cache used for deletion and edit logging.
+
+    Each guild gets its own LRU so a busy guild cannot evict another guild's
+    history. Entries pushed out of memory optionally spill to a disk tier so
+    deletions can still be logged hours later.
+    """
+
+    def __init__(self, per_guild_capacity: int = 1000, per_guild_memory: int = 512 * 1024,
+                 total_memory: int = 64 * 1024 * 1024, disk_path: Optional[str] = None,
+                 disk_ttl: int = 6 * 3600):
+        self.per_guild_capacity = per_guild_capacity
+        self.per_guild_memory = per_guild_memory
+        self.total_memory = total_memory
+        self.guilds: Dict[int, GuildMessageCache] = {}
+        self.memory = 0
+        self.stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+        self.disk = None
+        if disk_path:
+            try:
+                self.disk = DiskMessageStore(disk_path, disk_ttl)
+            except Exception as e:
+                logger.error(f"Disk message cache disabled: {e}")
+
+    @classmethod
+    def from_env(cls) -> 'MessageCache':
+        """Build a cache using MESSAGE_CACHE_* environment settings"""
+        disk_path = None
+        if os.getenv('MESSAGE_CACHE_DISK', 'true').lower() == 'true':
+            disk_path = os.getenv('MESSAGE_CACHE_DISK_PATH', os.path.join('cache_data', 'messages.sqlite3'))
+        return cls(
+            per_guild_capacity=int(os.getenv('MESSAGE_CACHE_PER_GUILD', '1000')),
+            per_guild_memory=int(os.getenv('MESSAGE_CACHE_GUILD_KB', '512')) * 1024,
+            total_memory=int(os.getenv('MESSAGE_CACHE_TOTAL_MB', '64')) * 1024 * 1024,
+            disk_path=disk_path,
+            disk_ttl=int(os.getenv('MESSAGE_CACHE_DISK_HOURS', '6')) * 3600
+        )
+
+    def _guild(self, guild_id: int) -> GuildMessageCache:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = GuildMessageCache(self.per_guild_capacity, self.per_guild_memory)
+            self.guilds[guild_id] = guild
+        return guild
+
+    def _evicted(self, entries: List[CachedMessage]) -> None:
+        if not entries:
+            return
+        self.stats['evictions'] += len(entries)
+        if self.disk:
+            self.disk.spill(entries)
+
+    def add(self, entry: CachedMessage) -> None:
+        """Cache a message snapshot"""
+        guild = self._guild(entry.guild_id)
+        before = guild.memory
+        self._evicted(guild.put(entry))
+        self.memory += guild.memory - before
+
+        # Enforce the global budget by trimming the largest guild
+        if self.memory > self.total_memory:
+            largest = max(self.guilds.values(), key=lambda g: g.memory)
+            trimmed = []
+            while largest.entries and largest.memory > largest.memory_budget // 2:
+                _, oldest = largest.entries.popitem(last=False)
+                largest.memory -= oldest.size
+                self.memory -= oldest.size
+                trimmed.append(oldest)
+            self._evicted(trimmed)
+
+    def get(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Look up a message without removing it (memory tier only)"""
+        guild = self.guilds.get(guild_id)
+        return guild.get(message_id) if guild else None
+
+    def update_content(self, guild_id: int, message_id: int, content: str) -> None:
+        """Refresh the cached content of an edited message"""
+        guild = self.guilds.get(guild_id)
+        entry = guild.pop(message_id) if guild else None
+        if entry:
+            self.memory -= entry.size
+            entry.content = content or ''
+            entry.size = entry._estimate_size()
+            self.add(entry)
+
+    async def pop(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        """Remove and return a message, falling back to the disk tier"""
+        guild = self.guilds.get(guild_id)
+        entry = guild.pop(message_id) if guild else None
+        if entry:
+            self.memory -= entry.size
+            self.stats['hits'] += 1
+            return entry
+
+        if self.disk:
+            entry = await self.disk.pop(message_id)
+            if entry:
+                self.stats['disk_hits'] += 1
+                return entry
+
+        self.stats['misses'] += 1
+        return None
+
+    def drop_guild(self, guild_id: int) -> None:
+        guild = self.guilds.pop(guild_id, None)
+        if guild:
+            self.memory -= guild.memory
+
+    async def cleanup_expired(self) -> int:
+        return await self.disk.cleanup_expired() if self.disk else 0
+
+    async def close(self) -> None:
+        if self.disk:
+            disk, self.disk = self.disk, None
+            await disk.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'guilds': len(self.guilds),
+            'entries': sum(len(guild) for guild in self.guilds.values()),
+            'memory_bytes': self.memory,
+            **self.stats
+        }
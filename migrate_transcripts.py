@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Script de migration des archives de tickets entre deux stockages
+(Google Drive <-> disque local), en conservant noms et dates d'archivage.
+
+Usage :
+    python migrate_transcripts.py drive local
+    python migrate_transcripts.py local:/ancien/dossier drive --guild 123456789 --dry-run
+
+Les archives déjà présentes dans la cible (même nom de fichier) sont ignorées,
+de même que les pièces jointes déjà archivées (même empreinte SHA-256) : le
+script peut donc être relancé après une interruption. Les identifiants de
+fichiers de l'index SQL des transcripts sont mis à jour si la base est accessible.
+"""
+
+import io
+import os
+import re
+import asyncio
+import argparse
+import logging
+from typing import Dict, Optional
+
+from cloud_storage import TranscriptStorage, create_transcript_storage
+
+ARCHIVE_NAME_PATTERN = re.compile(r'^ticket_(\d+)_')
+
+
+async def connect_database():
+    """Connexion à la base de l'index des transcripts (None si indisponible)"""
+    from db import Database
+
+    db = Database(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '3306')),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASS', ''),
+        db=os.getenv('DB_NAME', 'maybebot')
+    )
+    try:
+        await db.connect()
+        return db
+    except Exception as e:
+        print(f"⚠️ Base de données indisponible, index des transcripts non mis à jour: {e}")
+        return None
+
+
+async def copy_archive(source: TranscriptStorage, target: TranscriptStorage, file: Dict) -> Optional[Dict]:
+    """Copie une archive de la source vers la cible, en conservant sa date de création"""
+    match = ARCHIVE_NAME_PATTERN.match(file['name'])
+    guild_id = int(match.group(1)) if match else 0
+    content = await source.read_archive(file['id'])
+    return await target.store_archive(guild_id, file['name'], io.BytesIO(content), file.get('createdTime'))
+
+
+async def copy_blob(source: TranscriptStorage, target: TranscriptStorage, guild_id: int, digest: str) -> bool:
+    """Copie une pièce jointe archivée si la cible ne l'a pas encore"""
+    if await target.has_blob(guild_id, digest):
+        return False
+    blob = await source.read_blob(guild_id, digest)
+    if blob is None:
+        return False
+    content, content_type = blob
+    await target.store_blob(guild_id, digest, io.BytesIO(content), content_type)
+    return True
+
+
+async def update_index(db, old_id: str, new_id: str) -> None:
+    """Fait pointer l'index SQL des transcripts vers la nouvelle archive"""
+    await db.execute("UPDATE ticket_transcripts SET file_id = %s WHERE file_id = %s", (new_id, old_id))
+    await db.execute("UPDATE ticket_transcript_messages SET file_id = %s WHERE file_id = %s", (new_id, old_id))
+
+
+async def migrate(source_name: str, target_name: str, guild_id: Optional[int] = None,
+                  dry_run: bool = False, concurrency: int = 4, use_db: bool = True) -> int:
+    source = create_transcript_storage(source_name)
+    target = create_transcript_storage(target_name)
+    db = None
+    try:
+        if not await source.initialize():
+            print(f"❌ Stockage source ({source.backend_name}) non disponible")
+            return 0
+        if not await target.initialize():
+            print(f"❌ Stockage cible ({target.backend_name}) non disponible")
+            return 0
+
+        files = await source.list_ticket_archives(guild_id)
+        existing = {file['name'] for file in await target.list_ticket_archives(guild_id)}
+        pending = [file for file in files if file['name'] not in existing]
+        blobs = await source.list_blobs(guild_id)
+        print(f"📁 {len(files)} archive(s) dans la source, {len(pending)} à copier, {len(blobs)} pièce(s) jointe(s)")
+        if dry_run:
+            return 0
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def migrate_blob(blob_guild_id: int, digest: str) -> bool:
+            async with semaphore:
+                try:
+                    return await copy_blob(source, target, blob_guild_id, digest)
+                except Exception as e:
+                    print(f"❌ Erreur lors de la copie de la pièce jointe {digest}: {e}")
+                    return False
+
+        # Pièces jointes d'abord : les transcripts copiés pointent vers elles
+        blob_results = await asyncio.gather(*(migrate_blob(g, d) for g, d in blobs))
+        if blobs:
+            print(f"✅ {sum(blob_results)} pièce(s) jointe(s) copiée(s)")
+        if not pending:
+            return 0
+
+        if use_db:
+            db = await connect_database()
+
+        copied = 0
+
+        async def migrate_one(file: Dict):
+            nonlocal copied
+            async with semaphore:
+                try:
+                    new_file = await copy_archive(source, target, file)
+                    if not new_file:
+                        print(f"❌ Échec de la copie de {file['name']}")
+                        return
+                    if db:
+                        await update_index(db, file['id'], new_file['id'])
+                    copied += 1
+                    print(f"✅ {file['name']} -> {new_file['id']}")
+                except Exception as e:
+                    print(f"❌ Erreur lors de la copie de {file['name']}: {e}")
+
+        await asyncio.gather(*(migrate_one(file) for file in pending))
+        print(f"✅ {copied}/{len(pending)} archive(s) migrée(s)")
+        return copied
+    finally:
+        await source.close()
+        await target.close()
+        if db:
+            await db.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Migre les archives de tickets entre deux stockages")
+    parser.add_argument('source', help="Stockage source : drive, local ou local:<dossier>")
+    parser.add_argument('target', help="Stockage cible : drive, local ou local:<dossier>")
+    parser.add_argument('--guild', type=int, help="Limiter la migration à un serveur")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher le nombre d'archives à copier sans rien copier")
+    parser.add_argument('--concurrency', type=int, default=4, help="Copies simultanées (défaut : 4)")
+    parser.add_argument('--no-db', action='store_true', help="Ne pas mettre à jour l'index SQL des transcripts")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.source, args.target, args.guild, args.dry_run, args.concurrency, not args.no_db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+-- Migration: Guilds the bot is in, published by the bot
+-- Fully resynced when the bot connects and updated on guild join/remove; read by
+-- the dashboard for guild access checks instead of calling Discord each time
+
+CREATE TABLE IF NOT EXISTS bot_guilds (
+    guild_id BIGINT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
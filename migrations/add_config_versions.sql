@@ -0,0 +1,26 @@
+-- Migration: Component config versions and single-statement rules toggle
+-- The dashboard bumps (guild_id, scope) whenever it edits or deploys a ticket panel
+-- or the rules message; the bot watches this table to invalidate its in-memory
+-- panel/button/rules configs instead of querying them on every click
+
+CREATE TABLE IF NOT EXISTS config_versions (
+    guild_id BIGINT NOT NULL,
+    scope VARCHAR(32) NOT NULL, -- 'tickets', 'rules'
+    version INT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (guild_id, scope),
+    INDEX idx_updated_at (updated_at)
+);
+
+CREATE TABLE IF NOT EXISTS rules_acceptances (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    accepted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    accepted TINYINT(1) NOT NULL DEFAULT 1,
+    PRIMARY KEY (guild_id, user_id),
+    INDEX idx_accepted_at (accepted_at)
+);
+
+-- Withdrawn acceptances are kept with accepted = 0 so a click is one upsert
+ALTER TABLE rules_acceptances
+ADD COLUMN IF NOT EXISTS accepted TINYINT(1) NOT NULL DEFAULT 1 AFTER accepted_at;
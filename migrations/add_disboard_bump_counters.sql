@@ -0,0 +1,21 @@
+-- Migration: Daily Disboard bump counters
+-- One row per (guild, bumper, day), incremented on each bump; leaderboards and
+-- bump statistics are summed from these rows instead of counting disboard_bumps
+
+CREATE TABLE IF NOT EXISTS disboard_bump_counters (
+    guild_id BIGINT NOT NULL,
+    bumper_id BIGINT NOT NULL,
+    bump_day DATE NOT NULL,
+    bumper_name VARCHAR(255) NOT NULL,
+    bumps INT NOT NULL DEFAULT 0,
+    first_bump_at DATETIME NOT NULL,
+    last_bump_at DATETIME NOT NULL,
+    PRIMARY KEY (guild_id, bumper_id, bump_day),
+    INDEX idx_guild_day (guild_id, bump_day)
+);
+
+-- Backfill from the existing bump history
+INSERT IGNORE INTO disboard_bump_counters (guild_id, bumper_id, bump_day, bumper_name, bumps, first_bump_at, last_bump_at)
+SELECT guild_id, bumper_id, DATE(bump_time), MAX(bumper_name), COUNT(*), MIN(bump_time), MAX(bump_time)
+FROM disboard_bumps
+GROUP BY guild_id, bumper_id, DATE(bump_time);
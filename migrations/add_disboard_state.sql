@@ -0,0 +1,20 @@
+-- Migration: Latest Disboard bump state per guild
+-- One row per guild (last bump, its channel, last reminder sent), maintained by
+-- the reminder cog so reminders no longer scan the whole bump history
+
+CREATE TABLE IF NOT EXISTS disboard_state (
+    guild_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    last_bump_at DATETIME NOT NULL,
+    last_bumper_id BIGINT NULL,
+    last_reminder_at DATETIME NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Backfill from the latest bump of each guild and its latest reminder
+INSERT IGNORE INTO disboard_state (guild_id, channel_id, last_bump_at, last_bumper_id, last_reminder_at)
+SELECT b.guild_id, b.channel_id, b.bump_time, b.bumper_id,
+       (SELECT MAX(r.reminder_time) FROM disboard_reminders r WHERE r.guild_id = b.guild_id)
+FROM disboard_bumps b
+JOIN (SELECT guild_id, MAX(bump_time) AS bump_time FROM disboard_bumps GROUP BY guild_id) latest
+  ON latest.guild_id = b.guild_id AND latest.bump_time = b.bump_time;
@@ -0,0 +1,9 @@
+-- Migration: Indexes for the dashboard's single-query guild stats
+-- The aggregate (member count, XP sum, average level) and the top 5 are read from
+-- one covering index per guild; recent activity is counted per guild and time range
+
+ALTER TABLE xp_data
+ADD INDEX IF NOT EXISTS idx_guild_xp_level (guild_id, xp, level, user_id);
+
+ALTER TABLE xp_history
+ADD INDEX IF NOT EXISTS idx_guild_time (guild_id, timestamp);
@@ -0,0 +1,22 @@
+-- Migration: Precomputed moderation statistics
+-- Daily counters per (guild, day, action type, moderator) and each user's latest
+-- action per type, maintained by log_moderation_action and reconciled from
+-- moderation_history by the moderation cog
+
+CREATE TABLE IF NOT EXISTS moderation_daily_stats (
+    guild_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    action_type VARCHAR(16) NOT NULL,
+    moderator_id BIGINT NOT NULL,
+    action_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, action_type, moderator_id)
+);
+
+CREATE TABLE IF NOT EXISTS moderation_user_last_action (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    action_type VARCHAR(16) NOT NULL,
+    last_action_at DATETIME NOT NULL,
+    PRIMARY KEY (guild_id, user_id, action_type),
+    INDEX idx_guild_last_action (guild_id, last_action_at)
+);
@@ -0,0 +1,25 @@
+-- Migration: Keyset pagination for moderation history
+-- Older installs created moderation_history from db.py with created_at/duration only;
+-- bring them to the schema the bot and dashboard query (timestamp, duration_minutes, ...)
+
+ALTER TABLE moderation_history
+ADD COLUMN IF NOT EXISTS duration_minutes INT NULL,
+ADD COLUMN IF NOT EXISTS evidence_urls TEXT NULL,
+ADD COLUMN IF NOT EXISTS channel_id BIGINT NULL,
+ADD COLUMN IF NOT EXISTS message_id BIGINT NULL,
+ADD COLUMN IF NOT EXISTS timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP NULL,
+ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE,
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+
+ALTER TABLE moderation_history
+MODIFY action_type ENUM('warn', 'timeout', 'kick', 'ban', 'unban', 'unmute') NOT NULL;
+
+-- A timestamp column just added above was filled with the migration time
+UPDATE moderation_history SET timestamp = created_at WHERE timestamp > created_at;
+
+-- Pages are read newest first by (timestamp, id), per guild and optionally per user or action
+ALTER TABLE moderation_history
+ADD INDEX IF NOT EXISTS idx_guild_timestamp (guild_id, timestamp, id),
+ADD INDEX IF NOT EXISTS idx_guild_user_timestamp (guild_id, user_id, timestamp, id),
+ADD INDEX IF NOT EXISTS idx_guild_action_timestamp (guild_id, action_type, timestamp, id);
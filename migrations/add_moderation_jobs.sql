@@ -0,0 +1,22 @@
+-- Migration: Durable jobs for expiring moderation actions
+-- One row per pending expiration (end of a timeout, end of a temporary ban),
+-- loaded into the bot's scheduler heap at startup and deleted once executed
+
+CREATE TABLE IF NOT EXISTS moderation_jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    action_type VARCHAR(16) NOT NULL,
+    due_at DATETIME NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(255) NULL,
+    status ENUM('pending', 'failed') NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_status_due (status, due_at)
+);
+
+-- Actions already recorded as active with an expiration
+INSERT INTO moderation_jobs (guild_id, user_id, action_type, due_at)
+SELECT guild_id, user_id, action_type, expires_at
+FROM moderation_history
+WHERE is_active = TRUE AND expires_at IS NOT NULL AND action_type IN ('timeout', 'ban');
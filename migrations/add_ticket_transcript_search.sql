@@ -0,0 +1,18 @@
+-- Migration: Add full-text index over ticket transcript messages
+-- Filled when a ticket is finalized (and once for older archives by the transcript backfill)
+-- so the dashboard can search ticket content without downloading archives
+
+CREATE TABLE IF NOT EXISTS ticket_transcript_messages (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    file_id VARCHAR(255) NOT NULL, -- Archive in ticket_transcripts
+    guild_id BIGINT NOT NULL,
+    ticket_id BIGINT NOT NULL,
+    message_id BIGINT NULL,
+    author_id BIGINT NULL,
+    author_name VARCHAR(100),
+    content TEXT, -- Message content followed by embed titles and descriptions
+    sent_at DATETIME NULL,
+    INDEX idx_file_id (file_id),
+    INDEX idx_guild_id (guild_id),
+    FULLTEXT INDEX ft_content_author (content, author_name)
+);
@@ -0,0 +1,29 @@
+-- Migration: Add ticket transcript index
+-- One row per archived ticket transcript, written when a ticket is finalized,
+-- so user and guild lookups no longer download every archive from Google Drive
+
+CREATE TABLE IF NOT EXISTS ticket_transcripts (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    file_id VARCHAR(255) NOT NULL UNIQUE,
+    filename VARCHAR(255),
+    size_bytes BIGINT DEFAULT 0,
+    guild_id BIGINT NOT NULL,
+    ticket_id BIGINT NOT NULL,
+    user_id BIGINT NULL, -- Ticket owner
+    username VARCHAR(100),
+    discriminator VARCHAR(10),
+    display_name VARCHAR(100),
+    avatar_url VARCHAR(512),
+    participants JSON, -- {"user_id": "display name"} of every message author
+    message_count INT DEFAULT 0,
+    event_count INT DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'closed',
+    opened_at DATETIME NULL,
+    closed_at DATETIME NULL,
+    first_message_at DATETIME NULL,
+    last_message_at DATETIME NULL,
+    archived_at DATETIME NOT NULL, -- Upload time of the archive
+    INDEX idx_guild_archived (guild_id, archived_at),
+    INDEX idx_guild_user_archived (guild_id, user_id, archived_at),
+    INDEX idx_guild_ticket (guild_id, ticket_id)
+);
@@ -0,0 +1,94 @@
+"""
+Pagination de l'historique de modération par curseur
+Les pages sont repérées par le couple (timestamp, id) de la dernière entrée
+affichée plutôt que par un OFFSET : chaque page ne lit que ses propres lignes via
+les index (guild_id[, user_id | action_type], timestamp, id), quelle que soit sa
+profondeur. Partagé par le bot (/moderation_history) et le dashboard.
+"""
+
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_PAGE_SIZE = 100
+DATE_FILTERS = {
+    'today': "timestamp >= CURDATE()",
+    'week': "timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)",
+    'month': "timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)",
+}
+
+
+def encode_cursor(timestamp: datetime, entry_id: int) -> str:
+    """Curseur opaque désignant la position juste après une entrée"""
+    raw = f"{timestamp.strftime('%Y-%m-%dT%H:%M:%S')}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse de encode_cursor, lève ValueError pour un curseur invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, entry_id = raw.split('|')
+        return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S'), int(entry_id)
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+
+def build_filters(guild_id: int, user_id: Optional[int] = None, action_type: Optional[str] = None,
+                  date_filter: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+    """Conditions WHERE (sur moderation_history, sans alias) et leurs paramètres"""
+    conditions = ["guild_id = %s"]
+    params: List[Any] = [guild_id]
+    if user_id:
+        conditions.append("user_id = %s")
+        params.append(user_id)
+    if action_type:
+        conditions.append("action_type = %s")
+        params.append(action_type)
+    if date_filter in DATE_FILTERS:
+        conditions.append(DATE_FILTERS[date_filter])
+    return conditions, params
+
+
+async def fetch_history_page(db, guild_id: int, user_id: Optional[int] = None, action_type: Optional[str] = None,
+                             date_filter: Optional[str] = None, limit: int = 25,
+                             cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Une page d'historique, de la plus récente à la plus ancienne
+
+    Retourne (entrées, curseur de la page suivante ou None).
+    """
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    conditions, params = build_filters(guild_id, user_id, action_type, date_filter)
+    if cursor:
+        timestamp, entry_id = decode_cursor(cursor)
+        # Forme développée de (timestamp, id) < (%s, %s), utilisable comme borne d'index
+        conditions.append("timestamp <= %s AND (timestamp < %s OR id < %s)")
+        params.extend([timestamp, timestamp, entry_id])
+    params.append(limit + 1)
+
+    rows = await db.query(f"""
+        SELECT * FROM moderation_history
+        WHERE {' AND '.join(conditions)}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT %s
+    """, params, fetchall=True)
+    rows = list(rows or [])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['timestamp'], last['id'])
+    return rows, next_cursor
+
+
+async def count_history(db, guild_id: int, user_id: Optional[int] = None, action_type: Optional[str] = None,
+                        date_filter: Optional[str] = None) -> int:
+    """Nombre total d'entrées correspondant aux filtres"""
+    conditions, params = build_filters(guild_id, user_id, action_type, date_filter)
+    result = await db.query(
+        f"SELECT COUNT(*) as total FROM moderation_history WHERE {' AND '.join(conditions)}",
+        params,
+        fetchone=True
+    )
+    return result['total'] if result else 0
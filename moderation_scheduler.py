@@ -0,0 +1,268 @@
+"""
+Planificateur durable des expirations de modération
+Chaque action temporaire (timeout, ban temporaire) laisse une ligne dans
+`moderation_jobs`. Le bot charge ces lignes au démarrage dans un tas trié par
+échéance et dort jusqu'à la prochaine : aucune relecture périodique de
+moderation_history. Les échéances atteintes sont exécutées par lots (levée des
+bans temporaires, désactivation des entrées d'historique en une requête).
+Les jobs insérés par d'autres processus (dashboard) sont récupérés en
+comparant périodiquement les identifiants en attente (index status, due_at) à
+ceux du tas : un identifiant plus petit qu'un job déjà connu n'est pas perdu.
+Un nouveau ban, un débannissement ou une levée de timeout annule les
+expirations en attente du même membre, et chaque lot vérifie que ses jobs sont
+toujours en base avant de les exécuter (annulations faites par le dashboard).
+"""
+
+import os
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+EXPIRING_ACTIONS = ('timeout', 'ban')
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=5)  # Multiplié par le numéro de la tentative
+# Action enregistrée -> expiration en attente qu'elle rend caduque (un ban permanent ne doit pas être levé)
+SUPERSEDED_EXPIRATIONS = {'ban': 'ban', 'unban': 'ban', 'timeout': 'timeout', 'unmute': 'timeout'}
+
+
+async def enqueue_expirations(db, guild_id: int, action_type: str,
+                              entries: Iterable[Tuple[int, datetime]]) -> int:
+    """Insère les jobs d'expiration de (user_id, échéance) sans passer par le planificateur du bot
+
+    Utilisé par le dashboard et les actions groupées ; le bot les charge lors de sa prochaine synchronisation.
+    """
+    if action_type not in EXPIRING_ACTIONS:
+        return 0
+    rows = [(guild_id, user_id, action_type, due_at) for user_id, due_at in entries]
+    if not rows:
+        return 0
+    return await db.execute_many(
+        "INSERT INTO moderation_jobs (guild_id, user_id, action_type, due_at) VALUES (%s, %s, %s, %s)",
+        rows
+    ) or 0
+
+
+async def cancel_expirations(db, guild_id: int, action_type: str, user_ids: Iterable[int]) -> int:
+    """Supprime les expirations en attente rendues caduques par `action_type` pour ces membres"""
+    expiring = SUPERSEDED_EXPIRATIONS.get(action_type)
+    user_ids = list(user_ids)
+    if expiring is None or not user_ids:
+        return 0
+    return await db.execute(
+        f"""DELETE FROM moderation_jobs
+            WHERE guild_id = %s AND action_type = %s AND user_id IN ({', '.join(['%s'] * len(user_ids))})""",
+        [guild_id, expiring, *user_ids]
+    ) or 0
+
+
+class ModerationJob:
+    __slots__ = ('id', 'guild_id', 'user_id', 'action_type', 'due_at', 'attempts')
+
+    def __init__(self, row: Dict):
+        self.id = row['id']
+        self.guild_id = row['guild_id']
+        self.user_id = row['user_id']
+        self.action_type = row['action_type']
+        self.due_at = row['due_at']
+        self.attempts = row.get('attempts', 0)
+
+
+class ModerationJobScheduler:
+    """Tas des échéances en mémoire, adossé à la table moderation_jobs"""
+
+    def __init__(self, bot, sync_interval: Optional[float] = None):
+        self.bot = bot
+        self.db = bot.db
+        self.sync_interval = sync_interval if sync_interval is not None else float(
+            os.getenv('MODERATION_JOBS_SYNC_SECONDS', '60')
+        )
+        self.heap: List[Tuple[float, int]] = []
+        self.jobs: Dict[int, ModerationJob] = {}
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    async def start(self) -> None:
+        if not self.task:
+            await self.sync()
+            self.task = asyncio.create_task(self._run())
+            logger.info(f"Planificateur de modération démarré ({len(self.jobs)} job(s) en attente)")
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def _push(self, job: ModerationJob) -> None:
+        was_next = self.heap[0][0] if self.heap else None
+        self.jobs[job.id] = job
+        heapq.heappush(self.heap, (job.due_at.timestamp(), job.id))
+        if was_next is None or self.heap[0][0] < was_next:
+            self.wakeup.set()  # Nouvelle échéance la plus proche : recalculer le sommeil
+
+    async def schedule(self, guild_id: int, user_id: int, action_type: str, due_at: datetime) -> Optional[int]:
+        """Enregistre une expiration et l'ajoute au tas (O(log n))"""
+        if action_type not in EXPIRING_ACTIONS:
+            return None
+        job_id = await self.db.execute_and_get_id(
+            "INSERT INTO moderation_jobs (guild_id, user_id, action_type, due_at) VALUES (%s, %s, %s, %s)",
+            (guild_id, user_id, action_type, due_at)
+        )
+        self._push(ModerationJob({
+            'id': job_id, 'guild_id': guild_id, 'user_id': user_id, 'action_type': action_type, 'due_at': due_at
+        }))
+        return job_id
+
+    async def cancel(self, guild_id: int, user_id: int, action_type: str) -> int:
+        """Annule les expirations du membre rendues caduques par une nouvelle action (base et tas)"""
+        expiring = SUPERSEDED_EXPIRATIONS.get(action_type)
+        if expiring is None:
+            return 0
+        for job in [job for job in self.jobs.values()
+                    if (job.guild_id, job.user_id, job.action_type) == (guild_id, user_id, expiring)]:
+            del self.jobs[job.id]  # Entrée du tas ignorée par next_due / pop_due
+        return await cancel_expirations(self.db, guild_id, action_type, [user_id])
+
+    async def sync(self) -> int:
+        """Charge les jobs en attente pas encore connus (tous au premier appel)"""
+        pending = await self.db.query(
+            "SELECT id FROM moderation_jobs WHERE status = 'pending'",
+            fetchall=True
+        ) or []
+        missing = [row['id'] for row in pending if row['id'] not in self.jobs]
+        if not missing:
+            return 0
+        rows = await self.db.query(
+            f"""SELECT id, guild_id, user_id, action_type, due_at, attempts FROM moderation_jobs
+                WHERE status = 'pending' AND id IN ({', '.join(['%s'] * len(missing))})""",
+            missing,
+            fetchall=True
+        ) or []
+        for row in rows:
+            if row['id'] not in self.jobs:
+                self._push(ModerationJob(row))
+        return len(rows)
+
+    def next_due(self) -> Optional[float]:
+        # Entrées périmées (job reprogrammé) laissées dans le tas : écartées à la lecture
+        while self.heap and self.heap[0][1] not in self.jobs:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: float) -> List[ModerationJob]:
+        due = []
+        while len(due) < BATCH_SIZE and self.next_due() is not None and self.heap[0][0] <= now:
+            _, job_id = heapq.heappop(self.heap)
+            job = self.jobs.get(job_id)
+            if job and job.due_at.timestamp() <= now:
+                due.append(job)
+        return due
+
+    async def _run(self) -> None:
+        await self.bot.wait_until_ready()
+        loop = asyncio.get_running_loop()
+        last_sync = loop.time()
+        while True:
+            try:
+                next_due = self.next_due()
+                timeout = self.sync_interval - (loop.time() - last_sync)
+                if next_due is not None:
+                    timeout = min(timeout, next_due - datetime.now().timestamp())
+                if timeout > 0:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                if loop.time() - last_sync >= self.sync_interval:
+                    await self.sync()
+                    last_sync = loop.time()
+                due = self.pop_due(datetime.now().timestamp())
+                if due:
+                    await self.run_batch(due)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Erreur du planificateur de modération: {e}")
+                await asyncio.sleep(5)
+
+    async def run_batch(self, jobs: List[ModerationJob]) -> None:
+        """Exécute des jobs échus : levée des bans, puis mises à jour groupées en base"""
+        # Jobs annulés entre-temps par un autre processus (dashboard, actions groupées) : ignorés
+        rows = await self.db.query(
+            f"SELECT id FROM moderation_jobs WHERE id IN ({', '.join(['%s'] * len(jobs))})",
+            [job.id for job in jobs],
+            fetchall=True
+        ) or []
+        existing = {row['id'] for row in rows}
+        for job in jobs:
+            if job.id not in existing:
+                self.jobs.pop(job.id, None)
+        jobs = [job for job in jobs if job.id in existing]
+        if not jobs:
+            return
+        done, failed = [], []
+        for job in jobs:
+            try:
+                if job.action_type == 'ban':
+                    await self.lift_ban(job)
+                # Fin de timeout : Discord la lève lui-même, seul l'historique est à mettre à jour
+                done.append(job)
+            except Exception as e:
+                failed.append((job, str(e)[:255]))
+
+        if done:
+            keys = [(job.guild_id, job.user_id, job.action_type) for job in done]
+            await self.db.execute(
+                f"""UPDATE moderation_history SET is_active = FALSE
+                    WHERE is_active = TRUE AND expires_at <= NOW()
+                      AND (guild_id, user_id, action_type) IN ({', '.join(['(%s, %s, %s)'] * len(keys))})""",
+                [value for key in keys for value in key]
+            )
+            await self.db.execute(
+                f"DELETE FROM moderation_jobs WHERE id IN ({', '.join(['%s'] * len(done))})",
+                [job.id for job in done]
+            )
+            for job in done:
+                self.jobs.pop(job.id, None)
+
+        for job, error in failed:
+            job.attempts += 1
+            if job.attempts >= MAX_ATTEMPTS:
+                self.jobs.pop(job.id, None)
+                await self.db.execute(
+                    "UPDATE moderation_jobs SET status = 'failed', attempts = %s, last_error = %s WHERE id = %s",
+                    (job.attempts, error, job.id)
+                )
+                logger.error(f"Expiration {job.action_type} abandonnée pour {job.user_id} sur {job.guild_id}: {error}")
+                continue
+            job.due_at = datetime.now() + RETRY_DELAY * job.attempts
+            await self.db.execute(
+                "UPDATE moderation_jobs SET due_at = %s, attempts = %s, last_error = %s WHERE id = %s",
+                (job.due_at, job.attempts, error, job.id)
+            )
+            heapq.heappush(self.heap, (job.due_at.timestamp(), job.id))
+
+        logger.info(f"{len(done)} expiration(s) de modération exécutée(s), {len(failed)} en échec")
+
+    async def lift_ban(self, job: ModerationJob) -> None:
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return  # Le bot a quitté le serveur : rien à lever
+        try:
+            await guild.unban(discord.Object(id=job.user_id), reason="Expiration du ban temporaire")
+        except discord.NotFound:
+            pass  # Déjà débanni manuellement
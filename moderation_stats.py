@@ -0,0 +1,171 @@
+"""
+Statistiques de modération précalculées
+Chaque action enregistrée incrémente un compteur journalier (serveur, jour, type
+d'action, modérateur) et la date de dernière action subie par l'utilisateur : les
+écrans de statistiques lisent ces quelques lignes au lieu d'agréger tout
+moderation_history. reconcile() recalcule les compteurs depuis l'historique
+(rattrapage initial, puis correction périodique des jours écoulés).
+"""
+
+from datetime import date
+from typing import Dict, List, Optional
+
+STATS_WINDOW_DAYS = 30
+ACTION_TYPES = ('warn', 'timeout', 'kick', 'ban', 'unban', 'unmute')
+
+
+async def record_action(db, guild_id: int, user_id: int, moderator_id: int, action_type: str) -> None:
+    """Compte une action qui vient d'être ajoutée à moderation_history"""
+    await db.execute(
+        """INSERT INTO moderation_daily_stats (guild_id, day, action_type, moderator_id, action_count)
+           VALUES (%s, CURDATE(), %s, %s, 1)
+           ON DUPLICATE KEY UPDATE action_count = action_count + 1""",
+        (guild_id, action_type, moderator_id)
+    )
+    await db.execute(
+        """INSERT INTO moderation_user_last_action (guild_id, user_id, action_type, last_action_at)
+           VALUES (%s, %s, %s, NOW())
+           ON DUPLICATE KEY UPDATE last_action_at = GREATEST(last_action_at, VALUES(last_action_at))""",
+        (guild_id, user_id, action_type)
+    )
+
+
+async def record_actions(db, guild_id: int, moderator_id: int, action_type: str, user_ids: List[int]) -> None:
+    """Compte un lot d'actions identiques (actions groupées) en deux requêtes"""
+    if not user_ids:
+        return
+    await db.execute(
+        """INSERT INTO moderation_daily_stats (guild_id, day, action_type, moderator_id, action_count)
+           VALUES (%s, CURDATE(), %s, %s, %s)
+           ON DUPLICATE KEY UPDATE action_count = action_count + VALUES(action_count)""",
+        (guild_id, action_type, moderator_id, len(user_ids))
+    )
+    await db.execute_many(
+        """INSERT INTO moderation_user_last_action (guild_id, user_id, action_type, last_action_at)
+           VALUES (%s, %s, %s, NOW())
+           ON DUPLICATE KEY UPDATE last_action_at = GREATEST(last_action_at, VALUES(last_action_at))""",
+        [(guild_id, user_id, action_type) for user_id in user_ids]
+    )
+
+
+async def reconcile(db, since: Optional[date] = None, until: Optional[date] = None) -> int:
+    """Recalcule les compteurs des jours [since, until[ depuis moderation_history (tout l'historique par défaut)
+
+    Retourne le nombre de lignes de compteurs écrites.
+    """
+    conditions, params = [], []
+    if since:
+        conditions.append("timestamp >= %s")
+        params.append(since)
+    if until:
+        conditions.append("timestamp < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    written = await db.execute(f"""
+        INSERT INTO moderation_daily_stats (guild_id, day, action_type, moderator_id, action_count)
+        SELECT guild_id, DATE(timestamp), action_type, moderator_id, COUNT(*)
+        FROM moderation_history
+        {where}
+        GROUP BY guild_id, DATE(timestamp), action_type, moderator_id
+        ON DUPLICATE KEY UPDATE action_count = VALUES(action_count)
+    """, params or None)
+    await db.execute(f"""
+        INSERT INTO moderation_user_last_action (guild_id, user_id, action_type, last_action_at)
+        SELECT guild_id, user_id, action_type, MAX(timestamp)
+        FROM moderation_history
+        {where}
+        GROUP BY guild_id, user_id, action_type
+        ON DUPLICATE KEY UPDATE last_action_at = GREATEST(last_action_at, VALUES(last_action_at))
+    """, params or None)
+
+    # Compteurs de jours dont les actions ont disparu de l'historique
+    stale_conditions = ["NOT EXISTS (SELECT 1 FROM moderation_history mh WHERE mh.guild_id = s.guild_id "
+                        "AND mh.timestamp >= s.day AND mh.timestamp < s.day + INTERVAL 1 DAY "
+                        "AND mh.action_type = s.action_type AND mh.moderator_id = s.moderator_id)"]
+    stale_params = []
+    if since:
+        stale_conditions.append("s.day >= %s")
+        stale_params.append(since)
+    if until:
+        stale_conditions.append("s.day < %s")
+        stale_params.append(until)
+    await db.execute(
+        f"DELETE s FROM moderation_daily_stats s WHERE {' AND '.join(stale_conditions)}",
+        stale_params or None
+    )
+    return written or 0
+
+
+async def read_stats(db, guild_id: int, days: int = STATS_WINDOW_DAYS) -> Dict:
+    """Statistiques des `days` derniers jours (aujourd'hui compris)
+
+    Même forme que l'ancienne agrégation : stats par type d'action, top
+    modérateurs et totaux.
+    """
+    # Bornes calculées par la base, comme CURDATE() dans record_action
+    counters = await db.query(
+        """SELECT action_type, moderator_id, SUM(action_count) as action_count
+           FROM moderation_daily_stats
+           WHERE guild_id = %s AND day >= CURDATE() - INTERVAL %s DAY
+           GROUP BY action_type, moderator_id""",
+        (guild_id, days - 1),
+        fetchall=True
+    ) or []
+    users = await db.query(
+        """SELECT action_type, user_id
+           FROM moderation_user_last_action
+           WHERE guild_id = %s AND last_action_at >= CURDATE() - INTERVAL %s DAY""",
+        (guild_id, days - 1),
+        fetchall=True
+    ) or []
+
+    by_action: Dict[str, Dict] = {}
+    by_moderator: Dict[int, int] = {}
+    for row in counters:
+        count = int(row['action_count'])
+        entry = by_action.setdefault(row['action_type'], {
+            'action_type': row['action_type'], 'count': 0, 'unique_users': 0, 'unique_moderators': 0
+        })
+        entry['count'] += count
+        entry['unique_moderators'] += 1
+        by_moderator[row['moderator_id']] = by_moderator.get(row['moderator_id'], 0) + count
+    for row in users:
+        if row['action_type'] in by_action:
+            by_action[row['action_type']]['unique_users'] += 1
+
+    top_moderators = sorted(by_moderator.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        'stats': sorted(by_action.values(), key=lambda entry: entry['count'], reverse=True),
+        'top_moderators': [
+            {'moderator_id': moderator_id, 'action_count': count} for moderator_id, count in top_moderators
+        ],
+        'totals': {
+            'total_actions': sum(by_moderator.values()),
+            'unique_users': len({row['user_id'] for row in users}),
+            'unique_moderators': len(by_moderator)
+        }
+    }
+
+
+async def read_action_totals(db, guild_id: int) -> Dict:
+    """Totaux depuis toujours et sur le dernier mois / la dernière semaine, par type d'action"""
+    rows = await db.query(
+        """SELECT action_type,
+                  SUM(action_count) as total,
+                  SUM(CASE WHEN day >= CURDATE() - INTERVAL 1 MONTH THEN action_count ELSE 0 END) as this_month,
+                  SUM(CASE WHEN day >= CURDATE() - INTERVAL 1 WEEK THEN action_count ELSE 0 END) as this_week
+           FROM moderation_daily_stats
+           WHERE guild_id = %s
+           GROUP BY action_type""",
+        (guild_id,),
+        fetchall=True
+    ) or []
+    totals = {action: {'total': 0, 'this_month': 0, 'this_week': 0} for action in ACTION_TYPES}
+    for row in rows:
+        totals[row['action_type']] = {
+            'total': int(row['total'] or 0),
+            'this_month': int(row['this_month'] or 0),
+            'this_week': int(row['this_week'] or 0)
+        }
+    return totals
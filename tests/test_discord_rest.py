@@ -0,0 +1,130 @@
+"""
+Tests du client REST Discord partagé sur le faux Discord local (fake_discord.py)
+"""
+
+import time
+import asyncio
+
+from discord_rest import DiscordRESTClient
+from fake_discord import FakeDiscordAPI
+
+GUILD_ID = '10'
+BOT_AUTH = {'Authorization': 'Bot token'}
+DATA = {
+    'guilds': [{
+        'id': GUILD_ID,
+        'name': 'Serveur',
+        'channels': [{'id': '11', 'name': 'general', 'type': 0}],
+        'roles': [{'id': '12', 'name': 'Modérateur', 'position': 1}]
+    }]
+}
+
+
+def make_client(**kwargs):
+    api = FakeDiscordAPI(DATA, **kwargs)
+    return api, DiscordRESTClient(transport=api)
+
+
+def test_requests_wait_for_their_bucket():
+    api, client = make_client(rate_limit=2, reset_after=0.2)
+
+    async def scenario():
+        try:
+            # La première réponse fait connaître la fenêtre du bucket
+            first = await client.get(f'/guilds/{GUILD_ID}/roles', headers=BOT_AUTH)
+            started = time.monotonic()
+            responses = await asyncio.gather(*(
+                client.get(f'/guilds/{GUILD_ID}/roles', headers=BOT_AUTH) for _ in range(4)
+            ))
+            return [first, *responses], time.monotonic() - started
+        finally:
+            await client.aclose()
+
+    responses, elapsed = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert client.stats['rate_limited'] == 0
+    assert client.stats['waited_seconds'] > 0
+    assert elapsed >= 0.15
+    assert api.count('GET', f'/guilds/{GUILD_ID}/roles') == 5
+
+
+def test_retries_after_429():
+    api, client = make_client(reset_after=0.05)
+    api.force_429(2)
+
+    async def scenario():
+        try:
+            return await client.get(f'/guilds/{GUILD_ID}/channels', headers=BOT_AUTH)
+        finally:
+            await client.aclose()
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.json()[0]['name'] == 'general'
+    assert client.stats['rate_limited'] == 2
+    assert client.stats['retries'] == 2
+    assert api.count('GET', f'/guilds/{GUILD_ID}/channels') == 3
+
+
+def test_gives_up_after_max_retries():
+    api = FakeDiscordAPI(DATA, reset_after=0.01)
+    client = DiscordRESTClient(transport=api, max_retries=1)
+    api.force_429(3)
+
+    async def scenario():
+        try:
+            return await client.get(f'/guilds/{GUILD_ID}', headers=BOT_AUTH)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario()).status_code == 429
+    assert api.count('GET', f'/guilds/{GUILD_ID}') == 2
+
+
+def test_global_429_pauses_every_route_of_the_token():
+    api, client = make_client(reset_after=0.2)
+    api.force_429(1, is_global=True)
+
+    async def scenario():
+        try:
+            first = asyncio.create_task(client.get(f'/guilds/{GUILD_ID}/roles', headers=BOT_AUTH))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            # Autre route, même jeton : attend la fin de la limite globale
+            other = await client.get(f'/guilds/{GUILD_ID}/channels', headers=BOT_AUTH)
+            waited = time.monotonic() - started
+            user = await client.get('/users/@me', headers={'Authorization': 'Bearer inconnu'})
+            return await first, other, waited, user
+        finally:
+            await client.aclose()
+
+    first, other, waited, user = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert other.status_code == 200
+    assert waited >= 0.1
+    assert client.global_buckets['Bot token'].hits == 1
+    assert client.global_buckets['Bearer inconnu'].hits == 0
+    assert user.status_code == 404  # Jeton inconnu du faux Discord, mais pas bloqué
+
+
+def test_routes_sharing_a_bucket_are_merged():
+    roles, channels = 'GET /guilds/{id}/roles', 'GET /guilds/{id}/channels'
+    api, client = make_client(rate_limit=2, reset_after=0.2,
+                              shared_buckets={roles: 'partage', channels: 'partage'})
+
+    async def scenario():
+        try:
+            await client.get(f'/guilds/{GUILD_ID}/roles', headers=BOT_AUTH)
+            await client.get(f'/guilds/{GUILD_ID}/channels', headers=BOT_AUTH)
+            # Fenêtre partagée épuisée : la requête suivante attend au lieu de recevoir un 429
+            return await client.get(f'/guilds/{GUILD_ID}/channels', headers=BOT_AUTH)
+        finally:
+            await client.aclose()
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    bucket_hash = client.bucket_hashes[roles]
+    assert client.bucket_hashes[channels] == bucket_hash
+    assert ('Bot token', bucket_hash, GUILD_ID) in client.buckets
+    assert client.stats['rate_limited'] == 0
+    assert client.stats['waited_seconds'] > 0
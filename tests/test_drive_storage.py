@@ -0,0 +1,107 @@
+"""
+Tests du stockage Google Drive sur le faux Drive local (fake_drive.py)
+"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from cloud_storage import GoogleDriveStorage
+
+GUILD_ID = 123456789
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('GOOGLE_DRIVE_FAKE_DIR', str(tmp_path / 'drive'))
+    return GoogleDriveStorage(credentials_file=str(tmp_path / 'credentials.json'),
+                              token_file=str(tmp_path / 'token.json'))
+
+
+def test_upload_and_download(storage):
+    logs_data = {
+        'ticket_id': 7,
+        'messages': [{'id': 1, 'content': 'Bonjour', 'author': {'id': 42, 'name': 'membre'}}],
+        'events': [{'type': 'closed', 'user_id': 42}]
+    }
+
+    async def scenario():
+        assert await storage.initialize()
+        file_id = await storage.upload_ticket_logs(GUILD_ID, 7, logs_data)
+        archives = await storage.list_ticket_archives(GUILD_ID)
+        return file_id, archives, await storage.download_ticket_logs(file_id)
+
+    file_id, archives, downloaded = asyncio.run(scenario())
+    assert [archive['id'] for archive in archives] == [file_id]
+    assert archives[0]['name'].startswith(f"ticket_{GUILD_ID}_7_")
+    assert downloaded['messages'] == logs_data['messages']
+    assert downloaded['events'] == logs_data['events']
+    assert downloaded['metadata']['message_count'] == 1
+
+
+def test_list_follows_pagination(storage):
+    async def scenario():
+        assert await storage.initialize()
+        service = storage._service
+        # Plus d'une page de 1000 résultats, insérés directement dans l'index du faux Drive
+        for n in range(1005):
+            file_id = f"archive{n}"
+            service.files_index[file_id] = {
+                'id': file_id,
+                'name': f"ticket_{GUILD_ID}_{n}_20240101_000000.zip",
+                'mimeType': 'application/zip',
+                'parents': [storage.folder_id],
+                'createdTime': f"2024-01-01T00:00:00.{n:06d}Z",
+                'size': '10'
+            }
+        pages = []
+        list_files = service.list_files
+
+        def counting_list_files(*args):
+            pages.append(args[3])
+            return list_files(*args)
+
+        service.list_files = counting_list_files
+        return await storage.list_ticket_archives(GUILD_ID), pages
+
+    archives, pages = asyncio.run(scenario())
+    assert len(archives) == 1005
+    assert len({archive['id'] for archive in archives}) == 1005
+    assert pages == [None, '1000']
+    assert archives[0]['id'] == 'archive1004'  # createdTime desc
+
+
+def test_call_timeout(storage):
+    async def scenario():
+        assert await storage.initialize()
+        file_id = await storage.upload_ticket_logs(GUILD_ID, 1, {'messages': []})
+        storage._service.latency = 0.5
+        storage.timeout = 0.05
+        with pytest.raises(asyncio.TimeoutError):
+            await storage.read_archive(file_id)
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_cap(storage):
+    storage.max_concurrency = 2
+    storage._semaphore = asyncio.Semaphore(2)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def blocking_call():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(storage._run(blocking_call) for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak[0] == 2
@@ -0,0 +1,40 @@
+"""
+Tests de l'index des noms des membres
+"""
+
+from types import SimpleNamespace
+
+from member_index import MemberNameIndex
+
+
+def member(member_id, name, bot=False):
+    return SimpleNamespace(id=member_id, name=name, display_name=name, global_name=None, bot=bot)
+
+
+def make_index(*names):
+    members = [member(member_id, name) for member_id, name in enumerate(names, start=1)]
+    return MemberNameIndex(SimpleNamespace(id=1, chunked=True, members=members))
+
+
+def test_prefix():
+    index = make_index('alex', 'Alice', 'bob')
+    assert index.prefix('al') == [1, 2]
+    assert index.prefix('ALI') == [2]
+
+
+def test_fuzzy_finds_a_typo():
+    index = make_index('alex', 'bob', 'charlie', 'david', 'eve')
+    assert index.fuzzy('alxe')[0] == 1
+
+
+def test_fuzzy_falls_back_to_the_most_selective_trigram():
+    # Tous les trigrammes de la requête sont soit absents, soit trop courants
+    index = make_index('alex', 'alan', 'albert')
+    assert 1 in index.fuzzy('alxe')
+
+
+def test_search_skips_bots():
+    index = make_index('alex')
+    index.add(member(2, 'alexbot', bot=True))
+    assert index.search('alex') == [1]
+    assert index.search('alex', include_bots=True) == [1, 2]
@@ -0,0 +1,346 @@
+"""
+Tampon disque des transcripts de tickets ouverts
+Les messages et événements sont ajoutés à des segments JSONL locaux, seule une
+petite fin de transcript reste en mémoire
+"""
+
+import os
+import json
+import time
+import asyncio
+import shutil
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+HEADER_FILE = "header.json"
+EVENTS_FILE = "events.jsonl"
+MESSAGE_SEGMENT_PREFIX = "messages-"
+FAILED_DIR = "_failed"  # Transcripts irrécupérables, mis de côté pour inspection
+
+
+def _parses(line: bytes) -> bool:
+    try:
+        json.loads(line)
+        return True
+    except ValueError:
+        return False
+
+
+def repair_jsonl_tail(path: str) -> bool:
+    """Répare la fin d'un fichier JSONL après une écriture interrompue
+
+    Une dernière ligne illisible est tronquée (tout ce qui précède est
+    conservé) ; une dernière ligne complète à laquelle il manque le retour à la
+    ligne le récupère. Renvoie True si le fichier a été modifié.
+    """
+    with open(path, 'rb+') as f:
+        data = f.read()
+        content = data.rstrip(b'\n')
+        if not content:
+            return False
+        start = content.rfind(b'\n') + 1
+        if not _parses(content[start:]):
+            f.truncate(start)
+            logger.warning(f"Écriture interrompue tronquée en fin de {path} ({len(data) - start} octets)")
+            return True
+        if not data.endswith(b'\n'):
+            f.write(b'\n')
+            return True
+    return False
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Entrées d'un fichier JSONL ; seule une dernière ligne illisible (écriture interrompue) est ignorée"""
+    with open(path, 'r', encoding='utf-8') as f:
+        previous = None
+        for line in f:
+            if not line.strip():
+                continue
+            if previous is not None:
+                yield json.loads(previous)
+            previous = line
+    if previous is not None:
+        try:
+            entry = json.loads(previous)
+        except ValueError:
+            logger.warning(f"Dernière ligne illisible ignorée dans {path}")
+            return
+        yield entry
+
+
+class TicketTranscript:
+    """État en mémoire d'un transcript ouvert (en-tête, écritures en attente, fin)"""
+
+    __slots__ = (
+        'key', 'directory', 'header', 'pending_messages', 'pending_events', 'tail',
+        'message_count', 'event_count', 'segment_index', 'segment_size', 'last_flush', 'lock'
+    )
+
+    def __init__(self, key: str, directory: str, header: Dict[str, Any], tail_size: int):
+        self.key = key
+        self.directory = directory
+        self.header = header
+        self.pending_messages: List[str] = []
+        self.pending_events: List[str] = []
+        self.tail: Deque[Dict[str, Any]] = deque(maxlen=tail_size)
+        self.message_count = 0
+        self.event_count = 0
+        self.segment_index = 1
+        self.segment_size = 0
+        self.last_flush = time.monotonic()
+        self.lock = asyncio.Lock()  # Garde l'ordre des écritures concurrentes
+
+    def segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"{MESSAGE_SEGMENT_PREFIX}{index:06d}.jsonl")
+
+    def segment_paths(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(MESSAGE_SEGMENT_PREFIX) and name.endswith(".jsonl")
+        )
+
+
+class TranscriptBuffer:
+    """Tampon de transcripts persistant sur disque.
+
+    Chaque ticket ouvert a son propre dossier contenant un en-tête JSON, des
+    segments JSONL de messages et un fichier d'événements. Les écritures sont
+    regroupées (par nombre de lignes ou délai), la mémoire reste donc stable quel
+    que soit le nombre ou la longueur des tickets, et les transcripts survivent à
+    un redémarrage du bot.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, tail_size: int = 20, flush_lines: int = 20,
+                 flush_interval: float = 2.0, segment_bytes: int = 1024 * 1024):
+        self.base_dir = base_dir or os.getenv('TRANSCRIPT_BUFFER_DIR', os.path.join('cache_data', 'transcripts'))
+        self.tail_size = tail_size
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.transcripts: Dict[str, TicketTranscript] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.transcripts
+
+    def keys(self) -> List[str]:
+        return list(self.transcripts)
+
+    def __len__(self) -> int:
+        return len(self.transcripts)
+
+    def recover(self) -> int:
+        """Recharge les transcripts laissés sur disque par une exécution précédente"""
+        recovered = 0
+        for key in os.listdir(self.base_dir):
+            if key in self.transcripts or not os.path.isfile(os.path.join(self.base_dir, key, HEADER_FILE)):
+                continue
+            if self._load(key):
+                recovered += 1
+        return recovered
+
+    def _load(self, key: str) -> Optional[TicketTranscript]:
+        """Recharge un transcript depuis son dossier ; un dossier irrécupérable est mis de côté"""
+        directory = os.path.join(self.base_dir, key)
+        try:
+            with open(os.path.join(directory, HEADER_FILE), 'r', encoding='utf-8') as f:
+                header = json.load(f)
+            transcript = TicketTranscript(key, directory, header, self.tail_size)
+            segments = transcript.segment_paths()
+            for path in segments:
+                repair_jsonl_tail(path)
+                for entry in read_jsonl(path):
+                    transcript.message_count += 1
+                    transcript.tail.append(entry)
+            if segments:
+                transcript.segment_index = int(os.path.basename(segments[-1])[len(MESSAGE_SEGMENT_PREFIX):-6])
+                transcript.segment_size = os.path.getsize(segments[-1])
+            events_path = os.path.join(directory, EVENTS_FILE)
+            if os.path.exists(events_path):
+                repair_jsonl_tail(events_path)
+                transcript.event_count = sum(1 for _ in read_jsonl(events_path))
+        except Exception as e:
+            logger.error(f"Transcript {key} illisible, mis de côté dans {FAILED_DIR}: {e}")
+            self._set_aside(key)
+            return None
+        self.transcripts[key] = transcript
+        return transcript
+
+    def _set_aside(self, key: str) -> None:
+        """Déplace un dossier irrécupérable hors du tampon : il n'est jamais réutilisé ni complété"""
+        target = os.path.join(self.base_dir, FAILED_DIR, f"{key}-{int(time.time())}")
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(os.path.join(self.base_dir, key), target)
+        except OSError as e:
+            logger.error(f"Impossible de mettre de côté le transcript {key}: {e}")
+
+    def ensure(self, key: str, header: Dict[str, Any]) -> TicketTranscript:
+        """Retourne le transcript d'un ticket, en le créant si nécessaire"""
+        transcript = self.transcripts.get(key)
+        if transcript is None:
+            directory = os.path.join(self.base_dir, key)
+            if os.path.isfile(os.path.join(directory, HEADER_FILE)):
+                # Dossier non rechargé : le reprendre plutôt que d'écrire par-dessus
+                transcript = self._load(key)
+                if transcript is not None:
+                    return transcript
+                if os.path.exists(directory):
+                    raise RuntimeError(f"Transcript {key} irrécupérable toujours présent dans {directory}")
+            os.makedirs(directory, exist_ok=True)
+            transcript = TicketTranscript(key, directory, dict(header), self.tail_size)
+            self.transcripts[key] = transcript
+            self._write_header(transcript)
+        return transcript
+
+    def update_header(self, key: str, **fields) -> bool:
+        """Ajoute des champs à l'en-tête d'un transcript (infos utilisateur, statut...)"""
+        transcript = self.transcripts.get(key)
+        if transcript is None:
+            return False
+        transcript.header.update(fields)
+        self._write_header(transcript)
+        return True
+
+    def get_header(self, key: str) -> Optional[Dict[str, Any]]:
+        transcript = self.transcripts.get(key)
+        return transcript.header if transcript else None
+
+    def _write_header(self, transcript: TicketTranscript) -> None:
+        path = os.path.join(transcript.directory, HEADER_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(transcript.header, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def append_message(self, key: str, entry: Dict[str, Any]) -> None:
+        transcript = self.transcripts[key]
+        if transcript.message_count == 0:
+            # Conservé pour les métadonnées de l'archive (repli sur l'auteur du premier message)
+            self.update_header(key, first_message=entry)
+        participants = transcript.header.setdefault("participants", {})
+        author_id = entry.get("author_id")
+        if author_id and author_id not in participants:
+            # Liste des participants pour l'index des transcripts (en-tête réécrit seulement à l'arrivée d'un nouvel auteur)
+            participants[author_id] = entry.get("author_name")
+            self._write_header(transcript)
+        transcript.pending_messages.append(json.dumps(entry, ensure_ascii=False))
+        transcript.tail.append(entry)
+        transcript.message_count += 1
+        await self._maybe_flush(transcript)
+
+    async def append_event(self, key: str, entry: Dict[str, Any]) -> None:
+        transcript = self.transcripts[key]
+        transcript.pending_events.append(json.dumps(entry, ensure_ascii=False))
+        transcript.event_count += 1
+        await self._maybe_flush(transcript)
+
+    async def _maybe_flush(self, transcript: TicketTranscript) -> None:
+        pending = len(transcript.pending_messages) + len(transcript.pending_events)
+        if pending >= self.flush_lines or time.monotonic() - transcript.last_flush >= self.flush_interval:
+            await self._flush(transcript)
+
+    async def _flush(self, transcript: TicketTranscript) -> None:
+        async with transcript.lock:
+            await self._write_pending(transcript)
+
+    async def _write_pending(self, transcript: TicketTranscript) -> None:
+        transcript.last_flush = time.monotonic()
+        if transcript.pending_messages:
+            lines, transcript.pending_messages = transcript.pending_messages, []
+            data = "\n".join(lines) + "\n"
+            if transcript.segment_size and transcript.segment_size + len(data) > self.segment_bytes:
+                transcript.segment_index += 1
+                transcript.segment_size = 0
+            async with aiofiles.open(transcript.segment_path(transcript.segment_index), 'a', encoding='utf-8') as f:
+                await f.write(data)
+            transcript.segment_size += len(data)
+        if transcript.pending_events:
+            lines, transcript.pending_events = transcript.pending_events, []
+            async with aiofiles.open(os.path.join(transcript.directory, EVENTS_FILE), 'a', encoding='utf-8') as f:
+                await f.write("\n".join(lines) + "\n")
+
+    async def flush(self, key: str) -> None:
+        transcript = self.transcripts.get(key)
+        if transcript:
+            await self._flush(transcript)
+
+    async def flush_all(self) -> None:
+        for transcript in list(self.transcripts.values()):
+            try:
+                await self._flush(transcript)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture du transcript {transcript.key}: {e}")
+
+    async def flush_due(self) -> int:
+        """Écrit les transcripts dont des lignes attendent depuis plus de flush_interval"""
+        flushed = 0
+        now = time.monotonic()
+        for transcript in list(self.transcripts.values()):
+            if not (transcript.pending_messages or transcript.pending_events):
+                continue
+            if now - transcript.last_flush < self.flush_interval:
+                continue
+            try:
+                await self._flush(transcript)
+                flushed += 1
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture du transcript {transcript.key}: {e}")
+        return flushed
+
+    def start_flusher(self) -> None:
+        """Écriture périodique : un ticket calme ne garde pas ses dernières lignes en mémoire"""
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop_flusher(self) -> None:
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_due()
+
+    def tail(self, key: str) -> List[Dict[str, Any]]:
+        """Derniers messages du transcript (gardés en mémoire)"""
+        transcript = self.transcripts.get(key)
+        return list(transcript.tail) if transcript else []
+
+    def counts(self, key: str) -> Dict[str, int]:
+        transcript = self.transcripts.get(key)
+        if not transcript:
+            return {"messages": 0, "events": 0}
+        return {"messages": transcript.message_count, "events": transcript.event_count}
+
+    def iter_messages(self, key: str) -> Iterator[Dict[str, Any]]:
+        """Relit les messages depuis les segments (appeler flush() avant)"""
+        transcript = self.transcripts[key]
+        for path in transcript.segment_paths():
+            yield from read_jsonl(path)
+
+    def iter_events(self, key: str) -> Iterator[Dict[str, Any]]:
+        """Relit les événements depuis le disque (appeler flush() avant)"""
+        transcript = self.transcripts[key]
+        path = os.path.join(transcript.directory, EVENTS_FILE)
+        if not os.path.exists(path):
+            return
+        yield from read_jsonl(path)
+
+    def discard(self, key: str) -> None:
+        """Supprime un transcript après archivage"""
+        transcript = self.transcripts.pop(key, None)
+        if transcript:
+            shutil.rmtree(transcript.directory, ignore_errors=True)
@@ -0,0 +1,545 @@
+"""
+Index des transcripts de tickets archivés
+Une ligne par archive (serveur, ticket, propriétaire, participants, dates,
+compteurs, fichier) pour répondre aux recherches par utilisateur ou par serveur
+sans télécharger les archives, et un index plein texte du contenu des messages
+"""
+
+import os
+import re
+import html
+import json
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Taille minimale d'un mot indexé par InnoDB (innodb_ft_min_token_size)
+MIN_TOKEN_SIZE = 3
+
+# Mots vides par défaut d'InnoDB : jamais indexés, donc jamais exigés dans une recherche
+_STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how",
+    "i", "in", "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "who", "will", "with", "und", "www"
+}
+
+# Entrées de la table migrations marquant la fin de l'indexation des archives existantes
+BACKFILL_MARKER = "backfill_ticket_transcripts"
+SEARCH_BACKFILL_MARKER = "backfill_ticket_transcript_messages"
+
+_FILENAME_PATTERN = re.compile(r"^ticket_(\d+)_(\d+)_")
+
+_SUMMARY_COLUMNS = """
+    file_id, filename, size_bytes, guild_id, ticket_id, user_id, username, discriminator,
+    display_name, avatar_url, participants, message_count, event_count, status,
+    opened_at, closed_at, first_message_at, last_message_at, archived_at
+"""
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    """Convertit une date ISO (Discord, Drive ou locale) en DATETIME naïf UTC"""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TranscriptIndex:
+    """Index SQL des archives de tickets (tables ticket_transcripts et ticket_transcript_messages).
+
+    Alimenté à la finalisation de chaque ticket, et une fois pour les archives
+    plus anciennes via backfill(). Les listes retournées ont la même forme que
+    celles de TranscriptStorage.list_all_ticket_logs, sans les messages ni les
+    événements (à télécharger à la demande via file_id). Le contenu des messages
+    est indexé en plein texte pour la recherche du dashboard.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.backfilled = False
+        self.search_backfilled = False
+
+    @staticmethod
+    def build_row(file: Dict, metadata: Dict, participants: Dict[str, str],
+                  first_message_at: Optional[str] = None, last_message_at: Optional[str] = None) -> Dict:
+        """Construit une ligne d'index à partir du fichier archivé et de metadata.json"""
+        guild_id = _int_or_none(metadata.get("guild_id"))
+        ticket_id = _int_or_none(metadata.get("ticket_id"))
+        match = _FILENAME_PATTERN.match(file.get("name", ""))
+        if match and (guild_id is None or ticket_id is None):
+            guild_id, ticket_id = int(match.group(1)), int(match.group(2))
+
+        user_id = _int_or_none(metadata.get("user_id"))
+        participants = dict(participants)
+        if user_id and str(user_id) not in participants:
+            participants[str(user_id)] = metadata.get("display_name") or metadata.get("username")
+
+        return {
+            "file_id": file["id"],
+            "filename": file.get("name"),
+            "size_bytes": _int_or_none(file.get("size")) or 0,
+            "guild_id": guild_id,
+            "ticket_id": ticket_id,
+            "user_id": user_id,
+            "username": metadata.get("username"),
+            "discriminator": metadata.get("discriminator"),
+            "display_name": metadata.get("display_name"),
+            "avatar_url": metadata.get("avatar_url"),
+            "participants": json.dumps(participants, ensure_ascii=False),
+            "message_count": metadata.get("message_count") or 0,
+            "event_count": metadata.get("event_count") or 0,
+            "status": metadata.get("status") or "closed",
+            "opened_at": _parse_datetime(metadata.get("created_at")),
+            "closed_at": _parse_datetime(metadata.get("closed_at")),
+            "first_message_at": _parse_datetime(first_message_at),
+            "last_message_at": _parse_datetime(last_message_at),
+            "archived_at": _parse_datetime(file.get("createdTime")) or datetime.utcnow()
+        }
+
+    @classmethod
+    def build_row_from_logs(cls, file: Dict, logs_data: Dict) -> Dict:
+        """Construit une ligne d'index à partir d'une archive téléchargée (backfill)"""
+        messages = logs_data.get("messages", [])
+        metadata = dict(logs_data.get("metadata") or {})
+        metadata.setdefault("guild_id", logs_data.get("guild_id"))
+        metadata.setdefault("ticket_id", logs_data.get("ticket_id"))
+        metadata.setdefault("message_count", len(messages))
+        metadata.setdefault("event_count", len(logs_data.get("events", [])))
+        if not metadata.get("user_id") and messages:
+            first_message = messages[0]
+            metadata.update({
+                "user_id": first_message.get("author_id"),
+                "username": first_message.get("author_username"),
+                "discriminator": first_message.get("author_discriminator"),
+                "display_name": first_message.get("author_name"),
+                "avatar_url": first_message.get("author_avatar_url")
+            })
+
+        participants = {}
+        for message in messages:
+            author_id = message.get("author_id")
+            if author_id and author_id not in participants:
+                participants[author_id] = message.get("author_name")
+
+        return cls.build_row(
+            file, metadata, participants,
+            messages[0].get("timestamp") if messages else None,
+            messages[-1].get("timestamp") if messages else None
+        )
+
+    async def record(self, row: Dict) -> bool:
+        """Ajoute ou met à jour une archive dans l'index"""
+        columns = list(row.keys())
+        updates = ", ".join(f"{column} = VALUES({column})" for column in columns if column != "file_id")
+        try:
+            await self.db.execute(
+                f"INSERT INTO ticket_transcripts ({', '.join(columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {updates}",
+                tuple(row[column] for column in columns)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation du transcript {row.get('file_id')}: {e}")
+            return False
+
+    async def remove(self, file_ids: Iterable[str]) -> None:
+        """Retire des archives supprimées de l'index et de l'index plein texte"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(file_ids))
+        await self.db.execute(f"DELETE FROM ticket_transcripts WHERE file_id IN ({placeholders})", tuple(file_ids))
+        await self.db.execute(
+            f"DELETE FROM ticket_transcript_messages WHERE file_id IN ({placeholders})", tuple(file_ids)
+        )
+
+    @staticmethod
+    def _summary(row: Dict) -> Dict:
+        """Ligne SQL -> même forme que les entrées de list_all_ticket_logs (sans messages)"""
+        try:
+            participants = json.loads(row.get("participants") or "{}")
+        except (TypeError, ValueError):
+            participants = {}
+        return {
+            "file_id": row["file_id"],
+            "filename": row.get("filename"),
+            "created_time": _isoformat(row.get("archived_at")),
+            "size": row.get("size_bytes") or 0,
+            "message_count": row.get("message_count") or 0,
+            "event_count": row.get("event_count") or 0,
+            "ticket_id": str(row["ticket_id"]) if row.get("ticket_id") else "Inconnu",
+            "user_id": str(row["user_id"]) if row.get("user_id") else "Inconnu",
+            "username": row.get("username") or "Inconnu",
+            "discriminator": row.get("discriminator") or "0000",
+            "display_name": row.get("display_name") or row.get("username") or "Inconnu",
+            "avatar_url": row.get("avatar_url"),
+            "participants": [{"id": user_id, "name": name} for user_id, name in participants.items()],
+            "created_at": _isoformat(row.get("opened_at")) or "Inconnu",
+            "status": row.get("status") or "closed",
+            "closed_at": _isoformat(row.get("closed_at")),
+            "first_message_at": _isoformat(row.get("first_message_at")),
+            "last_message_at": _isoformat(row.get("last_message_at"))
+        }
+
+    async def list_user(self, guild_id: int, user_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """Archives dont l'utilisateur est le propriétaire, les plus récentes d'abord"""
+        sql = (f"SELECT {_SUMMARY_COLUMNS} FROM ticket_transcripts "
+               "WHERE guild_id = %s AND user_id = %s ORDER BY archived_at DESC, id DESC")
+        params = [guild_id, user_id]
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        rows = await self.db.query(sql, tuple(params), fetchall=True)
+        return [self._summary(row) for row in (rows or [])]
+
+    async def list_guild(self, guild_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Archives d'un serveur, les plus récentes d'abord"""
+        sql = (f"SELECT {_SUMMARY_COLUMNS} FROM ticket_transcripts "
+               "WHERE guild_id = %s ORDER BY archived_at DESC, id DESC")
+        params = [guild_id]
+        if limit:
+            sql += " LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
+        rows = await self.db.query(sql, tuple(params), fetchall=True)
+        return [self._summary(row) for row in (rows or [])]
+
+    async def guild_of(self, file_id: str) -> Optional[int]:
+        """Serveur d'une archive indexée (None si l'archive n'est pas dans l'index)"""
+        row = await self.db.query(
+            "SELECT guild_id FROM ticket_transcripts WHERE file_id = %s", (file_id,), fetchone=True
+        )
+        return int(row['guild_id']) if row else None
+
+    async def find_ticket(self, guild_id: int, ticket_id: int) -> Optional[Dict]:
+        """Dernière archive d'un ticket (ticket_id = ID du canal)"""
+        row = await self.db.query(
+            f"SELECT {_SUMMARY_COLUMNS} FROM ticket_transcripts "
+            "WHERE guild_id = %s AND ticket_id = %s ORDER BY archived_at DESC, id DESC LIMIT 1",
+            (guild_id, ticket_id),
+            fetchone=True
+        )
+        return self._summary(row) if row else None
+
+    async def search_users(self, guild_id: int, query: str, limit: int = 10) -> List[Dict]:
+        """Propriétaires de tickets dont l'ID ou le nom contient la recherche, avec leur nombre de tickets"""
+        pattern = f"%{query}%"
+        rows = await self.db.query(
+            """SELECT user_id, MAX(username) AS username, MAX(display_name) AS display_name,
+                      MAX(discriminator) AS discriminator, MAX(avatar_url) AS avatar_url,
+                      COUNT(*) AS ticket_count,
+                      MAX(archived_at) AS last_ticket_at
+               FROM ticket_transcripts
+               WHERE guild_id = %s AND user_id IS NOT NULL
+                 AND (CAST(user_id AS CHAR) LIKE %s OR username LIKE %s OR display_name LIKE %s)
+               GROUP BY user_id
+               ORDER BY last_ticket_at DESC
+               LIMIT %s""",
+            (guild_id, pattern, pattern, pattern, limit),
+            fetchall=True
+        )
+        return [
+            {
+                "user_id": str(row["user_id"]),
+                "username": row.get("username") or row.get("display_name") or "Inconnu",
+                "display_name": row.get("display_name") or row.get("username") or "Inconnu",
+                "discriminator": row.get("discriminator") or "0000",
+                "avatar_url": row.get("avatar_url"),
+                "ticket_count": row["ticket_count"],
+                "last_ticket_at": _isoformat(row.get("last_ticket_at"))
+            }
+            for row in (rows or [])
+        ]
+
+    async def guild_stats(self, guild_id: int) -> Dict[str, int]:
+        """Nombre d'archives, de propriétaires distincts et de messages d'un serveur"""
+        row = await self.db.query(
+            """SELECT COUNT(*) AS total_tickets, COUNT(DISTINCT user_id) AS unique_users,
+                      COALESCE(SUM(message_count), 0) AS total_messages
+               FROM ticket_transcripts WHERE guild_id = %s""",
+            (guild_id,),
+            fetchone=True
+        ) or {}
+        return {
+            "total_tickets": int(row.get("total_tickets") or 0),
+            "unique_users": int(row.get("unique_users") or 0),
+            "total_messages": int(row.get("total_messages") or 0)
+        }
+
+    async def indexed_file_ids(self, table: str = "ticket_transcripts") -> Set[str]:
+        rows = await self.db.query(f"SELECT DISTINCT file_id FROM {table}", fetchall=True)
+        return {row["file_id"] for row in (rows or [])}
+
+    # ---- Recherche plein texte (table ticket_transcript_messages, index FULLTEXT MySQL) ----
+
+    @staticmethod
+    def _message_row(file_id: str, guild_id: int, ticket_id: int, message: Dict) -> Tuple:
+        parts = [message.get("content") or ""]
+        for embed in message.get("embeds") or []:
+            parts.extend(filter(None, (embed.get("title"), embed.get("description"))))
+        return (
+            file_id, guild_id, ticket_id,
+            _int_or_none(message.get("message_id")),
+            _int_or_none(message.get("author_id")),
+            (message.get("author_name") or "")[:100],
+            "\n".join(part for part in parts if part),
+            _parse_datetime(message.get("timestamp"))
+        )
+
+    async def index_messages(self, file_id: str, guild_id: int, ticket_id: int,
+                             messages: Iterable[Dict], batch_size: int = 500) -> int:
+        """Ajoute le contenu des messages d'une archive à l'index plein texte (par lots)"""
+        sql = (
+            "INSERT INTO ticket_transcript_messages "
+            "(file_id, guild_id, ticket_id, message_id, author_id, author_name, content, sent_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+        )
+        await self.db.execute("DELETE FROM ticket_transcript_messages WHERE file_id = %s", (file_id,))
+        total = 0
+        iterator = iter(messages)
+        while True:
+            # Lecture des segments sur disque hors de la boucle d'événements
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(iterator, batch_size)))
+            if not batch:
+                return total
+            rows = [self._message_row(file_id, guild_id, ticket_id, message) for message in batch]
+            rows = [row for row in rows if row[6] or row[5]]
+            await self.db.execute_many(sql, rows)
+            total += len(rows)
+
+    @staticmethod
+    def _boolean_query(query: str) -> Tuple[str, List[str]]:
+        """Requête MATCH ... IN BOOLEAN MODE où chaque terme est obligatoire, plus les termes à surligner"""
+        terms = [term for term in re.findall(r"[\w'@.#:/-]+", query) if term.strip("'@.#:/-")]
+        clauses = []
+        used = []
+        for term in terms[:10]:
+            if re.fullmatch(r"\w+", term):
+                if len(term) < MIN_TOKEN_SIZE or term.lower() in _STOPWORDS:
+                    continue
+                clauses.append(f"+{term}*")
+            else:
+                # Identifiants (commande, URL...) : recherchés comme une phrase
+                clauses.append('+"' + term.replace('"', '') + '"')
+            used.append(term)
+        return " ".join(clauses), used
+
+    @staticmethod
+    def _snippet(content: str, terms: List[str], width: int = 160) -> str:
+        """Extrait autour du premier terme trouvé, termes entourés de <mark> (HTML échappé)"""
+        content = " ".join((content or "").split())
+        pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+                             re.IGNORECASE) if terms else None
+        match = pattern.search(content) if pattern else None
+        start = max(0, match.start() - width // 2) if match else 0
+        end = min(len(content), start + width)
+        excerpt = content[start:end]
+
+        parts = []
+        position = 0
+        for found in (pattern.finditer(excerpt) if pattern else ()):
+            parts.append(html.escape(excerpt[position:found.start()]))
+            parts.append(f"<mark>{html.escape(found.group())}</mark>")
+            position = found.end()
+        parts.append(html.escape(excerpt[position:]))
+        return ("…" if start else "") + "".join(parts) + ("…" if end < len(content) else "")
+
+    async def search(self, guild_id: int, query: str, page: int = 1, per_page: int = 20,
+                     snippets_per_ticket: int = 3) -> Dict[str, Any]:
+        """Recherche plein texte dans les transcripts d'un serveur, paginée par ticket"""
+        page = max(1, page)
+        per_page = max(1, min(per_page, 50))
+        boolean_query, terms = self._boolean_query(query)
+        result = {"query": query, "page": page, "per_page": per_page, "total": 0, "pages": 0, "results": []}
+        if not boolean_query:
+            return result
+
+        match = "MATCH(content, author_name) AGAINST(%s IN BOOLEAN MODE)"
+        total = await self.db.query(
+            f"SELECT COUNT(DISTINCT file_id) AS total FROM ticket_transcript_messages "
+            f"WHERE guild_id = %s AND {match}",
+            (guild_id, boolean_query),
+            fetchone=True
+        )
+        result["total"] = int((total or {}).get("total") or 0)
+        result["pages"] = (result["total"] + per_page - 1) // per_page
+        if not result["total"]:
+            return result
+
+        tickets = await self.db.query(
+            f"SELECT file_id, COUNT(*) AS hits, MAX({match}) AS score, MAX(sent_at) AS last_hit_at "
+            f"FROM ticket_transcript_messages WHERE guild_id = %s AND {match} "
+            f"GROUP BY file_id ORDER BY score DESC, last_hit_at DESC LIMIT %s OFFSET %s",
+            (boolean_query, guild_id, boolean_query, per_page, (page - 1) * per_page),
+            fetchall=True
+        ) or []
+        file_ids = [row["file_id"] for row in tickets]
+        if not file_ids:
+            return result
+        placeholders = ", ".join(["%s"] * len(file_ids))
+
+        summaries = await self.db.query(
+            f"SELECT {_SUMMARY_COLUMNS} FROM ticket_transcripts WHERE file_id IN ({placeholders})",
+            tuple(file_ids),
+            fetchall=True
+        ) or []
+        summaries = {row["file_id"]: self._summary(row) for row in summaries}
+
+        messages = await self.db.query(
+            f"SELECT file_id, message_id, author_id, author_name, content, sent_at, {match} AS score "
+            f"FROM ticket_transcript_messages WHERE file_id IN ({placeholders}) AND {match} "
+            f"ORDER BY score DESC, sent_at ASC",
+            (boolean_query, *file_ids, boolean_query),
+            fetchall=True
+        ) or []
+        snippets: Dict[str, List[Dict]] = {}
+        for message in messages:
+            ticket_snippets = snippets.setdefault(message["file_id"], [])
+            if len(ticket_snippets) < snippets_per_ticket:
+                ticket_snippets.append({
+                    "message_id": str(message["message_id"]) if message.get("message_id") else None,
+                    "author_id": str(message["author_id"]) if message.get("author_id") else None,
+                    "author_name": message.get("author_name"),
+                    "timestamp": _isoformat(message.get("sent_at")),
+                    "snippet": self._snippet(message.get("content"), terms)
+                })
+
+        for row in tickets:
+            summary = summaries.get(row["file_id"]) or {"file_id": row["file_id"]}
+            result["results"].append({
+                **summary,
+                "hits": row["hits"],
+                "snippets": snippets.get(row["file_id"], [])
+            })
+        return result
+
+    # ---- Indexation des archives existantes ----
+
+    async def _has_marker(self, marker: str) -> bool:
+        try:
+            row = await self.db.query(
+                "SELECT id FROM migrations WHERE filename = %s", (marker,), fetchone=True
+            )
+        except Exception:
+            return False
+        return bool(row)
+
+    async def _set_marker(self, marker: str) -> None:
+        await self.db.execute("INSERT IGNORE INTO migrations (filename) VALUES (%s)", (marker,))
+
+    async def is_backfilled(self) -> bool:
+        """Vrai une fois les archives antérieures à l'index toutes indexées"""
+        if not self.backfilled:
+            self.backfilled = await self._has_marker(BACKFILL_MARKER)
+        return self.backfilled
+
+    async def is_search_ready(self) -> bool:
+        """Vrai une fois le contenu des archives antérieures ajouté à l'index plein texte"""
+        if not self.search_backfilled:
+            self.search_backfilled = await self._has_marker(SEARCH_BACKFILL_MARKER)
+        return self.search_backfilled
+
+    async def backfill(self, storage, batch_size: int = 8, force: bool = False) -> int:
+        """Indexe les archives stockées absentes de l'index (tâche unique, reprise possible).
+
+        Seules les archives manquantes dans l'index ou dans l'index plein texte
+        sont téléchargées, par lots pour borner la mémoire. Chaque marqueur n'est
+        posé que si toutes les archives concernées ont pu être indexées.
+        """
+        need_rows = force or not await self.is_backfilled()
+        need_text = force or not await self.is_search_ready()
+        if not need_rows and not need_text:
+            return 0
+
+        files = await storage.list_ticket_archives()
+        indexed = await self.indexed_file_ids() if need_rows else {file["id"] for file in files}
+        searchable = (await self.indexed_file_ids("ticket_transcript_messages")
+                      if need_text else {file["id"] for file in files})
+        missing = [file for file in files if file["id"] not in indexed or file["id"] not in searchable]
+        logger.info(f"Indexation des transcripts: {len(missing)} archive(s) à indexer sur {len(files)}")
+
+        added = 0
+        failed = 0
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            results = await asyncio.gather(*(storage.download_ticket_logs(file["id"]) for file in batch))
+            for file, logs_data in zip(batch, results):
+                if not logs_data:
+                    failed += 1
+                    continue
+                row = self.build_row_from_logs(file, logs_data)
+                try:
+                    if file["id"] not in indexed:
+                        if not await self.record(row):
+                            failed += 1
+                            continue
+                        added += 1
+                    if file["id"] not in searchable:
+                        await self.index_messages(
+                            file["id"], row["guild_id"], row["ticket_id"], logs_data.get("messages", [])
+                        )
+                except Exception as e:
+                    logger.error(f"Erreur lors de l'indexation de l'archive {file['id']}: {e}")
+                    failed += 1
+
+        if not failed:
+            if need_rows:
+                await self._set_marker(BACKFILL_MARKER)
+                self.backfilled = True
+            if need_text:
+                await self._set_marker(SEARCH_BACKFILL_MARKER)
+                self.search_backfilled = True
+        logger.info(f"Indexation des transcripts terminée: {added} ajoutée(s), {failed} échec(s)")
+        return added
+
+
+async def _run_backfill():
+    """Lance l'indexation des archives existantes : python transcript_index.py"""
+    from dotenv import load_dotenv
+    from db import Database
+    from cloud_storage import create_transcript_storage
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    db = Database(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '3306')),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASS', ''),
+        db=os.getenv('DB_NAME', 'maybebot')
+    )
+    await db.connect()
+    storage = create_transcript_storage()
+    try:
+        if not await storage.initialize():
+            print(f"❌ Stockage des transcripts ({storage.backend_name}) non disponible")
+            return
+        added = await TranscriptIndex(db).backfill(storage, force=True)
+        print(f"✅ {added} archive(s) indexée(s)")
+    finally:
+        await storage.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_backfill())
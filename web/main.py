@@ -8,7 +8,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import os
@@ -16,17 +16,20 @@ import sys
 import json
 import asyncio
 import traceback
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Set
 import httpx
 from jose import JWTError, jwt
 import secrets
+import hmac
+import hashlib
+import time
 from pydantic import BaseModel
 import aiomysql
 from pathlib import Path
 from dotenv import load_dotenv
 import re
-from urllib.parse import urlencode
+from urllib.parse import quote, urlencode
 
 WEB_DIR = Path(__file__).resolve().parent
 
@@ -38,7 +41,19 @@ load_dotenv("../.env")  # Load from parent directory (main .env)
 import sys
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from db import Database
-from cloud_storage import GoogleDriveStorage
+from cloud_storage import LOCAL_FILE_ID_PATTERN, create_transcript_storage
+from transcript_index import TranscriptIndex
+from attachment_archiver import ATTACHMENT_URL_PREFIX, SHA256_PATTERN
+from moderation_stats import read_stats as read_moderation_stats, record_action as record_moderation_stats
+from moderation_history import MAX_PAGE_SIZE as MAX_HISTORY_PAGE_SIZE, build_filters as build_history_filters, count_history, fetch_history_page
+from bulk_moderation import BULK_ACTIONS, MAX_BULK_TARGETS, BulkActionExecutor, BulkJob, RateLimited
+from moderation_scheduler import cancel_expirations, enqueue_expirations
+from discord_rest import DiscordRESTClient, close_client as close_discord_client, get_client as get_discord_client
+from guild_metadata import DiscordAPIError, GuildMetadataCache
+from bot_ipc_client import BotIPCClient
+from guild_access import (BAN_MEMBERS, KICK_MEMBERS, MODERATE_MEMBERS, BotGuildSet, UserGuildCache,
+                          admin_guilds, guild_permissions, has_permission)
+from guild_stats import GuildStatsCache, load_guild_stats
 
 # Language support
 SUPPORTED_LANGUAGES = ['fr']
@@ -105,6 +120,8 @@ async def lifespan(app: FastAPI):
         await create_level_roles_table()  # Add level roles table
         await create_embed_config_table()  # Add embed config table
         await create_rules_validation_table()  # Add rules validation table
+        await create_config_versions_table()  # Config versions watched by the bot's interaction router
+        await create_bot_guilds_table()  # Guild list published by the bot for access checks
         await create_level_up_config_table()  # Add level up config table
         await create_feur_mode_table()  # Add feur mode table
         await migrate_level_up_config_show_avatar()  # Add show_user_avatar column
@@ -113,16 +130,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Startup running in limited mode (database unavailable): {e}")
 
-    # Initialize Google Drive Storage
-    global drive_storage
-    drive_storage = GoogleDriveStorage()
+    # Initialize transcript storage (Google Drive or local disk, see TRANSCRIPT_STORAGE)
+    global transcript_storage
     try:
-        await drive_storage.initialize()
+        transcript_storage = create_transcript_storage()
+        await transcript_storage.initialize()
     except Exception as e:
-        print(f"⚠️ Google Drive storage disabled: {e}")
+        print(f"⚠️ Transcript storage disabled: {e}")
+    
+    # Transcript index (filled by the bot at ticket finalization and by its one-time backfill)
+    global transcript_index, bulk_executor
+    if database:
+        transcript_index = TranscriptIndex(database)
+        bulk_executor = BulkActionExecutor(database)
+    
+    # Bot guild set used by guild access checks (bot_guilds table, Discord API as fallback)
+    try:
+        await bot_guild_set.start()
+    except Exception as e:
+        print(f"⚠️ Bot guild set unavailable: {e}")
     
     yield
     # Shutdown
+    await bot_guild_set.stop()
+    if bulk_executor:
+        await bulk_executor.close()
+    await close_discord_client()
+    await bot_ipc.aclose()
+    if transcript_storage:
+        await transcript_storage.close()
     if database:
         await database.close()
 
@@ -199,7 +235,15 @@ print(f"  - DISCORD_CLIENT_SECRET: {'✅ Found' if DISCORD_CLIENT_SECRET else '
 
 # Database
 database = None
-drive_storage = None  # Global storage instance
+transcript_storage = None  # Global storage instance
+transcript_index = None  # SQL index of archived ticket transcripts
+bulk_executor = None  # Bulk moderation jobs (rate-limited worker pool)
+
+async def get_transcript_index() -> Optional[TranscriptIndex]:
+    """Return the transcript index once the bot has indexed the existing archives"""
+    if transcript_index and await transcript_index.is_backfilled():
+        return transcript_index
+    return None
 
 app = FastAPI(
     title="Maybee Dashboard",
@@ -275,9 +319,19 @@ print(f"  - DISCORD_CLIENT_SECRET: {'✅ Found' if DISCORD_CLIENT_SECRET else '
 # Database
 database = None
 
-# Cache for guild access verification
-guild_access_cache = {}
-guild_access_cache_ttl = 300  # 5 minutes
+# Guild access verification: the bot's guild set (refreshed in the background) and
+# each user's admin guilds (bounded LRU, kept until their session expires)
+bot_guild_set = BotGuildSet(get_discord_client, DISCORD_BOT_TOKEN, lambda: database)
+user_guild_cache = UserGuildCache()
+
+# Dashboard home stats: one aggregate query per guild, served stale-while-revalidate
+guild_stats = GuildStatsCache(lambda guild_id: load_guild_stats(database, guild_id))
+
+# Local IPC API of the bot (gateway cache and commands); REST/database fallbacks when unavailable
+bot_ipc = BotIPCClient()
+
+# Short-lived cache of Discord guild channels, roles and info shared by all endpoints
+guild_metadata = GuildMetadataCache(get_discord_client, DISCORD_BOT_TOKEN, ipc=bot_ipc)
 
 # Pydantic models
 class User(BaseModel):
@@ -376,6 +430,14 @@ class ModerationAction(BaseModel):
     duration: Optional[int] = None  # For timeout duration in minutes
     channel_id: Optional[str] = None  # For sending log messages
 
+class BulkModerationAction(BaseModel):
+    action: str  # "timeout", "kick", "ban"
+    user_ids: List[str] = []
+    joined_within_minutes: Optional[int] = None  # Also target members who joined in the last N minutes
+    reason: Optional[str] = "No reason provided"
+    duration: Optional[int] = None  # For timeout duration in minutes
+    channel_id: Optional[str] = None  # Channel for the summary log message
+
 # Ticket System Models
 class TicketButton(BaseModel):
     id: Optional[int] = None
@@ -513,24 +575,23 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
 
-async def get_user_guilds(access_token: str) -> List[Dict]:
-    """Get user's Discord guilds"""
+async def fetch_user_guild_list(access_token: str) -> List[Dict]:
+    """All of the user's guilds with their permissions, straight from Discord (raises on failure)"""
+    response = await get_discord_client().get(
+        "https://discord.com/api/users/@me/guilds",
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=10.0
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Discord API error when fetching user guilds: {response.status_code}")
+    return response.json()
+
+async def get_user_guild_list(access_token: str, expires_at: Optional[float] = None) -> List[Dict]:
+    """All of the user's Discord guilds, cached until the session expires"""
+    if not access_token:
+        return []
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {"Authorization": f"Bearer {access_token}"}
-            response = await client.get("https://discord.com/api/users/@me/guilds", headers=headers)
-            if response.status_code == 200:
-                guilds = response.json()
-                # Filter guilds where user has admin permissions
-                admin_guilds = []
-                for guild in guilds:
-                    permissions = int(guild.get("permissions", 0))
-                    if permissions & 0x8:  # Administrator permission
-                        admin_guilds.append(guild)
-                return admin_guilds
-            else:
-                print(f"Discord API error when fetching user guilds: {response.status_code}")
-                return []
+        return await user_guild_cache.get_or_fetch(access_token, fetch_user_guild_list, expires_at)
     except httpx.ReadTimeout:
         print("Timeout when fetching user guilds from Discord API")
         return []
@@ -538,51 +599,19 @@ async def get_user_guilds(access_token: str) -> List[Dict]:
         print(f"Error fetching user guilds: {e}")
         return []
 
-async def get_bot_guilds() -> List[str]:
-    """Get guilds where the bot is present using Discord API"""
-    try:
-        if not DISCORD_BOT_TOKEN:
-            print("❌ No Discord bot token available for API calls")
-            return []
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-            response = await client.get("https://discord.com/api/users/@me/guilds", headers=headers)
-            
-            if response.status_code == 200:
-                guilds = response.json()
-                guild_ids = [str(guild['id']) for guild in guilds]
-                print(f"✅ Bot guilds from Discord API: {len(guild_ids)} guilds")
-                return guild_ids
-            else:
-                print(f"❌ Discord API error when fetching bot guilds: {response.status_code}")
-                print(f"❌ Error details: {response.text}")
-                # Fallback to database method
-                try:
-                    guilds_data = await database.query(
-                        "SELECT DISTINCT guild_id FROM xp_data", 
-                        fetchall=True
-                    )
-                    fallback_guilds = [str(guild['guild_id']) for guild in guilds_data] if guilds_data else []
-                    print(f"🔄 Using fallback database method: {len(fallback_guilds)} guilds")
-                    return fallback_guilds
-                except Exception as db_error:
-                    print(f"❌ Database fallback also failed: {db_error}")
-                    return []
-    except Exception as e:
-        print(f"❌ Error getting bot guilds from Discord API: {e}")
-        # Fallback to database method
-        try:
-            guilds_data = await database.query(
-                "SELECT DISTINCT guild_id FROM xp_data", 
-                fetchall=True
-            )
-            fallback_guilds = [str(guild['guild_id']) for guild in guilds_data] if guilds_data else []
-            print(f"🔄 Using fallback database method: {len(fallback_guilds)} guilds")
-            return fallback_guilds
-        except Exception as db_error:
-            print(f"❌ Database fallback also failed: {db_error}")
-            return []
+async def get_user_guilds(access_token: str, expires_at: Optional[float] = None) -> List[Dict]:
+    """Get user's Discord guilds (admin only), cached until the session expires"""
+    return admin_guilds(await get_user_guild_list(access_token, expires_at))
+
+async def get_user_guild_permissions(guild_id: str, current_user: str) -> int:
+    """Permission bitfield of the logged-in user in a guild (0 when unknown)"""
+    payload = jwt.decode(current_user, SECRET_KEY, algorithms=[ALGORITHM])
+    user_guilds = await get_user_guild_list(payload.get("discord_token"), payload.get("exp"))
+    return guild_permissions(user_guilds, guild_id)
+
+async def get_bot_guilds() -> Set[str]:
+    """Get guilds where the bot is present (shared set refreshed in the background)"""
+    return await bot_guild_set.snapshot()
 
 # Database initialization
 async def init_database():
@@ -687,9 +716,51 @@ async def create_moderation_tables():
     )
     """
     
+    # Precomputed stats, maintained by the bot (log_moderation_action + reconciliation) and dashboard actions
+    daily_stats_table = """
+    CREATE TABLE IF NOT EXISTS moderation_daily_stats (
+        guild_id BIGINT NOT NULL,
+        day DATE NOT NULL,
+        action_type VARCHAR(16) NOT NULL,
+        moderator_id BIGINT NOT NULL,
+        action_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, day, action_type, moderator_id)
+    )
+    """
+    
+    user_last_action_table = """
+    CREATE TABLE IF NOT EXISTS moderation_user_last_action (
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        action_type VARCHAR(16) NOT NULL,
+        last_action_at DATETIME NOT NULL,
+        PRIMARY KEY (guild_id, user_id, action_type),
+        INDEX idx_guild_last_action (guild_id, last_action_at)
+    )
+    """
+    
+    # Pending expirations, executed by the bot's moderation scheduler
+    jobs_table = """
+    CREATE TABLE IF NOT EXISTS moderation_jobs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        guild_id BIGINT NOT NULL,
+        user_id BIGINT NOT NULL,
+        action_type VARCHAR(16) NOT NULL,
+        due_at DATETIME NOT NULL,
+        attempts INT NOT NULL DEFAULT 0,
+        last_error VARCHAR(255) NULL,
+        status ENUM('pending', 'failed') NOT NULL DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_status_due (status, due_at)
+    )
+    """
+    
     try:
         await database.execute(warnings_table)
         await database.execute(timeouts_table)
+        await database.execute(daily_stats_table)
+        await database.execute(user_last_action_table)
+        await database.execute(jobs_table)
         print("✅ Moderation tables created/verified")
         return True
     except Exception as e:
@@ -875,11 +946,60 @@ async def create_ticket_tables():
     )
     """
     
+    # Index of archived transcripts (also created by the bot migration add_ticket_transcripts.sql)
+    ticket_transcripts_table = """
+    CREATE TABLE IF NOT EXISTS ticket_transcripts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        file_id VARCHAR(255) NOT NULL UNIQUE,
+        filename VARCHAR(255),
+        size_bytes BIGINT DEFAULT 0,
+        guild_id BIGINT NOT NULL,
+        ticket_id BIGINT NOT NULL,
+        user_id BIGINT NULL,
+        username VARCHAR(100),
+        discriminator VARCHAR(10),
+        display_name VARCHAR(100),
+        avatar_url VARCHAR(512),
+        participants JSON,
+        message_count INT DEFAULT 0,
+        event_count INT DEFAULT 0,
+        status VARCHAR(20) DEFAULT 'closed',
+        opened_at DATETIME NULL,
+        closed_at DATETIME NULL,
+        first_message_at DATETIME NULL,
+        last_message_at DATETIME NULL,
+        archived_at DATETIME NOT NULL,
+        INDEX idx_guild_archived (guild_id, archived_at),
+        INDEX idx_guild_user_archived (guild_id, user_id, archived_at),
+        INDEX idx_guild_ticket (guild_id, ticket_id)
+    )
+    """
+    
+    # Full-text index over transcript messages (also created by add_ticket_transcript_search.sql)
+    ticket_transcript_messages_table = """
+    CREATE TABLE IF NOT EXISTS ticket_transcript_messages (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        file_id VARCHAR(255) NOT NULL,
+        guild_id BIGINT NOT NULL,
+        ticket_id BIGINT NOT NULL,
+        message_id BIGINT NULL,
+        author_id BIGINT NULL,
+        author_name VARCHAR(100),
+        content TEXT,
+        sent_at DATETIME NULL,
+        INDEX idx_file_id (file_id),
+        INDEX idx_guild_id (guild_id),
+        FULLTEXT INDEX ft_content_author (content, author_name)
+    )
+    """
+    
     try:
         await database.execute(ticket_config_table)
         await database.execute(ticket_panels_table)
         await database.execute(ticket_buttons_table)
         await database.execute(active_tickets_table)
+        await database.execute(ticket_transcripts_table)
+        await database.execute(ticket_transcript_messages_table)
         print("✅ Ticket system tables created/verified")
         return True
     except Exception as e:
@@ -981,6 +1101,7 @@ async def create_rules_validation_table():
         guild_id BIGINT NOT NULL,
         user_id BIGINT NOT NULL,
         accepted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        accepted TINYINT(1) NOT NULL DEFAULT 1,
         PRIMARY KEY (guild_id, user_id),
         INDEX idx_accepted_at (accepted_at)
     )
@@ -1004,12 +1125,75 @@ async def create_rules_validation_table():
                 "ALTER TABLE rules_validation_config ADD COLUMN rules_fields JSON AFTER rules_description"
             )
 
+        # Ensure accepted column exists (withdrawn acceptances are kept with accepted = 0)
+        accepted_column = await database.fetch_one(
+            """SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'rules_acceptances' AND COLUMN_NAME = 'accepted'"""
+        )
+        if not accepted_column:
+            await database.execute(
+                "ALTER TABLE rules_acceptances ADD COLUMN accepted TINYINT(1) NOT NULL DEFAULT 1 AFTER accepted_at"
+            )
+
         print("✅ Rules validation tables created/verified")
         return True
     except Exception as e:
         print(f"❌ Error creating rules validation tables: {e}")
         return False
 
+async def create_config_versions_table():
+    """Create the config versions table the bot watches to invalidate its cached panel/rules configs"""
+    config_versions_table = """
+    CREATE TABLE IF NOT EXISTS config_versions (
+        guild_id BIGINT NOT NULL,
+        scope VARCHAR(32) NOT NULL,
+        version INT NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+        PRIMARY KEY (guild_id, scope),
+        INDEX idx_updated_at (updated_at)
+    )
+    """
+
+    try:
+        await database.execute(config_versions_table)
+        print("✅ Config versions table created/verified")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating config versions table: {e}")
+        return False
+
+async def create_bot_guilds_table():
+    """Create the table the bot publishes its guild list into (read by guild access checks)"""
+    bot_guilds_table = """
+    CREATE TABLE IF NOT EXISTS bot_guilds (
+        guild_id BIGINT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """
+
+    try:
+        await database.execute(bot_guilds_table)
+        print("✅ Bot guilds table created/verified")
+        return True
+    except Exception as e:
+        print(f"❌ Error creating bot guilds table: {e}")
+        return False
+
+async def bump_config_version(guild_id: str, scope: str):
+    """Tell the bot a guild's component config changed ('tickets' panels/buttons, 'rules' or 'role_menus')"""
+    try:
+        await database.execute(
+            """INSERT INTO config_versions (guild_id, scope, version) VALUES (%s, %s, 1)
+               ON DUPLICATE KEY UPDATE version = version + 1""",
+            (int(guild_id), scope)
+        )
+    except Exception as e:
+        # The bot's cache still expires on its own TTL
+        print(f"⚠️ Could not bump {scope} config version for guild {guild_id}: {e}")
+    # Immediate invalidation when the bot is reachable; its version watcher catches up otherwise
+    await bot_ipc.command("/config/invalidate", {"guild_id": str(guild_id), "scope": scope})
+
 async def create_level_up_config_table():
     """Create the level_up_config table for storing custom level up message configurations"""
     level_up_config_table = """
@@ -1365,7 +1549,7 @@ async def discord_callback(code: str, request: Request):
         if request.url.hostname in {"localhost", "127.0.0.1"}:
             redirect_uri = str(request.url_for("discord_callback"))
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             # Exchange code for access token
             token_data = {
                 "client_id": DISCORD_CLIENT_ID,
@@ -1437,7 +1621,7 @@ async def get_current_user_info(current_user: str = Depends(get_current_user)):
         if not discord_token:
             raise HTTPException(status_code=401, detail="No Discord token")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             # Get user info
             user_response = await client.get(
                 "https://discord.com/api/users/@me",
@@ -1450,12 +1634,11 @@ async def get_current_user_info(current_user: str = Depends(get_current_user)):
             user_data = user_response.json()
             
             # Get user guilds and filter by bot presence
-            user_guilds = await get_user_guilds(discord_token)
+            user_guilds = await get_user_guilds(discord_token, payload.get("exp"))
             bot_guilds = await get_bot_guilds()
             
             print(f"🔍 Debug: User guilds count: {len(user_guilds)}")
             print(f"🔍 Debug: Bot guilds count: {len(bot_guilds)}")
-            print(f"🔍 Debug: Bot guild IDs: {bot_guilds}")
             
             # Only show guilds where both user has admin and bot is present
             manageable_guilds = [
@@ -1702,8 +1885,21 @@ async def search_guild_members(
 
         print(f"🔍 Ticket search - Guild: {guild_id}, Query: '{query}'")
 
-        if not drive_storage:
-            print("⚠️ Google Drive not initialized, falling back to database search")
+        index = await get_transcript_index()
+        if index:
+            users = await index.search_users(int(guild_id), query)
+            return [
+                {
+                    "id": user["user_id"],
+                    "username": user["username"],
+                    "avatar_url": user["avatar_url"],
+                    "ticket_count": user["ticket_count"]
+                }
+                for user in users
+            ]
+
+        if not transcript_storage:
+            print("⚠️ Transcript storage not initialized, falling back to database search")
             # Fallback: search in database
             users_from_members = await database.fetch_all(
                 """SELECT DISTINCT user_id, username
@@ -1726,7 +1922,7 @@ async def search_guild_members(
             return result
 
         # Search in Google Drive tickets
-        all_tickets = await drive_storage.list_all_ticket_logs(int(guild_id))
+        all_tickets = await transcript_storage.list_all_ticket_logs(int(guild_id))
         print(f"📋 Found {len(all_tickets)} total tickets in Google Drive")
 
         # Filter tickets by query (username or user_id)
@@ -1774,8 +1970,9 @@ async def get_user_tickets(
         
         print(f"🎫 Getting tickets for user {user_id} in guild {guild_id} from Google Drive")
         
-        if not drive_storage:
-            print("⚠️ Google Drive not initialized, falling back to database")
+        index = await get_transcript_index()
+        if not index and not transcript_storage:
+            print("⚠️ Transcript storage not initialized, falling back to database")
             # Fallback to database if Drive is not available
             tickets = await database.fetch_all(
                 """SELECT * FROM active_tickets 
@@ -1808,8 +2005,11 @@ async def get_user_tickets(
             
             return result
         
-        # Use Google Drive to get tickets
-        tickets = await drive_storage.list_user_ticket_logs(int(guild_id), int(user_id))
+        # Indexed lookup (storage scan until existing archives are indexed)
+        if index:
+            tickets = await index.list_user(int(guild_id), int(user_id))
+        else:
+            tickets = await transcript_storage.list_user_ticket_logs(int(guild_id), int(user_id))
         print(f"📋 Found {len(tickets)} tickets from Google Drive for user {user_id}")
         
         if not tickets:
@@ -1863,10 +2063,20 @@ async def get_ticket_events(
         print(f"📋 Getting events for ticket channel {channel_id} in guild {guild_id}")
         
         # Try to get events from Google Drive first (if available)
-        if drive_storage:
+        if transcript_storage:
             try:
+                index = await get_transcript_index()
+                if index:
+                    # Indexed lookup: only this ticket's archive is downloaded (events only, messages stay compressed)
+                    ticket = await index.find_ticket(int(guild_id), int(channel_id))
+                    logs = await transcript_storage.read_transcript_summary(ticket["file_id"]) if ticket else None
+                    if logs:
+                        events = logs.get("events", [])
+                        print(f"✅ Found {len(events)} events in Google Drive")
+                        return events
+                
                 # Search for ticket with this channel_id in Google Drive
-                all_tickets = await drive_storage.list_all_ticket_logs(int(guild_id))
+                all_tickets = [] if index else await transcript_storage.list_all_ticket_logs(int(guild_id))
                 for ticket in all_tickets:
                     # ticket_id est le channel_id
                     if str(ticket.get("ticket_id")) == str(channel_id):
@@ -1912,6 +2122,119 @@ async def get_ticket_events(
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/guild/{guild_id}/tickets/search")
+async def search_ticket_transcripts(
+    guild_id: str,
+    q: str,
+    page: int = 1,
+    per_page: int = 20,
+    current_user: str = Depends(get_current_user)
+):
+    """Full-text search over archived ticket transcripts (content and authors)"""
+    try:
+        if not await verify_guild_access(guild_id, current_user):
+            raise HTTPException(status_code=403, detail="Access denied to this guild")
+        
+        if not transcript_index:
+            raise HTTPException(status_code=503, detail="Ticket search not available")
+        
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Empty search query")
+        
+        results = await transcript_index.search(int(guild_id), q, page=page, per_page=per_page)
+        # Older archives are only searchable once the bot has indexed them
+        results["complete"] = await transcript_index.is_search_ready()
+        return results
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Ticket search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Attachment types safe to render inline from the dashboard origin (anything else is downloaded)
+INLINE_ATTACHMENT_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "video/mp4", "audio/mpeg", "audio/ogg"}
+
+# Lifetime of the signed attachment links handed out with transcripts (links stay valid 1-2 periods)
+ATTACHMENT_LINK_TTL_SECONDS = int(os.getenv("ATTACHMENT_LINK_TTL_SECONDS", "3600"))
+
+def attachment_signature(guild_id: str, digest: str, expires: int) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"{guild_id}/{digest}/{expires}".encode(), hashlib.sha256).hexdigest()
+
+def sign_attachment_urls(messages, guild_id: str) -> List[Dict]:
+    """Copies of transcript messages whose archived attachment links carry a short-lived signature
+    
+    Only issued by endpoints that checked guild access; the expiry is rounded so links stay
+    identical within a period and the browser can reuse its private cache.
+    """
+    prefix = f"{ATTACHMENT_URL_PREFIX}/{guild_id}/"
+    expires = (int(time.time()) // ATTACHMENT_LINK_TTL_SECONDS + 2) * ATTACHMENT_LINK_TTL_SECONDS
+    signed = []
+    for message in messages:
+        attachments = message.get("attachments") or []
+        if any(str(attachment.get("url", "")).startswith(prefix) for attachment in attachments):
+            message = dict(message)
+            message["attachments"] = [
+                dict(attachment, url=f"{attachment['url']}?expires={expires}&signature="
+                                     f"{attachment_signature(guild_id, attachment['url'][len(prefix):], expires)}")
+                if str(attachment.get("url", "")).startswith(prefix) else attachment
+                for attachment in attachments
+            ]
+        signed.append(message)
+    return signed
+
+@app.get(ATTACHMENT_URL_PREFIX + "/{guild_id}/{digest}")
+async def get_ticket_attachment(guild_id: str, digest: str, expires: int = 0, signature: str = ""):
+    """Serve an archived ticket attachment by content address.
+    
+    Transcript links are plain <a href> (no bearer token), so each link carries an HMAC
+    signature issued with the transcript by an endpoint that checked guild access, and
+    expires after at most two ATTACHMENT_LINK_TTL_SECONDS periods.
+    """
+    if not guild_id.isdigit() or not SHA256_PATTERN.match(digest):
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if expires < time.time() or not hmac.compare_digest(signature, attachment_signature(guild_id, digest, expires)):
+        raise HTTPException(status_code=403, detail="Attachment link expired or invalid")
+    if not transcript_storage:
+        raise HTTPException(status_code=503, detail="Transcript storage not available")
+    
+    try:
+        blob = await transcript_storage.read_blob(int(guild_id), digest)
+    except Exception as e:
+        print(f"❌ Get ticket attachment error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not blob:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    
+    content, content_type = blob
+    headers = {
+        "Cache-Control": f"private, max-age={max(int(expires - time.time()), 0)}",
+        "ETag": f'"{digest}"',
+        "X-Content-Type-Options": "nosniff",
+        "Content-Security-Policy": "default-src 'none'; sandbox"
+    }
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in INLINE_ATTACHMENT_TYPES:
+        media_type = "application/octet-stream"
+        headers["Content-Disposition"] = f'attachment; filename="{digest[:16]}"'
+    return Response(content=content, media_type=media_type, headers=headers)
+
+async def transcript_belongs_to_guild(file_id: str, guild_id: str) -> bool:
+    """Whether an archived transcript belongs to the guild (local id prefix, then index, then the archive header)"""
+    match = LOCAL_FILE_ID_PATTERN.match(file_id)
+    if match:
+        return match.group(1) == guild_id
+    if transcript_index:
+        try:
+            indexed_guild = await transcript_index.guild_of(file_id)
+            if indexed_guild is not None:
+                return str(indexed_guild) == guild_id
+        except Exception as e:
+            print(f"⚠️ Transcript index lookup failed for {file_id}: {e}")
+    # Archives not indexed yet (Drive ids carry no guild): read the archive's own header
+    summary = await transcript_storage.read_transcript_summary(file_id)
+    return bool(summary) and str(summary.get("guild_id")) == guild_id
+
 @app.get("/api/guild/{guild_id}/tickets/file/{file_id}")
 async def get_ticket_transcript(
     guild_id: str,
@@ -1925,16 +2248,19 @@ async def get_ticket_transcript(
         
         print(f"📄 Getting transcript for file {file_id}")
         
-        if not drive_storage:
-            raise HTTPException(status_code=503, detail="Google Drive storage not available")
+        if not transcript_storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
+        if not await transcript_belongs_to_guild(file_id, guild_id):
+            raise HTTPException(status_code=404, detail="Ticket transcript not found")
         
         # Download ticket logs from Google Drive
-        ticket_data = await drive_storage.download_ticket_logs(file_id)
+        ticket_data = await transcript_storage.download_ticket_logs(file_id)
         
         if not ticket_data:
             raise HTTPException(status_code=404, detail="Ticket transcript not found")
         
         print(f"✅ Retrieved transcript with {len(ticket_data.get('messages', []))} messages")
+        ticket_data["messages"] = sign_attachment_urls(ticket_data.get("messages", []), guild_id)
         return ticket_data
         
     except HTTPException:
@@ -1945,6 +2271,36 @@ async def get_ticket_transcript(
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/guild/{guild_id}/tickets/file/{file_id}/messages")
+async def get_ticket_transcript_page(
+    guild_id: str,
+    file_id: str,
+    page: int = 0,
+    per_page: int = 25,
+    current_user: str = Depends(get_current_user)
+):
+    """Get one page of a ticket transcript's messages (only that part of the archive is decoded)"""
+    try:
+        if not await verify_guild_access(guild_id, current_user):
+            raise HTTPException(status_code=403, detail="Access denied to this guild")
+        
+        if not transcript_storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
+        if not await transcript_belongs_to_guild(file_id, guild_id):
+            raise HTTPException(status_code=404, detail="Ticket transcript not found")
+        
+        result = await transcript_storage.read_message_page(file_id, max(page, 0), min(max(per_page, 1), 100))
+        if not result:
+            raise HTTPException(status_code=404, detail="Ticket transcript not found")
+        result["messages"] = sign_attachment_urls(result["messages"], guild_id)
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Get ticket transcript page error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/guild/{guild_id}/tickets/recent")
 async def get_recent_tickets(
     guild_id: str,
@@ -1957,8 +2313,9 @@ async def get_recent_tickets(
         
         print(f"📋 Getting recent tickets for guild {guild_id}")
         
-        if not drive_storage:
-            print("⚠️ Google Drive not initialized, falling back to database")
+        index = await get_transcript_index()
+        if not index and not transcript_storage:
+            print("⚠️ Transcript storage not initialized, falling back to database")
             # Fallback to database
             tickets = await database.fetch_all(
                 """SELECT t.*, m.username 
@@ -1986,9 +2343,12 @@ async def get_recent_tickets(
             
             return result
         
-        # Get all tickets from Google Drive
-        all_tickets = await drive_storage.list_all_ticket_logs(int(guild_id))
-        print(f"📋 Found {len(all_tickets)} total tickets from Google Drive")
+        # Indexed lookup (storage scan until existing archives are indexed)
+        if index:
+            all_tickets = await index.list_guild(int(guild_id), limit=5)
+        else:
+            all_tickets = await transcript_storage.list_all_ticket_logs(int(guild_id))
+        print(f"📋 Found {len(all_tickets)} total tickets")
         
         # Sort by created_at and take the 5 most recent
         sorted_tickets = sorted(
@@ -2037,89 +2397,11 @@ async def get_guild_stats(guild_id: str, current_user: str = Depends(get_current
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Get various stats
-        stats = {}
-        
-        # Total members with XP
-        xp_member_count = await database.fetch_one(
-            "SELECT COUNT(*) as count FROM xp_data WHERE guild_id = %s",
-            (guild_id,)
-        )
-        xp_members = xp_member_count["count"] if xp_member_count else 0
-        
-        # Try to get total server members from Discord API (fallback to XP members)
-        try:
-            bot_token = DISCORD_BOT_TOKEN.strip() if DISCORD_BOT_TOKEN else None
-            if bot_token:
-                headers = {"Authorization": f"Bot {bot_token}"}
-                async with httpx.AsyncClient(timeout=8.0) as client:
-                    # Get actual members list to count real members (more accurate than guild.member_count)
-                    response = await client.get(f"https://discord.com/api/v10/guilds/{guild_id}/members?limit=1000", headers=headers)
-                    if response.status_code == 200:
-                        members = response.json()
-                        # Filter out bots to get real member count
-                        real_members = [m for m in members if not m.get("user", {}).get("bot", False)]
-                        stats["total_members"] = len(real_members)
-                    else:
-                        stats["total_members"] = xp_members
-            else:
-                stats["total_members"] = xp_members
-        except Exception:
-            stats["total_members"] = xp_members
-        
-        # Total XP given
-        total_xp = await database.fetch_one(
-            "SELECT SUM(xp) as total FROM xp_data WHERE guild_id = %s",
-            (guild_id,)
-        )
-        stats["total_xp"] = total_xp["total"] if total_xp and total_xp["total"] else 0
-        
-        # Average level
-        avg_level = await database.fetch_one(
-            "SELECT AVG(level) as avg FROM xp_data WHERE guild_id = %s",
-            (guild_id,)
-        )
-        stats["average_level"] = round(avg_level["avg"], 1) if avg_level and avg_level["avg"] else 0
-        
-        # Activity last 7 days
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        try:
-            recent_activity = await database.fetch_one(
-                "SELECT COUNT(*) as count FROM xp_history WHERE guild_id = %s AND timestamp >= %s",
-                (guild_id, week_ago)
-            )
-            if recent_activity and recent_activity["count"] is not None:
-                stats["recent_activity"] = recent_activity["count"]
-            else:
-                # Fallback: check recent updates in xp_data table
-                fallback_activity = await database.fetch_one(
-                    "SELECT COUNT(*) as count FROM xp_data WHERE guild_id = %s AND updated_at >= %s",
-                    (guild_id, week_ago)
-                )
-                stats["recent_activity"] = fallback_activity["count"] if fallback_activity else 0
-        except Exception:
-            stats["recent_activity"] = 0
-        
-        # Top 5 users
-        top_users = await database.fetch_all(
-            "SELECT user_id, xp, level FROM xp_data WHERE guild_id = %s ORDER BY xp DESC LIMIT 5",
-            (guild_id,)
-        )
-        # Convert user_id to string to prevent JavaScript precision loss with large integers
-        stats["top_users"] = []
-        if top_users:
-            for user in top_users:
-                user_dict = dict(user)
-                original_id = user_dict["user_id"]
-                user_dict["user_id"] = str(user_dict["user_id"])  # Convert to string for JavaScript
-                print(f"🔍 User ID conversion: {original_id} -> {user_dict['user_id']} (type: {type(user_dict['user_id'])})")
-                stats["top_users"].append(user_dict)
-        
-        print(f"🔍 Final top_users before JSON response: {stats['top_users']}")
-        import json
-        from fastapi import Response
-        return Response(content=json.dumps(stats, default=str, ensure_ascii=False), media_type="application/json")
+        # Served from cache; a stale entry is refreshed in the background
+        return await guild_stats.get(guild_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2157,97 +2439,15 @@ async def get_guild_bulk_data(guild_id: str, current_user: str = Depends(get_cur
         
         async def get_channels():
             try:
-                bot_token = DISCORD_BOT_TOKEN.strip()
-                headers = {"Authorization": f"Bot {bot_token}"}
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(f"https://discord.com/api/v10/guilds/{guild_id}/channels", headers=headers)
-                    if response.status_code == 200:
-                        channels = response.json()
-                        text_channels = [{"id": ch["id"], "name": ch["name"]} for ch in channels if ch["type"] == 0]
-                        return text_channels
-                return []
+                channels = await guild_metadata.channels(guild_id)
+                return [{"id": ch["id"], "name": ch["name"]} for ch in channels if ch["type"] == 0]
             except Exception as e:
                 print(f"Bulk channels error: {e}")
                 return []
         
         async def get_stats():
             try:
-                print(f"🔍 Getting stats for guild_id: {guild_id}")
-                
-                # Get XP-active members count (users who have earned XP)
-                xp_members = await database.fetch_val("SELECT COUNT(DISTINCT user_id) FROM xp_data WHERE guild_id = %s", (guild_id,))
-                print(f"📊 XP-active members query result: {xp_members}")
-                
-                # Try to get total server members from Discord API (fallback to XP members if API fails)
-                try:
-                    bot_token = DISCORD_BOT_TOKEN.strip()
-                    headers = {"Authorization": f"Bot {bot_token}"}
-                    async with httpx.AsyncClient(timeout=8.0) as client:
-                        # Get actual members list to count real members (more accurate than guild.member_count)
-                        response = await client.get(f"https://discord.com/api/v10/guilds/{guild_id}/members?limit=1000", headers=headers)
-                        if response.status_code == 200:
-                            members = response.json()
-                            # Filter out bots to get real member count
-                            real_members = [m for m in members if not m.get("user", {}).get("bot", False)]
-                            total_members = len(real_members)
-                            print(f"📊 Total server members from Discord members API: {total_members} (fetched {len(members)} total, {len(real_members)} non-bot)")
-                        else:
-                            total_members = xp_members
-                            print(f"📊 Discord members API failed, using XP members: {total_members}")
-                except Exception as api_error:
-                    total_members = xp_members
-                    print(f"📊 Discord API failed, using XP members: {total_members} - Error: {api_error}")
-                
-                total_xp = await database.fetch_val("SELECT COALESCE(SUM(xp), 0) FROM xp_data WHERE guild_id = %s", (guild_id,))
-                print(f"📊 Total XP query result: {total_xp}")
-                
-                avg_level = await database.fetch_val("SELECT COALESCE(AVG(level), 0) FROM xp_data WHERE guild_id = %s", (guild_id,))
-                print(f"📊 Average level query result: {avg_level}")
-                
-                # Check for recent activity in xp_history table first, fallback to xp_data updates
-                week_ago = datetime.utcnow() - timedelta(days=7)
-                try:
-                    recent_activity = await database.fetch_val(
-                        "SELECT COUNT(*) FROM xp_history WHERE guild_id = %s AND timestamp >= %s", 
-                        (guild_id, week_ago)
-                    )
-                    if recent_activity is None:
-                        # Fallback: check recent updates in xp_data table
-                        recent_activity = await database.fetch_val(
-                            "SELECT COUNT(*) FROM xp_data WHERE guild_id = %s AND updated_at >= %s", 
-                            (guild_id, week_ago)
-                        )
-                        print(f"📊 Recent activity (from xp_data updates): {recent_activity}")
-                    else:
-                        print(f"📊 Recent activity (from xp_history): {recent_activity}")
-                except Exception as activity_error:
-                    recent_activity = 0
-                    print(f"📊 Recent activity query failed: {activity_error}")
-                
-                top_users = await database.fetch_all("SELECT user_id, xp, level FROM xp_data WHERE guild_id = %s ORDER BY xp DESC LIMIT 5", (guild_id,))
-                print(f"📊 Top users query result: {top_users}")
-                
-                # Convert top_users to ensure user_id is string for JavaScript compatibility
-                top_users_list = []
-                for user in (top_users or []):
-                    user_dict = dict(user)
-                    user_dict["user_id"] = str(user_dict["user_id"])  # Force conversion to string
-                    top_users_list.append(user_dict)
-                print(f"📊 Top users converted to strings: {top_users_list}")
-                
-                # Debug info
-                total_rows = await database.fetch_val("SELECT COUNT(*) FROM xp_data")
-                print(f"📊 Total rows in xp_data table: {total_rows}")
-                guild_rows = await database.fetch_val("SELECT COUNT(*) FROM xp_data WHERE guild_id = %s", (guild_id,))
-                print(f"📊 XP data rows for guild {guild_id}: {guild_rows}")
-                
-                return {
-                    "total_members": total_members or 0,
-                    "total_xp": total_xp or 0,
-                    "average_level": round(avg_level, 1) if avg_level else 0,
-                    "recent_activity": recent_activity or 0,
-                    "top_users": top_users_list
-                }
+                return await guild_stats.get(guild_id)
             except Exception as e:
                 print(f"Bulk stats error: {e}")
                 return {"total_members": 0, "total_xp": 0, "average_level": 0, "recent_activity": 0, "top_users": []}
@@ -2306,58 +2506,29 @@ async def get_guild_channels(guild_id: str, current_user: str = Depends(get_curr
     try:
         print(f"Fetching channels for guild {guild_id}")
         
-        # Debug the bot token
-        bot_token = DISCORD_BOT_TOKEN
-        print(f"Bot token exists: {bool(bot_token)}")
-        if bot_token:
-            print(f"🔍 Raw token length: {len(bot_token)}")
-            print(f"🔍 Token starts with: '{bot_token[:5]}...'" if bot_token else "❌ No token")
-            print(f"🔍 Token ends with: '...{bot_token[-5:]}'" if bot_token else "❌ No token")
-            
-            # Clean the token
-            bot_token = bot_token.strip()
-            if bot_token and not bot_token.startswith('MTM'):
-                print(f"⚠️  Token doesn't start with expected prefix. First 10 chars: '{bot_token[:10]}'")
-                # Try to fix common issues
-                if '=' in bot_token and 'DISCORD_TOKEN=' in bot_token:
-                    bot_token = bot_token.split('=', 1)[1]
-                    print(f"🔧 Cleaned token from env format: '{bot_token[:10]}...'")
-            
-            print(f"🔍 Using cleaned token: '{bot_token[:10]}...'")
+        try:
+            channels = await guild_metadata.channels(guild_id)
+        except DiscordAPIError as e:
+            # Fallback to mock channels if API fails
+            print(f"Discord API error: {e}")
+            print("Using fallback mock channels due to API error")
+            return [
+                {"id": "1234567890123456789", "name": "general"},
+                {"id": "1234567890123456790", "name": "announcements"},
+                {"id": "1234567890123456791", "name": "bot-commands"},
+                {"id": "1234567890123456792", "name": "level-ups"},
+                {"id": "1234567890123456793", "name": "xp-tracking"},
+                {"id": "1234567890123456794", "name": "chat"}
+            ]
         
-        # Try to get Discord guild channels via bot token
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"https://discord.com/api/guilds/{guild_id}/channels",
-                headers={"Authorization": f"Bot {bot_token}"}
-            )
-            
-            print(f"Discord API response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"Discord API error: {response.text}")
-            
-            if response.status_code == 200:
-                channels = response.json()
-                print(f"Total channels found: {len(channels)}")
-                # Filter to text channels only
-                text_channels = [
-                    {"id": ch["id"], "name": ch["name"]} 
-                    for ch in channels 
-                    if ch["type"] == 0  # Text channel
-                ]
-                print(f"Text channels found: {len(text_channels)}")
-                return text_channels
-            else:
-                # Fallback to mock channels if API fails
-                print("Using fallback mock channels due to API error")
-                return [
-                    {"id": "1234567890123456789", "name": "general"},
-                    {"id": "1234567890123456790", "name": "announcements"},
-                    {"id": "1234567890123456791", "name": "bot-commands"},
-                    {"id": "1234567890123456792", "name": "level-ups"},
-                    {"id": "1234567890123456793", "name": "xp-tracking"},
-                    {"id": "1234567890123456794", "name": "chat"}
-                ]
+        # Filter to text channels only
+        text_channels = [
+            {"id": ch["id"], "name": ch["name"]} 
+            for ch in channels 
+            if ch["type"] == 0  # Text channel
+        ]
+        print(f"Text channels found: {len(text_channels)} of {len(channels)}")
+        return text_channels
                 
     except Exception as e:
         print(f"Error fetching channels: {e}")
@@ -2381,44 +2552,29 @@ async def get_guild_categories(guild_id: str, current_user: str = Depends(get_cu
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Get bot token
-        bot_token = DISCORD_BOT_TOKEN
-        if not bot_token:
+        if not DISCORD_BOT_TOKEN:
             print("❌ No bot token available")
             raise HTTPException(status_code=500, detail="Bot token not configured")
         
-        # Clean the token
-        bot_token = bot_token.strip()
-        if '=' in bot_token and 'DISCORD_TOKEN=' in bot_token:
-            bot_token = bot_token.split('=', 1)[1]
+        try:
+            channels = await guild_metadata.channels(guild_id)
+        except DiscordAPIError as e:
+            print(f"Discord API error: {e}")
+            # Fallback to mock categories if API fails
+            return [
+                {"id": "1234567890123456795", "name": "Support"},
+                {"id": "1234567890123456796", "name": "Tickets"},
+                {"id": "1234567890123456797", "name": "Admin"}
+            ]
         
-        # Try to get Discord guild channels via bot token
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"https://discord.com/api/guilds/{guild_id}/channels",
-                headers={"Authorization": f"Bot {bot_token}"}
-            )
-            
-            print(f"Discord API response status: {response.status_code}")
-            if response.status_code == 200:
-                channels = response.json()
-                print(f"Total channels found: {len(channels)}")
-                # Filter to category channels only (type 4)
-                categories = [
-                    {"id": ch["id"], "name": ch["name"]} 
-                    for ch in channels 
-                    if ch["type"] == 4  # Category channel
-                ]
-                print(f"Categories found: {len(categories)}")
-                return categories
-            else:
-                print(f"Discord API error: {response.text}")
-                # Fallback to mock categories if API fails
-                return [
-                    {"id": "1234567890123456795", "name": "Support"},
-                    {"id": "1234567890123456796", "name": "Tickets"},
-                    {"id": "1234567890123456797", "name": "Admin"}
-                ]
+        # Filter to category channels only (type 4)
+        categories = [
+            {"id": ch["id"], "name": ch["name"]} 
+            for ch in channels 
+            if ch["type"] == 4  # Category channel
+        ]
+        print(f"Categories found: {len(categories)}")
+        return categories
                 
     except Exception as e:
         print(f"Error fetching categories: {e}")
@@ -2439,61 +2595,43 @@ async def get_guild_roles(guild_id: str, current_user: str = Depends(get_current
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Get bot token
-        bot_token = DISCORD_BOT_TOKEN
-        if not bot_token:
+        if not DISCORD_BOT_TOKEN:
             print("❌ No bot token available")
             raise HTTPException(status_code=500, detail="Bot token not configured")
         
-        # Clean the token
-        bot_token = bot_token.strip()
-        if '=' in bot_token and 'DISCORD_TOKEN=' in bot_token:
-            bot_token = bot_token.split('=', 1)[1]
-        
-        # Try to get Discord guild roles via bot token
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"https://discord.com/api/guilds/{guild_id}/roles",
-                headers={"Authorization": f"Bot {bot_token}"}
-            )
-            
-            print(f"Discord API response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"Discord API error: {response.text}")
-            
-            if response.status_code == 200:
-                roles = response.json()
-                print(f"Total roles found: {len(roles)}")
-                
-                # Filter and format roles (exclude @everyone, sort by position)
-                filtered_roles = [
-                    {
-                        "id": role["id"], 
-                        "name": role["name"],
-                        "color": role["color"],
-                        "position": role["position"],
-                        "managed": role["managed"]
-                    } 
-                    for role in roles 
-                    if role["name"] != "@everyone"
+        try:
+            roles = await guild_metadata.roles(guild_id)
+        except DiscordAPIError as e:
+            # Fallback to mock roles if API fails
+            print(f"Discord API error: {e}")
+            print("Using fallback mock roles due to API error")
+            return {
+                "roles": [
+                    {"id": "1234567890123456801", "name": "Admin", "color": 16711680, "position": 10, "managed": False},
+                    {"id": "1234567890123456802", "name": "Moderator", "color": 3447003, "position": 9, "managed": False},
+                    {"id": "1234567890123456803", "name": "Member", "color": 0, "position": 1, "managed": False},
+                    {"id": "1234567890123456804", "name": "New Member", "color": 65280, "position": 0, "managed": False}
                 ]
-                
-                # Sort by position (higher position = higher in hierarchy)
-                filtered_roles.sort(key=lambda x: x["position"], reverse=True)
-                
-                print(f"Filtered roles found: {len(filtered_roles)}")
-                return {"roles": filtered_roles}
-            else:
-                # Fallback to mock roles if API fails
-                print("Using fallback mock roles due to API error")
-                return {
-                    "roles": [
-                        {"id": "1234567890123456801", "name": "Admin", "color": 16711680, "position": 10, "managed": False},
-                        {"id": "1234567890123456802", "name": "Moderator", "color": 3447003, "position": 9, "managed": False},
-                        {"id": "1234567890123456803", "name": "Member", "color": 0, "position": 1, "managed": False},
-                        {"id": "1234567890123456804", "name": "New Member", "color": 65280, "position": 0, "managed": False}
-                    ]
-                }
+            }
+        
+        # Filter and format roles (exclude @everyone, sort by position)
+        filtered_roles = [
+            {
+                "id": role["id"], 
+                "name": role["name"],
+                "color": role["color"],
+                "position": role["position"],
+                "managed": role["managed"]
+            } 
+            for role in roles 
+            if role["name"] != "@everyone"
+        ]
+        
+        # Sort by position (higher position = higher in hierarchy)
+        filtered_roles.sort(key=lambda x: x["position"], reverse=True)
+        
+        print(f"Filtered roles found: {len(filtered_roles)}")
+        return {"roles": filtered_roles}
                 
     except Exception as e:
         print(f"Error fetching roles: {e}")
@@ -2691,7 +2829,7 @@ async def send_test_levelup_message(
                 template = template.replace(k, v)
             return template
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             headers = {
                 "Authorization": f"Bot {bot_token}",
                 "Content-Type": "application/json"
@@ -3132,14 +3270,7 @@ async def get_role_menus(
         # Get channel names from Discord API
         channels_map = {}
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"https://discord.com/api/guilds/{guild_id}/channels",
-                    headers={"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-                )
-                if response.status_code == 200:
-                    channels = response.json()
-                    channels_map = {ch["id"]: ch["name"] for ch in channels}
+            channels_map = {ch["id"]: ch["name"] for ch in await guild_metadata.channels(guild_id)}
         except Exception as e:
             print(f"Error fetching channel names: {e}")
         
@@ -3375,62 +3506,26 @@ async def delete_role_menu(
         if menu["message_id"]:
             await notify_bot_role_menu_delete(guild_id, menu["channel_id"], menu["message_id"])
         
+        # Drop the menu from the bot's registry
+        await bump_config_version(guild_id, "role_menus")
+        
         return {"success": True}
         
     except Exception as e:
         print(f"Delete role menu error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/guild/{guild_id}/roles")
-async def get_guild_roles(
-    guild_id: str,
-    current_user: str = Depends(get_current_user)
-):
-    """Get roles for a guild"""
-    try:
-        if not await verify_guild_access(guild_id, current_user):
-            raise HTTPException(status_code=403, detail="Access denied to this guild")
-        
-        # Try to get roles from Discord API
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
-            response = await client.get(
-                f"https://discord.com/api/v10/guilds/{guild_id}/roles",
-                headers=headers
-            )
-            
-            if response.status_code == 200:
-                roles = response.json()
-                # Convert role IDs to strings for JavaScript compatibility
-                for role in roles:
-                    role["id"] = str(role["id"])
-                # Sort roles by position (higher position = higher in hierarchy)
-                roles.sort(key=lambda r: r.get('position', 0), reverse=True)
-                return {"roles": roles}
-            else:
-                raise HTTPException(status_code=500, detail="Failed to fetch roles from Discord")
-                
-    except Exception as e:
-        print(f"Get guild roles error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
 async def notify_bot_role_menu_update(guild_id: str, menu_id: int):
-    """Role menu created - bot will automatically detect and create Discord message"""
+    """Ask the bot to create/update the role menu message (IPC), or signal the change through config_versions"""
     try:
-        print(f"✅ Role menu {menu_id} created for guild {guild_id}")
-        print(f"🤖 Bot will automatically create Discord message within 30 seconds")
-        
-        # Try to trigger immediate creation by updating the menu to have a NULL message_id
-        # This will make the bot's check_new_role_menus task pick it up immediately
-        try:
-            await database.execute(
-                "UPDATE role_menus SET message_id = NULL WHERE id = %s",
-                (menu_id,)
-            )
-            print(f"🔄 Triggered immediate message creation for role menu {menu_id}")
-        except Exception as db_error:
-            print(f"⚠️ Could not trigger immediate creation: {db_error}")
-        
+        result = await bot_ipc.command(f"/role-menus/{menu_id}/deploy")
+        if result and result.get("deployed"):
+            print(f"✅ Role menu {menu_id} deployed by the bot for guild {guild_id}")
+            return True
+        
+        # Bot unreachable: its config version watcher reloads the guild's menus and deploys them
+        await bump_config_version(guild_id, "role_menus")
+        print(f"🤖 Bot will create/update the Discord message for role menu {menu_id} within a few seconds")
         return True
         
     except Exception as e:
@@ -3481,9 +3576,9 @@ async def send_role_menu_message(
 
         await notify_bot_role_menu_update(guild_id, menu_id)
 
-        # Wait briefly for the bot background task to create the message and store
-        # its ID so the dashboard can report an immediate status.
-        max_wait_seconds = 35
+        # Wait briefly for the bot to create the message and store its ID (immediate over
+        # IPC, a few seconds through the config version watcher) to report its status.
+        max_wait_seconds = 15
         poll_interval_seconds = 1
         elapsed = 0
 
@@ -3508,7 +3603,7 @@ async def send_role_menu_message(
         return {
             "success": True,
             "queued": True,
-            "message": "Role menu creation queued. The bot should publish it within 30 seconds."
+            "message": "Role menu creation queued. The bot will publish it as soon as it is online."
         }
         
     except Exception as e:
@@ -3561,7 +3656,7 @@ async def notify_bot_role_menu_delete(guild_id: str, channel_id: int, message_id
     """Notify bot to delete role menu message"""
     try:
         # Try to delete the message directly through Discord API
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
             response = await client.delete(
                 f"https://discord.com/api/v10/channels/{channel_id}/messages/{message_id}",
@@ -3628,49 +3723,17 @@ async def privacy_policy(request: Request):
         "current_date": current_date
     })
 
-# Add caching for guild access verification
-guild_access_cache = {}
-guild_access_cache_ttl = 300  # 5 minutes cache
-
 async def verify_guild_access(guild_id: str, current_user: str) -> bool:
-    """Verify user has access to a guild through Discord API or bot presence with caching"""
+    """Verify user has access to a guild through bot presence or the user's admin guilds"""
     try:
-        # Create cache key
         payload = jwt.decode(current_user, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        cache_key = f"{user_id}:{guild_id}"
-        
-        # Check cache first
-        current_time = datetime.now().timestamp()
-        if cache_key in guild_access_cache:
-            cached_result, cache_time = guild_access_cache[cache_key]
-            if current_time - cache_time < guild_access_cache_ttl:
-                print(f"✅ Using cached guild access for {guild_id}")
-                return cached_result
-        
-        print(f"🔍 Verifying guild access for guild {guild_id}")
-        discord_token = payload.get("discord_token")
-        print(f"🔍 Discord token available: {bool(discord_token)}")
-        
-        user_guilds = await get_user_guilds(discord_token)
-        bot_guilds = await get_bot_guilds()
         
-        print(f"🔍 User guilds count: {len(user_guilds)}")
-        print(f"🔍 Bot guilds: {bot_guilds}")
+        # Set lookup first; the user's guild list is only needed for guilds the bot is not in
+        if await bot_guild_set.contains(guild_id):
+            return True
         
-        # Check if user has access through Discord API OR if the guild is in bot's list
-        has_user_access = any(guild["id"] == guild_id for guild in user_guilds)
-        has_bot_access = guild_id in bot_guilds
-        
-        print(f"🔍 User access: {has_user_access}, Bot access: {has_bot_access}")
-        
-        result = has_user_access or has_bot_access
-        print(f"🔍 Final access result: {result}")
-        
-        # Cache the result
-        guild_access_cache[cache_key] = (result, current_time)
-        
-        return result
+        user_guilds = await get_user_guilds(payload.get("discord_token"), payload.get("exp"))
+        return any(guild["id"] == guild_id for guild in user_guilds)
     except Exception as e:
         print(f"❌ Exception in verify_guild_access: {e}")
         return False
@@ -4021,25 +4084,21 @@ async def send_test_welcome_message(
         print(f"🔍 Bot token available: {bool(bot_token)}")
         
         # Get guild info for server name
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             headers = {"Authorization": f"Bot {bot_token}", "Content-Type": "application/json"}
             
             print(f"🔍 Getting guild info for guild {guild_id}")
             # Get guild info for server name
-            guild_response = await client.get(
-                f"https://discord.com/api/v10/guilds/{guild_id}",
-                headers=headers
-            )
-            
-            print(f"🔍 Guild response status: {guild_response.status_code}")
             guild_name = "Unknown Server"
             member_count = "Unknown"
-            if guild_response.status_code == 200:
-                guild_data = guild_response.json()
+            try:
+                guild_data = await guild_metadata.guild(guild_id)
                 guild_name = guild_data.get("name", "Unknown Server")
-                member_count = str(guild_data.get("member_count", "Unknown"))
+                member_count = str(guild_data.get("member_count") or guild_data.get("approximate_member_count", "Unknown"))
                 print(f"🔍 Guild name: {guild_name}")
                 print(f"🔍 Member count: {member_count}")
+            except DiscordAPIError as e:
+                print(f"🔍 Guild info unavailable: {e}")
             
             # Get user info for avatar and username
             user_response = await client.get(
@@ -4397,6 +4456,8 @@ async def create_ticket_panel(
                      button.initial_message, button.button_order)
                 )
         
+        await bump_config_version(guild_id, 'tickets')
+        
         return {"message": "Ticket panel created successfully", "panel_id": panel_id}
         
     except Exception as e:
@@ -4469,6 +4530,8 @@ async def update_ticket_panel(
                      button.initial_message, button.button_order)
                 )
         
+        await bump_config_version(guild_id, 'tickets')
+        
         return {"message": "Ticket panel updated successfully"}
         
     except Exception as e:
@@ -4504,6 +4567,8 @@ async def delete_ticket_panel(
             (panel_id, guild_id)
         )
         
+        await bump_config_version(guild_id, 'tickets')
+        
         return {"message": "Ticket panel deleted successfully"}
         
     except Exception as e:
@@ -4638,7 +4703,7 @@ async def deploy_ticket_panel(
         # Debug: Print the full payload
         print(f"Debug: Full message payload: {message_payload}")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             response = await client.post(
                 f"https://discord.com/api/channels/{deploy_request.channel_id}/messages",
                 headers={
@@ -4661,6 +4726,8 @@ async def deploy_ticket_panel(
                 (deploy_request.channel_id, message_id, datetime.utcnow(), panel_id)
             )
         
+        await bump_config_version(guild_id, 'tickets')
+        
         return {"message": "Ticket panel deployed successfully"}
         
     except Exception as e:
@@ -4782,6 +4849,8 @@ async def update_rules_validation_config(
             )
         )
 
+        await bump_config_version(guild_id, 'rules')
+        
         return {"message": "Rules configuration saved successfully"}
     except Exception as e:
         print(f"Update rules config error: {e}")
@@ -4866,7 +4935,7 @@ async def deploy_rules_validation_message(
         if not bot_token:
             raise HTTPException(status_code=500, detail="Bot token not configured")
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with get_discord_client().session(timeout=15.0) as client:
             response = await client.post(
                 f"https://discord.com/api/v10/channels/{rules_channel_id}/messages",
                 headers={
@@ -4886,6 +4955,8 @@ async def deploy_rules_validation_message(
             (int(message_id), datetime.utcnow(), guild_id)
         )
 
+        await bump_config_version(guild_id, 'rules')
+        
         return {"message": "Rules message deployed successfully", "message_id": str(message_id)}
     except Exception as e:
         print(f"Deploy rules message error: {e}")
@@ -5094,22 +5165,25 @@ async def get_guild_members(
         print(f"🔍 Using cleaned bot token: {bot_token[:20]}..." if bot_token else "❌ No bot token found")
         print(f"🔍 Guild ID being accessed: {guild_id}")
         
+        # Members from the bot's gateway cache when it is reachable
+        ipc_members = await bot_ipc.get(f"/guilds/{guild_id}/members", {"limit": 100})
+        if ipc_members is not None:
+            return {"members": [{
+                "id": member["user"]["id"],
+                "username": member["user"]["username"],
+                "display_name": member.get("nick") or member["user"]["username"],
+                "avatar": member["user"].get("avatar"),
+                "joined_at": member.get("joined_at")
+            } for member in ipc_members]}
+        
         # Get guild members from Discord API
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             # First, let's check if the bot is in the guild
-            guild_response = await client.get(
-                f"https://discord.com/api/v10/guilds/{guild_id}",
-                headers={"Authorization": f"Bot {bot_token}"}
-            )
-            
-            print(f"Guild info response status: {guild_response.status_code}")
-            if guild_response.status_code != 200:
-                print(f"❌ Bot not in guild or guild access denied: {guild_response.status_code}")
-                error_detail = guild_response.json() if guild_response.headers.get('content-type') == 'application/json' else guild_response.text
-                print(f"Guild error details: {error_detail}")
+            try:
+                guild_info = await guild_metadata.guild(guild_id)
+            except DiscordAPIError as e:
+                print(f"❌ Bot not in guild or guild access denied: {e}")
                 return {"members": []}
-            
-            guild_info = guild_response.json()
             print(f"✅ Bot has access to guild: {guild_info.get('name', 'Unknown')}")
             
             # Now try to get members
@@ -5169,7 +5243,7 @@ async def get_bot_status():
         if not bot_token:
             return {"valid": False, "error": "No bot token configured"}
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             response = await client.get(
                 "https://discord.com/api/v10/users/@me",
                 headers={"Authorization": f"Bot {bot_token}"}
@@ -5204,56 +5278,65 @@ async def get_bot_guild_info(
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
         # Get bot token from environment
-        bot_token = DISCORD_BOT_TOKEN
-        if not bot_token:
+        if not DISCORD_BOT_TOKEN:
             return {"error": "Bot token not configured"}
         
         # Get guild info from Discord API
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            guild_response = await client.get(
-                f"https://discord.com/api/v10/guilds/{guild_id}",
-                headers={"Authorization": f"Bot {bot_token}"}
-            )
-            
-            if guild_response.status_code == 200:
-                guild_data = guild_response.json()
-                
-                # Try to get bot member info
-                bot_member_response = await client.get(
-                    f"https://discord.com/api/v10/users/@me",
-                    headers={"Authorization": f"Bot {bot_token}"}
-                )
-                
-                bot_info = {"id": "unknown"}
-                if bot_member_response.status_code == 200:
-                    bot_info = bot_member_response.json()
-                
-                # Try to get bot's permissions in the guild
-                bot_guild_member_response = await client.get(
-                    f"https://discord.com/api/v10/guilds/{guild_id}/members/{bot_info['id']}",
-                    headers={"Authorization": f"Bot {bot_token}"}
-                )
-                
-                permissions = "Unknown"
-                if bot_guild_member_response.status_code == 200:
-                    bot_member_data = bot_guild_member_response.json()
-                    permissions = bot_member_data.get("permissions", "Unknown")
-                
-                return {
-                    "guild_name": guild_data.get("name"),
-                    "bot_id": bot_info.get("id"),
-                    "bot_username": bot_info.get("username"),
-                    "bot_permissions": permissions,
-                    "guild_member_count": guild_data.get("member_count", "Unknown"),
-                    "bot_in_guild": True
-                }
-            else:
-                return {"error": f"Cannot access guild: {guild_response.status_code}"}
+        try:
+            guild_data = await guild_metadata.guild(guild_id)
+        except DiscordAPIError as e:
+            return {"error": f"Cannot access guild: {e.status_code}"}
+        
+        # Try to get bot member info
+        bot_info = {"id": "unknown"}
+        try:
+            bot_info = await guild_metadata.get("", "bot_user")
+        except DiscordAPIError:
+            pass
+        
+        # Try to get bot's permissions in the guild
+        permissions = "Unknown"
+        try:
+            bot_member_data = await guild_metadata.get(guild_id, "bot_member")
+            permissions = bot_member_data.get("permissions", "Unknown")
+        except DiscordAPIError:
+            pass
+        
+        return {
+            "guild_name": guild_data.get("name"),
+            "bot_id": bot_info.get("id"),
+            "bot_username": bot_info.get("username"),
+            "bot_permissions": permissions,
+            "guild_member_count": guild_data.get("member_count") or guild_data.get("approximate_member_count", "Unknown"),
+            "bot_in_guild": True
+        }
                 
     except Exception as e:
         print(f"Bot info error: {e}")
         return {"error": str(e)}
 
+async def log_moderation_history(guild_id: str, user_id: str, moderator_id: str, action_type: str,
+                                 reason: Optional[str], duration_minutes: Optional[int] = None):
+    """Record a dashboard moderation action in moderation_history and the stats counters"""
+    try:
+        expires_at = None
+        if action_type == "timeout" and duration_minutes:
+            expires_at = datetime.now() + timedelta(minutes=duration_minutes)
+        await database.execute(
+            """INSERT INTO moderation_history
+               (guild_id, user_id, moderator_id, action_type, reason, duration_minutes, expires_at, is_active)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+            (int(guild_id), int(user_id), int(moderator_id), action_type, reason, duration_minutes, expires_at, True)
+        )
+        await record_moderation_stats(database, int(guild_id), int(user_id), int(moderator_id), action_type)
+        # A new ban / timeout replaces any pending expiration for this member (the bot re-checks before acting)
+        await cancel_expirations(database, int(guild_id), action_type, [int(user_id)])
+        if expires_at:
+            # Picked up by the bot's moderation scheduler, which deactivates the entry when it expires
+            await enqueue_expirations(database, int(guild_id), action_type, [(int(user_id), expires_at)])
+    except Exception as e:
+        print(f"⚠️ Failed to record moderation history: {e}")
+
 @app.post("/api/guild/{guild_id}/moderation/action")
 async def perform_moderation_action(
     guild_id: str,
@@ -5284,7 +5367,7 @@ async def perform_moderation_action(
             print("❌ No bot token configured")
             raise HTTPException(status_code=500, detail="Bot token not configured")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             headers = {"Authorization": f"Bot {bot_token}", "Content-Type": "application/json"}
             
             # Get user info for display
@@ -5382,6 +5465,7 @@ async def perform_moderation_action(
                 )
                 
                 if kick_response.status_code == 204:
+                    guild_metadata.invalidate(guild_id, "guild")  # Member count changed
                     success_message = f"User kicked successfully. Reason: {action.reason}"
                     log_message = f"👢 **User Kicked**\n**User:** {user_info.get('username', 'Unknown')} (<@{action.user_id}>)\n**Moderator:** {moderator_info.get('username', 'Unknown')} (<@{moderator_id}>)\n**Reason:** {action.reason}"
                 else:
@@ -5396,6 +5480,7 @@ async def perform_moderation_action(
                 )
                 
                 if ban_response.status_code == 204:
+                    guild_metadata.invalidate(guild_id, "guild")  # Member count changed
                     success_message = f"User banned successfully. Reason: {action.reason}"
                     log_message = f"🔨 **User Banned**\n**User:** {user_info.get('username', 'Unknown')} (<@{action.user_id}>)\n**Moderator:** {moderator_info.get('username', 'Unknown')} (<@{moderator_id}>)\n**Reason:** {action.reason}"
                 else:
@@ -5404,6 +5489,11 @@ async def perform_moderation_action(
             else:
                 raise HTTPException(status_code=400, detail="Invalid moderation action")
             
+            await log_moderation_history(
+                guild_id, action.user_id, moderator_id, action.action, action.reason,
+                action.duration if action.action == "timeout" else None
+            )
+            
             # Send log message to channel if specified
             if action.channel_id and log_message:
                 try:
@@ -5451,6 +5541,206 @@ async def perform_moderation_action(
         print(f"Moderation action traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def list_recently_joined_members(client: DiscordRESTClient, guild_id: str, minutes: int,
+                                       max_pages: int = 50) -> List[str]:
+    """IDs of non-bot members who joined in the last `minutes` (member list scanned page by page)"""
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    recent, after = [], "0"
+    for _ in range(max_pages):
+        response = await client.get(
+            f"https://discord.com/api/v10/guilds/{guild_id}/members",
+            headers={"Authorization": f"Bot {DISCORD_BOT_TOKEN}"},
+            params={"limit": 1000, "after": after}
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"Failed to list guild members: {response.status_code}")
+        members = response.json()
+        for member in members:
+            joined_at = member.get("joined_at")
+            if not member["user"].get("bot") and joined_at and datetime.fromisoformat(joined_at) >= cutoff:
+                recent.append(member["user"]["id"])
+        if len(members) < 1000:
+            break
+        after = members[-1]["user"]["id"]
+    return recent
+
+def top_role_position(role_ids: List[str], positions: Dict[str, int]) -> int:
+    """Position of a member's highest role (0 for @everyone only)"""
+    return max((positions.get(str(role_id), 0) for role_id in role_ids), default=0)
+
+def raise_for_rate_limit(response: httpx.Response) -> None:
+    if response.status_code == 429:
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        retry_after = data.get("retry_after") or response.headers.get("Retry-After") or 1
+        raise RateLimited(float(retry_after), bool(data.get("global")))
+
+def discord_bulk_performer(client: DiscordRESTClient, job: BulkJob, positions: Dict[str, int],
+                           bot_top: int, moderator_top: Optional[int]):
+    """Discord REST call for one target of a bulk job
+    
+    Like the bot's bulk command, targets whose top role is at or above the bot's, or the
+    moderator's (`moderator_top` is None for the server owner), are skipped.
+    """
+    base_url = f"https://discord.com/api/v10/guilds/{job.guild_id}"
+    headers = {"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
+    if job.reason:
+        headers["X-Audit-Log-Reason"] = quote(job.reason)
+    
+    async def check_hierarchy(user_id: int):
+        response = await client.get(f"{base_url}/members/{user_id}", headers={"Authorization": f"Bot {DISCORD_BOT_TOKEN}"})
+        raise_for_rate_limit(response)
+        if response.status_code == 404:
+            # A ban may target an account that already left the server
+            if job.action_type != "ban":
+                raise LookupError("member left the server")
+            return
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text[:150]}")
+        target_top = top_role_position(response.json().get("roles", []), positions)
+        if target_top >= bot_top:
+            raise PermissionError("skipped: top role at or above the bot's")
+        if moderator_top is not None and target_top >= moderator_top:
+            raise PermissionError("skipped: top role at or above yours")
+    
+    async def perform(user_id: int):
+        await check_hierarchy(user_id)
+        if job.action_type == "ban":
+            response = await client.put(f"{base_url}/bans/{user_id}", headers=headers, json={"delete_message_seconds": 0})
+        elif job.action_type == "timeout":
+            until = datetime.now(timezone.utc) + timedelta(minutes=job.duration_minutes)
+            response = await client.patch(
+                f"{base_url}/members/{user_id}", headers=headers,
+                json={"communication_disabled_until": until.isoformat()}
+            )
+        else:
+            response = await client.delete(f"{base_url}/members/{user_id}", headers=headers)
+        
+        raise_for_rate_limit(response)
+        if response.status_code not in (200, 204):
+            raise Exception(f"HTTP {response.status_code}: {response.text[:150]}")
+    
+    return perform
+
+# Discord permission required from the dashboard user for each bulk action (Administrator also grants it)
+BULK_ACTION_PERMISSIONS = {"timeout": MODERATE_MEMBERS, "kick": KICK_MEMBERS, "ban": BAN_MEMBERS}
+
+@app.post("/api/guild/{guild_id}/moderation/bulk")
+async def start_bulk_moderation_action(
+    guild_id: str,
+    action: BulkModerationAction,
+    current_user: str = Depends(get_current_user)
+):
+    """Start a bulk moderation job; progress is read from the status or stream endpoints"""
+    if not await verify_guild_access(guild_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied to this guild")
+    if not DISCORD_BOT_TOKEN:
+        raise HTTPException(status_code=500, detail="Bot token not configured")
+    if not bulk_executor:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    if action.action not in BULK_ACTIONS:
+        raise HTTPException(status_code=400, detail="Invalid bulk moderation action")
+    if action.action == "timeout" and not (action.duration and 0 < action.duration <= 40320):
+        raise HTTPException(status_code=400, detail="Duration between 1 and 40320 minutes required for timeout")
+    # Guild access only proves the bot is there; the action itself needs the matching moderation permission
+    permissions = await get_user_guild_permissions(guild_id, current_user)
+    if not has_permission(permissions, BULK_ACTION_PERMISSIONS[action.action]):
+        raise HTTPException(status_code=403, detail=f"Missing permission for bulk {action.action}")
+    
+    moderator_id = jwt.decode(current_user, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    client = get_discord_client()
+    try:
+        owner_id = str((await guild_metadata.guild(guild_id))["owner_id"])
+        bot_id = str((await guild_metadata.get("", "bot_user"))["id"])
+        positions = {role["id"]: role["position"] for role in await guild_metadata.roles(guild_id)}
+        bot_top = top_role_position((await guild_metadata.get(guild_id, "bot_member")).get("roles", []), positions)
+    except DiscordAPIError as e:
+        raise HTTPException(status_code=502, detail=f"Could not load guild information: {e.status_code}")
+    moderator_top = None
+    if str(moderator_id) != owner_id:
+        response = await client.get(
+            f"https://discord.com/api/v10/guilds/{guild_id}/members/{moderator_id}",
+            headers={"Authorization": f"Bot {DISCORD_BOT_TOKEN}"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=403, detail="You are not a member of this guild")
+        moderator_top = top_role_position(response.json().get("roles", []), positions)
+    targets = [user_id for user_id in action.user_ids if user_id.isdigit()]
+    if action.joined_within_minutes:
+        targets += await list_recently_joined_members(client, guild_id, min(action.joined_within_minutes, 10080))
+    # Same exclusions as the bot's bulk command: moderator, server owner and the bot itself
+    excluded = {str(moderator_id), owner_id, bot_id}
+    targets = [int(user_id) for user_id in dict.fromkeys(targets) if user_id not in excluded]
+    if not targets:
+        raise HTTPException(status_code=400, detail="No member targeted")
+    
+    job = BulkJob(int(guild_id), int(moderator_id), action.action, targets,
+                  reason=action.reason, duration_minutes=action.duration)
+    
+    async def finish(job: BulkJob):
+        """Post one summary log for the whole job"""
+        if job.action_type in ("kick", "ban") and job.succeeded:
+            guild_metadata.invalidate(guild_id, "guild")  # Member count changed
+        if action.channel_id and job.succeeded:
+            description = (
+                f"**Action:** {job.action_type}\n**Moderator:** <@{moderator_id}>\n"
+                f"**Members:** {len(job.succeeded)} succeeded, {len(job.failed)} failed\n**Reason:** {job.reason}"
+            )
+            await client.post(
+                f"https://discord.com/api/v10/channels/{action.channel_id}/messages",
+                headers={"Authorization": f"Bot {DISCORD_BOT_TOKEN}"},
+                json={"embeds": [{
+                    "title": "Bulk Moderation Action",
+                    "description": description,
+                    "color": 0xff6b6b,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "footer": {"text": "Maybee Moderation System"}
+                }]}
+            )
+    
+    bulk_executor.submit(job, discord_bulk_performer(client, job, positions, bot_top, moderator_top), on_done=finish)
+    return {
+        "job_id": job.id,
+        "total": len(job.targets),
+        "truncated": len(targets) > MAX_BULK_TARGETS
+    }
+
+def get_bulk_job(guild_id: str, job_id: str) -> BulkJob:
+    job = bulk_executor.get(job_id) if bulk_executor else None
+    if not job or str(job.guild_id) != guild_id:
+        raise HTTPException(status_code=404, detail="Bulk moderation job not found")
+    return job
+
+@app.get("/api/guild/{guild_id}/moderation/bulk/{job_id}")
+async def get_bulk_moderation_status(
+    guild_id: str,
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    """Current progress of a bulk moderation job"""
+    if not await verify_guild_access(guild_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied to this guild")
+    return get_bulk_job(guild_id, job_id).snapshot()
+
+@app.get("/api/guild/{guild_id}/moderation/bulk/{job_id}/stream")
+async def stream_bulk_moderation_progress(
+    guild_id: str,
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    """Server-sent events with the job progress until it finishes"""
+    if not await verify_guild_access(guild_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied to this guild")
+    job = get_bulk_job(guild_id, job_id)
+    
+    async def events():
+        async for snapshot in job.progress(interval=0.5):
+            yield f"data: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/api/guild/{guild_id}/moderation/history")
 async def get_guild_moderation_history(
     guild_id: str,
@@ -5764,7 +6054,7 @@ async def send_embed_message(
         print(f"🔍 Embed payload: {embed}")
         
         # Send message to Discord
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with get_discord_client().session(timeout=10.0) as client:
             response = await client.post(
                 f"https://discord.com/api/channels/{embed_data.target_channel}/messages",
                 headers={
@@ -5916,14 +6206,23 @@ async def search_users(
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Import GoogleDriveStorage
-        import sys
-        sys.path.append('..')
-        from cloud_storage import GoogleDriveStorage
+        index = await get_transcript_index()
+        if index:
+            users = await index.search_users(int(guild_id), query)
+            return {"users": [
+                {
+                    'id': user['user_id'],
+                    'username': user['username'],
+                    'discriminator': user['discriminator'],
+                    'avatar_url': user['avatar_url']
+                }
+                for user in users
+            ]}
         
-        # Initialize Google Drive storage
-        storage = GoogleDriveStorage()
-        await storage.initialize()
+        # Shared transcript storage (initialized once at startup)
+        storage = transcript_storage
+        if not storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
         
         # Get all ticket logs from Google Drive
         all_logs = await storage.list_all_ticket_logs(guild_id)
@@ -5978,14 +6277,26 @@ async def get_search_suggestions(
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Import GoogleDriveStorage
-        import sys
-        sys.path.append('..')
-        from cloud_storage import GoogleDriveStorage
+        index = await get_transcript_index()
+        if index:
+            # Users with the most recent tickets, aggregated in SQL
+            users = await index.search_users(int(guild_id), "")
+            return {"suggestions": [
+                {
+                    'id': user['user_id'],
+                    'username': user['username'],
+                    'discriminator': user['discriminator'],
+                    'avatar_url': user['avatar_url'],
+                    'ticket_count': user['ticket_count'],
+                    'last_ticket_date': user['last_ticket_at']
+                }
+                for user in users
+            ]}
         
-        # Initialize Google Drive storage
-        storage = GoogleDriveStorage()
-        await storage.initialize()
+        # Shared transcript storage (initialized once at startup)
+        storage = transcript_storage
+        if not storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
         
         # Get all ticket logs from Google Drive
         all_logs = await storage.list_all_ticket_logs(guild_id)
@@ -6044,21 +6355,21 @@ async def get_user_tickets_legacy(
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Import GoogleDriveStorage
-        import sys
-        sys.path.append('..')
-        from cloud_storage import GoogleDriveStorage
-        
-        # Initialize Google Drive storage
-        storage = GoogleDriveStorage()
-        await storage.initialize()
-        
         # Validate user_id
         if user_id == 'Inconnu' or not user_id.isdigit():
             raise HTTPException(status_code=400, detail="Invalid user ID")
         
-        # Get ticket logs for this specific user from Google Drive
-        user_logs = await storage.list_user_ticket_logs(guild_id, int(user_id))
+        index = await get_transcript_index()
+        if index:
+            user_logs = await index.list_user(int(guild_id), int(user_id))
+        else:
+            # Shared transcript storage (initialized once at startup)
+            storage = transcript_storage
+            if not storage:
+                raise HTTPException(status_code=503, detail="Transcript storage not available")
+            
+            # Get ticket logs for this specific user from Google Drive
+            user_logs = await storage.list_user_ticket_logs(guild_id, int(user_id))
         
         # Process logs to create user info and tickets list
         user_tickets = []
@@ -6119,14 +6430,12 @@ async def get_ticket_details(
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Import GoogleDriveStorage
-        import sys
-        sys.path.append('..')
-        from cloud_storage import GoogleDriveStorage
-        
-        # Initialize Google Drive storage
-        storage = GoogleDriveStorage()
-        await storage.initialize()
+        # Shared transcript storage (initialized once at startup)
+        storage = transcript_storage
+        if not storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
+        if not await transcript_belongs_to_guild(file_id, guild_id):
+            raise HTTPException(status_code=404, detail="Ticket logs not found")
         
         # Download ticket logs from Google Drive
         ticket_data = await storage.download_ticket_logs(file_id)
@@ -6134,8 +6443,11 @@ async def get_ticket_details(
         if not ticket_data:
             raise HTTPException(status_code=404, detail="Ticket logs not found")
         
+        ticket_data["messages"] = sign_attachment_urls(ticket_data.get("messages", []), guild_id)
         return ticket_data
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Get ticket details error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -6154,14 +6466,10 @@ async def debug_ticket_logs(
         if not await verify_guild_access(guild_id, current_user):
             raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Import GoogleDriveStorage
-        import sys
-        sys.path.append('..')
-        from cloud_storage import GoogleDriveStorage
-        
-        # Initialize Google Drive storage
-        storage = GoogleDriveStorage()
-        await storage.initialize()
+        # Shared transcript storage (initialized once at startup)
+        storage = transcript_storage
+        if not storage:
+            raise HTTPException(status_code=503, detail="Transcript storage not available")
         
         # Get all ticket logs from Google Drive
         all_logs = await storage.list_all_ticket_logs(guild_id)
@@ -6209,60 +6517,23 @@ async def get_moderation_history(
     action_type: Optional[str] = None,
     date_filter: Optional[str] = None,
     limit: int = 25,
-    offset: int = 0
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
 ):
-    """Récupère l'historique de modération avec filtres"""
+    """Récupère une page de l'historique de modération avec filtres (pagination par curseur)"""
     try:
-        db = await get_database()
-        
-        # Construire la requête avec filtres
-        where_conditions = ["guild_id = %s"]
-        params = [guild_id]
-        
-        if user_id:
-            where_conditions.append("user_id = %s")
-            params.append(user_id)
-        
-        if action_type:
-            where_conditions.append("action_type = %s")
-            params.append(action_type)
-        
-        # Filtre par date
-        if date_filter:
-            if date_filter == "today":
-                where_conditions.append("DATE(timestamp) = CURDATE()")
-            elif date_filter == "week":
-                where_conditions.append("timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)")
-            elif date_filter == "month":
-                where_conditions.append("timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)")
-        
-        where_clause = " AND ".join(where_conditions)
-        
-        # Requête principale
-        query = f"""
-            SELECT mh.*, 
-                   u.username as user_name, u.discriminator as user_discriminator,
-                   m.username as moderator_name, m.discriminator as moderator_discriminator
-            FROM moderation_history mh
-            LEFT JOIN user_cache u ON mh.user_id = u.user_id
-            LEFT JOIN user_cache m ON mh.moderator_id = m.user_id
-            WHERE {where_clause}
-            ORDER BY mh.timestamp DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
+        if not await verify_guild_access(str(guild_id), current_user):
+            raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        results = await db.fetch(query, params)
+        results, next_cursor = await fetch_history_page(
+            database, guild_id, user_id=user_id, action_type=action_type,
+            date_filter=date_filter, limit=limit, cursor=cursor
+        )
         
-        # Compter le total pour la pagination
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM moderation_history mh
-            WHERE {where_clause}
-        """
-        count_params = params[:-2]  # Enlever limit et offset
-        count_result = await db.fetchone(count_query, count_params)
-        total_count = count_result['total'] if count_result else 0
+        # Le total n'est compté qu'à la première page
+        total_count = None
+        if not cursor:
+            total_count = await count_history(database, guild_id, user_id, action_type, date_filter)
         
         # Formater les résultats
         formatted_results = []
@@ -6270,11 +6541,7 @@ async def get_moderation_history(
             formatted_results.append({
                 "id": row['id'],
                 "user_id": row['user_id'],
-                "user_name": row['user_name'],
-                "user_discriminator": row['user_discriminator'],
                 "moderator_id": row['moderator_id'],
-                "moderator_name": row['moderator_name'],
-                "moderator_discriminator": row['moderator_discriminator'],
                 "action_type": row['action_type'],
                 "reason": row['reason'],
                 "duration_minutes": row['duration_minutes'],
@@ -6288,12 +6555,14 @@ async def get_moderation_history(
             "data": formatted_results,
             "pagination": {
                 "total": total_count,
-                "limit": limit,
-                "offset": offset,
-                "has_more": offset + limit < total_count
+                "limit": min(max(limit, 1), MAX_HISTORY_PAGE_SIZE),
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting moderation history: {e}")
         return {
@@ -6302,64 +6571,21 @@ async def get_moderation_history(
         }
 
 @app.get("/api/moderation/stats/{guild_id}")
-async def get_moderation_stats(guild_id: int):
-    """Récupère les statistiques de modération"""
+async def get_moderation_stats(guild_id: int, current_user: str = Depends(get_current_user)):
+    """Récupère les statistiques de modération (compteurs journaliers précalculés)"""
     try:
-        db = await get_database()
-        
-        # Statistiques générales
-        stats_query = """
-            SELECT 
-                action_type,
-                COUNT(*) as count,
-                COUNT(DISTINCT user_id) as unique_users,
-                COUNT(DISTINCT moderator_id) as unique_moderators
-            FROM moderation_history 
-            WHERE guild_id = %s AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-            GROUP BY action_type
-        """
-        stats = await db.fetch(stats_query, (guild_id,))
-        
-        # Top modérateurs
-        moderators_query = """
-            SELECT 
-                moderator_id,
-                COUNT(*) as action_count,
-                m.username as moderator_name,
-                m.discriminator as moderator_discriminator
-            FROM moderation_history mh
-            LEFT JOIN user_cache m ON mh.moderator_id = m.user_id
-            WHERE guild_id = %s AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-            GROUP BY moderator_id
-            ORDER BY action_count DESC
-            LIMIT 10
-        """
-        moderators = await db.fetch(moderators_query, (guild_id,))
+        if not await verify_guild_access(str(guild_id), current_user):
+            raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        # Statistiques globales
-        total_query = """
-            SELECT 
-                COUNT(*) as total_actions,
-                COUNT(DISTINCT user_id) as unique_users,
-                COUNT(DISTINCT moderator_id) as unique_moderators
-            FROM moderation_history 
-            WHERE guild_id = %s AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        """
-        total_stats = await db.fetchone(total_query, (guild_id,))
+        stats = await read_moderation_stats(database, guild_id)
         
         return {
             "success": True,
-            "data": {
-                "stats": [dict(stat) for stat in stats],
-                "top_moderators": [dict(mod) for mod in moderators],
-                "totals": dict(total_stats) if total_stats else {
-                    "total_actions": 0,
-                    "unique_users": 0,
-                    "unique_moderators": 0
-                }
-            }
+            "data": stats
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error getting moderation stats: {e}")
         return {
@@ -6372,47 +6598,25 @@ async def export_moderation_history(
     guild_id: int,
     user_id: Optional[int] = None,
     action_type: Optional[str] = None,
-    date_filter: Optional[str] = None
+    date_filter: Optional[str] = None,
+    current_user: str = Depends(get_current_user)
 ):
     """Exporte l'historique de modération en CSV"""
     try:
-        db = await get_database()
-        
-        # Construire la requête avec filtres (même logique que get_moderation_history)
-        where_conditions = ["guild_id = %s"]
-        params = [guild_id]
-        
-        if user_id:
-            where_conditions.append("user_id = %s")
-            params.append(user_id)
-        
-        if action_type:
-            where_conditions.append("action_type = %s")
-            params.append(action_type)
-        
-        if date_filter:
-            if date_filter == "today":
-                where_conditions.append("DATE(timestamp) = CURDATE()")
-            elif date_filter == "week":
-                where_conditions.append("timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)")
-            elif date_filter == "month":
-                where_conditions.append("timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)")
+        if not await verify_guild_access(str(guild_id), current_user):
+            raise HTTPException(status_code=403, detail="Access denied to this guild")
         
-        where_clause = " AND ".join(where_conditions)
+        # Mêmes filtres que get_moderation_history
+        where_conditions, params = build_history_filters(guild_id, user_id, action_type, date_filter)
         
         # Requête pour l'export (pas de limite)
         query = f"""
-            SELECT mh.*, 
-                   u.username as user_name, u.discriminator as user_discriminator,
-                   m.username as moderator_name, m.discriminator as moderator_discriminator
-            FROM moderation_history mh
-            LEFT JOIN user_cache u ON mh.user_id = u.user_id
-            LEFT JOIN user_cache m ON mh.moderator_id = m.user_id
-            WHERE {where_clause}
-            ORDER BY mh.timestamp DESC
+            SELECT * FROM moderation_history
+            WHERE {" AND ".join(where_conditions)}
+            ORDER BY timestamp DESC, id DESC
         """
         
-        results = await db.fetch(query, params)
+        results = await database.fetch_all(query, params)
         
         # Créer le CSV
         import csv
@@ -6432,9 +6636,9 @@ async def export_moderation_history(
             writer.writerow([
                 row['id'],
                 row['user_id'],
-                f"{row['user_name']}#{row['user_discriminator']}" if row['user_name'] else f"User {row['user_id']}",
+                f"User {row['user_id']}",
                 row['moderator_id'],
-                f"{row['moderator_name']}#{row['moderator_discriminator']}" if row['moderator_name'] else f"Moderator {row['moderator_id']}",
+                f"Moderator {row['moderator_id']}",
                 row['action_type'],
                 row['reason'] or '',
                 row['duration_minutes'] or '',
@@ -6454,6 +6658,8 @@ async def export_moderation_history(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error exporting moderation history: {e}")
         return {
@@ -6901,16 +7107,16 @@ async def get_moderation_stats_chart(guild_id: str, period: str = "7d", current_
         try:
             query = """
             SELECT 
-                DATE(created_at) as date,
+                day as date,
                 action_type,
-                COUNT(*) as count
-            FROM moderation_history
-            WHERE guild_id = %s AND created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY DATE(created_at), action_type
+                CAST(SUM(action_count) AS SIGNED) as count
+            FROM moderation_daily_stats
+            WHERE guild_id = %s AND day >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+            GROUP BY day, action_type
             ORDER BY date
             """
             
-            results = await database.query(query, (guild_id, days_back))
+            results = await database.query(query, (guild_id, days_back), fetchall=True)
             if results is None:
                 results = []
             print(f"📊 Moderation query successful, {len(results)} results")
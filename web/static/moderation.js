@@ -4,6 +4,8 @@ class ModerationHistory {
         this.dashboard = dashboard;
         this.currentPage = 1;
         this.totalPages = 1;
+        this.cursors = [null]; // Start cursor of each page visited so far
+        this.nextCursor = null;
         this.filters = {
             user: '',
             action: '',
@@ -12,6 +14,11 @@ class ModerationHistory {
         };
     }
     
+    authHeaders() {
+        const token = this.dashboard.getCookie('access_token');
+        return token ? { 'Authorization': `Bearer ${token}` } : {};
+    }
+    
     async init() {
         console.log('🐝 Initializing moderation history...');
         this.setupEventListeners();
@@ -61,6 +68,7 @@ class ModerationHistory {
             prevBtn.addEventListener('click', () => {
                 if (this.currentPage > 1) {
                     this.currentPage--;
+                    this.cursors.pop();
                     this.loadHistory();
                 }
             });
@@ -68,8 +76,9 @@ class ModerationHistory {
         
         if (nextBtn) {
             nextBtn.addEventListener('click', () => {
-                if (this.currentPage < this.totalPages) {
+                if (this.nextCursor) {
                     this.currentPage++;
+                    this.cursors.push(this.nextCursor);
                     this.loadHistory();
                 }
             });
@@ -79,13 +88,15 @@ class ModerationHistory {
     async loadHistory() {
         try {
             const guildId = this.dashboard.guildId;
-            const offset = (this.currentPage - 1) * this.filters.limit;
+            const cursor = this.cursors[this.cursors.length - 1];
             
             const params = new URLSearchParams({
-                limit: this.filters.limit,
-                offset: offset
+                limit: this.filters.limit
             });
             
+            if (cursor) {
+                params.append('cursor', cursor);
+            }
             if (this.filters.user) {
                 params.append('user_id', this.filters.user);
             }
@@ -96,15 +107,17 @@ class ModerationHistory {
                 params.append('date_filter', this.filters.date);
             }
             
-            const response = await fetch(`/api/moderation/history/${guildId}?${params}`);
+            const response = await fetch(`/api/moderation/history/${guildId}?${params}`, {
+                headers: this.authHeaders()
+            });
             const data = await response.json();
             
             if (data.success) {
                 this.displayHistory(data.data);
                 this.updatePagination(data.pagination);
             } else {
-                console.error('Failed to load moderation history:', data.error);
-                this.showError(data.error);
+                console.error('Failed to load moderation history:', data.error || data.detail);
+                this.showError(data.error || data.detail);
             }
         } catch (error) {
             console.error('Error loading moderation history:', error);
@@ -115,7 +128,9 @@ class ModerationHistory {
     async loadStats() {
         try {
             const guildId = this.dashboard.guildId;
-            const response = await fetch(`/api/moderation/stats/${guildId}`);
+            const response = await fetch(`/api/moderation/stats/${guildId}`, {
+                headers: this.authHeaders()
+            });
             const data = await response.json();
             
             if (data.success) {
@@ -206,7 +221,11 @@ class ModerationHistory {
     }
     
     updatePagination(pagination) {
-        this.totalPages = Math.ceil(pagination.total / pagination.limit);
+        // The total is only counted on the first page
+        if (pagination.total !== null && pagination.total !== undefined) {
+            this.totalPages = Math.max(1, Math.ceil(pagination.total / pagination.limit));
+        }
+        this.nextCursor = pagination.next_cursor;
         
         const prevBtn = document.getElementById('prevPageBtn');
         const nextBtn = document.getElementById('nextPageBtn');
@@ -218,7 +237,7 @@ class ModerationHistory {
         }
         
         if (nextBtn) {
-            nextBtn.disabled = this.currentPage >= this.totalPages;
+            nextBtn.disabled = !this.nextCursor;
         }
         
         if (paginationInfo) {
@@ -242,6 +261,7 @@ class ModerationHistory {
         this.filters.limit = limitFilter ? parseInt(limitFilter.value) : 25;
         
         this.currentPage = 1;
+        this.cursors = [null];
         this.loadHistory();
     }
     
@@ -264,6 +284,7 @@ class ModerationHistory {
         };
         
         this.currentPage = 1;
+        this.cursors = [null];
         this.loadHistory();
     }
     
@@ -283,7 +304,8 @@ class ModerationHistory {
             }
             
             const response = await fetch(`/api/moderation/export/${guildId}?${params}`, {
-                method: 'POST'
+                method: 'POST',
+                headers: this.authHeaders()
             });
             const data = await response.json();
             
@@ -299,8 +321,8 @@ class ModerationHistory {
                 document.body.removeChild(a);
                 window.URL.revokeObjectURL(url);
             } else {
-                console.error('Failed to export moderation history:', data.error);
-                alert('Failed to export moderation history: ' + data.error);
+                console.error('Failed to export moderation history:', data.error || data.detail);
+                alert('Failed to export moderation history: ' + (data.error || data.detail));
             }
         } catch (error) {
             console.error('Error exporting moderation history:', error);